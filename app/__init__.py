@@ -19,18 +19,35 @@ def create_app(config_name='default'):
     
     # Cargar configuración
     app.config.from_object(get_config(config_name))
+    app.config.setdefault('CONFIG_NAME', config_name)  # los procesos de trabajo crean la suya igual
     
     # Inicializar sesiones
     sess.init_app(app)
     
+    # Inicializar pool de conexiones a la base de datos
+    from app import database
+    database.init_app(app)
+    
     # Registrar blueprints (rutas)
-    from app.routes import auth, dashboard, productos, movimientos, usuarios
+    from app.routes import auth, dashboard, productos, movimientos, usuarios, trabajos, analitica
     
     app.register_blueprint(auth.bp)
     app.register_blueprint(dashboard.bp)
     app.register_blueprint(productos.bp)
     app.register_blueprint(movimientos.bp)
     app.register_blueprint(usuarios.bp)
+    app.register_blueprint(trabajos.bp)
+    app.register_blueprint(analitica.bp)
+    
+    # Tareas periódicas (archivo histórico, almacén analítico) con la primera petición
+    from app.services.job_runner import iniciar_programados
+    app.before_request(iniciar_programados)
+    
+    # Índice de búsqueda y motor de alertas en segundo plano desde la primera petición
+    from app.services.product_search import precargar_indice
+    from app.services.alert_engine import precargar_motor
+    app.before_request(precargar_indice)
+    app.before_request(precargar_motor)
     
     # Ruta raíz redirige al dashboard
     @app.route('/')
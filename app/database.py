@@ -4,22 +4,66 @@
 # ACTUALIZADO CON SISTEMA DE ROLES
 # =============================================
 
+import random
+import time
+
 import pyodbc
 from flask import current_app, g
 
+from app.db_pool import ConnectionPool
+from app.rows import make_rows
+from app.services.audit_writer import TABLAS_AUDITADAS, eventos_cambio, get_audit_writer
+from app.services.query_stats import get_registro_consultas
+
+
+def get_pool(app=None):
+    """
+    Obtiene el pool de conexiones de la aplicación.
+    Se crea la primera vez que se solicita, con DB_POOL_MIN_SIZE conexiones abiertas.
+    """
+    app = app or current_app._get_current_object()
+    pool = app.extensions.get('db_pool')
+    
+    if pool is None:
+        connection_string = app.config['DB_CONNECTION_STRING']
+        
+        def crear_conexion():
+            conn = pyodbc.connect(connection_string, timeout=10)
+            conn.autocommit = False  # Manejar transacciones manualmente
+            return conn
+        
+        pool = ConnectionPool(
+            crear_conexion,
+            min_size=app.config.get('DB_POOL_MIN_SIZE', 2),
+            max_size=app.config.get('DB_POOL_MAX_SIZE', 10),
+            timeout=app.config.get('DB_POOL_TIMEOUT', 10),
+            recycle=app.config.get('DB_POOL_RECYCLE', 1800),
+            validate=app.config.get('DB_POOL_VALIDATE', True)
+        )
+        app.extensions['db_pool'] = pool
+        
+        # Si la BD no responde al iniciar, las conexiones se abren al pedirlas
+        try:
+            pool.fill()
+        except pyodbc.Error as e:
+            print(f"Error al abrir las conexiones iniciales del pool: {e}")
+    
+    return pool
+
+
+def get_pool_stats():
+    """Obtiene las estadísticas del pool de conexiones"""
+    return get_pool().stats()
+
 
 def get_db():
     """
     Obtiene la conexión a la base de datos.
-    Se reutiliza durante el contexto de la petición.
+    Se toma prestada del pool y se reutiliza durante el contexto de la petición.
     """
     if 'db' not in g:
         try:
-            g.db = pyodbc.connect(
-                current_app.config['DB_CONNECTION_STRING'],
-                timeout=10
-            )
-            g.db.autocommit = False  # Manejar transacciones manualmente
+            g.db = get_pool().acquire()
         except pyodbc.Error as e:
             print(f"Error al conectar a la base de datos: {e}")
             raise
@@ -28,19 +72,27 @@ def get_db():
 
 
 def close_db(e=None):
-    """Cierra la conexión a la base de datos al final de la petición"""
+    """Devuelve la conexión al pool al final de la petición"""
     db = g.pop('db', None)
     
     if db is not None:
-        db.close()
+        get_pool().release(db)
 
 
 def init_app(app):
-    """Registra la función de cierre en la aplicación"""
+    """Crea el pool y registra la función de cierre en la aplicación"""
+    get_pool(app)
     app.teardown_appcontext(close_db)
 
 
-def execute_query(query, params=None, fetch=True):
+def _registrar_consulta(query, params, inicio, procedimiento=False):
+    """Suma la ejecución a las estadísticas de consultas (asesor_indices.py)"""
+    registro = get_registro_consultas()
+    if registro is not None:
+        registro.registrar(query, params, time.perf_counter() - inicio, procedimiento)
+
+
+def execute_query(query, params=None, fetch=True, auditar=None):
     """
     Ejecuta una consulta SQL y retorna los resultados.
     
@@ -48,13 +100,21 @@ def execute_query(query, params=None, fetch=True):
         query (str): Consulta SQL
         params (tuple): Parámetros para la consulta
         fetch (bool): Si debe retornar resultados (SELECT) o no (INSERT/UPDATE)
+        auditar (tuple): (tabla, columna, valor) de las filas que cambia la escritura,
+                         para registrar en Auditoria los valores antes y después
     
     Returns:
-        list: Lista de resultados si fetch=True
+        list: Lista de filas (Row: fila.col o fila['col']) si fetch=True
         int: Número de filas afectadas si fetch=False
     """
+    if auditar and not fetch:
+        writer = get_audit_writer()
+        if writer is not None:
+            return _execute_audited(query, params, auditar, writer)
+    
     db = get_db()
     cursor = db.cursor()
+    inicio = time.perf_counter()
     
     try:
         if params:
@@ -65,13 +125,13 @@ def execute_query(query, params=None, fetch=True):
         if fetch:
             # Para SELECT
             columns = [column[0] for column in cursor.description]
-            results = []
-            for row in cursor.fetchall():
-                results.append(dict(zip(columns, row)))
-            return results
+            filas = list(make_rows(columns, cursor.fetchall()))
+            _registrar_consulta(query, params, inicio)
+            return filas
         else:
             # Para INSERT, UPDATE, DELETE
             db.commit()
+            _registrar_consulta(query, params, inicio)
             return cursor.rowcount
             
     except pyodbc.Error as e:
@@ -82,47 +142,371 @@ def execute_query(query, params=None, fetch=True):
         cursor.close()
 
 
-def execute_procedure(proc_name, params=None):
+def _execute_audited(query, params, auditar, writer):
     """
-    Ejecuta un procedimiento almacenado.
+    Escritura con auditoría: lee las filas antes y después en el mismo lote
+    y la misma transacción (un viaje a la BD) y encola la diferencia en el
+    AuditWriter después del commit, para no auditar lo que se revierte.
+    """
+    tabla, columna, valor = auditar
+    llave, campos = TABLAS_AUDITADAS[tabla]
+    select = f"SELECT {llave}, {', '.join(campos)} FROM {tabla}"
+    
+    db = get_db()
+    cursor = db.cursor()
+    inicio = time.perf_counter()
+    
+    try:
+        cursor.execute(
+            f"{select} WITH (UPDLOCK, ROWLOCK) WHERE {columna} = ?;\n{query};\n{select} WHERE {columna} = ?;",
+            (valor, *(params or ()), valor)
+        )
+        
+        # Result sets: filas antes, conteo(s) de la escritura, filas después
+        columnas = [column[0] for column in cursor.description]
+        antes = cursor.fetchall()
+        despues = []
+        afectadas = -1
+        while cursor.nextset():
+            if cursor.description:
+                despues = cursor.fetchall()
+            else:
+                afectadas = cursor.rowcount
+        
+        db.commit()
+        _registrar_consulta(query, params, inicio)
+        
+    except pyodbc.Error as e:
+        db.rollback()
+        print(f"Error en consulta SQL: {e}")
+        raise
+    finally:
+        cursor.close()
+    
+    def por_llave(filas):
+        return {fila[0]: dict(zip(columnas[1:], fila[1:])) for fila in filas}
+    
+    writer.registrar(eventos_cambio(tabla, por_llave(antes), por_llave(despues)))
+    return afectadas
+
+
+def stream_query(query, params=None, batch_size=None):
+    """
+    Ejecuta una consulta SELECT y retorna un generador que produce las filas
+    por lotes con fetchmany, sin cargar todo el resultado en memoria.
+    
+    Usa una conexión propia del pool (no la de g.db) para que la petición
+    pueda seguir ejecutando otras consultas mientras se consume el resultado.
+    La conexión se toma en la primera iteración y se devuelve al pool cuando
+    el generador se agota o se cierra.
     
     Args:
-        proc_name (str): Nombre del procedimiento
-        params (dict): Parámetros del procedimiento
+        query (str): Consulta SQL
+        params (tuple): Parámetros para la consulta
+        batch_size (int): Filas por cada fetchmany
     
     Returns:
-        list: Resultados del procedimiento
+        generator: Filas (Row) con acceso por nombre de columna
     """
-    db = get_db()
-    cursor = db.cursor()
+    pool = get_pool()
+    batch_size = batch_size or current_app.config.get('DB_STREAM_BATCH_SIZE', 1000)
+    return _stream_rows(pool, query, params, batch_size, get_registro_consultas())
+
+
+def _stream_rows(pool, query, params, batch_size, registro=None):
+    """Generador interno de stream_query (registra el tiempo hasta el primer resultado)"""
+    conn = pool.acquire()
+    cursor = conn.cursor()
     
     try:
+        inicio = time.perf_counter()
         if params:
-            # Construir llamada al procedimiento
-            placeholders = ', '.join(['?' for _ in params])
-            call = f"EXEC {proc_name} {placeholders}"
-            cursor.execute(call, list(params.values()))
+            cursor.execute(query, params)
         else:
-            cursor.execute(f"EXEC {proc_name}")
-        
-        # Obtener resultados
-        results = []
-        if cursor.description:
-            columns = [column[0] for column in cursor.description]
-            for row in cursor.fetchall():
-                results.append(dict(zip(columns, row)))
+            cursor.execute(query)
+        if registro is not None:
+            registro.registrar(query, params, time.perf_counter() - inicio)
         
+        columns = [column[0] for column in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from make_rows(columns, rows)
+            
+    except pyodbc.Error as e:
+        print(f"Error en consulta SQL (streaming): {e}")
+        raise
+    finally:
+        try:
+            cursor.close()
+        finally:
+            pool.release(conn)
+
+
+def execute_batch(sentencias):
+    """
+    Ejecuta varias sentencias con muchas filas de parámetros cada una,
+    en una sola transacción y enviando los parámetros en bloque (fast_executemany).
+    
+    Args:
+        sentencias (list): Pares (query, lista de tuplas de parámetros)
+    
+    Returns:
+        int: Total de filas de parámetros enviadas
+    """
+    sentencias = [(query, filas) for query, filas in sentencias if filas]
+    if not sentencias:
+        return 0
+    
+    db = get_db()
+    cursor = db.cursor()
+    cursor.fast_executemany = True
+    
+    try:
+        total = 0
+        for query, filas in sentencias:
+            cursor.executemany(query, filas)
+            total += len(filas)
         db.commit()
-        return results
+        return total
         
     except pyodbc.Error as e:
         db.rollback()
-        print(f"Error al ejecutar procedimiento {proc_name}: {e}")
+        print(f"Error en ejecución por lotes: {e}")
         raise
     finally:
         cursor.close()
 
 
+class ResultSet(list):
+    """Lista de filas de un result set que conserva los nombres de columna"""
+    
+    def __init__(self, columns, rows=()):
+        super().__init__(rows)
+        self.columns = columns
+
+
+def _fetch_result_set(cursor):
+    """Lee el result set actual del cursor como lista de filas"""
+    columns = [column[0] for column in cursor.description]
+    return ResultSet(columns, make_rows(columns, cursor.fetchall()))
+
+
+def _llamada(proc_name, params=None):
+    """Texto EXEC del procedimiento, con un ? por parámetro"""
+    if params:
+        placeholders = ', '.join(['?' for _ in params])
+        return f"EXEC {proc_name} {placeholders}"
+    return f"EXEC {proc_name}"
+
+
+def _call_procedure(cursor, proc_name, params=None):
+    """Construye y ejecuta la llamada EXEC al procedimiento"""
+    if params:
+        cursor.execute(_llamada(proc_name, params), list(params.values()))
+    else:
+        cursor.execute(_llamada(proc_name))
+
+
+def es_interbloqueo(error):
+    """
+    Indica si el servidor eligió la transacción como víctima de un
+    interbloqueo (error 1205, SQLSTATE 40001). SQL Server ya la revirtió
+    completa, así que se puede volver a ejecutar tal cual.
+    """
+    return bool(error.args) and (error.args[0] == '40001' or '(1205)' in str(error.args[-1]))
+
+
+def _con_reintentos(nombre, operacion):
+    """
+    Ejecuta 'operacion' y la repite si resulta víctima de un interbloqueo,
+    con espera exponencial y aleatoria para que los reintentos no choquen
+    de nuevo (DB_DEADLOCK_RETRIES, DB_DEADLOCK_BACKOFF).
+    
+    Solo para operaciones que hacen commit o rollback de todo su trabajo:
+    al reintentar no puede quedar nada pendiente en la conexión.
+    """
+    reintentos = current_app.config.get('DB_DEADLOCK_RETRIES', 3)
+    espera = current_app.config.get('DB_DEADLOCK_BACKOFF', 0.05)
+    
+    for intento in range(reintentos + 1):
+        try:
+            return operacion()
+        except pyodbc.Error as e:
+            if intento == reintentos or not es_interbloqueo(e):
+                print(f"Error al ejecutar procedimiento {nombre}: {e}")
+                raise
+            pausa = espera * (2 ** intento) * random.uniform(0.5, 1.5)
+            print(f"Interbloqueo en {nombre}: reintento {intento + 1} de {reintentos} en {pausa * 1000:.0f} ms")
+            time.sleep(pausa)
+
+
+def execute_procedure(proc_name, params=None):
+    """
+    Ejecuta un procedimiento almacenado.
+    Si es víctima de un interbloqueo se reintenta (ver _con_reintentos).
+    
+    Args:
+        proc_name (str): Nombre del procedimiento
+        params (dict): Parámetros del procedimiento
+    
+    Returns:
+        list: Resultados del procedimiento (solo el primer result set)
+    """
+    
+    def ejecutar():
+        db = get_db()
+        cursor = db.cursor()
+        
+        try:
+            _call_procedure(cursor, proc_name, params)
+            
+            # Obtener resultados
+            results = []
+            if cursor.description:
+                results = _fetch_result_set(cursor)
+            
+            db.commit()
+            return results
+            
+        except pyodbc.Error:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+    
+    inicio = time.perf_counter()
+    results = _con_reintentos(proc_name, ejecutar)
+    _registrar_consulta(_llamada(proc_name, params), params, inicio, procedimiento=True)
+    return results
+
+
+def execute_procedure_multi(proc_name, params=None):
+    """
+    Ejecuta un procedimiento almacenado que retorna varios result sets.
+    Recorre todos los result sets con nextset() en una sola llamada.
+    Si es víctima de un interbloqueo se reintenta (ver _con_reintentos).
+    
+    Args:
+        proc_name (str): Nombre del procedimiento
+        params (dict): Parámetros del procedimiento
+    
+    Returns:
+        list: Un ResultSet (lista de filas con .columns) por cada SELECT del procedimiento
+    """
+    
+    def ejecutar():
+        db = get_db()
+        cursor = db.cursor()
+        
+        try:
+            _call_procedure(cursor, proc_name, params)
+            
+            result_sets = []
+            while True:
+                # Omitir conteos de filas sin columnas (INSERT/UPDATE internos)
+                if cursor.description:
+                    result_sets.append(_fetch_result_set(cursor))
+                if not cursor.nextset():
+                    break
+            
+            db.commit()
+            return result_sets
+            
+        except pyodbc.Error:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+    
+    inicio = time.perf_counter()
+    result_sets = _con_reintentos(proc_name, ejecutar)
+    _registrar_consulta(_llamada(proc_name, params), params, inicio, procedimiento=True)
+    return result_sets
+
+
+# Columnas de #LineasMovimiento, en el orden de cada tupla de líneas
+_SQL_LINEAS_MOVIMIENTO = """
+    IF OBJECT_ID('tempdb..#LineasMovimiento') IS NOT NULL
+        DROP TABLE #LineasMovimiento;
+    CREATE TABLE #LineasMovimiento (
+        linea INT PRIMARY KEY,
+        id_producto INT,
+        id_tipo_movimiento INT,
+        cantidad INT,
+        id_proveedor INT,
+        numero_documento VARCHAR(50),
+        observaciones VARCHAR(4000)
+    );
+"""
+
+_TIPOS_LINEAS_MOVIMIENTO = [
+    (pyodbc.SQL_INTEGER, 0, 0),
+    (pyodbc.SQL_INTEGER, 0, 0),
+    (pyodbc.SQL_INTEGER, 0, 0),
+    (pyodbc.SQL_INTEGER, 0, 0),
+    (pyodbc.SQL_INTEGER, 0, 0),
+    (pyodbc.SQL_VARCHAR, 50, 0),
+    (pyodbc.SQL_VARCHAR, 4000, 0)
+]
+
+
+def registrar_movimientos_lote(lineas, id_usuario, todo_o_nada=False):
+    """
+    Registra varios movimientos en una sola transacción.
+    
+    Las líneas se envían en bloque (fast_executemany) a una tabla temporal
+    de la conexión y sp_RegistrarMovimientosLote las aplica por conjuntos.
+    Si es víctima de un interbloqueo se reintenta (ver _con_reintentos).
+    
+    Args:
+        lineas (list): Tuplas (linea, id_producto, id_tipo_movimiento, cantidad,
+                       id_proveedor, numero_documento, observaciones)
+        id_usuario (int): Usuario que registra
+        todo_o_nada (bool): Si alguna línea se rechaza no se registra ninguna
+    
+    Returns:
+        list: Una fila por línea (linea, estado, mensaje, id_producto,
+              id_movimiento, stock_anterior, stock_nuevo)
+    """
+    
+    def ejecutar():
+        db = get_db()
+        cursor = db.cursor()
+        
+        try:
+            cursor.execute(_SQL_LINEAS_MOVIMIENTO)
+            
+            # Tipos explícitos: el driver no tiene que describir la tabla temporal
+            cursor.fast_executemany = True
+            cursor.setinputsizes(_TIPOS_LINEAS_MOVIMIENTO)
+            cursor.executemany("INSERT INTO #LineasMovimiento VALUES (?, ?, ?, ?, ?, ?, ?)", lineas)
+            cursor.fast_executemany = False
+            cursor.setinputsizes(None)
+            
+            cursor.execute(
+                "EXEC sp_RegistrarMovimientosLote ?, ?",
+                (id_usuario, 1 if todo_o_nada else 0)
+            )
+            while cursor.description is None and cursor.nextset():
+                pass
+            resultados = _fetch_result_set(cursor)
+            
+            cursor.execute("DROP TABLE #LineasMovimiento")
+            db.commit()
+            return resultados
+            
+        except pyodbc.Error:
+            # También revierte la tabla temporal: un reintento la vuelve a llenar
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+    
+    return _con_reintentos('sp_RegistrarMovimientosLote', ejecutar)
+
+
 # =============================================
 # FUNCIONES HELPER PARA CONSULTAS COMUNES
 # =============================================
@@ -146,42 +530,191 @@ def update_last_access(user_id):
     execute_query(query, (user_id,), fetch=False)
 
 
-def get_productos(filtro=None, limit=None, offset=None):
-    """Obtiene lista de productos con filtros opcionales"""
-    query = """
+def get_productos(filtro=None, limit=None, seek=None, direccion='siguiente'):
+    """
+    Obtiene lista de productos con filtros opcionales
+    
+    Si el índice de búsqueda resuelve el filtro, las filas vienen en su orden
+    de relevancia y traen la columna 'relevancia' (posición 0..n-1); si no,
+    van por nombre y 'relevancia' es NULL.
+    
+    Args:
+        filtro (str): Texto a buscar en SKU o nombre
+        limit (int): Máximo de filas a retornar
+        seek (tuple): (nombre_producto, id_producto), o (relevancia, id_producto)
+                      con el índice, desde donde continuar (keyset)
+        direccion (str): 'siguiente' avanza desde seek, 'anterior' retrocede
+                         (en ese caso las filas vienen en orden inverso)
+    """
+    join = ""
+    relevancia = "NULL"
+    params = []
+    condicion, params_filtro = "", []
+    
+    if filtro:
+        from app.services.product_search import condicion_producto, relevancia_producto
+        condicion, params_filtro, ids = condicion_producto(filtro)
+        if ids:
+            join, params, relevancia = relevancia_producto(ids)
+            condicion, params_filtro = "", []
+    
+    query = f"""
         SELECT p.id_producto, p.sku, p.codigo_barras, p.nombre_producto,
                p.stock_actual, p.stock_minimo, p.stock_maximo,
                p.precio_compra, p.precio_venta,
-               c.nombre_categoria, pr.nombre_proveedor
-        FROM Productos p
+               c.nombre_categoria, pr.nombre_proveedor,
+               {relevancia} AS relevancia
+        FROM Productos p{join}
         LEFT JOIN Categorias c ON p.id_categoria = c.id_categoria
         LEFT JOIN Proveedores pr ON p.id_proveedor = pr.id_proveedor
         WHERE p.activo = 1
     """
+    query += condicion
+    params.extend(params_filtro)
     
-    params = []
+    # Llave de ordenamiento: la posición en el índice o el nombre
+    llave = relevancia if join else "p.nombre_producto"
     
-    if filtro:
-        query += " AND (p.sku LIKE ? OR p.nombre_producto LIKE ?)"
-        params.extend([f'%{filtro}%', f'%{filtro}%'])
+    orden = 'ASC'
+    if seek:
+        if direccion == 'anterior':
+            orden = 'DESC'
+        # Un cursor de la otra llave (el índice cambió entre páginas) se
+        # descarta: se muestra la primera o la última página
+        if isinstance(seek[0], int) == bool(join):
+            comparador = '<' if direccion == 'anterior' else '>'
+            query += f" AND ({llave} {comparador} ? OR ({llave} = ? AND p.id_producto {comparador} ?))"
+            params.extend([seek[0], seek[0], seek[1]])
     
-    query += " ORDER BY p.nombre_producto"
+    query += f" ORDER BY {llave} {orden}, p.id_producto {orden}"
     
     if limit:
-        query += f" OFFSET {offset or 0} ROWS FETCH NEXT {limit} ROWS ONLY"
+        query += " OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+        params.append(int(limit))
     
     return execute_query(query, tuple(params) if params else None)
 
 
-def get_alertas_stock():
-    """Obtiene productos con stock bajo"""
-    query = "SELECT * FROM vw_ProductosStockBajo ORDER BY nivel_alerta, stock_actual"
-    return execute_query(query)
+# Valores de Productos.nivel_stock (0 = normal)
+NIVELES_STOCK = {1: 'AGOTADO', 2: 'CRÍTICO', 3: 'BAJO'}
+
+
+def get_alertas_stock(limite=5):
+    """
+    Obtiene los productos con stock bajo más graves
+    
+    Args:
+        limite (int): Máximo de productos (TOP en SQL, usa IX_Productos_NivelStock)
+    """
+    query = "SELECT TOP (?) * FROM vw_ProductosStockBajo ORDER BY nivel_stock, stock_actual"
+    return execute_query(query, (int(limite),))
+
+
+def get_resumen_alertas():
+    """
+    Cuenta las alertas pendientes por tipo sin cargarlas
+    
+    Returns:
+        dict: total, STOCK_CRITICO y STOCK_MINIMO
+    """
+    query = """
+        SELECT tipo_alerta, COUNT(*) AS total
+        FROM AlertasStock
+        WHERE estado = 'PENDIENTE'
+        GROUP BY tipo_alerta
+    """
+    resumen = {'total': 0, 'STOCK_CRITICO': 0, 'STOCK_MINIMO': 0}
+    for fila in execute_query(query):
+        resumen[fila['tipo_alerta']] = fila['total']
+        resumen['total'] += fila['total']
+    return resumen
+
+
+def get_alertas_pendientes(limit, seek=None, direccion='siguiente'):
+    """
+    Obtiene una página de alertas pendientes: críticas primero y luego las más recientes
+    
+    Args:
+        limit (int): Máximo de filas a retornar
+        seek (tuple): (tipo_alerta, fecha_generacion, id_alerta) desde donde continuar
+        direccion (str): 'siguiente' o 'anterior' (filas en orden inverso)
+    """
+    query = """
+        SELECT 
+            a.*,
+            p.sku,
+            p.nombre_producto,
+            p.stock_actual,
+            c.nombre_categoria,
+            pr.nombre_proveedor
+        FROM AlertasStock a
+        INNER JOIN Productos p ON a.id_producto = p.id_producto
+        LEFT JOIN Categorias c ON p.id_categoria = c.id_categoria
+        LEFT JOIN Proveedores pr ON p.id_proveedor = pr.id_proveedor
+        WHERE a.estado = 'PENDIENTE'
+    """
+    params = []
+    
+    # 'STOCK_CRITICO' < 'STOCK_MINIMO': ordenar por tipo_alerta pone las críticas
+    # primero y permite recorrer IX_AlertasStock_Estado sin ordenar
+    asc, desc = 'ASC', 'DESC'
+    if seek:
+        if direccion == 'anterior':
+            query += """ AND (a.tipo_alerta < ? OR (a.tipo_alerta = ? AND (
+                             a.fecha_generacion > CAST(? AS DATETIME)
+                             OR (a.fecha_generacion = CAST(? AS DATETIME) AND a.id_alerta > ?))))"""
+            asc, desc = 'DESC', 'ASC'
+        else:
+            query += """ AND (a.tipo_alerta > ? OR (a.tipo_alerta = ? AND (
+                             a.fecha_generacion < CAST(? AS DATETIME)
+                             OR (a.fecha_generacion = CAST(? AS DATETIME) AND a.id_alerta < ?))))"""
+        params.extend([seek[0], seek[0], seek[1], seek[1], seek[2]])
+    
+    query += f"""
+        ORDER BY a.tipo_alerta {asc}, a.fecha_generacion {desc}, a.id_alerta {desc}
+        OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+    """
+    params.append(int(limit))
+    
+    return execute_query(query, tuple(params))
 
 
 def get_dashboard_stats():
-    """Obtiene estadísticas para el dashboard"""
-    return execute_procedure('sp_ObtenerDashboard')
+    """
+    Obtiene estadísticas para el dashboard en una sola llamada.
+    Lee el snapshot que mantienen los triggers; la tarea programada
+    'reconciliar_dashboard' (JOBS_SCHEDULE) lo recalcula periódicamente.
+    
+    Returns:
+        dict: resumen, productos_vendidos, alertas_pendientes,
+              movimientos_por_dia, alertas, movimientos_recientes
+              y alertas_por_nivel
+    """
+    sets = execute_procedure_multi('sp_ObtenerDashboard')
+    sets += [ResultSet([]) for _ in range(7 - len(sets))]
+    
+    return {
+        'resumen': sets[0][0] if sets[0] else {},
+        'productos_vendidos': sets[1],
+        'alertas_pendientes': sets[2][0]['alertas_pendientes'] if sets[2] else 0,
+        'movimientos_por_dia': sets[3],
+        'alertas': sets[4],
+        'movimientos_recientes': sets[5],
+        'alertas_por_nivel': {
+            NIVELES_STOCK[fila['nivel_stock']]: fila['total'] for fila in sets[6]
+        }
+    }
+
+
+def reconciliar_dashboard(segundos_minimos=0):
+    """
+    Recalcula el snapshot del dashboard desde Productos, Movimientos y AlertasStock
+    
+    Args:
+        segundos_minimos (int): No recalcular si otro proceso lo hizo hace menos
+                                de estos segundos (0 = siempre)
+    """
+    execute_procedure('sp_ReconciliarDashboard', {'segundos_minimos': int(segundos_minimos)})
 
 
 # =============================================
@@ -0,0 +1,293 @@
+# =============================================
+# POOL DE CONEXIONES - SGI-GuateMart
+# app/db_pool.py
+# =============================================
+
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeoutError(Exception):
+    """Se lanza cuando no hay conexiones disponibles dentro del tiempo de espera"""
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones reutilizables a la base de datos.
+
+    - Mantiene un mínimo de conexiones abiertas y nunca excede el máximo:
+      fill() las abre al crear el pool y, después de descartar una conexión,
+      un hilo de fondo repone las que falten.
+    - Valida cada conexión antes de entregarla (SELECT 1).
+    - Recicla conexiones que superan la edad máxima configurada.
+    - Hace rollback al devolver la conexión para limpiar transacciones abiertas.
+    """
+
+    def __init__(self, creator, min_size=2, max_size=10, timeout=10,
+                 recycle=1800, validate=True):
+        """
+        Args:
+            creator (callable): Función sin argumentos que abre una conexión nueva
+            min_size (int): Conexiones que se mantienen abiertas
+            max_size (int): Máximo de conexiones simultáneas
+            timeout (float): Segundos máximos de espera para obtener una conexión
+            recycle (int): Edad máxima en segundos de una conexión (0 = sin límite)
+            validate (bool): Si se valida la conexión al entregarla
+        """
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError('Tamaños de pool inválidos')
+
+        self._creator = creator
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.validate = validate
+
+        self._lock = threading.Condition()
+        self._idle = deque()       # (conexion, creada_en)
+        self._created_at = {}      # id(conexion) -> creada_en, para las que están en uso
+        self._total = 0            # Conexiones abiertas (en uso + libres)
+        self._closed = False
+        self._filling = False      # Hay un hilo reponiendo el mínimo
+
+        # Estadísticas
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._created = 0
+        self._recycled = 0
+        self._invalidated = 0
+
+    # -----------------------------------------
+    # Creación y validación
+    # -----------------------------------------
+
+    def _connect(self):
+        """Abre una conexión nueva (fuera del lock)"""
+        conn = self._creator()
+        with self._lock:
+            self._created += 1
+        return conn, time.monotonic()
+
+    def _is_expired(self, created_at):
+        return self.recycle and (time.monotonic() - created_at) > self.recycle
+
+    def _is_valid(self, conn):
+        if not self.validate:
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def fill(self):
+        """Abre conexiones hasta alcanzar el tamaño mínimo"""
+        while True:
+            with self._lock:
+                if self._closed or self._total >= self.min_size:
+                    return
+                self._total += 1
+            try:
+                conn, created_at = self._connect()
+            except Exception:
+                with self._lock:
+                    self._total -= 1
+                    self._lock.notify()
+                raise
+            with self._lock:
+                cerrado = self._closed
+                if cerrado:
+                    self._total -= 1
+                else:
+                    self._idle.append((conn, created_at))
+                    self._lock.notify()
+            if cerrado:
+                self._close_quietly(conn)
+                return
+
+    def _fill_async(self):
+        """Repone el mínimo en un hilo de fondo (sin demorar a quien descartó)"""
+        with self._lock:
+            if self._filling or self._closed or self._total >= self.min_size:
+                return
+            self._filling = True
+
+        def reponer():
+            try:
+                self.fill()
+            except Exception as e:
+                print(f"Error al reponer conexiones del pool: {e}")
+            finally:
+                with self._lock:
+                    self._filling = False
+
+        threading.Thread(target=reponer, name='db-pool-fill', daemon=True).start()
+
+    # -----------------------------------------
+    # Préstamo y devolución
+    # -----------------------------------------
+
+    def acquire(self, timeout=None):
+        """
+        Obtiene una conexión del pool.
+
+        Args:
+            timeout (float): Espera máxima; por defecto usa el timeout del pool
+
+        Returns:
+            Conexión lista para usar
+
+        Raises:
+            PoolTimeoutError: Si no se obtiene conexión a tiempo
+        """
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+        limite = inicio + timeout
+        espero = False
+
+        while True:
+            conn = None
+            crear = False
+
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError('El pool de conexiones está cerrado')
+
+                while not self._idle and self._total >= self.max_size:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f'No hay conexiones disponibles después de {timeout} segundos'
+                        )
+                    espero = True
+                    self._lock.wait(restante)
+
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                else:
+                    self._total += 1
+                    crear = True
+
+            if crear:
+                try:
+                    conn, created_at = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._total -= 1
+                        self._lock.notify()
+                    raise
+            elif self._is_expired(created_at):
+                self._discard(conn, recycled=True)
+                continue
+            elif not self._is_valid(conn):
+                self._discard(conn)
+                continue
+
+            espera = time.monotonic() - inicio
+            with self._lock:
+                self._created_at[id(conn)] = created_at
+                self._checkouts += 1
+                if espero:
+                    self._waits += 1
+                self._wait_time_total += espera
+                self._wait_time_max = max(self._wait_time_max, espera)
+            return conn
+
+    def release(self, conn):
+        """
+        Devuelve una conexión al pool, limpiando la transacción pendiente.
+
+        Args:
+            conn: Conexión obtenida con acquire()
+        """
+        with self._lock:
+            created_at = self._created_at.pop(id(conn), None)
+
+        if created_at is None:
+            # No pertenece a este pool
+            self._close_quietly(conn)
+            return
+
+        try:
+            conn.rollback()
+        except Exception:
+            self._discard(conn)
+            return
+
+        if self._closed or self._is_expired(created_at):
+            self._discard(conn, recycled=not self._closed)
+            return
+
+        with self._lock:
+            self._idle.append((conn, created_at))
+            self._lock.notify()
+
+    def _discard(self, conn, recycled=False):
+        """Cierra una conexión y libera su lugar en el pool"""
+        self._close_quietly(conn)
+        with self._lock:
+            self._total -= 1
+            if recycled:
+                self._recycled += 1
+            else:
+                self._invalidated += 1
+            self._lock.notify()
+        self._fill_async()
+
+    def close(self):
+        """Cierra todas las conexiones libres y rechaza nuevos préstamos"""
+        with self._lock:
+            self._closed = True
+            libres = list(self._idle)
+            self._idle.clear()
+            self._total -= len(libres)
+            self._lock.notify_all()
+        for conn, _ in libres:
+            self._close_quietly(conn)
+
+    # -----------------------------------------
+    # Estadísticas
+    # -----------------------------------------
+
+    def stats(self):
+        """
+        Obtiene las estadísticas actuales del pool
+
+        Returns:
+            dict: Conexiones en uso/libres, esperas y reciclajes
+        """
+        with self._lock:
+            return {
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'total': self._total,
+                'en_uso': len(self._created_at),
+                'libres': len(self._idle),
+                'prestamos': self._checkouts,
+                'esperas': self._waits,
+                'tiempo_espera_total': round(self._wait_time_total, 6),
+                'tiempo_espera_promedio': round(self._wait_time_total / self._checkouts, 6) if self._checkouts else 0.0,
+                'tiempo_espera_max': round(self._wait_time_max, 6),
+                'timeouts': self._timeouts,
+                'creadas': self._created,
+                'recicladas': self._recycled,
+                'invalidadas': self._invalidated
+            }
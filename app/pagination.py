@@ -0,0 +1,138 @@
+# =============================================
+# PAGINACIÓN POR CURSOR (KEYSET) - SGI-GuateMart
+# app/pagination.py
+# =============================================
+
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+
+
+# =============================================
+# CURSORES OPACOS
+# =============================================
+
+def encode_cursor(values):
+    """
+    Codifica los valores de la llave de ordenamiento en un token para la URL
+
+    Args:
+        values (tuple): Valores de la última/primera fila de la página
+
+    Returns:
+        str: Token base64 url-safe
+    """
+    data = [{'dt': v.isoformat()} if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(data, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """
+    Decodifica un token generado por encode_cursor
+
+    Returns:
+        tuple: Valores de la llave, o None si el token es inválido
+    """
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        data = json.loads(raw.decode('utf-8'))
+        if not isinstance(data, list):
+            return None
+        return tuple(
+            datetime.fromisoformat(v['dt']) if isinstance(v, dict) else v
+            for v in data
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def get_seek(args, longitud=2):
+    """
+    Lee el cursor de la petición (parámetros 'siguiente' o 'anterior')
+
+    Args:
+        args: request.args
+        longitud (int): Cantidad de columnas de la llave de ordenamiento
+
+    Returns:
+        tuple: (valores de la llave o None, dirección 'siguiente'/'anterior')
+    """
+    for direccion in ('anterior', 'siguiente'):
+        seek = decode_cursor(args.get(direccion))
+        if seek is not None and len(seek) == longitud:
+            return seek, direccion
+    return None, 'siguiente'
+
+
+def keyset_page(rows, per_page, seek, direccion, key):
+    """
+    Arma la página a partir de las filas consultadas con per_page + 1 de límite
+
+    Args:
+        rows (list): Filas retornadas (en orden invertido si direccion='anterior')
+        per_page (int): Filas por página
+        seek (tuple): Cursor usado en la consulta (None = primera página)
+        direccion (str): 'siguiente' o 'anterior'
+        key (callable): Obtiene la llave de ordenamiento de una fila
+
+    Returns:
+        dict: items, has_prev, has_next, cursor_anterior, cursor_siguiente
+    """
+    hay_mas = len(rows) > per_page
+    items = list(rows[:per_page])
+
+    if direccion == 'anterior' and seek is not None:
+        items.reverse()
+        has_prev, has_next = hay_mas, True
+    else:
+        has_prev, has_next = seek is not None, hay_mas
+
+    return {
+        'items': items,
+        'has_prev': has_prev and bool(items),
+        'has_next': has_next and bool(items),
+        'cursor_anterior': encode_cursor(key(items[0])) if items else None,
+        'cursor_siguiente': encode_cursor(key(items[-1])) if items else None
+    }
+
+
+# =============================================
+# CONTEO TOTAL CACHEADO
+# =============================================
+
+_conteos = {}
+_conteos_lock = threading.Lock()
+
+
+def cached_count(clave, contar, ttl):
+    """
+    Retorna el total de registros cacheado por 'ttl' segundos
+
+    Args:
+        clave (tuple): Identifica la consulta y sus filtros
+        contar (callable): Ejecuta el COUNT(*) cuando no hay valor vigente
+        ttl (int): Segundos de validez; 0 desactiva el conteo
+
+    Returns:
+        int: Total de registros, o None si el conteo está desactivado
+    """
+    if not ttl:
+        return None
+
+    ahora = time.monotonic()
+    with _conteos_lock:
+        guardado = _conteos.get(clave)
+        if guardado and guardado[1] > ahora:
+            return guardado[0]
+
+    total = contar()
+    with _conteos_lock:
+        if len(_conteos) > 1000:
+            _conteos.clear()
+        _conteos[clave] = (total, ahora + ttl)
+    return total
@@ -0,0 +1,115 @@
+# =============================================
+# RUTAS DE ANÁLISIS HISTÓRICO - SGI-GuateMart
+# app/routes/analitica.py
+# =============================================
+
+from datetime import datetime
+
+from flask import (
+    Blueprint, render_template, request, redirect, url_for, flash, session, current_app,
+    Response, stream_with_context
+)
+from app.routes.auth import login_required, role_required
+from app.services.analytics_store import get_almacen_analitico
+from app.services.historical_analytics import REPORTES, generar_reporte
+from app.services.job_runner import get_job_runner
+from app.services.report_export import exportar_csv, exportar_xlsx
+
+bp = Blueprint('analitica', __name__, url_prefix='/analitica')
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+
+def _fecha(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+    except ValueError:
+        return None
+
+
+@bp.route('/')
+@login_required
+@role_required('Administrador', 'Operador de Bodega')
+def index():
+    """
+    Reportes de rotación, ventas por categoría, productos sin movimiento y
+    rentabilidad sobre toda la historia (incluidos los meses archivados),
+    calculados desde el almacén analítico sin consultar Movimientos
+    """
+    
+    reporte = request.args.get('reporte', 'rotacion')
+    if reporte not in REPORTES:
+        reporte = 'rotacion'
+    
+    if not current_app.config.get('ANALYTICS_ENABLED', True):
+        flash('El análisis histórico está desactivado', 'warning')
+        return redirect(url_for('dashboard.index'))
+    
+    almacen = get_almacen_analitico()
+    actualizado = almacen.actualizado()
+    titulo, _, columnas = REPORTES[reporte]
+    
+    if actualizado is None:
+        return render_template(
+            'analitica/index.html', reportes=REPORTES, reporte=reporte, titulo=titulo,
+            columnas=columnas, filas=[], actualizado=None, desde=None, hasta=None
+        )
+    
+    try:
+        desde, hasta, filas = generar_reporte(
+            almacen, reporte, _fecha(request.args.get('desde')), _fecha(request.args.get('hasta'))
+        )
+    
+    except Exception as e:
+        print(f"Error al generar análisis histórico: {e}")
+        flash('Error al generar el reporte', 'error')
+        return redirect(url_for('dashboard.index'))
+    
+    formato = request.args.get('formato')
+    if formato in FORMATOS:
+        campos = [campo for campo, _ in columnas]
+        datos = ([fila[campo] for campo in campos] for fila in filas)
+        titulos = [texto for _, texto in columnas]
+        partes = exportar_xlsx(titulos, datos, nombre_hoja=titulo[:31]) if formato == 'xlsx' \
+            else exportar_csv(titulos, datos)
+        nombre = f"analitica_{reporte}_{desde:%Y%m%d}_{hasta:%Y%m%d}"
+        return Response(
+            stream_with_context(partes),
+            mimetype=FORMATOS[formato],
+            headers={'Content-Disposition': f'attachment; filename={nombre}.{formato}'}
+        )
+    
+    return render_template(
+        'analitica/index.html',
+        reportes=REPORTES,
+        reporte=reporte,
+        titulo=titulo,
+        columnas=columnas,
+        filas=filas,
+        desde=desde,
+        hasta=hasta,
+        actualizado=actualizado
+    )
+
+
+@bp.route('/actualizar', methods=['POST'])
+@login_required
+@role_required('Administrador')
+def actualizar():
+    """Encola la exportación de los movimientos nuevos al almacén analítico"""
+    
+    runner = get_job_runner()
+    if runner is None:
+        flash('Los trabajos en segundo plano están desactivados', 'warning')
+        return redirect(url_for('analitica.index'))
+    
+    id_trabajo = runner.encolar(
+        'exportar_analitica', {},
+        id_usuario=session.get('user_id'),
+        descripcion='Actualización del almacén analítico'
+    )
+    flash('La actualización se está ejecutando en segundo plano', 'info')
+    return redirect(url_for('trabajos.listar', resaltar=id_trabajo))
@@ -4,16 +4,51 @@
 # ACTUALIZADO CON SISTEMA DE ROLES
 # =============================================
 
-from flask import Blueprint, render_template, g, session
-from app.routes.auth import login_required
+from flask import Blueprint, render_template, g, session, request, make_response, current_app
+from app.routes.auth import login_required, role_required
 from app.database import (
-    get_dashboard_stats, get_alertas_stock, execute_query,
-    get_permisos_usuario, puede_ver_precios
+    get_dashboard_stats, get_permisos_usuario, puede_ver_precios, get_pool_stats
 )
+from app.services.dashboard_cache import DashboardCache, get_dashboard_cache
 
 bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
 
+def _datos_dashboard(rol_usuario):
+    """Consulta los datos del dashboard tal como los ve un rol"""
+    puede_ver_finanzas = puede_ver_precios(rol_usuario)
+    
+    # Obtener estadísticas del dashboard (una sola llamada, 7 result sets)
+    stats = get_dashboard_stats()
+    stats_general = stats['resumen']
+    
+    # El total de alertas coincide con los productos bajo el mínimo de vw_ProductosStockBajo
+    alertas_total = stats_general.get('productos_stock_bajo') or 0
+    
+    # NUEVO: Filtrar información financiera según permisos
+    if not puede_ver_finanzas:
+        # Usuario de Consulta: Ocultar información financiera
+        if stats_general:
+            # Mantener solo información de cantidades, remover valores monetarios
+            stats_filtrado = {
+                'total_productos': stats_general.get('total_productos', 0),
+                'total_items_inventario': stats_general.get('total_items_inventario', 0),
+                'productos_stock_bajo': stats_general.get('productos_stock_bajo', 0)
+            }
+            stats_general = stats_filtrado
+    
+    return {
+        'stats': stats_general,
+        'productos_vendidos': stats['productos_vendidos'][:5],  # Top 5
+        'alertas': stats['alertas'],  # Primeras 5 alertas
+        'alertas_total': alertas_total,
+        'alertas_por_nivel': stats['alertas_por_nivel'],
+        'movimientos': stats['movimientos_recientes'],
+        'permisos': get_permisos_usuario(rol_usuario),
+        'puede_ver_finanzas': puede_ver_finanzas
+    }
+
+
 @bp.route('/')
 @login_required
 def index():
@@ -22,60 +57,27 @@ def index():
     try:
         # NUEVO: Obtener rol y permisos del usuario
         rol_usuario = session.get('rol')
-        permisos = get_permisos_usuario(rol_usuario)
-        puede_ver_finanzas = puede_ver_precios(rol_usuario)
-        
-        # Obtener estadísticas del dashboard
-        stats_results = get_dashboard_stats()
         
-        # El procedimiento retorna 4 resultsets
-        stats_general = stats_results[0] if len(stats_results) > 0 and stats_results[0] else {}
-        productos_vendidos = stats_results[1] if len(stats_results) > 1 else []
-        alertas_count = stats_results[2] if len(stats_results) > 2 and stats_results[2] else {'alertas_pendientes': 0}
-        movimientos_recientes = stats_results[3] if len(stats_results) > 3 else []
-        
-        # NUEVO: Filtrar información financiera según permisos
-        if not puede_ver_finanzas:
-            # Usuario de Consulta: Ocultar información financiera
-            if stats_general:
-                # Mantener solo información de cantidades, remover valores monetarios
-                stats_filtrado = {
-                    'total_productos': stats_general.get('total_productos', 0),
-                    'stock_total': stats_general.get('stock_total', 0),
-                    'productos_bajo_stock': stats_general.get('productos_bajo_stock', 0),
-                    'movimientos_hoy': stats_general.get('movimientos_hoy', 0)
-                }
-                stats_general = stats_filtrado
+        # Mismo rol, mismos datos: se comparten en caché durante DASHBOARD_CACHE_TTL
+        datos, etag_datos = get_dashboard_cache().get(
+            rol_usuario, lambda: _datos_dashboard(rol_usuario)
+        )
         
-        # Obtener alertas de stock
-        alertas = get_alertas_stock()
+        # La página también muestra el nombre del usuario
+        etag = DashboardCache.calcular_etag([
+            etag_datos, g.user['id_usuario'], g.user['nombre_completo'],
+            rol_usuario, current_app.config.get('APP_VERSION')
+        ])
         
-        # Obtener movimientos recientes (últimos 10)
-        query_movimientos = """
-            SELECT TOP 10
-                m.fecha_movimiento,
-                p.nombre_producto,
-                tm.nombre_tipo,
-                m.cantidad,
-                u.nombre_completo
-            FROM Movimientos m
-            INNER JOIN Productos p ON m.id_producto = p.id_producto
-            INNER JOIN TiposMovimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
-            INNER JOIN Usuarios u ON m.id_usuario = u.id_usuario
-            ORDER BY m.fecha_movimiento DESC
-        """
-        movimientos = execute_query(query_movimientos)
+        # Con mensajes flash pendientes hay que renderizar para mostrarlos
+        if request.if_none_match.contains(etag) and not session.get('_flashes'):
+            response = make_response('', 304)
+        else:
+            response = make_response(render_template('dashboard.html', **datos))
         
-        return render_template(
-            'dashboard.html',
-            stats=stats_general,
-            productos_vendidos=productos_vendidos[:5],  # Top 5
-            alertas=alertas[:5],  # Primeras 5 alertas
-            alertas_total=len(alertas),
-            movimientos=movimientos,
-            permisos=permisos,  # NUEVO: Pasar permisos al template
-            puede_ver_finanzas=puede_ver_finanzas  # NUEVO: Flag específico para finanzas
-        )
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         print(f"Error en dashboard: {e}")
@@ -90,8 +92,25 @@ def index():
             productos_vendidos=[],
             alertas=[],
             alertas_total=0,
+            alertas_por_nivel={},
             movimientos=[],
             permisos=permisos,
             puede_ver_finanzas=False,
             error="Error al cargar estadísticas"
-        )
\ No newline at end of file
+        )
+
+
+@bp.route('/pool')
+@login_required
+@role_required('Administrador')
+def pool():
+    """Estadísticas del pool de conexiones - SOLO: Administrador"""
+    return get_pool_stats()
+
+
+@bp.route('/cache')
+@login_required
+@role_required('Administrador')
+def cache():
+    """Estadísticas de la caché del dashboard - SOLO: Administrador"""
+    return get_dashboard_cache().stats()
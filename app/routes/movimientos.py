@@ -4,9 +4,25 @@
 # ACTUALIZADO CON SISTEMA DE ROLES
 # =============================================
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import (
+    Blueprint, render_template, stream_template, request, redirect, url_for, flash, session,
+    current_app, Response, stream_with_context
+)
 from app.routes.auth import login_required, role_required
-from app.database import execute_query, execute_procedure, puede_registrar_movimientos, puede_resolver_alertas
+from app.pagination import get_seek, keyset_page, cached_count
+from app.services.product_search import condicion_producto
+from app.services.dashboard_cache import invalidar_dashboard
+from app.services.alert_engine import procesar_productos, alerta_resuelta
+from app.services.report_export import exportar_csv, exportar_xlsx
+from app.services.report_analytics import agregados_reporte
+from app.services.job_runner import tarea, get_job_runner
+from app.services.data_archive import get_archivo_historico
+from app.rows import make_rows
+from app.database import (
+    execute_query, execute_procedure, stream_query, registrar_movimientos_lote,
+    get_alertas_pendientes, get_resumen_alertas,
+    puede_registrar_movimientos, puede_resolver_alertas
+)
 
 bp = Blueprint('movimientos', __name__, url_prefix='/movimientos')
 
@@ -16,12 +32,11 @@ bp = Blueprint('movimientos', __name__, url_prefix='/movimientos')
 def listar():
     """Lista los movimientos de inventario - TODOS LOS ROLES pueden ver"""
     
-    # Obtener filtros
+    # Obtener filtros y cursor de paginación
     filtro = request.args.get('q', '')
     tipo = request.args.get('tipo', '')
-    page = int(request.args.get('page', 1))
+    seek, direccion = get_seek(request.args)
     per_page = 20
-    offset = (page - 1) * per_page
     
     try:
         query = """
@@ -46,32 +61,55 @@ def listar():
         params = []
         
         if filtro:
-            query += " AND (p.sku LIKE ? OR p.nombre_producto LIKE ?)"
-            params.extend([f'%{filtro}%', f'%{filtro}%'])
+            # Incluye productos desactivados: su historial sigue visible
+            condicion, params_filtro, _ = condicion_producto(filtro, solo_activos=False)
+            query += condicion
+            params.extend(params_filtro)
         
         if tipo:
             query += " AND m.id_tipo_movimiento = ?"
             params.append(tipo)
         
-        query += f" ORDER BY m.fecha_movimiento DESC OFFSET {offset} ROWS FETCH NEXT {per_page} ROWS ONLY"
+        # Keyset sobre (fecha_movimiento, id_movimiento) en lugar de OFFSET
+        # CAST a DATETIME para comparar con la misma precisión de la columna
+        orden = 'DESC'
+        if seek:
+            if direccion == 'anterior':
+                query += """ AND (m.fecha_movimiento > CAST(? AS DATETIME)
+                             OR (m.fecha_movimiento = CAST(? AS DATETIME) AND m.id_movimiento > ?))"""
+                orden = 'ASC'
+            else:
+                query += """ AND (m.fecha_movimiento < CAST(? AS DATETIME)
+                             OR (m.fecha_movimiento = CAST(? AS DATETIME) AND m.id_movimiento < ?))"""
+            params.extend([seek[0], seek[0], seek[1]])
         
-        movimientos = execute_query(query, tuple(params) if params else None)
+        query += f" ORDER BY m.fecha_movimiento {orden}, m.id_movimiento {orden} OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+        params.append(per_page + 1)
         
-        # Contar total
-        query_count = "SELECT COUNT(*) as total FROM Movimientos m INNER JOIN Productos p ON m.id_producto = p.id_producto WHERE 1=1"
-        params_count = []
-        
-        if filtro:
-            query_count += " AND (p.sku LIKE ? OR p.nombre_producto LIKE ?)"
-            params_count.extend([f'%{filtro}%', f'%{filtro}%'])
+        movimientos = execute_query(query, tuple(params))
+        pagina = keyset_page(
+            movimientos, per_page, seek, direccion,
+            key=lambda m: (m['fecha_movimiento'], m['id_movimiento'])
+        )
         
-        if tipo:
-            query_count += " AND m.id_tipo_movimiento = ?"
-            params_count.append(tipo)
+        # Contar total (cacheado, opcional)
+        def contar():
+            query_count = "SELECT COUNT(*) as total FROM Movimientos m INNER JOIN Productos p ON m.id_producto = p.id_producto WHERE 1=1"
+            params_count = []
+            
+            if filtro:
+                condicion, params_filtro, _ = condicion_producto(filtro, solo_activos=False)
+                query_count += condicion
+                params_count.extend(params_filtro)
+            
+            if tipo:
+                query_count += " AND m.id_tipo_movimiento = ?"
+                params_count.append(tipo)
+            
+            total_result = execute_query(query_count, tuple(params_count) if params_count else None)
+            return total_result[0]['total'] if total_result else 0
         
-        total_result = execute_query(query_count, tuple(params_count) if params_count else None)
-        total = total_result[0]['total'] if total_result else 0
-        total_pages = (total + per_page - 1) // per_page
+        total = cached_count(('movimientos', filtro, tipo), contar, current_app.config.get('PAGINATION_COUNT_TTL', 60))
         
         # Obtener tipos de movimiento para el filtro
         tipos_movimiento = execute_query("SELECT * FROM TiposMovimiento WHERE activo = 1")
@@ -82,12 +120,11 @@ def listar():
         
         return render_template(
             'movimientos/listar.html',
-            movimientos=movimientos,
+            movimientos=pagina['items'],
             tipos_movimiento=tipos_movimiento,
             filtro=filtro,
             tipo_seleccionado=tipo,
-            page=page,
-            total_pages=total_pages,
+            pagina=pagina,
             total=total,
             puede_registrar=puede_registrar  # NUEVO: Pasar permiso al template
         )
@@ -134,6 +171,8 @@ def registrar():
             }
             
             result = execute_procedure('sp_RegistrarMovimiento', params)
+            procesar_productos([id_producto])
+            invalidar_dashboard()
             
             flash('Movimiento registrado exitosamente', 'success')
             return redirect(url_for('movimientos.listar'))
@@ -155,34 +194,197 @@ def registrar():
     )
 
 
+def _entero(valor):
+    """Convierte a int un valor del formulario o del JSON (None si viene vacío)"""
+    if valor is None or (isinstance(valor, str) and not valor.strip()):
+        return None
+    if isinstance(valor, bool):
+        raise ValueError
+    numero = int(valor)
+    if not -2**31 <= numero < 2**31:  # columnas INT de SQL Server
+        raise ValueError
+    return numero
+
+
+def _lineas_lote():
+    """
+    Lee las líneas del lote desde JSON o desde el formulario.
+    
+    JSON: {"lineas": [{"id_producto", "id_tipo_movimiento", "cantidad",
+           "id_proveedor", "numero_documento", "observaciones"}, ...],
+           "todo_o_nada": false} - los campos fuera de "lineas" aplican a
+           todas las líneas que no los traigan.
+    Formulario: campos id_producto y cantidad repetidos, uno por línea;
+           id_tipo_movimiento repetido o uno solo para todo el lote.
+    
+    Returns:
+        tuple: (lista de dicts por línea, comunes, todo_o_nada)
+    """
+    if request.is_json:
+        datos = request.get_json(silent=True)
+        lineas = datos.get('lineas') if isinstance(datos, dict) else None
+        if not isinstance(lineas, list):
+            raise ValueError('Debe enviar una lista "lineas"')
+        lineas = [linea if isinstance(linea, dict) else {} for linea in lineas]
+        return lineas, datos, bool(datos.get('todo_o_nada'))
+    
+    productos = request.form.getlist('id_producto')
+    cantidades = request.form.getlist('cantidad')
+    tipos = request.form.getlist('id_tipo_movimiento')
+    if len(cantidades) != len(productos) or len(tipos) not in (1, len(productos)):
+        raise ValueError('Cada línea debe tener producto, tipo y cantidad')
+    
+    lineas = [
+        {
+            'id_producto': id_producto,
+            'cantidad': cantidad,
+            'id_tipo_movimiento': tipos[i] if len(tipos) > 1 else tipos[0]
+        }
+        for i, (id_producto, cantidad) in enumerate(zip(productos, cantidades))
+        if id_producto or cantidad  # filas vacías del formulario
+    ]
+    return lineas, request.form, request.form.get('todo_o_nada') == '1'
+
+
+def _rechazo(numero, mensaje):
+    """Resultado de una línea que no llega a la base de datos"""
+    return {
+        'linea': numero,
+        'estado': 'RECHAZADO',
+        'mensaje': mensaje,
+        'id_producto': None,
+        'id_movimiento': None,
+        'stock_anterior': None,
+        'stock_nuevo': None
+    }
+
+
+@bp.route('/registrar-lote', methods=['GET', 'POST'])
+@login_required
+@role_required('Administrador', 'Operador de Bodega')
+def registrar_lote():
+    """
+    Registrar varios movimientos en una sola transacción (JSON o formulario)
+    SOLO: Administrador y Operador de Bodega
+    
+    Cada línea recibe su resultado: REGISTRADO con el id del movimiento y el
+    stock resultante, o RECHAZADO con el motivo.
+    """
+    
+    es_json = request.is_json
+    resultados = None
+    
+    if request.method == 'POST':
+        try:
+            lineas, comunes, todo_o_nada = _lineas_lote()
+            
+            maximo = current_app.config.get('MOVIMIENTOS_LOTE_MAX', 1000)
+            if not lineas:
+                raise ValueError('El lote no tiene líneas')
+            if len(lineas) > maximo:
+                raise ValueError(f'Máximo {maximo} líneas por lote')
+            
+        except ValueError as e:
+            if es_json:
+                return {'success': False, 'error': str(e)}, 400
+            flash(str(e), 'error')
+            return redirect(url_for('movimientos.registrar_lote'))
+        
+        # Las líneas con datos que no son números se rechazan aquí; el resto va a la BD
+        enviar = []
+        rechazadas = {}
+        for numero, linea in enumerate(lineas, 1):
+            numero_documento = linea.get('numero_documento', comunes.get('numero_documento')) or None
+            observaciones = linea.get('observaciones', comunes.get('observaciones')) or None
+            
+            if numero_documento and len(str(numero_documento)) > 50:
+                rechazadas[numero] = _rechazo(numero, 'El número de documento admite 50 caracteres')
+                continue
+            if observaciones and len(str(observaciones)) > 4000:
+                rechazadas[numero] = _rechazo(numero, 'Las observaciones admiten 4000 caracteres')
+                continue
+            
+            try:
+                enviar.append((
+                    numero,
+                    _entero(linea.get('id_producto')),
+                    _entero(linea.get('id_tipo_movimiento', comunes.get('id_tipo_movimiento'))),
+                    _entero(linea.get('cantidad')),
+                    _entero(linea.get('id_proveedor', comunes.get('id_proveedor'))),
+                    str(numero_documento) if numero_documento else None,
+                    str(observaciones) if observaciones else None
+                ))
+            except (TypeError, ValueError):
+                rechazadas[numero] = _rechazo(numero, 'Datos de la línea no válidos')
+        
+        if todo_o_nada and rechazadas:
+            for linea in enviar:
+                rechazadas[linea[0]] = _rechazo(linea[0], 'No se aplicó: el lote tiene líneas rechazadas')
+            enviar = []
+        
+        try:
+            filas = registrar_movimientos_lote(enviar, session.get('user_id'), todo_o_nada) if enviar else []
+        except Exception as e:
+            print(f"Error al registrar lote de movimientos: {e}")
+            if es_json:
+                return {'success': False, 'error': f'Error al registrar movimientos: {str(e)}'}, 500
+            flash(f'Error al registrar movimientos: {str(e)}', 'error')
+            return redirect(url_for('movimientos.registrar_lote'))
+        
+        resultados = sorted(
+            [fila._asdict() for fila in filas] + list(rechazadas.values()),
+            key=lambda r: r['linea']
+        )
+        
+        registrados = [r for r in resultados if r['estado'] == 'REGISTRADO']
+        if registrados:
+            procesar_productos([r['id_producto'] for r in registrados])
+            invalidar_dashboard()
+        
+        if es_json:
+            return {
+                'success': True,
+                'total': len(resultados),
+                'registrados': len(registrados),
+                'rechazados': len(resultados) - len(registrados),
+                'resultados': resultados
+            }
+        
+        if len(registrados) == len(resultados):
+            flash(f'{len(registrados)} movimientos registrados exitosamente', 'success')
+        else:
+            flash(f'{len(registrados)} de {len(resultados)} movimientos registrados; revise las líneas rechazadas', 'warning')
+    
+    # Obtener datos para el formulario
+    productos = execute_query("SELECT id_producto, sku, nombre_producto, stock_actual FROM Productos WHERE activo = 1 ORDER BY nombre_producto")
+    tipos_movimiento = execute_query("SELECT * FROM TiposMovimiento WHERE activo = 1 ORDER BY nombre_tipo")
+    proveedores = execute_query("SELECT * FROM Proveedores WHERE activo = 1 ORDER BY nombre_proveedor")
+    
+    return render_template(
+        'movimientos/registrar_lote.html',
+        productos=productos,
+        tipos_movimiento=tipos_movimiento,
+        proveedores=proveedores,
+        resultados=resultados
+    )
+
+
 @bp.route('/alertas')
 @login_required
 def alertas():
     """Ver todas las alertas de stock - TODOS LOS ROLES pueden ver"""
     
+    seek, direccion = get_seek(request.args, longitud=3)
+    per_page = 24
+    
     try:
-        query = """
-            SELECT 
-                a.*,
-                p.sku,
-                p.nombre_producto,
-                p.stock_actual,
-                c.nombre_categoria,
-                pr.nombre_proveedor
-            FROM AlertasStock a
-            INNER JOIN Productos p ON a.id_producto = p.id_producto
-            LEFT JOIN Categorias c ON p.id_categoria = c.id_categoria
-            LEFT JOIN Proveedores pr ON p.id_proveedor = pr.id_proveedor
-            WHERE a.estado = 'PENDIENTE'
-            ORDER BY 
-                CASE a.tipo_alerta
-                    WHEN 'STOCK_CRITICO' THEN 1
-                    WHEN 'STOCK_MINIMO' THEN 2
-                END,
-                a.fecha_generacion DESC
-        """
-        
-        alertas = execute_query(query)
+        # Solo la página actual; los totales salen de un conteo por tipo
+        alertas = get_alertas_pendientes(per_page + 1, seek, direccion)
+        pagina = keyset_page(
+            alertas, per_page, seek, direccion,
+            key=lambda a: (a['tipo_alerta'], a['fecha_generacion'], a['id_alerta'])
+        )
+        resumen = get_resumen_alertas()
         
         # NUEVO: Verificar si el usuario puede resolver alertas
         rol_usuario = session.get('rol')
@@ -190,14 +392,16 @@ def alertas():
         
         return render_template(
             'movimientos/alertas.html', 
-            alertas=alertas,
+            alertas=pagina['items'],
+            pagina=pagina,
+            resumen=resumen,
             puede_resolver=puede_resolver  # NUEVO: Pasar permiso al template
         )
         
     except Exception as e:
         print(f"Error al listar alertas: {e}")
         flash('Error al cargar alertas', 'error')
-        return render_template('movimientos/alertas.html', alertas=[], error=str(e))
+        return render_template('movimientos/alertas.html', alertas=[], pagina=None, resumen=None, error=str(e))
 
 
 @bp.route('/alertas/<int:id>/resolver', methods=['POST'])
@@ -211,6 +415,7 @@ def resolver_alerta(id):
     
     try:
         id_usuario = session.get('user_id')
+        alerta = execute_query("SELECT id_producto FROM AlertasStock WHERE id_alerta = ?", (id,))
         query = """
             UPDATE AlertasStock 
             SET estado = 'RESUELTA',
@@ -219,6 +424,9 @@ def resolver_alerta(id):
             WHERE id_alerta = ?
         """
         execute_query(query, (id_usuario, id), fetch=False)
+        if alerta:
+            alerta_resuelta(alerta[0]['id_producto'])
+        invalidar_dashboard()
         flash('Alerta resuelta exitosamente', 'success')
     except Exception as e:
         print(f"Error al resolver alerta: {e}")
@@ -226,7 +434,110 @@ def resolver_alerta(id):
     
     return redirect(url_for('movimientos.alertas'))
 
-from datetime import datetime  
+from datetime import datetime, timedelta
+from itertools import chain
+
+
+def _filtros_reporte(fecha_desde, fecha_hasta, producto, tipo, alias='m', columna_fecha='fecha_movimiento'):
+    """
+    Construye las condiciones WHERE del reporte de movimientos
+    
+    Args:
+        alias (str): Alias de Movimientos (o de MovimientosDiarios)
+        columna_fecha (str): Columna de fecha de esa tabla
+    
+    Returns:
+        tuple: (condiciones SQL, lista de parámetros)
+    """
+    condiciones = ""
+    params = []
+    
+    # Rango por día sin aplicar funciones a la columna, para que use el índice por fecha
+    if fecha_desde:
+        condiciones += f" AND {alias}.{columna_fecha} >= CAST(? AS DATE)"
+        params.append(fecha_desde)
+    
+    if fecha_hasta:
+        condiciones += f" AND {alias}.{columna_fecha} < DATEADD(DAY, 1, CAST(? AS DATE))"
+        params.append(fecha_hasta)
+    
+    if producto:
+        condicion, params_filtro, _ = condicion_producto(producto, solo_activos=False)
+        condiciones += condicion
+        params.extend(params_filtro)
+    
+    if tipo:
+        condiciones += f" AND {alias}.id_tipo_movimiento = ?"
+        params.append(tipo)
+    
+    return condiciones, params
+
+
+def _limite_archivo(archivados):
+    """
+    Con archivados, fecha desde la que el detalle se lee de la BD (lo anterior
+    sale del archivo histórico, aunque todavía no se haya terminado de borrar)
+    
+    Returns:
+        date: o None si no se incluyen meses archivados o no hay ninguno
+    """
+    return get_archivo_historico().archivado_hasta('Movimientos') if archivados else None
+
+
+def _movimientos_archivados(columnas, fecha_desde, fecha_hasta, producto, tipo):
+    """
+    Movimientos de los meses archivados con los filtros del reporte, del más
+    reciente al más antiguo y con las mismas columnas que la consulta a la BD
+    
+    Args:
+        columnas (tuple): Columnas de Movimientos o sku, nombre_producto,
+                          nombre_tipo y nombre_completo
+    
+    Returns:
+        iterator: Filas (Row)
+    """
+    
+    desde = datetime.strptime(fecha_desde, '%Y-%m-%d') if fecha_desde else None
+    hasta = datetime.strptime(fecha_hasta, '%Y-%m-%d') + timedelta(days=1) if fecha_hasta else None
+    
+    ids_producto = None
+    if producto:
+        condicion, params, ids = condicion_producto(producto, solo_activos=False)
+        if ids is None:
+            ids = [fila.id_producto for fila in execute_query(
+                f"SELECT p.id_producto FROM Productos p WHERE 1=1 {condicion}", tuple(params)
+            )]
+        ids_producto = set(ids)
+    
+    # Los nombres no se archivan: se toman de las tablas actuales
+    productos = {fila.id_producto: fila for fila in execute_query(
+        "SELECT id_producto, sku, nombre_producto FROM Productos"
+    )}
+    tipos = {fila.id_tipo_movimiento: fila.nombre_tipo for fila in execute_query(
+        "SELECT id_tipo_movimiento, nombre_tipo FROM TiposMovimiento"
+    )}
+    usuarios = {fila.id_usuario: fila.nombre_completo for fila in execute_query(
+        "SELECT id_usuario, nombre_completo FROM Usuarios"
+    )} if 'nombre_completo' in columnas else {}
+    
+    nombres = ('sku', 'nombre_producto', 'nombre_tipo', 'nombre_completo')
+    leidas = ('id_producto', 'id_tipo_movimiento', 'id_usuario') + tuple(c for c in columnas if c not in nombres)
+    filas = get_archivo_historico().leer(
+        'Movimientos', leidas, desde, hasta, descendente=True,
+        id_producto=ids_producto, id_tipo_movimiento=int(tipo) if tipo else None
+    )
+    
+    def completar(fila):
+        datos = dict(zip(leidas, fila))
+        producto = productos.get(datos['id_producto'])
+        datos['sku'] = producto.sku if producto else None
+        datos['nombre_producto'] = producto.nombre_producto if producto else None
+        datos['nombre_tipo'] = tipos.get(datos['id_tipo_movimiento'])
+        datos['nombre_completo'] = usuarios.get(datos['id_usuario'])
+        return tuple(datos[c] for c in columnas)
+    
+    return make_rows(columnas, map(completar, filas))
+
 
 @bp.route('/reporte')
 @login_required
@@ -237,9 +548,29 @@ def reporte():
     fecha_hasta = request.args.get('fecha_hasta', '')
     producto = request.args.get('producto', '')
     tipo = request.args.get('tipo', '')
+    archivados = bool(request.args.get('archivados'))
     
     try:
-        query = """
+        condiciones, params = _filtros_reporte(fecha_desde, fecha_hasta, producto, tipo)
+        archivado_hasta = get_archivo_historico().archivado_hasta('Movimientos')
+        limite = _limite_archivo(archivados)
+        if limite:
+            condiciones += " AND m.fecha_movimiento >= ?"
+            params.append(limite)
+        
+        # Totales por tipo, por producto y por día desde el resumen diario, en
+        # columnas: el costo depende de los días y productos del rango, no de
+        # la cantidad de movimientos
+        condiciones_resumen, params_resumen = _filtros_reporte(
+            fecha_desde, fecha_hasta, producto, tipo, alias='r', columna_fecha='fecha'
+        )
+        agregados = agregados_reporte(condiciones_resumen, tuple(params_resumen) if params_resumen else None)
+        totales = agregados['totales']
+        total_movimientos = agregados['estadisticas']['registros']
+        
+        tipos_movimiento = execute_query("SELECT * FROM TiposMovimiento WHERE activo = 1 ORDER BY nombre_tipo")
+        
+        query = f"""
             SELECT 
                 m.fecha_movimiento,
                 p.sku,
@@ -250,43 +581,22 @@ def reporte():
             FROM Movimientos m
             INNER JOIN Productos p ON m.id_producto = p.id_producto
             INNER JOIN TiposMovimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
-            WHERE 1=1
+            WHERE 1=1 {condiciones}
+            ORDER BY m.fecha_movimiento DESC
         """
         
-        params = []
-        
-        if fecha_desde:
-            query += " AND CAST(m.fecha_movimiento AS DATE) >= ?"
-            params.append(fecha_desde)
-        
-        if fecha_hasta:
-            query += " AND CAST(m.fecha_movimiento AS DATE) <= ?"
-            params.append(fecha_hasta)
-        
-        if producto:
-            query += " AND (p.sku LIKE ? OR p.nombre_producto LIKE ?)"
-            params.extend([f'%{producto}%', f'%{producto}%'])
-        
-        if tipo:
-            query += " AND m.id_tipo_movimiento = ?"
-            params.append(tipo)
-        
-        query += " ORDER BY m.fecha_movimiento DESC"
-        
-        movimientos = execute_query(query, tuple(params) if params else None)
-        tipos_movimiento = execute_query("SELECT * FROM TiposMovimiento WHERE activo = 1 ORDER BY nombre_tipo")
-        
-        totales = {}
-        for mov in movimientos:
-            tipo_nombre = mov['nombre_tipo']
-            if tipo_nombre not in totales:
-                totales[tipo_nombre] = 0
-            totales[tipo_nombre] += mov['cantidad']
+        # Las filas se leen por lotes mientras se envía la página
+        movimientos = stream_query(query, tuple(params) if params else None)
+        if limite:
+            movimientos = chain(movimientos, _movimientos_archivados(
+                ('fecha_movimiento', 'sku', 'nombre_producto', 'nombre_tipo', 'cantidad', 'numero_documento'),
+                fecha_desde, fecha_hasta, producto, tipo
+            ))
         
         # Obtener fecha y hora actual
         fecha_reporte = datetime.now().strftime('%d/%m/%Y %H:%M')
         
-        return render_template(
+        return stream_template(
             'movimientos/reporte.html',
             movimientos=movimientos,
             tipos_movimiento=tipos_movimiento,
@@ -295,11 +605,201 @@ def reporte():
             producto=producto,
             tipo_seleccionado=tipo,
             totales=totales,
-            total_movimientos=len(movimientos),
+            total_movimientos=total_movimientos,
+            agregados=agregados,
+            archivados=archivados,
+            archivado_hasta=archivado_hasta,
             fecha_reporte=fecha_reporte
         )
         
     except Exception as e:
         print(f"Error al generar reporte: {e}")
         flash('Error al generar el reporte', 'error')
-        return render_template('movimientos/reporte.html', movimientos=[], error=str(e))
\ No newline at end of file
+        return render_template('movimientos/reporte.html', movimientos=[], error=str(e))
+
+
+COLUMNAS_EXPORTACION = [
+    'Fecha', 'SKU', 'Producto', 'Tipo', 'Cantidad',
+    'Stock Anterior', 'Stock Nuevo', 'Usuario', 'Documento'
+]
+
+# Vistas agregadas del reporte: vista -> (llave en agregados_reporte, hoja, columnas, campos)
+VISTAS_EXPORTACION = {
+    'tipos': ('por_tipo', 'Por tipo', ['Tipo', 'Movimientos', 'Cantidad'],
+              ('nombre_tipo', 'registros', 'cantidad')),
+    'productos': ('por_producto', 'Por producto', ['SKU', 'Producto', 'Movimientos', 'Cantidad'],
+                  ('sku', 'nombre_producto', 'registros', 'cantidad')),
+    'dias': ('por_dia', 'Por día', ['Fecha', 'Movimientos', 'Cantidad'],
+             ('fecha', 'registros', 'cantidad'))
+}
+
+FORMATOS_EXPORTACION = {
+    'csv': (exportar_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (exportar_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+}
+
+
+def _datos_exportacion(vista, fecha_desde, fecha_hasta, producto, tipo, archivados=False):
+    """
+    Hoja, columnas y filas de la exportación del reporte (con archivados,
+    el detalle incluye los meses del archivo histórico)
+    
+    Returns:
+        tuple: (nombre de hoja, columnas, iterable de filas)
+    """
+    
+    if vista:
+        # Agregados del resumen diario: pocas filas, se calculan antes de responder
+        llave, hoja, columnas, campos = VISTAS_EXPORTACION[vista]
+        condiciones, params = _filtros_reporte(
+            fecha_desde, fecha_hasta, producto, tipo, alias='r', columna_fecha='fecha'
+        )
+        agregados = agregados_reporte(condiciones, tuple(params) if params else None, top_productos=None)
+        return hoja, columnas, [tuple(fila[campo] for campo in campos) for fila in agregados[llave]]
+    
+    condiciones, params = _filtros_reporte(fecha_desde, fecha_hasta, producto, tipo)
+    limite = _limite_archivo(archivados)
+    if limite:
+        condiciones += " AND m.fecha_movimiento >= ?"
+        params.append(limite)
+    
+    query = f"""
+        SELECT 
+            m.fecha_movimiento,
+            p.sku,
+            p.nombre_producto,
+            tm.nombre_tipo,
+            m.cantidad,
+            m.stock_anterior,
+            m.stock_nuevo,
+            u.nombre_completo,
+            m.numero_documento
+        FROM Movimientos m
+        INNER JOIN Productos p ON m.id_producto = p.id_producto
+        INNER JOIN TiposMovimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
+        INNER JOIN Usuarios u ON m.id_usuario = u.id_usuario
+        WHERE 1=1 {condiciones}
+        ORDER BY m.fecha_movimiento DESC, m.id_movimiento DESC
+    """
+    filas = stream_query(query, tuple(params) if params else None)
+    if limite:
+        filas = chain(filas, _movimientos_archivados(
+            ('fecha_movimiento', 'sku', 'nombre_producto', 'nombre_tipo', 'cantidad',
+             'stock_anterior', 'stock_nuevo', 'nombre_completo', 'numero_documento'),
+            fecha_desde, fecha_hasta, producto, tipo
+        ))
+    return 'Reporte', COLUMNAS_EXPORTACION, filas
+
+
+def _generar_exportacion(formato, hoja, columnas, filas):
+    """Partes del archivo CSV o XLSX"""
+    generar = FORMATOS_EXPORTACION[formato][0]
+    if formato == 'xlsx':
+        return generar(columnas, filas, nombre_hoja=hoja)
+    return generar(columnas, filas)
+
+
+@tarea('exportar_reporte')
+def tarea_exportar_reporte(trabajo, formato, vista, fecha_desde, fecha_hasta, producto, tipo, nombre,
+                           archivados=False):
+    """
+    Exportación del reporte en un proceso de trabajo: el archivo se escribe
+    en disco y el usuario lo descarga desde Trabajos cuando está listo
+    """
+    
+    total = None
+    if not vista:
+        # El total sale del resumen diario (un registro por producto, tipo y día)
+        condiciones, params = _filtros_reporte(
+            fecha_desde, fecha_hasta, producto, tipo, alias='r', columna_fecha='fecha'
+        )
+        total = execute_query(f"""
+            SELECT ISNULL(SUM(r.total_movimientos), 0) AS total
+            FROM MovimientosDiarios r
+            INNER JOIN Productos p ON r.id_producto = p.id_producto
+            WHERE 1=1 {condiciones}
+        """, tuple(params) if params else None)[0]['total']
+    
+    hoja, columnas, filas = _datos_exportacion(vista, fecha_desde, fecha_hasta, producto, tipo, archivados)
+    escritas = 0
+    
+    def con_avance(filas):
+        nonlocal escritas
+        for fila in filas:
+            yield fila
+            escritas += 1
+            if escritas % 1000 == 0:
+                trabajo.progreso(escritas, total, f'{escritas:,} filas exportadas')
+    
+    ruta = trabajo.archivo_resultado(f'{nombre}.{formato}')
+    with open(ruta, 'wb') as archivo:
+        for parte in _generar_exportacion(formato, hoja, columnas, con_avance(filas)):
+            archivo.write(parte.encode('utf-8') if isinstance(parte, str) else parte)
+    
+    trabajo.progreso(escritas, escritas, f'{escritas:,} filas exportadas', forzar=True)
+    return {'filas': escritas, 'archivo': f'{nombre}.{formato}'}
+
+
+@bp.route('/reporte/exportar')
+@login_required
+def exportar_reporte():
+    """
+    Exporta el reporte de movimientos a CSV o Excel con los mismos filtros.
+    Las filas pasan del cursor a la respuesta por lotes: la memoria no crece
+    con el tamaño del reporte y la descarga empieza de inmediato.
+    
+    Con vista=tipos|productos|dias se exportan los agregados del reporte
+    en lugar del detalle de movimientos.
+    
+    Con segundo_plano=1 la exportación se encola como trabajo y se redirige
+    a la lista de trabajos para seguir el avance y descargar el archivo.
+    
+    Con archivados=1 el detalle incluye los meses del archivo histórico.
+    """
+    
+    formato = request.args.get('formato', 'csv')
+    vista = request.args.get('vista', '')
+    fecha_desde = request.args.get('fecha_desde', '')
+    fecha_hasta = request.args.get('fecha_hasta', '')
+    producto = request.args.get('producto', '')
+    tipo = request.args.get('tipo', '')
+    archivados = bool(request.args.get('archivados'))
+    
+    if formato not in FORMATOS_EXPORTACION or (vista and vista not in VISTAS_EXPORTACION):
+        flash('Formato de exportación no válido', 'error')
+        return redirect(url_for('movimientos.reporte'))
+    
+    mimetype = FORMATOS_EXPORTACION[formato][1]
+    nombre = f"reporte_movimientos_{datetime.now().strftime('%Y%m%d_%H%M')}"
+    if vista:
+        nombre = f"{nombre}_{vista}"
+    
+    if request.args.get('segundo_plano'):
+        runner = get_job_runner()
+        if runner is not None:
+            id_trabajo = runner.encolar(
+                'exportar_reporte',
+                {'formato': formato, 'vista': vista, 'fecha_desde': fecha_desde, 'fecha_hasta': fecha_hasta,
+                 'producto': producto, 'tipo': tipo, 'nombre': nombre, 'archivados': archivados},
+                id_usuario=session.get('user_id'),
+                descripcion=f'Exportación {formato.upper()} del reporte de movimientos'
+            )
+            flash('La exportación se está generando. Descárguela aquí cuando termine.', 'info')
+            return redirect(url_for('trabajos.listar', resaltar=id_trabajo))
+    
+    try:
+        hoja, columnas, filas = _datos_exportacion(vista, fecha_desde, fecha_hasta, producto, tipo, archivados)
+        
+    except Exception as e:
+        print(f"Error al exportar reporte: {e}")
+        flash('Error al exportar el reporte', 'error')
+        return redirect(url_for('movimientos.reporte'))
+    
+    return Response(
+        stream_with_context(_generar_exportacion(formato, hoja, columnas, filas)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename={nombre}.{formato}',
+            'X-Accel-Buffering': 'no'  # que un proxy no acumule la respuesta
+        }
+    )
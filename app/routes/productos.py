@@ -4,9 +4,21 @@
 # ACTUALIZADO CON SISTEMA DE ROLES
 # =============================================
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session
+import os
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, current_app
+from werkzeug.utils import secure_filename
 from app.routes.auth import login_required, role_required
+from app.pagination import get_seek, keyset_page, cached_count
 from app.services.barcode_service import BarcodeService, ProductService
+from app.services.product_search import condicion_producto, refrescar_producto
+from app.services.barcode_cache import get_barcode_cache
+from app.services.barcode_providers import get_lookup_client
+from app.services.dashboard_cache import invalidar_dashboard
+from app.services.alert_engine import procesar_productos
+from app.services.product_import import FORMATOS_IMPORTACION, importar_productos
+from app.services.job_runner import tarea, get_job_runner
 from app.database import (
     execute_query, get_productos, 
     puede_crear_productos, puede_editar_productos, 
@@ -22,27 +34,44 @@ bp = Blueprint('productos', __name__, url_prefix='/productos')
 def listar():
     """Lista todos los productos - TODOS LOS ROLES pueden ver"""
     
-    # Obtener filtros
+    # Obtener filtros y cursor de paginación
     filtro = request.args.get('q', '')
-    page = int(request.args.get('page', 1))
+    seek, direccion = get_seek(request.args)
     per_page = 20
-    offset = (page - 1) * per_page
     
     try:
-        # Obtener productos
-        productos = get_productos(filtro=filtro if filtro else None, limit=per_page, offset=offset)
-        
-        # Contar total para paginación
-        query_count = "SELECT COUNT(*) as total FROM Productos WHERE activo = 1"
-        params_count = None
+        # Obtener productos (keyset sobre nombre_producto, id_producto, o sobre
+        # la relevancia cuando el índice de búsqueda resuelve el filtro)
+        productos = get_productos(
+            filtro=filtro if filtro else None,
+            limit=per_page + 1,
+            seek=seek,
+            direccion=direccion
+        )
+        pagina = keyset_page(
+            productos, per_page, seek, direccion,
+            key=lambda p: (
+                p['nombre_producto'] if p['relevancia'] is None else p['relevancia'],
+                p['id_producto']
+            )
+        )
         
-        if filtro:
-            query_count += " AND (sku LIKE ? OR nombre_producto LIKE ?)"
-            params_count = (f'%{filtro}%', f'%{filtro}%')
+        # Contar total (cacheado, opcional)
+        def contar():
+            query_count = "SELECT COUNT(*) as total FROM Productos p WHERE p.activo = 1"
+            params_count = None
+            
+            if filtro:
+                condicion, params_filtro, ids = condicion_producto(filtro)
+                if ids is not None:
+                    return len(ids)  # El índice ya filtra productos activos
+                query_count += condicion
+                params_count = tuple(params_filtro)
+            
+            total_result = execute_query(query_count, params_count)
+            return total_result[0]['total'] if total_result else 0
         
-        total_result = execute_query(query_count, params_count)
-        total = total_result[0]['total'] if total_result else 0
-        total_pages = (total + per_page - 1) // per_page
+        total = cached_count(('productos', filtro), contar, current_app.config.get('PAGINATION_COUNT_TTL', 60))
         
         # NUEVO: Obtener permisos del usuario actual
         rol_usuario = session.get('rol')
@@ -50,10 +79,9 @@ def listar():
         
         return render_template(
             'productos/listar.html',
-            productos=productos,
+            productos=pagina['items'],
             filtro=filtro,
-            page=page,
-            total_pages=total_pages,
+            pagina=pagina,
             total=total,
             permisos=permisos  # NUEVO: Pasar todos los permisos al template
         )
@@ -110,8 +138,12 @@ def crear():
                 query_insert,
                 (sku, codigo_barras, nombre, descripcion, id_categoria, id_proveedor,
                  precio_compra, precio_venta, stock_actual, stock_minimo, stock_maximo, ubicacion),
-                fetch=False
+                fetch=False,
+                auditar=('Productos', 'sku', sku)
             )
+            refrescar_producto(sku=sku)
+            procesar_productos(sku=sku)
+            invalidar_dashboard()
             
             flash(f'Producto {nombre} creado exitosamente', 'success')
             return redirect(url_for('productos.listar'))
@@ -131,6 +163,110 @@ def crear():
     )
 
 
+def _aplicar_importacion(resultado):
+    """Sincroniza índice de búsqueda, alertas y dashboard con lo importado"""
+    if resultado['insertados'] or resultado['actualizados']:
+        refrescar_producto(desde=resultado['desde'])
+        procesar_productos(desde=resultado['desde'])
+        invalidar_dashboard()
+
+
+@tarea('importar_productos', al_terminar=_aplicar_importacion)
+def tarea_importar_productos(trabajo, ruta, lote, max_errores, id_usuario=None, ip_address=None):
+    """
+    Importación en un proceso de trabajo. Si se cancela, los lotes ya
+    escritos se conservan. El archivo subido se borra al terminar.
+    """
+    
+    def avance(filas):
+        trabajo.progreso(filas, mensaje=f'{filas:,} filas procesadas')
+    
+    try:
+        return importar_productos(ruta, lote=lote, max_errores=max_errores, progreso=avance,
+                                  id_usuario=id_usuario, ip_address=ip_address)
+    finally:
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+@bp.route('/importar', methods=['GET', 'POST'])
+@login_required
+@role_required('Administrador', 'Operador de Bodega')
+def importar():
+    """
+    Importar productos desde un archivo CSV o Excel (.xlsx)
+    SOLO: Administrador y Operador de Bodega
+    
+    Los SKU nuevos se crean y los existentes se actualizan (las celdas
+    vacías conservan el valor actual y el stock solo cambia con movimientos).
+    Con 'segundo_plano' el archivo se procesa como trabajo y la página
+    de Trabajos muestra el avance.
+    """
+    
+    resultado = None
+    
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if archivo is None or not archivo.filename:
+            flash('Seleccione un archivo', 'error')
+            return redirect(url_for('productos.importar'))
+        
+        extension = archivo.filename.rsplit('.', 1)[-1].lower() if '.' in archivo.filename else ''
+        permitidas = current_app.config.get('ALLOWED_EXTENSIONS', FORMATOS_IMPORTACION)
+        if extension not in permitidas or extension not in FORMATOS_IMPORTACION:
+            flash('Formato no soportado: use un archivo .csv o .xlsx', 'error')
+            return redirect(url_for('productos.importar'))
+        
+        # Se guarda en UPLOAD_FOLDER y se lee por partes desde el disco
+        carpeta = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{secure_filename(archivo.filename) or 'productos.' + extension}"
+        ruta = os.path.join(carpeta, nombre)
+        archivo.save(ruta)
+        
+        lote = current_app.config.get('PRODUCT_IMPORT_BATCH_SIZE', 1000)
+        max_errores = current_app.config.get('PRODUCT_IMPORT_MAX_ERRORS', 1000)
+        
+        runner = get_job_runner() if request.form.get('segundo_plano') else None
+        if runner is not None:
+            # El proceso de trabajo borra el archivo al terminar
+            id_trabajo = runner.encolar(
+                'importar_productos',
+                {'ruta': os.path.abspath(ruta), 'lote': lote, 'max_errores': max_errores,
+                 'id_usuario': session.get('user_id'), 'ip_address': request.remote_addr},
+                id_usuario=session.get('user_id'),
+                descripcion=f'Importación de productos: {archivo.filename}'
+            )
+            flash('La importación se está procesando. Puede seguir el avance aquí.', 'info')
+            return redirect(url_for('trabajos.listar', resaltar=id_trabajo))
+        
+        try:
+            resultado = importar_productos(ruta, lote=lote, max_errores=max_errores)
+            _aplicar_importacion(resultado)
+            
+            mensaje = (f"{resultado['insertados']} productos creados y {resultado['actualizados']} "
+                       f"actualizados en {resultado['segundos']} s")
+            if resultado['total_errores']:
+                flash(f"{mensaje}; {resultado['total_errores']} filas con errores", 'warning')
+            else:
+                flash(mensaje, 'success')
+                
+        except ValueError as e:
+            flash(str(e), 'error')
+        except Exception as e:
+            print(f"Error al importar productos: {e}")
+            flash(f'Error al importar productos: {str(e)}', 'error')
+        finally:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+    
+    return render_template('productos/importar.html', resultado=resultado)
+
+
 @bp.route('/<int:id>/editar', methods=['GET', 'POST'])
 @login_required
 @role_required('Administrador', 'Operador de Bodega')  # ACTUALIZADO: Roles correctos
@@ -184,8 +320,12 @@ def editar(id):
                     request.form.get('ubicacion'),
                     id
                 ),
-                fetch=False
+                fetch=False,
+                auditar=('Productos', 'id_producto', id)
             )
+            refrescar_producto(id)
+            procesar_productos([id])
+            invalidar_dashboard()
             
             flash('Producto actualizado exitosamente', 'success')
             return redirect(url_for('productos.listar'))
@@ -216,8 +356,11 @@ def eliminar(id):
     """
     
     try:
-        query = "UPDATE Productos SET activo = 0 WHERE id_producto = ?"
-        execute_query(query, (id,), fetch=False)
+        query = "UPDATE Productos SET activo = 0, fecha_modificacion = GETDATE() WHERE id_producto = ?"
+        execute_query(query, (id,), fetch=False, auditar=('Productos', 'id_producto', id))
+        refrescar_producto(id)
+        procesar_productos([id])
+        invalidar_dashboard()
         flash('Producto eliminado exitosamente', 'success')
     except Exception as e:
         print(f"Error al eliminar producto: {e}")
@@ -303,4 +446,70 @@ def buscar_barcode():
         return {
             'success': False,
             'error': f'Error al buscar: {str(e)}'
-        }
\ No newline at end of file
+        }
+
+
+@bp.route('/buscar-barcode-lote', methods=['POST'])
+@login_required
+def buscar_barcode_lote():
+    """
+    Buscar información de varios códigos de barras (por ejemplo un manifiesto de proveedor)
+    Endpoint AJAX: {"codigos_barras": [...]} -> resultados en el mismo orden
+    """
+    try:
+        codigos = (request.get_json(silent=True) or {}).get('codigos_barras', [])
+        
+        if not isinstance(codigos, list) or not codigos:
+            return {
+                'success': False,
+                'error': 'Debe enviar una lista "codigos_barras"'
+            }, 400
+        
+        maximo = current_app.config.get('BARCODE_BATCH_MAX', 500)
+        if len(codigos) > maximo:
+            return {
+                'success': False,
+                'error': f'Máximo {maximo} códigos por consulta'
+            }, 400
+        
+        resultados = BarcodeService.buscar_multiple(codigos)
+        
+        return {
+            'success': True,
+            'total': len(resultados),
+            'encontrados': sum(1 for r in resultados if r.get('encontrado')),
+            'resultados': [
+                {
+                    'codigo_barras': r.get('codigo_barras'),
+                    'encontrado': bool(r.get('encontrado')),
+                    'data': ProductService.prellenar_producto(r),
+                    'error': r.get('error')
+                }
+                for r in resultados
+            ]
+        }
+        
+    except Exception as e:
+        return {
+            'success': False,
+            'error': f'Error al buscar: {str(e)}'
+        }
+
+
+@bp.route('/barcode-cache')
+@login_required
+@role_required('Administrador')
+def barcode_cache():
+    """Estadísticas de la caché de códigos de barras - SOLO: Administrador"""
+    cache = get_barcode_cache()
+    if cache is None:
+        return {'activa': False}
+    return {'activa': True, **cache.stats()}
+
+
+@bp.route('/barcode-proveedores')
+@login_required
+@role_required('Administrador')
+def barcode_proveedores():
+    """Latencia, errores y estado del circuito de cada API - SOLO: Administrador"""
+    return get_lookup_client().stats()
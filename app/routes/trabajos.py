@@ -0,0 +1,109 @@
+# =============================================
+# RUTAS DE TRABAJOS EN SEGUNDO PLANO - SGI-GuateMart
+# app/routes/trabajos.py
+# =============================================
+
+import os
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, send_file, abort
+from app.routes.auth import login_required
+from app.services.job_runner import get_job_runner, CANCELADO, COMPLETADO, EN_PROCESO
+
+bp = Blueprint('trabajos', __name__, url_prefix='/trabajos')
+
+# Campos que se envían al navegador (sin rutas del servidor ni parámetros internos)
+CAMPOS_PUBLICOS = ('id', 'tipo', 'descripcion', 'estado', 'hechos', 'total', 'porcentaje',
+                   'mensaje', 'resultado', 'nombre_archivo', 'cancelar', 'creado', 'iniciado', 'terminado')
+
+
+def _runner():
+    runner = get_job_runner()
+    if runner is None:
+        abort(404)
+    return runner
+
+
+def _trabajo(id_trabajo):
+    """Trabajo del usuario actual (el Administrador ve todos)"""
+    trabajo = _runner().store.obtener(id_trabajo)
+    if trabajo is None:
+        abort(404)
+    if session.get('rol') != 'Administrador' and trabajo['id_usuario'] != session.get('user_id'):
+        abort(404)
+    return trabajo
+
+
+def _publico(trabajo):
+    return {campo: trabajo[campo] for campo in CAMPOS_PUBLICOS}
+
+
+@bp.route('/')
+@login_required
+def listar():
+    """Trabajos del usuario con su avance (JSON con formato=json)"""
+    
+    runner = get_job_runner()
+    if runner is None:
+        flash('Los trabajos en segundo plano están desactivados', 'warning')
+        return redirect(url_for('dashboard.index'))
+    
+    todos = session.get('rol') == 'Administrador' and request.args.get('todos')
+    trabajos = runner.store.listar(None if todos else session.get('user_id'))
+    
+    if request.args.get('formato') == 'json':
+        return jsonify({'trabajos': [_publico(t) for t in trabajos]})
+    
+    for trabajo in trabajos:
+        trabajo['creado_texto'] = datetime.fromtimestamp(trabajo['creado']).strftime('%d/%m/%Y %H:%M')
+    
+    return render_template(
+        'trabajos/listar.html',
+        trabajos=trabajos,
+        todos=bool(todos),
+        resaltar=request.args.get('resaltar', '')
+    )
+
+
+@bp.route('/<id_trabajo>')
+@login_required
+def estado(id_trabajo):
+    """Estado y avance de un trabajo"""
+    return jsonify(_publico(_trabajo(id_trabajo)))
+
+
+@bp.route('/<id_trabajo>/cancelar', methods=['POST'])
+@login_required
+def cancelar(id_trabajo):
+    """Cancela un trabajo pendiente o en proceso"""
+    
+    _trabajo(id_trabajo)
+    nuevo_estado = _runner().cancelar(id_trabajo)
+    
+    if request.is_json or request.args.get('formato') == 'json':
+        return jsonify({'id': id_trabajo, 'estado': nuevo_estado})
+    
+    if nuevo_estado == CANCELADO:
+        flash('Trabajo cancelado', 'success')
+    elif nuevo_estado == EN_PROCESO:
+        flash('Cancelación solicitada: el trabajo se detendrá en unos segundos', 'info')
+    else:
+        flash('El trabajo ya había terminado', 'info')
+    return redirect(url_for('trabajos.listar'))
+
+
+@bp.route('/<id_trabajo>/descargar')
+@login_required
+def descargar(id_trabajo):
+    """Descarga el archivo generado por un trabajo terminado"""
+    
+    trabajo = _trabajo(id_trabajo)
+    if trabajo['estado'] != COMPLETADO or not trabajo['archivo'] or not os.path.exists(trabajo['archivo']):
+        flash('El archivo no está disponible', 'warning')
+        return redirect(url_for('trabajos.listar'))
+    
+    return send_file(
+        os.path.abspath(trabajo['archivo']),
+        as_attachment=True,
+        download_name=trabajo['nombre_archivo']
+    )
@@ -0,0 +1,101 @@
+# =============================================
+# FILAS COMPACTAS - SGI-GuateMart
+# app/rows.py
+# =============================================
+
+from functools import lru_cache
+from operator import itemgetter
+
+
+class Row(tuple):
+    """
+    Fila de resultado basada en tupla.
+
+    Los nombres de columna se guardan una sola vez en la clase (creada y
+    cacheada por cada lista de columnas), no en cada fila. Permite:
+        fila.sku, fila['sku'], fila[0], fila.get('sku'), dict(fila)
+    """
+
+    __slots__ = ()
+
+    _columns = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        """Igual que dict.get"""
+        pos = self._index.get(key)
+        return default if pos is None else tuple.__getitem__(self, pos)
+
+    def keys(self):
+        """Nombres de columna (permite dict(fila))"""
+        return self._index.keys()
+
+    def values(self):
+        return [tuple.__getitem__(self, pos) for pos in self._index.values()]
+
+    def items(self):
+        return [(nombre, tuple.__getitem__(self, pos)) for nombre, pos in self._index.items()]
+
+    def _asdict(self):
+        """Convierte la fila a diccionario (por ejemplo para JSON)"""
+        return dict(self.items())
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __repr__(self):
+        campos = ', '.join(f'{nombre}={valor!r}' for nombre, valor in self.items())
+        return f'Row({campos})'
+
+    def __reduce__(self):
+        return (_rebuild_row, (self._columns, tuple(self)))
+
+
+# Nombres que no se convierten en propiedades para no ocultar métodos de Row
+# (count e index de tuple sí se pueden ocultar con una columna del mismo nombre)
+_RESERVADOS = frozenset(dir(Row)) - frozenset(dir(tuple))
+
+
+@lru_cache(maxsize=256)
+def row_class(columns):
+    """
+    Obtiene (o crea) la clase de fila para una lista de columnas
+
+    Args:
+        columns (tuple): Nombres de columna en el orden del cursor
+
+    Returns:
+        type: Subclase de Row con una propiedad por columna
+    """
+    # Si hay nombres repetidos gana la última columna, igual que dict(zip(...))
+    index = {nombre: pos for pos, nombre in enumerate(columns)}
+
+    namespace = {'__slots__': (), '_columns': columns, '_index': index}
+    for nombre, pos in index.items():
+        if nombre.isidentifier() and nombre not in _RESERVADOS:
+            namespace[nombre] = property(itemgetter(pos))
+
+    return type('Row', (Row,), namespace)
+
+
+def _rebuild_row(columns, values):
+    return row_class(columns)(values)
+
+
+def make_rows(columns, rows):
+    """
+    Convierte filas del cursor en filas compactas
+
+    Args:
+        columns (list): Nombres de columna (cursor.description)
+        rows (iterable): Filas retornadas por fetchall/fetchmany
+
+    Returns:
+        map: Iterador de filas Row
+    """
+    return map(row_class(tuple(columns)), rows)
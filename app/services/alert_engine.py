@@ -0,0 +1,427 @@
+# =============================================
+# MOTOR INCREMENTAL DE ALERTAS DE STOCK
+# app/services/alert_engine.py
+# =============================================
+
+import threading
+import time
+
+from flask import current_app
+
+from app.database import execute_query, execute_batch
+
+
+STOCK_CRITICO = 'STOCK_CRITICO'
+STOCK_MINIMO = 'STOCK_MINIMO'
+
+# Mismos textos que genera sp_RegistrarMovimiento
+MENSAJE_AGOTADO = 'Producto agotado'
+MENSAJE_CRITICO = 'Stock crítico, por debajo del 50% del mínimo'
+MENSAJE_MINIMO = 'Stock alcanzó el nivel mínimo'
+
+
+def clasificar(stock, minimo, activo=True):
+    """
+    Tipo de alerta que le corresponde a un producto (mismo criterio que el SP)
+
+    Returns:
+        str: STOCK_CRITICO, STOCK_MINIMO o None si no requiere alerta
+    """
+    if not activo or stock is None or minimo is None or stock > minimo:
+        return None
+    if stock <= 0 or stock <= minimo * 0.5:
+        return STOCK_CRITICO
+    return STOCK_MINIMO
+
+
+def mensaje_alerta(tipo, stock):
+    if tipo == STOCK_MINIMO:
+        return MENSAJE_MINIMO
+    return MENSAJE_AGOTADO if stock <= 0 else MENSAJE_CRITICO
+
+
+class AlertEngine:
+    """
+    Estado en memoria de cada producto (stock, mínimo, activo y alerta pendiente).
+
+    Cada escritura re-evalúa solo los productos que tocó: la decisión es
+    O(1) por producto y únicamente los cambios de estado (emitir, escalar
+    de STOCK_MINIMO a STOCK_CRITICO o resolver) quedan en cola para
+    escribirse juntos en AlertasStock. Un movimiento que no cambia el estado
+    de la alerta no escribe nada.
+
+    Una alerta crítica no baja a mínima mientras siga pendiente.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._productos = {}    # id -> (stock, minimo, activo, alerta pendiente)
+        self._cambios = {}      # id -> (alerta deseada o None, stock, minimo)
+        self._evaluados = 0
+        self._emitidas = 0
+        self._escaladas = 0
+        self._resueltas = 0
+
+    def __len__(self):
+        return len(self._productos)
+
+    def cargar(self, productos, pendientes):
+        """
+        Carga el estado completo y encola lo que no coincida con la BD
+
+        Args:
+            productos (iterable): Tuplas (id_producto, stock, minimo, activo)
+            pendientes (dict): id_producto -> tipo de la alerta pendiente
+        """
+        with self._lock:
+            self._productos = {}
+            self._cambios = {}
+            for id_producto, stock, minimo, activo in productos:
+                self._productos[id_producto] = (stock, minimo, activo, pendientes.get(id_producto))
+        for id_producto, estado in list(self._productos.items()):
+            self.actualizar(id_producto, estado[0], estado[1], estado[2])
+
+    def sincronizar_pendientes(self, pendientes):
+        """Reemplaza las alertas pendientes conocidas por las de la BD"""
+        with self._lock:
+            for id_producto, estado in self._productos.items():
+                tipo = pendientes.get(id_producto)
+                if tipo != estado[3] and id_producto not in self._cambios:
+                    self._productos[id_producto] = estado[:3] + (tipo,)
+
+    def actualizar(self, id_producto, stock, minimo, activo=True):
+        """
+        Registra los valores actuales de un producto y decide su alerta
+
+        Returns:
+            bool: True si la alerta del producto cambió
+        """
+        deseado = clasificar(stock, minimo, activo)
+
+        with self._lock:
+            self._evaluados += 1
+            anterior = self._productos.get(id_producto)
+            pendiente = anterior[3] if anterior else None
+
+            nuevo = pendiente
+            if deseado is None:
+                if pendiente is not None:
+                    nuevo = None
+                    self._resueltas += 1
+            elif pendiente is None:
+                nuevo = deseado
+                self._emitidas += 1
+            elif deseado == STOCK_CRITICO and pendiente == STOCK_MINIMO:
+                nuevo = deseado
+                self._escaladas += 1
+
+            self._productos[id_producto] = (stock, minimo, activo, nuevo)
+
+            if nuevo != pendiente or (id_producto in self._cambios and nuevo is not None):
+                self._cambios[id_producto] = (nuevo, stock, minimo)
+                return True
+            return False
+
+    def marcar_resuelta(self, id_producto):
+        """Un usuario resolvió la alerta: se vuelve a emitir si el stock sigue bajo"""
+        with self._lock:
+            estado = self._productos.get(id_producto)
+            if estado is not None:
+                self._productos[id_producto] = estado[:3] + (None,)
+
+    def tomar_cambios(self):
+        """
+        Retira los cambios pendientes de escribir
+
+        Returns:
+            dict: id_producto -> (alerta deseada o None, stock, minimo)
+        """
+        with self._lock:
+            cambios, self._cambios = self._cambios, {}
+            return cambios
+
+    def devolver_cambios(self, cambios):
+        """
+        Vuelve a encolar cambios que no se pudieron escribir. Si el producto
+        cambió después de tomarlos, se conserva el cambio más reciente.
+        """
+        with self._lock:
+            for id_producto, cambio in cambios.items():
+                self._cambios.setdefault(id_producto, cambio)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'productos': len(self._productos),
+                'alertas_pendientes': sum(1 for e in self._productos.values() if e[3]),
+                'cambios_en_cola': len(self._cambios),
+                'evaluados': self._evaluados,
+                'emitidas': self._emitidas,
+                'escaladas': self._escaladas,
+                'resueltas': self._resueltas
+            }
+
+
+# =============================================
+# ESCRITURA EN AlertasStock
+# =============================================
+
+# Las tres sentencias son condicionales: si otro proceso o el SP ya dejó la
+# alerta en el estado deseado no hacen nada. La comprobación de _SQL_EMITIR
+# bloquea el rango (id_producto, PENDIENTE) hasta el commit, como la de
+# sp_RegistrarMovimiento: dos escritores no pueden crear dos pendientes
+_SQL_RESOLVER = """
+    UPDATE AlertasStock
+    SET estado = 'RESUELTA', fecha_resolucion = GETDATE()
+    WHERE id_producto = ? AND estado = 'PENDIENTE'
+"""
+
+_SQL_ESCALAR = """
+    UPDATE AlertasStock
+    SET tipo_alerta = 'STOCK_CRITICO', stock_actual = ?, mensaje = ?
+    WHERE id_producto = ? AND estado = 'PENDIENTE' AND tipo_alerta = 'STOCK_MINIMO'
+"""
+
+_SQL_EMITIR = """
+    INSERT INTO AlertasStock (id_producto, tipo_alerta, stock_actual, stock_minimo, mensaje, estado)
+    SELECT ?, ?, ?, ?, ?, 'PENDIENTE'
+    WHERE NOT EXISTS (
+        SELECT 1 FROM AlertasStock WITH (UPDLOCK, HOLDLOCK)
+        WHERE id_producto = ? AND estado = 'PENDIENTE'
+    )
+"""
+
+
+def aplicar_cambios(cambios):
+    """
+    Escribe un lote de cambios de alertas en una sola transacción
+
+    Args:
+        cambios (dict): Resultado de AlertEngine.tomar_cambios()
+
+    Returns:
+        int: Cantidad de productos cuyo cambio se envió
+    """
+    resolver, escalar, emitir = [], [], []
+    for id_producto, (tipo, stock, minimo) in cambios.items():
+        if tipo is None:
+            resolver.append((id_producto,))
+            continue
+        mensaje = mensaje_alerta(tipo, stock)
+        if tipo == STOCK_CRITICO:
+            escalar.append((stock, mensaje, id_producto))
+        emitir.append((id_producto, tipo, stock, minimo, mensaje, id_producto))
+
+    execute_batch([
+        (_SQL_RESOLVER, resolver),
+        (_SQL_ESCALAR, escalar),
+        (_SQL_EMITIR, emitir)
+    ])
+    return len(cambios)
+
+
+# =============================================
+# MOTOR DE LA APLICACIÓN
+# =============================================
+
+_carga_lock = threading.Lock()
+
+_SQL_PRODUCTOS = "SELECT id_producto, stock_actual, stock_minimo, activo FROM Productos"
+
+
+def _pendientes():
+    """Alertas pendientes por producto (si hay varias, la crítica)"""
+    pendientes = {}
+    query = "SELECT id_producto, tipo_alerta FROM AlertasStock WHERE estado = 'PENDIENTE'"
+    for fila in execute_query(query):
+        if pendientes.get(fila['id_producto']) != STOCK_CRITICO:
+            pendientes[fila['id_producto']] = fila['tipo_alerta']
+    return pendientes
+
+
+def _escribir_cambios(engine):
+    """
+    Escribe los cambios en cola; si la escritura falla vuelven a la cola
+    y se reintentan con el siguiente lote o la siguiente sincronización
+    """
+    cambios = engine.tomar_cambios()
+    if not cambios:
+        return
+    try:
+        aplicar_cambios(cambios)
+    except Exception:
+        engine.devolver_cambios(cambios)
+        raise
+
+
+def _sincronizar(engine, desde):
+    """Aplica los productos modificados por otros procesos desde una fecha"""
+    ahora = execute_query("SELECT GETDATE() AS ahora")[0]['ahora']
+    engine.sincronizar_pendientes(_pendientes())
+    for fila in execute_query(_SQL_PRODUCTOS + " WHERE fecha_modificacion >= ?", (desde,)):
+        engine.actualizar(fila['id_producto'], fila['stock_actual'], fila['stock_minimo'], fila['activo'])
+    _escribir_cambios(engine)
+    return ahora
+
+
+def _evaluar(engine, ids=None, sku=None, desde=None):
+    """Lee de la BD los productos tocados por una escritura y los pasa al motor"""
+    if ids:
+        filas = execute_query(
+            _SQL_PRODUCTOS + " WHERE id_producto IN (SELECT CAST(value AS INT) FROM STRING_SPLIT(?, ','))",
+            (','.join(str(i) for i in set(ids)),)
+        )
+    elif sku:
+        filas = execute_query(_SQL_PRODUCTOS + " WHERE sku = ?", (sku,))
+    elif desde is not None:
+        filas = execute_query(_SQL_PRODUCTOS + " WHERE fecha_modificacion >= ?", (desde,))
+    else:
+        filas = []
+
+    for fila in filas:
+        engine.actualizar(fila['id_producto'], fila['stock_actual'], fila['stock_minimo'], fila['activo'])
+
+
+def _construir(app, estado):
+    """
+    Carga el motor en un hilo. Las escrituras que llegan mientras tanto
+    quedan en estado['en_espera'] y se evalúan antes de publicarlo.
+    """
+    intervalo = app.config.get('ALERT_ENGINE_SYNC_INTERVAL', 300)
+    with app.app_context():
+        try:
+            engine = AlertEngine()
+            ahora = execute_query("SELECT GETDATE() AS ahora")[0]['ahora']
+            engine.cargar(
+                ((f['id_producto'], f['stock_actual'], f['stock_minimo'], f['activo'])
+                 for f in execute_query(_SQL_PRODUCTOS)),
+                _pendientes()
+            )
+            while True:
+                with _carga_lock:
+                    en_espera, estado['en_espera'] = estado['en_espera'], []
+                    if not en_espera:
+                        estado['sincronizado'] = ahora
+                        estado['proxima_sync'] = time.monotonic() + intervalo
+                        estado['engine'] = engine
+                        break
+                for ids, sku, desde in en_espera:
+                    _evaluar(engine, ids, sku, desde)
+        except Exception as e:
+            # La próxima carga lee el estado completo, incluidas las escrituras en espera
+            print(f"Error al cargar motor de alertas: {e}")
+            with _carga_lock:
+                estado['en_espera'] = []
+                estado['reintento'] = time.monotonic() + intervalo
+            return
+
+        try:
+            _escribir_cambios(engine)
+        except Exception as e:
+            print(f"Error al procesar alertas de stock: {e}")
+
+
+def precargar_motor():
+    """
+    Empieza a cargar el motor de alertas en segundo plano (una vez por aplicación)
+
+    Se llama antes de cada petición, como iniciar_programados: los procesos
+    de trabajo también crean la aplicación pero no registran movimientos.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('ALERT_ENGINE_ENABLED', True):
+        return
+    estado = app.extensions.get('alert_engine')
+    if estado is not None and (estado['engine'] is not None or time.monotonic() < estado['reintento']):
+        return
+
+    with _carga_lock:
+        estado = app.extensions.get('alert_engine')
+        if estado is None:
+            estado = {'engine': None, 'en_espera': [], 'reintento': 0}
+            app.extensions['alert_engine'] = estado
+        if estado['engine'] is not None or time.monotonic() < estado['reintento']:
+            return
+        estado['reintento'] = float('inf')
+
+    threading.Thread(target=_construir, args=(app, estado), name='motor-alertas', daemon=True).start()
+
+
+def _encolar(ids, sku, desde):
+    """
+    Deja una escritura en espera mientras el motor se carga
+
+    Returns:
+        bool: False si el motor ya está listo (o no se está cargando)
+    """
+    estado = current_app.extensions.get('alert_engine')
+    if estado is None:
+        return False
+    with _carga_lock:
+        if estado['engine'] is not None or estado['reintento'] != float('inf'):
+            return False
+        estado['en_espera'].append((ids, sku, desde))
+        return True
+
+
+def get_alert_engine():
+    """
+    Obtiene el motor de alertas de la aplicación, o None si está desactivado
+    o aún se está cargando (precargar_motor). Cada ALERT_ENGINE_SYNC_INTERVAL
+    segundos se sincroniza con los cambios hechos por otros procesos.
+
+    Returns:
+        AlertEngine: o None
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('ALERT_ENGINE_ENABLED', True):
+        return None
+
+    estado = app.extensions.get('alert_engine')
+    if estado is None or estado['engine'] is None:
+        return None
+
+    if time.monotonic() >= estado['proxima_sync'] and _carga_lock.acquire(blocking=False):
+        try:
+            estado['proxima_sync'] = time.monotonic() + app.config.get('ALERT_ENGINE_SYNC_INTERVAL', 300)
+            estado['sincronizado'] = _sincronizar(estado['engine'], estado['sincronizado'])
+        except Exception as e:
+            print(f"Error al sincronizar motor de alertas: {e}")
+        finally:
+            _carga_lock.release()
+
+    return estado['engine']
+
+
+def procesar_productos(ids=None, sku=None, desde=None):
+    """
+    Re-evalúa las alertas de los productos tocados por una escritura ya confirmada
+    y escribe en un solo lote los cambios resultantes. Si el motor aún se está
+    cargando, la escritura queda en espera y se evalúa al terminar la carga.
+
+    Args:
+        ids (list): ids de los productos modificados
+        sku (str): SKU de un producto recién creado (si no se conoce su id)
+        desde (datetime): Todos los productos modificados desde esa fecha (importaciones)
+    """
+    try:
+        engine = get_alert_engine()
+        if engine is None:
+            if _encolar(ids, sku, desde):
+                return
+            engine = get_alert_engine()     # terminó de cargar mientras tanto
+            if engine is None:
+                return
+
+        _evaluar(engine, ids, sku, desde)
+        _escribir_cambios(engine)
+    except Exception as e:
+        # La escritura principal ya se confirmó; los cambios quedan en cola
+        print(f"Error al procesar alertas de stock: {e}")
+
+
+def alerta_resuelta(id_producto):
+    """Avisa al motor que un usuario resolvió manualmente la alerta de un producto"""
+    estado = current_app.extensions.get('alert_engine')
+    if estado is not None and estado['engine'] is not None:
+        estado['engine'].marcar_resuelta(id_producto)
@@ -0,0 +1,489 @@
+# =============================================
+# ALMACÉN ANALÍTICO DE MOVIMIENTOS (COLUMNAR POR MES)
+# app/services/analytics_store.py
+# =============================================
+
+import json
+import mmap
+import os
+import shutil
+import sys
+import threading
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+from flask import current_app
+
+from app.services.job_runner import tarea
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy las columnas se leen como memoryview (mismo resultado)
+    np = None
+
+
+# Formato en disco (carpeta del almacén):
+#   manifest.json              -> particiones vigentes, archivo de dimensiones y
+#                                 cuándo se reemplazó cada versión anterior
+#   AAAA-MM.<versión>/         -> un mes de Movimientos, un archivo por columna
+#       <columna>.bin          sin comprimir, ancho fijo little-endian: se abre
+#                              con mmap y se usa sin copiar ni decodificar
+#   dimensiones.<versión>.json -> Productos, Categorias y TiposMovimiento al
+#                              exportar, por columnas
+# La exportación escribe cada mes en una versión nueva y después cambia el
+# manifiesto: quien está leyendo sigue con la anterior hasta volver a abrir.
+VERSION = 1
+MANIFEST = 'manifest.json'
+CONSERVAR_VERSIONES = 3600    # segundos que se conservan las versiones reemplazadas
+
+# columna -> (typecode de array, dtype de NumPy), en el orden de _SQL_MES
+COLUMNAS = {
+    'id_movimiento': ('i', '<i4'),
+    'id_producto': ('i', '<i4'),
+    'id_tipo_movimiento': ('i', '<i4'),
+    'cantidad': ('i', '<i4'),
+    'id_usuario': ('i', '<i4'),
+    'fecha': ('q', '<i8'),        # segundos desde 1970
+}
+
+_SQL_MES = """
+    SELECT id_movimiento, id_producto, id_tipo_movimiento, cantidad, id_usuario,
+           DATEDIFF_BIG(SECOND, '19700101', fecha_movimiento) AS fecha
+    FROM Movimientos
+    WHERE fecha_movimiento >= ? AND fecha_movimiento < ? AND id_movimiento > ?
+    ORDER BY id_movimiento
+"""
+
+_EPOCA = datetime(1970, 1, 1)
+
+
+def a_segundos(valor):
+    """date/datetime -> segundos desde 1970 (como la columna fecha)"""
+    if not isinstance(valor, datetime):
+        valor = datetime(valor.year, valor.month, valor.day)
+    return (valor - _EPOCA) // timedelta(seconds=1)
+
+
+def de_segundos(segundos):
+    return _EPOCA + timedelta(seconds=int(segundos))
+
+
+def _clave_mes(fecha):
+    return f'{fecha.year:04d}-{fecha.month:02d}'
+
+
+def _inicio_mes(clave):
+    anio, mes = clave.split('-')
+    return date(int(anio), int(mes), 1)
+
+
+def _mes_siguiente(inicio):
+    return date(inicio.year + inicio.month // 12, inicio.month % 12 + 1, 1)
+
+
+def _abrir_columna(ruta, typecode, dtype):
+    """Columna mapeada en memoria: arreglo NumPy o memoryview, sin copiar"""
+    with open(ruta, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return np.zeros(0, dtype=dtype) if np is not None else array(typecode)
+        datos = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if np is not None:
+        return np.frombuffer(datos, dtype=dtype)
+    if sys.byteorder == 'little':
+        return memoryview(datos).cast(typecode)
+    valores = array(typecode)
+    valores.frombytes(datos)
+    valores.byteswap()
+    return valores
+
+
+# =============================================
+# LECTURA
+# =============================================
+
+class Particion:
+    """Un mes de Movimientos; cada columna se mapea la primera vez que se pide"""
+
+    def __init__(self, carpeta, mes, filas):
+        self.carpeta = carpeta
+        self.mes = mes
+        self.filas = filas
+        inicio = _inicio_mes(mes)
+        self.desde = a_segundos(inicio)
+        self.hasta = a_segundos(_mes_siguiente(inicio))
+        self._columnas = {}
+
+    def columna(self, nombre):
+        valores = self._columnas.get(nombre)
+        if valores is None:
+            typecode, dtype = COLUMNAS[nombre]
+            valores = _abrir_columna(os.path.join(self.carpeta, f'{nombre}.bin'), typecode, dtype)
+            self._columnas[nombre] = valores
+        return valores
+
+
+class AlmacenAnalitico:
+    """
+    Carpeta de particiones mensuales. El manifiesto se vuelve a leer cuando
+    lo cambia una exportación (en este u otro proceso); las particiones que
+    no cambiaron conservan sus columnas ya mapeadas.
+    """
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self._lock = threading.Lock()
+        self._manifest = {'version': VERSION, 'particiones': {}, 'dimensiones': None, 'actualizado': None}
+        self._mtime = None
+        self._particiones = {}
+        self._dimensiones = None
+
+    @property
+    def ruta_manifest(self):
+        return os.path.join(self.carpeta, MANIFEST)
+
+    def _leer(self):
+        try:
+            mtime = os.stat(self.ruta_manifest).st_mtime_ns
+        except OSError:
+            return self._manifest
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.ruta_manifest, encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+                self._mtime = mtime
+                vigentes = {info['carpeta'] for info in self._manifest['particiones'].values()}
+                self._particiones = {c: p for c, p in self._particiones.items() if c in vigentes}
+                if self._dimensiones is not None and self._dimensiones[0] != self._manifest['dimensiones']:
+                    self._dimensiones = None
+            return self._manifest
+
+    def info(self, mes):
+        info = self._leer()['particiones'].get(mes)
+        return dict(info) if info else None
+
+    def actualizado(self):
+        """
+        Returns:
+            datetime: Fecha de la última exportación, o None si no hay datos
+        """
+        actualizado = self._leer().get('actualizado')
+        return datetime.fromisoformat(actualizado) if actualizado else None
+
+    def particiones(self, desde=None, hasta=None):
+        """
+        Particiones que se cruzan con [desde, hasta) (date o datetime)
+
+        Returns:
+            list: Particion en orden de mes
+        """
+        manifest = self._leer()
+        minimo = a_segundos(desde) if desde is not None else None
+        maximo = a_segundos(hasta) if hasta is not None else None
+
+        resultado = []
+        with self._lock:
+            for mes, info in sorted(manifest['particiones'].items()):
+                particion = self._particiones.get(info['carpeta'])
+                if particion is None:
+                    particion = Particion(os.path.join(self.carpeta, info['carpeta']), mes, info['filas'])
+                    self._particiones[info['carpeta']] = particion
+                if minimo is not None and particion.hasta <= minimo:
+                    continue
+                if maximo is not None and particion.desde >= maximo:
+                    continue
+                resultado.append(particion)
+        return resultado
+
+    def dimensiones(self):
+        """
+        Returns:
+            dict: productos, categorias y tipos (dict de columna -> lista), o None
+        """
+        nombre = self._leer()['dimensiones']
+        if not nombre:
+            return None
+        actual = self._dimensiones
+        if actual is None or actual[0] != nombre:
+            with open(os.path.join(self.carpeta, nombre), encoding='utf-8') as f:
+                actual = (nombre, json.load(f))
+            self._dimensiones = actual
+        return actual[1]
+
+    # Escritura (solo el proceso que exporta)
+
+    def escribir_particion(self, mes, columnas, esperadas, cerrada):
+        """
+        Escribe una versión nueva del mes (no cambia el manifiesto)
+
+        Args:
+            columnas (dict): columna -> array con las filas del mes
+            esperadas (int): Movimientos del mes según MovimientosDiarios
+            cerrada (bool): El mes ya terminó (no se vuelve a leer si coincide)
+
+        Returns:
+            dict: Entrada del manifiesto para publicar()
+        """
+        carpeta = f'{mes}.{time.time_ns()}'
+        ruta = os.path.join(self.carpeta, carpeta)
+        os.makedirs(ruta)
+
+        for nombre, valores in columnas.items():
+            if sys.byteorder == 'big':
+                valores = array(valores.typecode, valores)
+                valores.byteswap()
+            with open(os.path.join(ruta, f'{nombre}.bin'), 'wb') as f:
+                valores.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        ids = columnas['id_movimiento']
+        return {
+            'carpeta': carpeta,
+            'filas': len(ids),
+            'id_maximo': max(ids) if ids else 0,
+            'esperadas': esperadas,
+            'cerrada': cerrada,
+            'exportado': datetime.now().isoformat(timespec='seconds')
+        }
+
+    def publicar(self, particiones, dimensiones=None):
+        """
+        Reemplaza en el manifiesto las particiones dadas (y las dimensiones)
+        de forma atómica y borra las versiones que ya no se usan. El
+        manifiesto guarda cuándo se reemplazó cada versión anterior.
+        """
+        manifest = json.loads(json.dumps(self._leer()))
+        ahora = time.time()
+        reemplazados = manifest.setdefault('reemplazados', {})
+
+        for mes, info in particiones.items():
+            anterior = manifest['particiones'].get(mes)
+            if anterior is not None and anterior['carpeta'] != info['carpeta']:
+                reemplazados[anterior['carpeta']] = ahora
+        manifest['particiones'].update(particiones)
+        if dimensiones is not None:
+            nombre = f'dimensiones.{time.time_ns()}.json'
+            with open(os.path.join(self.carpeta, nombre), 'w', encoding='utf-8') as f:
+                json.dump(dimensiones, f, ensure_ascii=False, separators=(',', ':'))
+            if manifest['dimensiones']:
+                reemplazados[manifest['dimensiones']] = ahora
+            manifest['dimensiones'] = nombre
+            manifest['actualizado'] = datetime.now().isoformat(timespec='seconds')
+
+        # Versiones sin fecha de reemplazo (exportación interrumpida, manifiestos
+        # anteriores): se cuentan desde ahora. Las que ya no existen se olvidan
+        vigentes = {info['carpeta'] for info in manifest['particiones'].values()}
+        vigentes.update((MANIFEST, manifest['dimensiones']))
+        existentes = set(os.listdir(self.carpeta))
+        for nombre in existentes - vigentes:
+            if not nombre.endswith('.tmp'):
+                reemplazados.setdefault(nombre, ahora)
+        for nombre in list(reemplazados):
+            if nombre not in existentes or nombre in vigentes:
+                del reemplazados[nombre]
+
+        temporal = self.ruta_manifest + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.ruta_manifest)
+        self._limpiar(manifest)
+
+    def _limpiar(self, manifest):
+        """
+        Borra las versiones reemplazadas hace más de CONSERVAR_VERSIONES
+        (otro proceso puede estar leyéndolas; en Windows un archivo mapeado
+        no se puede borrar y se reintenta en la siguiente exportación)
+        """
+        limite = time.time() - CONSERVAR_VERSIONES
+        for nombre, reemplazado in manifest.get('reemplazados', {}).items():
+            if reemplazado > limite:
+                continue
+            ruta = os.path.join(self.carpeta, nombre)
+            try:
+                if os.path.isdir(ruta):
+                    shutil.rmtree(ruta)
+                else:
+                    os.remove(ruta)
+            except OSError:
+                pass
+
+
+# =============================================
+# EXPORTACIÓN DESDE LA BD Y EL ARCHIVO HISTÓRICO
+# =============================================
+
+def _columnas_vacias():
+    return {nombre: array(typecode) for nombre, (typecode, _) in COLUMNAS.items()}
+
+
+def _conteos_por_mes():
+    """Movimientos por mes según el resumen diario (incluye los meses archivados)"""
+    from app.database import execute_query
+
+    return {
+        f'{fila.anio:04d}-{fila.mes:02d}': fila.filas
+        for fila in execute_query("""
+            SELECT YEAR(fecha) AS anio, MONTH(fecha) AS mes, SUM(total_movimientos) AS filas
+            FROM MovimientosDiarios
+            GROUP BY YEAR(fecha), MONTH(fecha)
+        """)
+    }
+
+
+def _leer_dimensiones():
+    """Productos, categorías y tipos de movimiento por columnas"""
+    from app.database import execute_query
+
+    def por_columnas(filas, columnas, convertir=None):
+        datos = {c: [] for c in columnas}
+        for fila in filas:
+            for c in columnas:
+                valor = fila[c]
+                datos[c].append(convertir(c, valor) if convertir else valor)
+        return datos
+
+    def producto(columna, valor):
+        if columna in ('precio_compra', 'precio_venta'):
+            return float(valor or 0)
+        if columna in ('stock_actual', 'activo', 'id_categoria'):
+            return int(valor) if valor is not None else None
+        return valor
+
+    return {
+        'productos': por_columnas(execute_query("""
+            SELECT id_producto, sku, nombre_producto, id_categoria, precio_compra, precio_venta,
+                   stock_actual, activo
+            FROM Productos
+            ORDER BY id_producto
+        """), ('id_producto', 'sku', 'nombre_producto', 'id_categoria', 'precio_compra',
+               'precio_venta', 'stock_actual', 'activo'), producto),
+        'categorias': por_columnas(execute_query(
+            "SELECT id_categoria, nombre_categoria FROM Categorias ORDER BY id_categoria"
+        ), ('id_categoria', 'nombre_categoria')),
+        'tipos': por_columnas(execute_query(
+            "SELECT id_tipo_movimiento, nombre_tipo, afecta_stock FROM TiposMovimiento ORDER BY id_tipo_movimiento"
+        ), ('id_tipo_movimiento', 'nombre_tipo', 'afecta_stock'))
+    }
+
+
+def _leer_mes_bd(columnas, desde, hasta, id_desde=0):
+    """Agrega a las columnas los movimientos del mes con id mayor a id_desde"""
+    from app.database import stream_query
+
+    destinos = list(columnas.values())
+    for fila in stream_query(_SQL_MES, (desde, hasta, id_desde)):
+        for valores, valor in zip(destinos, fila):
+            valores.append(valor)
+
+
+def _leer_mes_archivo(columnas, archivo, mes):
+    """Columnas del mes desde el archivo histórico (sin pasar por la BD)"""
+    with archivo.abrir('Movimientos', mes) as archivado:
+        for nombre in ('id_movimiento', 'id_producto', 'id_tipo_movimiento', 'cantidad', 'id_usuario'):
+            columnas[nombre].extend(iter(archivado.enteros(nombre)))
+        columnas['fecha'].extend(micro // 1000000 for micro in archivado.enteros('fecha_movimiento'))
+
+
+def _copiar_particion(columnas, particion):
+    for nombre, valores in columnas.items():
+        valores.extend(iter(particion.columna(nombre)) if np is None else particion.columna(nombre).tolist())
+
+
+def exportar_movimientos(almacen, archivo=None, hoy=None, avance=None):
+    """
+    Lleva al almacén los meses nuevos o con cambios
+
+    - Meses cerrados que coinciden con MovimientosDiarios: no se leen.
+    - Mes en curso (o un mes al que le faltan filas): solo los movimientos
+      con id mayor al último exportado, por el índice clustered.
+    - Meses ya archivados (data_archive): desde los archivos, no la BD.
+    - Un mes cerrado que sigue sin coincidir se exporta completo.
+
+    Args:
+        archivo (ArchivoHistorico): Meses que ya no están en Movimientos
+        avance (callable): Recibe (mes, filas del mes)
+
+    Returns:
+        dict: {'meses': exportados, 'filas': filas leídas}
+    """
+    hoy = hoy or date.today()
+    mes_actual = _clave_mes(hoy)
+    archivado_hasta = archivo.archivado_hasta('Movimientos') if archivo is not None else None
+    os.makedirs(almacen.carpeta, exist_ok=True)
+
+    resultado = {'meses': 0, 'filas': 0}
+    for mes, esperadas in sorted(_conteos_por_mes().items()):
+        previo = almacen.info(mes)
+        cerrada = mes < mes_actual
+        if previo and previo['esperadas'] == esperadas and (previo['cerrada'] or previo['filas'] == esperadas):
+            if cerrada and not previo['cerrada']:
+                almacen.publicar({mes: dict(previo, cerrada=True)})
+            continue
+
+        desde = _inicio_mes(mes)
+        hasta = _mes_siguiente(desde)
+        columnas = _columnas_vacias()
+
+        if archivado_hasta is not None and hasta <= archivado_hasta:
+            _leer_mes_archivo(columnas, archivo, mes)
+        elif previo and previo['filas'] < esperadas:
+            _copiar_particion(columnas, almacen.particiones(desde, hasta)[0])
+            _leer_mes_bd(columnas, desde, hasta, previo['id_maximo'])
+            if cerrada and len(columnas['id_movimiento']) != esperadas:
+                columnas = _columnas_vacias()
+                _leer_mes_bd(columnas, desde, hasta)
+        else:
+            _leer_mes_bd(columnas, desde, hasta)
+
+        filas = len(columnas['id_movimiento'])
+        if cerrada and filas != esperadas:
+            print(f"Almacén analítico: {mes} tiene {filas:,} movimientos y el resumen diario {esperadas:,}")
+
+        almacen.publicar({mes: almacen.escribir_particion(mes, columnas, esperadas, cerrada)})
+        resultado['meses'] += 1
+        resultado['filas'] += filas
+        if avance is not None:
+            avance(mes, filas)
+
+    almacen.publicar({}, _leer_dimensiones())
+    return resultado
+
+
+@tarea('exportar_analitica')
+def tarea_exportar_analitica(trabajo):
+    """Exportación programada (JOBS_SCHEDULE) en un proceso de trabajo"""
+    from app.services.data_archive import get_archivo_historico
+
+    if not current_app.config.get('ANALYTICS_ENABLED', True):
+        return {'meses': 0, 'filas': 0}
+
+    def avance(mes, filas):
+        trabajo.progreso(0, None, f'{mes}: {filas:,} movimientos exportados')
+
+    return exportar_movimientos(get_almacen_analitico(), get_archivo_historico(), avance=avance)
+
+
+_crear_lock = threading.Lock()
+
+
+def get_almacen_analitico():
+    """
+    Obtiene el almacén analítico de la aplicación
+
+    Returns:
+        AlmacenAnalitico
+    """
+    app = current_app._get_current_object()
+
+    almacen = app.extensions.get('almacen_analitico')
+    if almacen is None:
+        with _crear_lock:
+            almacen = app.extensions.get('almacen_analitico')
+            if almacen is None:
+                almacen = AlmacenAnalitico(app.config.get('ANALYTICS_PATH', os.path.join('cache', 'analitica')))
+                app.extensions['almacen_analitico'] = almacen
+    return almacen
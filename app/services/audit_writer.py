@@ -0,0 +1,317 @@
+# =============================================
+# AUDITORÍA ASÍNCRONA POR LOTES
+# app/services/audit_writer.py
+# =============================================
+
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from multiprocessing.util import Finalize
+
+from flask import current_app, has_request_context, request, session
+
+
+# Tablas auditadas: tabla -> (llave primaria, columnas que se comparan)
+TABLAS_AUDITADAS = {
+    'Productos': ('id_producto', (
+        'sku', 'codigo_barras', 'nombre_producto', 'descripcion', 'id_categoria', 'id_proveedor',
+        'precio_compra', 'precio_venta', 'stock_actual', 'stock_minimo', 'stock_maximo',
+        'ubicacion', 'activo'
+    )),
+}
+
+_SQL_INSERTAR = """
+    INSERT INTO Auditoria (
+        tabla_afectada, operacion, id_registro, id_usuario,
+        datos_anteriores, datos_nuevos, fecha_operacion, ip_address, detalles
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _json(datos):
+    return json.dumps(datos, default=str, ensure_ascii=False) if datos else None
+
+
+def contexto_actual():
+    """
+    Returns:
+        tuple: (id_usuario, ip) de la petición en curso, o (None, None)
+    """
+    if not has_request_context():
+        return None, None
+    return session.get('user_id'), request.remote_addr
+
+
+def evento(tabla, operacion, id_registro=None, anteriores=None, nuevos=None, detalles=None,
+           id_usuario=None, ip_address=None):
+    """
+    Arma la fila de Auditoria. La fecha es la del cambio, no la de la escritura.
+    Sin usuario ni IP se toman de la petición en curso.
+    """
+    if id_usuario is None and ip_address is None:
+        id_usuario, ip_address = contexto_actual()
+    return (tabla, operacion, id_registro, id_usuario, _json(anteriores), _json(nuevos),
+            datetime.now(), ip_address, detalles)
+
+
+def eventos_cambio(tabla, antes, despues):
+    """
+    Compara las filas leídas antes y después de una escritura
+
+    Args:
+        antes, despues (dict): id_registro -> {columna: valor}
+
+    Returns:
+        list: Eventos INSERT, UPDATE (solo columnas que cambiaron) y DELETE
+    """
+    eventos = []
+    for id_registro in sorted(antes.keys() | despues.keys()):
+        anterior, nuevo = antes.get(id_registro), despues.get(id_registro)
+        if anterior is None:
+            eventos.append(evento(tabla, 'INSERT', id_registro, nuevos=nuevo))
+        elif nuevo is None:
+            eventos.append(evento(tabla, 'DELETE', id_registro, anteriores=anterior))
+        else:
+            cambios = [c for c in nuevo if nuevo[c] != anterior.get(c)]
+            if cambios:
+                eventos.append(evento(
+                    tabla, 'UPDATE', id_registro,
+                    anteriores={c: anterior.get(c) for c in cambios},
+                    nuevos={c: nuevo[c] for c in cambios}
+                ))
+    return eventos
+
+
+class AuditWriter:
+    """
+    Escribe los eventos de auditoría en segundo plano y por lotes.
+
+    - Cola acotada: si se llena (BD lenta o caída) el hilo que registra
+      escribe él mismo en lugar de acumular memoria sin límite.
+    - Un hilo vacía la cola cada 'intervalo' segundos o al juntar 'lote'
+      eventos, con un solo executemany (fast_executemany).
+    - Al cerrar la aplicación se escribe lo pendiente; si la BD no responde
+      los eventos se guardan en 'ruta_pendientes' y se cargan al reiniciar.
+    """
+
+    def __init__(self, escribir, max_cola=10000, lote=500, intervalo=1.0, ruta_pendientes=None):
+        """
+        Args:
+            escribir (callable): Recibe una lista de eventos y los inserta en Auditoria
+            max_cola (int): Eventos en memoria antes de escribir en el hilo que registra
+            lote (int): Eventos por escritura
+            intervalo (float): Segundos máximos que un evento espera en la cola
+            ruta_pendientes (str): Archivo donde quedan los eventos no escritos al cerrar
+        """
+        self.escribir = escribir
+        self.lote = lote
+        self.intervalo = intervalo
+        self.ruta_pendientes = ruta_pendientes
+
+        self._cola = queue.Queue(max_cola)
+        self._fallidos = []               # lote que no se pudo escribir, va primero
+        self._escritura = threading.Lock()
+        self._archivo = threading.Lock()
+        self._lock = threading.Lock()
+        self._cerrado = threading.Event()
+        self._hilo = None
+        self._registrados = 0
+        self._escritos = 0
+        self._lotes = 0
+        self._errores = 0
+        self._directos = 0
+
+        self._cargar_pendientes()
+
+    def _contar(self, campo, n=1):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + n)
+
+    def _iniciar(self):
+        with self._lock:
+            if self._hilo is None and not self._cerrado.is_set():
+                self._hilo = threading.Thread(target=self._ciclo, name='auditoria', daemon=True)
+                self._hilo.start()
+
+    def registrar(self, eventos):
+        """Encola eventos (tuplas de evento()) sin esperar a la BD"""
+        if self._hilo is None:
+            self._iniciar()
+        for e in eventos:
+            try:
+                self._cola.put_nowait(e)
+            except queue.Full:
+                # Contrapresión: quien produce paga la escritura
+                self._contar('_directos')
+                self.vaciar()
+                try:
+                    self._cola.put_nowait(e)
+                except queue.Full:
+                    self._guardar_pendientes([e])
+            self._contar('_registrados')
+
+    def _tomar(self, espera):
+        """Hasta 'lote' eventos de la cola (espera el primero como máximo 'espera' s)"""
+        eventos = []
+        try:
+            eventos.append(self._cola.get(timeout=espera) if espera else self._cola.get_nowait())
+            while len(eventos) < self.lote:
+                eventos.append(self._cola.get_nowait())
+        except queue.Empty:
+            pass
+        return eventos
+
+    def _escribir(self, eventos):
+        """Escribe primero lo que falló antes; si falla, queda para el siguiente intento"""
+        with self._escritura:
+            pendientes = self._fallidos + eventos
+            self._fallidos = []
+            if not pendientes:
+                return True
+            try:
+                self.escribir(pendientes)
+            except Exception as e:
+                print(f"Error al escribir auditoría ({len(pendientes)} eventos): {e}")
+                self._contar('_errores')
+                # No se guardan sin límite en memoria: el exceso va al archivo
+                exceso = len(pendientes) - self._cola.maxsize
+                if exceso > 0:
+                    self._guardar_pendientes(pendientes[:exceso])
+                    pendientes = pendientes[exceso:]
+                self._fallidos = pendientes
+                return False
+            self._contar('_escritos', len(pendientes))
+            self._contar('_lotes')
+            return True
+
+    def _ciclo(self):
+        while not self._cerrado.is_set():
+            eventos = self._tomar(self.intervalo)
+            if (eventos or self._fallidos) and not self._escribir(eventos):
+                self._cerrado.wait(min(self.intervalo * 5, 10))
+
+    def vaciar(self):
+        """Escribe todo lo encolado en el hilo actual"""
+        while True:
+            eventos = self._tomar(0)
+            if not eventos and not self._fallidos:
+                return True
+            if not self._escribir(eventos):
+                return False
+
+    def cerrar(self, espera=5):
+        """Detiene el hilo y escribe lo pendiente (al cerrar la aplicación)"""
+        self._cerrado.set()
+        if self._hilo is not None:
+            self._hilo.join(espera)
+        if not self.vaciar():
+            with self._escritura:
+                restantes, self._fallidos = self._fallidos, []
+            while True:
+                eventos = self._tomar(0)
+                if not eventos:
+                    break
+                restantes += eventos
+            self._guardar_pendientes(restantes)
+
+    def _guardar_pendientes(self, eventos):
+        if not eventos:
+            return
+        if not self.ruta_pendientes:
+            print(f"Auditoría: se descartan {len(eventos)} eventos sin escribir")
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.ruta_pendientes)), exist_ok=True)
+        with self._archivo, open(self.ruta_pendientes, 'a', encoding='utf-8') as f:
+            for e in eventos:
+                f.write(json.dumps(e, default=str, ensure_ascii=False) + '\n')
+        print(f"Auditoría: {len(eventos)} eventos guardados en {self.ruta_pendientes}")
+
+    def _cargar_pendientes(self):
+        """Encola los eventos que quedaron en el archivo en la ejecución anterior"""
+        if not self.ruta_pendientes or not os.path.exists(self.ruta_pendientes):
+            return
+        eventos = []
+        with open(self.ruta_pendientes, encoding='utf-8') as f:
+            for linea in f:
+                if linea.strip():
+                    e = json.loads(linea)
+                    e[6] = datetime.fromisoformat(e[6])
+                    eventos.append(tuple(e))
+        os.remove(self.ruta_pendientes)
+        self._fallidos = eventos
+        if eventos:
+            self._iniciar()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'en_cola': self._cola.qsize(),
+                'reintentando': len(self._fallidos),
+                'registrados': self._registrados,
+                'escritos': self._escritos,
+                'lotes': self._lotes,
+                'errores': self._errores,
+                'escrituras_directas': self._directos
+            }
+
+
+def _escritor_pool(pool):
+    """Inserta un lote de eventos con una conexión propia del pool"""
+    def escribir(eventos):
+        conn = pool.acquire()
+        cursor = conn.cursor()
+        try:
+            cursor.fast_executemany = True
+            cursor.executemany(_SQL_INSERTAR, eventos)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            pool.release(conn)
+    return escribir
+
+
+_crear_lock = threading.Lock()
+
+
+def get_audit_writer():
+    """
+    Obtiene el escritor de auditoría de la aplicación
+
+    Returns:
+        AuditWriter: o None si la auditoría está desactivada
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('AUDIT_ENABLED', True):
+        return None
+
+    writer = app.extensions.get('audit_writer')
+    if writer is None:
+        with _crear_lock:
+            writer = app.extensions.get('audit_writer')
+            if writer is None:
+                from app.database import get_pool
+                writer = AuditWriter(
+                    _escritor_pool(get_pool(app)),
+                    max_cola=app.config.get('AUDIT_QUEUE_MAX', 10000),
+                    lote=app.config.get('AUDIT_BATCH_SIZE', 500),
+                    intervalo=app.config.get('AUDIT_FLUSH_INTERVAL', 1.0),
+                    ruta_pendientes=app.config.get('AUDIT_PENDING_PATH')
+                )
+                # Finalize (y no atexit) para que también corra al terminar
+                # los procesos de trabajo de multiprocessing
+                Finalize(writer, writer.cerrar, exitpriority=10)
+                app.extensions['audit_writer'] = writer
+    return writer
+
+
+def registrar_auditoria(eventos):
+    """Encola eventos de auditoría (no hace nada si está desactivada)"""
+    writer = get_audit_writer()
+    if writer is not None and eventos:
+        writer.registrar(eventos)
@@ -0,0 +1,216 @@
+# =============================================
+# CACHÉ PERSISTENTE DE CÓDIGOS DE BARRAS
+# app/services/barcode_cache.py
+# =============================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+
+class BarcodeCache:
+    """
+    Caché local en SQLite de las respuestas de la API de códigos de barras.
+
+    - TTL distinto para productos encontrados y para "no encontrado".
+    - Eviction LRU cuando se supera el máximo de entradas.
+    - Contadores de aciertos/fallos.
+
+    Cada hilo usa su propia conexión SQLite y la fecha de último acceso solo
+    se escribe cuando tiene más de 'touch_interval' segundos, de modo que un
+    acierto normal es una sola lectura por llave primaria.
+    """
+
+    def __init__(self, path, ttl_encontrado=7 * 86400, ttl_no_encontrado=86400,
+                 max_entries=50000, touch_interval=60):
+        """
+        Args:
+            path (str): Archivo SQLite
+            ttl_encontrado (int): Segundos de validez de un producto encontrado
+            ttl_no_encontrado (int): Segundos de validez de un "no encontrado"
+            max_entries (int): Máximo de códigos guardados
+            touch_interval (int): Segundos mínimos entre actualizaciones del último acceso
+        """
+        self.path = path
+        self.ttl_encontrado = ttl_encontrado
+        self.ttl_no_encontrado = ttl_no_encontrado
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._expired = 0
+        self._evicted = 0
+        self._writes = 0
+
+        directorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directorio, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS barcode_cache (
+                codigo_barras TEXT PRIMARY KEY,
+                encontrado INTEGER NOT NULL,
+                resultado TEXT NOT NULL,
+                expira REAL NOT NULL,
+                ultimo_acceso REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_barcode_cache_acceso ON barcode_cache(ultimo_acceso)")
+        conn.commit()
+
+    def _conn(self):
+        """Conexión SQLite del hilo actual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _contar(self, campo, n=1):
+        with self._lock:
+            setattr(self, campo, getattr(self, campo) + n)
+
+    def get(self, codigo_barras):
+        """
+        Busca un código en la caché
+
+        Returns:
+            dict: Resultado guardado, o None si no existe o expiró
+        """
+        conn = self._conn()
+        fila = conn.execute(
+            "SELECT resultado, expira, ultimo_acceso FROM barcode_cache WHERE codigo_barras = ?",
+            (codigo_barras,)
+        ).fetchone()
+
+        if fila is None:
+            self._contar('_misses')
+            return None
+
+        ahora = time.time()
+        resultado, expira, ultimo_acceso = fila
+
+        if expira <= ahora:
+            conn.execute("DELETE FROM barcode_cache WHERE codigo_barras = ?", (codigo_barras,))
+            conn.commit()
+            self._contar('_misses')
+            self._contar('_expired')
+            return None
+
+        if ahora - ultimo_acceso > self.touch_interval:
+            conn.execute(
+                "UPDATE barcode_cache SET ultimo_acceso = ? WHERE codigo_barras = ?",
+                (ahora, codigo_barras)
+            )
+            conn.commit()
+
+        self._contar('_hits')
+        return json.loads(resultado)
+
+    def set(self, codigo_barras, resultado):
+        """
+        Guarda el resultado de una consulta a la API
+
+        Args:
+            codigo_barras (str): Código consultado
+            resultado (dict): Respuesta de BarcodeService (encontrado o no)
+        """
+        encontrado = bool(resultado.get('encontrado'))
+        ttl = self.ttl_encontrado if encontrado else self.ttl_no_encontrado
+        if ttl <= 0:
+            return
+
+        ahora = time.time()
+        conn = self._conn()
+        conn.execute(
+            """
+            INSERT OR REPLACE INTO barcode_cache
+                (codigo_barras, encontrado, resultado, expira, ultimo_acceso)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (codigo_barras, int(encontrado), json.dumps(resultado), ahora + ttl, ahora)
+        )
+        conn.commit()
+        self._contar('_writes')
+
+        # Revisar el tamaño cada cierto número de escrituras
+        if self._writes % 100 == 0:
+            self.evict()
+
+    def evict(self):
+        """Elimina expirados y, si se supera el máximo, los menos usados recientemente"""
+        conn = self._conn()
+        borrados = conn.execute("DELETE FROM barcode_cache WHERE expira <= ?", (time.time(),)).rowcount
+
+        total = conn.execute("SELECT COUNT(*) FROM barcode_cache").fetchone()[0]
+        exceso = total - self.max_entries
+        if exceso > 0:
+            borrados += conn.execute(
+                """
+                DELETE FROM barcode_cache WHERE codigo_barras IN (
+                    SELECT codigo_barras FROM barcode_cache
+                    ORDER BY ultimo_acceso LIMIT ?
+                )
+                """,
+                (exceso,)
+            ).rowcount
+        conn.commit()
+        self._contar('_evicted', max(borrados, 0))
+
+    def clear(self):
+        conn = self._conn()
+        conn.execute("DELETE FROM barcode_cache")
+        conn.commit()
+
+    def stats(self):
+        """
+        Estadísticas de la caché
+
+        Returns:
+            dict: Aciertos, fallos, entradas y tasa de aciertos
+        """
+        entradas = self._conn().execute("SELECT COUNT(*) FROM barcode_cache").fetchone()[0]
+        with self._lock:
+            consultas = self._hits + self._misses
+            return {
+                'entradas': entradas,
+                'max_entradas': self.max_entries,
+                'aciertos': self._hits,
+                'fallos': self._misses,
+                'expirados': self._expired,
+                'eliminados': self._evicted,
+                'escrituras': self._writes,
+                'tasa_aciertos': round(self._hits / consultas, 4) if consultas else 0.0
+            }
+
+
+def get_barcode_cache():
+    """
+    Obtiene la caché de códigos de barras de la aplicación
+
+    Returns:
+        BarcodeCache: o None si está desactivada
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('BARCODE_CACHE_ENABLED', True):
+        return None
+
+    cache = app.extensions.get('barcode_cache')
+    if cache is None:
+        cache = BarcodeCache(
+            app.config.get('BARCODE_CACHE_PATH', 'cache/barcodes.sqlite3'),
+            ttl_encontrado=app.config.get('BARCODE_CACHE_TTL', 7 * 86400),
+            ttl_no_encontrado=app.config.get('BARCODE_CACHE_NEGATIVE_TTL', 86400),
+            max_entries=app.config.get('BARCODE_CACHE_MAX_ENTRIES', 50000)
+        )
+        app.extensions['barcode_cache'] = cache
+    return cache
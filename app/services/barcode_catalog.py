@@ -0,0 +1,331 @@
+# =============================================
+# CATÁLOGO OFFLINE DE CÓDIGOS DE BARRAS
+# app/services/barcode_catalog.py
+# =============================================
+
+import csv
+import gzip
+import io
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import threading
+import time
+from array import array
+
+from flask import current_app
+
+
+# Formato en disco (directorio del catálogo):
+#   actual        -> nombre de la versión vigente (se cambia con un solo os.replace)
+#   v<versión>/   -> una importación completa:
+#     indice.bin    encabezado + registros fijos ordenados por GTIN
+#                   (gtin uint64, offset uint64, longitud uint32)
+#     registros.bin JSON compacto de cada producto, uno tras otro
+# Los dos archivos de una versión nunca cambian: quien lee abre siempre
+# un índice y unos registros de la misma importación.
+MAGIC = b'SGIC'
+VERSION = 1
+ENCABEZADO = struct.Struct('<4sIQ')      # magic, versión, cantidad
+ENTRADA = struct.Struct('<QQI')          # gtin, offset, longitud
+
+ARCHIVO_ACTUAL = 'actual'
+ARCHIVO_INDICE = 'indice.bin'
+ARCHIVO_REGISTROS = 'registros.bin'
+
+# Columnas del export de Open Food Facts -> llaves compactas del registro
+CAMPOS = {
+    'product_name': 'n',
+    'brands': 'm',
+    'categories': 'c',
+    'image_url': 'i',
+    'quantity': 'p',
+    'generic_name': 'd'
+}
+
+
+def normalizar_gtin(codigo_barras):
+    """
+    Convierte un código EAN-8/UPC-A/EAN-13/GTIN-14 a entero de 14 dígitos
+
+    Returns:
+        int: GTIN, o None si no es numérico o es muy largo
+    """
+    codigo = str(codigo_barras or '').strip()
+    if not codigo.isdigit() or len(codigo) > 14:
+        return None
+    return int(codigo)
+
+
+# =============================================
+# IMPORTACIÓN
+# =============================================
+
+def _abrir_texto(origen):
+    if origen.endswith('.gz'):
+        return gzip.open(origen, 'rt', encoding='utf-8', newline='')
+    return open(origen, 'r', encoding='utf-8', newline='')
+
+
+def _leer_productos(origen):
+    """Lee el export de Open Food Facts (CSV/TSV o JSONL, opcionalmente .gz) en streaming"""
+    nombre = origen[:-3] if origen.endswith('.gz') else origen
+
+    with _abrir_texto(origen) as archivo:
+        if nombre.endswith(('.jsonl', '.json', '.ndjson')):
+            for linea in archivo:
+                linea = linea.strip()
+                if linea:
+                    try:
+                        yield json.loads(linea)
+                    except ValueError:
+                        continue
+        else:
+            csv.field_size_limit(sys.maxsize)
+            muestra = archivo.readline()
+            delimitador = '\t' if muestra.count('\t') > muestra.count(',') else ','
+            lector = csv.reader(io.StringIO(muestra), delimiter=delimitador)
+            columnas = next(lector)
+            yield from csv.DictReader(archivo, fieldnames=columnas, delimiter=delimitador)
+
+
+def construir_catalogo(origen, destino, progreso=None):
+    """
+    Construye el catálogo offline a partir de un export de productos
+
+    Args:
+        origen (str): Archivo CSV/TSV/JSONL (puede estar comprimido .gz)
+        destino (str): Directorio del catálogo
+        progreso (callable): Opcional, recibe la cantidad de productos leídos
+
+    Returns:
+        int: Cantidad de productos en el catálogo
+    """
+    version = f'v{time.time_ns()}'
+    carpeta = os.path.join(destino, version)
+    os.makedirs(carpeta)
+    ruta_registros = os.path.join(carpeta, ARCHIVO_REGISTROS)
+    ruta_indice = os.path.join(carpeta, ARCHIVO_INDICE)
+
+    gtins = array('Q')
+    offsets = array('Q')
+    longitudes = array('I')
+    offset = 0
+    leidos = 0
+
+    with open(ruta_registros, 'wb') as registros:
+        for producto in _leer_productos(origen):
+            leidos += 1
+            if progreso and leidos % 100000 == 0:
+                progreso(leidos)
+
+            gtin = normalizar_gtin(producto.get('code'))
+            if gtin is None:
+                continue
+
+            registro = {corta: producto.get(larga) for larga, corta in CAMPOS.items() if producto.get(larga)}
+            if not registro.get('n'):
+                continue
+
+            datos = json.dumps(registro, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            registros.write(datos)
+            gtins.append(gtin)
+            offsets.append(offset)
+            longitudes.append(len(datos))
+            offset += len(datos)
+
+    # Ordenar por GTIN; si un código se repite gana el último registro
+    orden = sorted(range(len(gtins)), key=gtins.__getitem__)
+    cantidad = 0
+    with open(ruta_indice, 'wb') as indice:
+        indice.write(ENCABEZADO.pack(MAGIC, VERSION, 0))
+        for pos, i in enumerate(orden):
+            if pos + 1 < len(orden) and gtins[orden[pos + 1]] == gtins[i]:
+                continue
+            indice.write(ENTRADA.pack(gtins[i], offsets[i], longitudes[i]))
+            cantidad += 1
+        indice.seek(0)
+        indice.write(ENCABEZADO.pack(MAGIC, VERSION, cantidad))
+
+    # Publicación atómica: un solo os.replace del puntero a la versión nueva.
+    # Los procesos que tienen el catálogo abierto lo recargan
+    anterior = version_actual(destino)
+    temporal = os.path.join(destino, ARCHIVO_ACTUAL + '.tmp')
+    with open(temporal, 'w', encoding='ascii') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, os.path.join(destino, ARCHIVO_ACTUAL))
+
+    _limpiar_versiones(destino, conservar={version, anterior})
+    return cantidad
+
+
+def version_actual(directorio):
+    """
+    Returns:
+        str: Nombre de la versión vigente del catálogo, o None si no hay
+    """
+    try:
+        with open(os.path.join(directorio, ARCHIVO_ACTUAL), encoding='ascii') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _limpiar_versiones(directorio, conservar):
+    """
+    Borra las versiones viejas. La anterior se conserva: otro proceso puede
+    tenerla abierta hasta su siguiente revisión (en Windows un archivo
+    mapeado no se puede borrar y se reintenta en la siguiente importación)
+    """
+    for nombre in os.listdir(directorio):
+        ruta = os.path.join(directorio, nombre)
+        if nombre in conservar or not nombre.startswith('v') or not os.path.isdir(ruta):
+            continue
+        shutil.rmtree(ruta, ignore_errors=True)
+
+
+# =============================================
+# CONSULTA
+# =============================================
+
+class OfflineCatalog:
+    """
+    Catálogo de productos en disco, abierto con mmap.
+
+    No se carga nada en memoria al iniciar: cada búsqueda es una búsqueda
+    binaria sobre el índice ordenado (O(log n)) y una lectura del registro.
+    """
+
+    FUENTE = 'Catálogo local'
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._indice = None
+        self._registros = None
+        self._cantidad = 0
+        self._version = None
+        self._revisado = 0.0
+        self._lock = threading.Lock()
+        self._abrir()
+
+    def _abrir(self):
+        self._cerrar()
+        self._version = version_actual(self.directorio)
+        if self._version is None:
+            return
+
+        carpeta = os.path.join(self.directorio, self._version)
+        ruta_indice = os.path.join(carpeta, ARCHIVO_INDICE)
+        ruta_registros = os.path.join(carpeta, ARCHIVO_REGISTROS)
+
+        indice = registros = None
+        try:
+            with open(ruta_indice, 'rb') as f:
+                indice = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            magic, version, cantidad = ENCABEZADO.unpack_from(indice, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'Catálogo inválido: {ruta_indice}')
+
+            if cantidad and os.path.getsize(ruta_registros):
+                with open(ruta_registros, 'rb') as f:
+                    registros = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError, struct.error) as e:
+            # Catálogo vacío: las búsquedas siguen con los proveedores.
+            # Se vuelve a intentar cuando se publique otra versión.
+            print(f"Error al abrir el catálogo offline {carpeta}: {e}")
+            for archivo in (indice, registros):
+                if archivo is not None:
+                    archivo.close()
+            return
+
+        self._indice, self._registros, self._cantidad = indice, registros, cantidad
+
+    def _cerrar(self):
+        for archivo in (self._indice, self._registros):
+            if archivo is not None:
+                archivo.close()
+        self._indice = self._registros = None
+        self._cantidad = 0
+
+    def __len__(self):
+        return self._cantidad
+
+    def _revisar_cambios(self):
+        """Reabre el catálogo si se importó uno nuevo (revisa cada 30 segundos)"""
+        ahora = time.monotonic()
+        if ahora - self._revisado < 30:
+            return
+        self._revisado = ahora
+        if version_actual(self.directorio) != self._version:
+            self._abrir()
+
+    def buscar(self, codigo_barras):
+        """
+        Busca un código en el catálogo
+
+        Returns:
+            dict: Producto en el formato de BarcodeService, o None si no está
+        """
+        gtin = normalizar_gtin(codigo_barras)
+        if gtin is None:
+            return None
+
+        with self._lock:
+            self._revisar_cambios()
+            if not self._cantidad:
+                return None
+
+            indice = self._indice
+            bajo, alto = 0, self._cantidad - 1
+            while bajo <= alto:
+                medio = (bajo + alto) // 2
+                clave, offset, longitud = ENTRADA.unpack_from(indice, ENCABEZADO.size + medio * ENTRADA.size)
+                if clave < gtin:
+                    bajo = medio + 1
+                elif clave > gtin:
+                    alto = medio - 1
+                else:
+                    registro = json.loads(self._registros[offset:offset + longitud].decode('utf-8'))
+                    return {
+                        'encontrado': True,
+                        'nombre': registro.get('n', ''),
+                        'marca': registro.get('m', ''),
+                        'categorias': registro.get('c', ''),
+                        'imagen_url': registro.get('i', ''),
+                        'peso': registro.get('p', ''),
+                        'descripcion': registro.get('d', ''),
+                        'codigo_barras': codigo_barras,
+                        'fuente': self.FUENTE
+                    }
+        return None
+
+
+_crear_lock = threading.Lock()
+
+
+def get_offline_catalog():
+    """
+    Obtiene el catálogo offline de la aplicación
+
+    Returns:
+        OfflineCatalog: o None si no está configurado
+    """
+    app = current_app._get_current_object()
+    directorio = app.config.get('BARCODE_CATALOG_PATH')
+    if not directorio:
+        return None
+
+    catalogo = app.extensions.get('barcode_catalog')
+    if catalogo is None:
+        with _crear_lock:
+            catalogo = app.extensions.get('barcode_catalog')
+            if catalogo is None:
+                catalogo = OfflineCatalog(directorio)
+                app.extensions['barcode_catalog'] = catalogo
+    return catalogo
@@ -0,0 +1,448 @@
+# =============================================
+# PROVEEDORES DE CÓDIGOS DE BARRAS - SGI-GuateMart
+# app/services/barcode_providers.py
+# =============================================
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from flask import current_app
+
+from app.services.http_client import get_session, get_rate_limiter
+
+
+class ProviderError(Exception):
+    """Error de un proveedor (timeout, 5xx, límite de peticiones)"""
+
+
+# =============================================
+# ESTADÍSTICAS Y CIRCUIT BREAKER
+# =============================================
+
+class CircuitBreaker:
+    """
+    Circuit breaker por proveedor.
+
+    CERRADO: se envían consultas normalmente.
+    ABIERTO: tras 'max_fallos' errores seguidos, o una tasa de error mayor a
+             'tasa_error' en la ventana, no se consulta durante 'espera' segundos.
+    SEMIABIERTO: pasada la espera se permite una consulta de prueba; si funciona
+                 se cierra, si falla se vuelve a abrir.
+    """
+
+    CERRADO = 'CERRADO'
+    ABIERTO = 'ABIERTO'
+    SEMIABIERTO = 'SEMIABIERTO'
+
+    def __init__(self, max_fallos=5, tasa_error=0.5, espera=30, ventana=20, latencia_max=None):
+        self.max_fallos = max_fallos
+        self.tasa_error = tasa_error
+        self.espera = espera
+        self.latencia_max = latencia_max
+
+        self._lock = threading.Lock()
+        self._estado = self.CERRADO
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        self._fallos_seguidos = 0
+        self._ventana = deque(maxlen=ventana)   # (ok, latencia)
+
+        # Estadísticas acumuladas
+        self.consultas = 0
+        self.errores = 0
+        self.aperturas = 0
+        self.rechazadas = 0
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self._estado == self.ABIERTO and time.monotonic() >= self._abierto_hasta:
+                return self.SEMIABIERTO
+            return self._estado
+
+    def permitir(self):
+        """Indica si se puede consultar al proveedor en este momento"""
+        with self._lock:
+            if self._estado == self.CERRADO:
+                return True
+            if self._estado == self.ABIERTO and time.monotonic() < self._abierto_hasta:
+                self.rechazadas += 1
+                return False
+            # Semiabierto: una sola consulta de prueba a la vez
+            if self._prueba_en_curso:
+                self.rechazadas += 1
+                return False
+            self._estado = self.SEMIABIERTO
+            self._prueba_en_curso = True
+            return True
+
+    def registrar(self, ok, latencia):
+        """Registra el resultado de una consulta"""
+        # Una respuesta correcta pero demasiado lenta cuenta como degradación
+        degradado = ok and self.latencia_max and latencia > self.latencia_max
+
+        with self._lock:
+            self.consultas += 1
+            self._ventana.append((ok and not degradado, latencia))
+
+            if ok and not degradado:
+                self._fallos_seguidos = 0
+                if self._estado != self.CERRADO:
+                    self._estado = self.CERRADO
+                    self._prueba_en_curso = False
+                return
+
+            if not ok:
+                self.errores += 1
+            self._fallos_seguidos += 1
+
+            errores_ventana = sum(1 for exito, _ in self._ventana if not exito)
+            ventana_llena = len(self._ventana) == self._ventana.maxlen
+
+            if (self._estado == self.SEMIABIERTO
+                    or self._fallos_seguidos >= self.max_fallos
+                    or (ventana_llena and errores_ventana / len(self._ventana) > self.tasa_error)):
+                if self._estado != self.ABIERTO:
+                    self.aperturas += 1
+                self._estado = self.ABIERTO
+                self._abierto_hasta = time.monotonic() + self.espera
+                self._prueba_en_curso = False
+
+    def liberar(self):
+        """Devuelve un permiso de permitir() que no se llegó a usar"""
+        with self._lock:
+            if self._estado == self.SEMIABIERTO:
+                self._prueba_en_curso = False
+
+    def stats(self):
+        with self._lock:
+            latencias = sorted(lat for _, lat in self._ventana)
+        estado = self.estado
+        p95 = latencias[min(len(latencias) - 1, int(len(latencias) * 0.95))] if latencias else 0.0
+        return {
+            'estado': estado,
+            'consultas': self.consultas,
+            'errores': self.errores,
+            'aperturas': self.aperturas,
+            'rechazadas': self.rechazadas,
+            'latencia_promedio': round(sum(latencias) / len(latencias), 4) if latencias else 0.0,
+            'latencia_p95': round(p95, 4)
+        }
+
+
+# =============================================
+# PROVEEDORES
+# =============================================
+
+class BarcodeProvider:
+    """Proveedor base: consulta una API y normaliza la respuesta"""
+
+    nombre = ''
+
+    def __init__(self, url, timeout=5, rate_limit=10, pool_size=10, breaker=None):
+        self.url = url
+        self.timeout = timeout
+        self.rate_limit = rate_limit
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+
+    def request(self, codigo_barras, timeout=None):
+        """Realiza la petición HTTP; debe retornar un requests.Response"""
+        raise NotImplementedError
+
+    def parse(self, response, codigo_barras):
+        """Convierte la respuesta en el formato de BarcodeService (encontrado o no)"""
+        raise NotImplementedError
+
+    def reservar(self, espera=0):
+        """
+        Toma un permiso del límite de peticiones del host del proveedor.
+        Se llama antes de buscar(), en el hilo de quien consulta: el pool
+        compartido no se ocupa esperando permisos.
+
+        Args:
+            espera (float): Segundos máximos de espera (0 = no esperar)
+
+        Returns:
+            bool: True si se puede consultar ahora
+        """
+        return get_rate_limiter(self.url, self.rate_limit).try_acquire(espera)
+
+    def buscar(self, codigo_barras, timeout=None):
+        """
+        Consulta el proveedor y registra latencia y errores.
+        El permiso del límite de peticiones se toma antes con reservar().
+
+        Args:
+            timeout (float): Segundos máximos de la petición (por defecto el del proveedor)
+
+        Returns:
+            dict: Resultado encontrado / no encontrado
+
+        Raises:
+            ProviderError: Timeout, error de conexión o respuesta 429/5xx
+        """
+        inicio = time.monotonic()
+        try:
+            response = self.request(codigo_barras, timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise ProviderError(f'{self.nombre} respondió {response.status_code}')
+            resultado = self.parse(response, codigo_barras)
+        except requests.exceptions.Timeout:
+            self.breaker.registrar(False, time.monotonic() - inicio)
+            raise ProviderError(f'Tiempo de espera agotado al consultar {self.nombre}')
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.breaker.registrar(False, time.monotonic() - inicio)
+            raise ProviderError(f'Error al consultar {self.nombre}: {str(e)}')
+        except ProviderError:
+            self.breaker.registrar(False, time.monotonic() - inicio)
+            raise
+
+        self.breaker.registrar(True, time.monotonic() - inicio)
+        return resultado
+
+    def _get(self, url, timeout=None, **kwargs):
+        return get_session(self.pool_size).get(url, timeout=timeout or self.timeout, **kwargs)
+
+    @staticmethod
+    def no_encontrado(codigo_barras):
+        return {
+            'encontrado': False,
+            'mensaje': 'Producto no encontrado en la base de datos',
+            'codigo_barras': codigo_barras
+        }
+
+
+class OpenFoodFactsProvider(BarcodeProvider):
+    nombre = 'Open Food Facts'
+
+    def request(self, codigo_barras, timeout=None):
+        return self._get(self.url.format(barcode=codigo_barras), timeout)
+
+    def parse(self, response, codigo_barras):
+        if response.status_code == 200:
+            data = response.json()
+
+            if data.get('status') == 1:  # Producto encontrado
+                product = data.get('product', {})
+
+                return {
+                    'encontrado': True,
+                    'nombre': product.get('product_name', ''),
+                    'marca': product.get('brands', ''),
+                    'categorias': product.get('categories', ''),
+                    'imagen_url': product.get('image_url', ''),
+                    'peso': product.get('quantity', ''),
+                    'descripcion': product.get('generic_name', ''),
+                    'codigo_barras': codigo_barras,
+                    'fuente': self.nombre
+                }
+
+        return self.no_encontrado(codigo_barras)
+
+
+class UPCItemDBProvider(BarcodeProvider):
+    nombre = 'UPC Item DB'
+
+    def request(self, codigo_barras, timeout=None):
+        return self._get(self.url, timeout, params={'upc': codigo_barras})
+
+    def parse(self, response, codigo_barras):
+        if response.status_code == 200:
+            data = response.json()
+            items = data.get('items') or []
+
+            if data.get('code') == 'OK' and items:
+                item = items[0]
+                imagenes = item.get('images') or []
+
+                return {
+                    'encontrado': True,
+                    'nombre': item.get('title', ''),
+                    'marca': item.get('brand', ''),
+                    'categorias': item.get('category', ''),
+                    'imagen_url': imagenes[0] if imagenes else '',
+                    'peso': item.get('weight', ''),
+                    'descripcion': item.get('description', ''),
+                    'codigo_barras': codigo_barras,
+                    'fuente': self.nombre
+                }
+
+        return self.no_encontrado(codigo_barras)
+
+
+# =============================================
+# CLIENTE CON VARIAS FUENTES
+# =============================================
+
+class MultiSourceLookup:
+    """
+    Consulta varios proveedores en orden de prioridad.
+
+    - Omite proveedores con el circuito abierto o sin permiso del límite de
+      peticiones: el permiso se toma antes de enviar la consulta al pool, y
+      solo se espera por él cuando no hay otra consulta en curso.
+    - Cada consulta tiene como timeout lo que queda del plazo, así una
+      consulta abandonada no ocupa un hilo del pool más allá de 'deadline'.
+    - Si el principal no responde en 'hedge_delay' segundos, lanza en paralelo
+      la consulta al siguiente (hedged request) y usa la primera respuesta
+      con el producto encontrado.
+    - Si un proveedor falla o no encuentra el producto, pasa al siguiente.
+    - Nunca espera más de 'deadline' segundos en total.
+    """
+
+    def __init__(self, providers, hedge_delay=0.8, deadline=5, max_workers=16):
+        self.providers = providers
+        self.hedge_delay = hedge_delay
+        self.deadline = deadline
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='barcode')
+
+    def lookup(self, codigo_barras):
+        """
+        Busca un código en los proveedores
+
+        Returns:
+            dict: Primer resultado encontrado; "no encontrado" si ninguno lo
+                  tiene; o error si ningún proveedor respondió
+        """
+        limite = time.monotonic() + self.deadline
+        pendientes = {}     # future -> proveedor
+        cola = list(self.providers)
+        no_encontrado = None
+        errores = []
+
+        def lanzar_siguiente():
+            while cola:
+                proveedor = cola.pop(0)
+                if not proveedor.breaker.permitir():
+                    errores.append(f'{proveedor.nombre}: circuito abierto')
+                    continue
+                restante = limite - time.monotonic()
+                # Con otra consulta en curso no se espera: se pasa al siguiente
+                if restante <= 0 or not proveedor.reservar(0 if pendientes else restante):
+                    proveedor.breaker.liberar()
+                    errores.append(f'{proveedor.nombre}: límite de peticiones')
+                    continue
+                future = self._executor.submit(proveedor.buscar, codigo_barras, max(restante, 0.1))
+                pendientes[future] = proveedor
+                return True
+            return False
+
+        lanzar_siguiente()
+
+        while pendientes:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+
+            # Mientras haya un proveedor de respaldo, esperar solo hasta el umbral de cobertura
+            espera = min(restante, self.hedge_delay) if cola else restante
+            listos, _ = wait(list(pendientes), timeout=espera, return_when=FIRST_COMPLETED)
+
+            if not listos:
+                lanzar_siguiente()  # Hedge: el proveedor actual está lento
+                continue
+
+            for future in listos:
+                pendientes.pop(future)
+                try:
+                    resultado = future.result()
+                except ProviderError as e:
+                    errores.append(str(e))
+                    continue
+                if resultado.get('encontrado'):
+                    self._abandonar(pendientes)
+                    return resultado
+                no_encontrado = resultado
+
+            if not pendientes:
+                lanzar_siguiente()
+
+        if no_encontrado is not None and not pendientes:
+            return no_encontrado
+
+        if not errores and pendientes:
+            errores.append('Tiempo de espera agotado al consultar la API')
+        self._abandonar(pendientes)
+
+        return {
+            'encontrado': False,
+            'error': '; '.join(errores) or 'Ningún proveedor disponible',
+            'codigo_barras': codigo_barras
+        }
+
+    @staticmethod
+    def _abandonar(pendientes):
+        """
+        Cancela las consultas que ya no se esperan. Las que no empezaron
+        salen del pool; las que están en curso terminan en su timeout.
+        """
+        for future, proveedor in pendientes.items():
+            if future.cancel():
+                proveedor.breaker.liberar()
+
+    def stats(self):
+        """Estadísticas de latencia, errores y estado del circuito por proveedor"""
+        return {proveedor.nombre: proveedor.breaker.stats() for proveedor in self.providers}
+
+
+def _crear_cliente(config):
+    """Arma los proveedores y el cliente con la configuración de la aplicación"""
+    from app.services.barcode_service import BarcodeService
+
+    timeout = config.get('BARCODE_TIMEOUT', 5)
+    pool_size = config.get('BARCODE_MAX_WORKERS', 8)
+
+    def breaker():
+        return CircuitBreaker(
+            max_fallos=config.get('BARCODE_BREAKER_FAILURES', 5),
+            tasa_error=config.get('BARCODE_BREAKER_ERROR_RATE', 0.5),
+            espera=config.get('BARCODE_BREAKER_COOLDOWN', 30),
+            latencia_max=config.get('BARCODE_BREAKER_SLOW_CALL', 3)
+        )
+
+    providers = [
+        OpenFoodFactsProvider(
+            config.get('BARCODE_OPENFOODFACTS_URL') or BarcodeService.OPENFOODFACTS_URL,
+            timeout=timeout, rate_limit=config.get('BARCODE_RATE_LIMIT', 10),
+            pool_size=pool_size, breaker=breaker()
+        )
+    ]
+    if config.get('BARCODE_UPCITEMDB_ENABLED', True):
+        providers.append(UPCItemDBProvider(
+            config.get('BARCODE_UPCITEMDB_URL') or BarcodeService.UPCITEMDB_URL,
+            timeout=timeout, rate_limit=config.get('BARCODE_UPCITEMDB_RATE_LIMIT', 1),
+            pool_size=pool_size, breaker=breaker()
+        ))
+
+    return MultiSourceLookup(
+        providers,
+        hedge_delay=config.get('BARCODE_HEDGE_DELAY', 0.8),
+        deadline=timeout,
+        max_workers=pool_size * 2
+    )
+
+
+_crear_lock = threading.Lock()
+
+
+def get_lookup_client():
+    """
+    Obtiene el cliente de búsqueda con varios proveedores de la aplicación
+
+    Returns:
+        MultiSourceLookup
+    """
+    app = current_app._get_current_object()
+
+    client = app.extensions.get('barcode_lookup')
+    if client is None:
+        with _crear_lock:
+            client = app.extensions.get('barcode_lookup')
+            if client is None:
+                client = _crear_cliente(app.config)
+                app.extensions['barcode_lookup'] = client
+    return client
@@ -3,9 +3,14 @@
 # app/services/barcode_service.py
 # =============================================
 
-import requests
+from concurrent.futures import ThreadPoolExecutor
+
 from flask import current_app
 
+from app.services.barcode_cache import get_barcode_cache
+from app.services.barcode_catalog import get_offline_catalog
+from app.services.barcode_providers import get_lookup_client
+
 class BarcodeService:
     """Servicio para consultar información de productos por código de barras"""
     
@@ -18,7 +23,8 @@ class BarcodeService:
     @staticmethod
     def buscar_por_barcode(codigo_barras):
         """
-        Busca información de un producto por código de barras
+        Busca información de un producto por código de barras.
+        Orden de consulta: catálogo offline, caché local y por último la API.
         
         Args:
             codigo_barras (str): Código de barras del producto
@@ -26,48 +32,42 @@ class BarcodeService:
         Returns:
             dict: Información del producto o None si no se encuentra
         """
-        try:
-            # Intentar con Open Food Facts
-            url = BarcodeService.OPENFOODFACTS_URL.format(barcode=codigo_barras)
-            response = requests.get(url, timeout=5)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                if data.get('status') == 1:  # Producto encontrado
-                    product = data.get('product', {})
-                    
-                    return {
-                        'encontrado': True,
-                        'nombre': product.get('product_name', ''),
-                        'marca': product.get('brands', ''),
-                        'categorias': product.get('categories', ''),
-                        'imagen_url': product.get('image_url', ''),
-                        'peso': product.get('quantity', ''),
-                        'descripcion': product.get('generic_name', ''),
-                        'codigo_barras': codigo_barras,
-                        'fuente': 'Open Food Facts'
-                    }
-            
-            # Si no se encuentra, retornar vacío
-            return {
-                'encontrado': False,
-                'mensaje': 'Producto no encontrado en la base de datos',
-                'codigo_barras': codigo_barras
-            }
+        catalogo = get_offline_catalog()
+        
+        if catalogo is not None:
+            resultado = catalogo.buscar(codigo_barras)
+            if resultado is not None:
+                return resultado
+        
+        cache = get_barcode_cache()
+        
+        if cache is not None:
+            resultado = cache.get(codigo_barras)
+            if resultado is not None:
+                return resultado
+        
+        resultado = BarcodeService.consultar_api(codigo_barras)
+        
+        # Guardar encontrados y "no encontrado"; los errores de red no se guardan
+        if cache is not None and 'error' not in resultado:
+            cache.set(codigo_barras, resultado)
+        
+        return resultado
+    
+    @staticmethod
+    def consultar_api(codigo_barras):
+        """
+        Consulta las APIs externas (sin caché).
+        Open Food Facts es la fuente principal y UPC Item DB el respaldo;
+        ver MultiSourceLookup para el manejo de latencia y fallos.
+        
+        Args:
+            codigo_barras (str): Código de barras del producto
             
-        except requests.exceptions.Timeout:
-            return {
-                'encontrado': False,
-                'error': 'Tiempo de espera agotado al consultar la API',
-                'codigo_barras': codigo_barras
-            }
-        except requests.exceptions.RequestException as e:
-            return {
-                'encontrado': False,
-                'error': f'Error al consultar la API: {str(e)}',
-                'codigo_barras': codigo_barras
-            }
+        Returns:
+            dict: Información del producto, "no encontrado" o error
+        """
+        return get_lookup_client().lookup(codigo_barras)
     
     @staticmethod
     def validar_barcode(codigo_barras):
@@ -94,20 +94,48 @@ class BarcodeService:
     @staticmethod
     def buscar_multiple(codigos_barras):
         """
-        Busca información de múltiples códigos de barras
+        Busca información de múltiples códigos de barras en paralelo.
+        
+        Usa a lo sumo BARCODE_MAX_WORKERS consultas simultáneas, respeta el
+        límite de peticiones por host y consulta una sola vez cada código
+        repetido. Un error en un código no detiene a los demás.
         
         Args:
             codigos_barras (list): Lista de códigos de barras
             
         Returns:
-            list: Lista con información de cada producto
+            list: Lista con información de cada producto, en el mismo orden
         """
-        resultados = []
-        for codigo in codigos_barras:
-            resultado = BarcodeService.buscar_por_barcode(codigo)
-            resultados.append(resultado)
+        app = current_app._get_current_object()
+        
+        def resolver(codigo):
+            with app.app_context():
+                try:
+                    if not BarcodeService.validar_barcode(codigo):
+                        return {
+                            'encontrado': False,
+                            'error': 'Código de barras inválido',
+                            'codigo_barras': codigo
+                        }
+                    return BarcodeService.buscar_por_barcode(codigo)
+                except Exception as e:
+                    return {
+                        'encontrado': False,
+                        'error': f'Error al buscar: {str(e)}',
+                        'codigo_barras': codigo
+                    }
+        
+        codigos = [str(codigo).strip() for codigo in codigos_barras]
+        unicos = list(dict.fromkeys(codigos))
+        
+        if len(unicos) <= 1:
+            por_codigo = {codigo: resolver(codigo) for codigo in unicos}
+        else:
+            workers = min(app.config.get('BARCODE_MAX_WORKERS', 8), len(unicos))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                por_codigo = dict(zip(unicos, executor.map(resolver, unicos)))
         
-        return resultados
+        return [por_codigo[codigo] for codigo in codigos]
 
 
 # =============================================
@@ -0,0 +1,157 @@
+# =============================================
+# CACHÉ DEL DASHBOARD POR ROL
+# app/services/dashboard_cache.py
+# =============================================
+
+import hashlib
+import json
+import threading
+import time
+
+from flask import current_app
+
+from app.services.job_runner import tarea
+
+
+class DashboardCache:
+    """
+    Caché en memoria de los datos del dashboard, una entrada por rol.
+
+    Todos los usuarios de un rol ven los mismos números, así que solo el
+    primero que entra después de expirar el TTL consulta SQL Server; los
+    demás reciben la misma entrada. Cada entrada guarda además un ETag
+    calculado sobre los datos para responder 304 a los navegadores.
+
+    invalidar() descarta todo de inmediato (movimientos, alertas,
+    productos). Una carga que estaba en curso al invalidar no se guarda.
+    """
+
+    def __init__(self, ttl=30):
+        """
+        Args:
+            ttl (int): Segundos de validez de cada entrada (0 = sin caché)
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = {}      # clave -> (expira, datos, etag)
+        self._cargando = {}      # clave -> Lock, una sola carga a la vez por rol
+        self._generacion = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidaciones = 0
+
+    @staticmethod
+    def calcular_etag(datos):
+        """ETag de los datos (Decimal y fechas se serializan como texto)"""
+        raw = json.dumps(datos, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha1(raw).hexdigest()
+
+    def _vigente(self, clave):
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[0] > time.monotonic():
+            return entrada
+        return None
+
+    def get(self, clave, cargar):
+        """
+        Obtiene los datos de una clave, cargándolos si no están o expiraron
+
+        Args:
+            clave: Normalmente el nombre del rol
+            cargar (callable): Función sin argumentos que consulta los datos
+
+        Returns:
+            tuple: (datos, etag)
+        """
+        if self.ttl <= 0:
+            datos = cargar()
+            return datos, self.calcular_etag(datos)
+
+        with self._lock:
+            entrada = self._vigente(clave)
+            if entrada is not None:
+                self._hits += 1
+                return entrada[1], entrada[2]
+            lock_clave = self._cargando.setdefault(clave, threading.Lock())
+
+        with lock_clave:
+            # Otro hilo pudo cargarla mientras se esperaba
+            with self._lock:
+                entrada = self._vigente(clave)
+                if entrada is not None:
+                    self._hits += 1
+                    return entrada[1], entrada[2]
+                self._misses += 1
+                generacion = self._generacion
+
+            datos = cargar()
+            etag = self.calcular_etag(datos)
+
+            with self._lock:
+                if generacion == self._generacion:
+                    self._entradas[clave] = (time.monotonic() + self.ttl, datos, etag)
+            return datos, etag
+
+    def invalidar(self):
+        """Descarta todas las entradas"""
+        with self._lock:
+            self._generacion += 1
+            self._invalidaciones += 1
+            self._entradas.clear()
+
+    def stats(self):
+        """
+        Estadísticas de la caché
+
+        Returns:
+            dict: Entradas, aciertos, fallos e invalidaciones
+        """
+        with self._lock:
+            consultas = self._hits + self._misses
+            return {
+                'ttl': self.ttl,
+                'entradas': len(self._entradas),
+                'aciertos': self._hits,
+                'fallos': self._misses,
+                'invalidaciones': self._invalidaciones,
+                'tasa_aciertos': round(self._hits / consultas, 4) if consultas else 0.0
+            }
+
+
+def get_dashboard_cache():
+    """Obtiene la caché del dashboard de la aplicación"""
+    app = current_app._get_current_object()
+    cache = app.extensions.get('dashboard_cache')
+    if cache is None:
+        cache = app.extensions['dashboard_cache'] = DashboardCache(
+            ttl=app.config.get('DASHBOARD_CACHE_TTL', 30)
+        )
+    return cache
+
+
+def invalidar_dashboard():
+    """Descarta el dashboard en caché después de una escritura que lo cambia"""
+    cache = current_app.extensions.get('dashboard_cache')
+    if cache is not None:
+        cache.invalidar()
+
+
+def _reconciliado(resultado):
+    """Descarta el dashboard en caché para mostrar los contadores recalculados"""
+    invalidar_dashboard()
+
+
+@tarea('reconciliar_dashboard', al_terminar=_reconciliado)
+def tarea_reconciliar_dashboard(trabajo):
+    """
+    Reconciliación programada (JOBS_SCHEDULE) del snapshot del dashboard
+
+    Corre en un proceso de trabajo y no en la petición de un usuario:
+    sp_ReconciliarDashboard toma el bloqueo exclusivo del snapshot y detiene
+    el registro de movimientos mientras recalcula.
+    """
+    from app.database import reconciliar_dashboard
+
+    reconciliar_dashboard()
+    trabajo.progreso(1, 1, 'Snapshot del dashboard reconciliado', forzar=True)
+    return {'reconciliado': True}
@@ -0,0 +1,669 @@
+# =============================================
+# ARCHIVO HISTÓRICO (MOVIMIENTOS, AUDITORÍA Y ALERTAS RESUELTAS)
+# app/services/data_archive.py
+# =============================================
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from flask import current_app
+
+from app.services.job_runner import tarea
+
+
+# Formato en disco (carpeta del archivo):
+#   manifest.json              -> meses archivados por tabla (filas, rango de llaves, sha256)
+#   <Tabla>/<Tabla>_AAAA-MM.zip -> un mes de una tabla, una entrada por columna:
+#       meta.json     columnas, tipos y cantidad de filas
+#       <col>.i64     int64 little-endian: enteros, fechas (microsegundos desde
+#                     1970) o, en columnas de texto, posiciones en <col>.txt.
+#                     La llave y las fechas se guardan como diferencias
+#       <col>.txt     texto UTF-8 concatenado
+#       <col>.nul     un byte por fila (1 = NULL), solo si la columna tiene nulos
+# Cada columna se comprime por separado: valores del mismo tipo quedan juntos
+VERSION = 1
+MANIFEST = 'manifest.json'
+
+ENTERO = 'entero'
+FECHA = 'fecha'
+TEXTO = 'texto'
+
+# tabla -> (llave, columna de fecha, condición adicional, columnas (nombre, tipo))
+TABLAS_ARCHIVO = {
+    'Movimientos': ('id_movimiento', 'fecha_movimiento', '', (
+        ('id_movimiento', ENTERO), ('id_producto', ENTERO), ('id_tipo_movimiento', ENTERO),
+        ('cantidad', ENTERO), ('stock_anterior', ENTERO), ('stock_nuevo', ENTERO),
+        ('id_usuario', ENTERO), ('id_proveedor', ENTERO), ('numero_documento', TEXTO),
+        ('observaciones', TEXTO), ('fecha_movimiento', FECHA)
+    )),
+    'Auditoria': ('id_auditoria', 'fecha_operacion', '', (
+        ('id_auditoria', ENTERO), ('tabla_afectada', TEXTO), ('operacion', TEXTO),
+        ('id_registro', ENTERO), ('id_usuario', ENTERO), ('datos_anteriores', TEXTO),
+        ('datos_nuevos', TEXTO), ('fecha_operacion', FECHA), ('ip_address', TEXTO),
+        ('detalles', TEXTO)
+    )),
+    # Solo las resueltas: las pendientes siguen activas aunque sean viejas
+    'AlertasStock': ('id_alerta', 'fecha_resolucion', "estado = 'RESUELTA'", (
+        ('id_alerta', ENTERO), ('id_producto', ENTERO), ('tipo_alerta', TEXTO),
+        ('stock_actual', ENTERO), ('stock_minimo', ENTERO), ('mensaje', TEXTO),
+        ('estado', TEXTO), ('fecha_generacion', FECHA), ('fecha_resolucion', FECHA),
+        ('id_usuario_resolucion', ENTERO)
+    )),
+}
+
+_EPOCA = datetime(1970, 1, 1)
+_MICRO = timedelta(microseconds=1)
+
+
+def _a_micro(valor):
+    if not isinstance(valor, datetime):
+        valor = datetime(valor.year, valor.month, valor.day)
+    return (valor - _EPOCA) // _MICRO
+
+
+def _de_micro(valor):
+    return _EPOCA + timedelta(microseconds=valor)
+
+
+def _clave_mes(fecha):
+    return f'{fecha.year:04d}-{fecha.month:02d}'
+
+
+def _inicio_mes(clave):
+    anio, mes = clave.split('-')
+    return date(int(anio), int(mes), 1)
+
+
+def _sumar_meses(fecha, meses):
+    """Primer día del mes que está 'meses' después (o antes, si es negativo)"""
+    total = fecha.year * 12 + fecha.month - 1 + meses
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _a_bytes(valores):
+    """array('q') -> bytes little-endian"""
+    if sys.byteorder == 'big':
+        valores = array('q', valores)
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def _de_bytes(datos):
+    valores = array('q')
+    valores.frombytes(datos)
+    if sys.byteorder == 'big':
+        valores.byteswap()
+    return valores
+
+
+def _sha256(ruta):
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+# =============================================
+# ESCRITURA Y LECTURA DE UN MES
+# =============================================
+
+class ColumnasMes:
+    """
+    Acumula las filas de un mes en columnas compactas (int64 y bytes)
+    mientras se leen de la BD, sin guardar una tupla por fila
+    """
+
+    def __init__(self, columnas):
+        self.columnas = columnas
+        self.filas = 0
+        self._valores = [array('q', [0] if tipo == TEXTO else []) for _, tipo in columnas]
+        self._texto = [bytearray() if tipo == TEXTO else None for _, tipo in columnas]
+        self._nulos = [bytearray() for _ in columnas]
+
+    def agregar(self, fila):
+        for i, (_, tipo) in enumerate(self.columnas):
+            valor = fila[i]
+            self._nulos[i].append(valor is None)
+            if tipo == TEXTO:
+                if valor is not None:
+                    self._texto[i] += str(valor).encode('utf-8')
+                self._valores[i].append(len(self._texto[i]))
+            elif valor is None:
+                self._valores[i].append(0)
+            elif tipo == FECHA:
+                self._valores[i].append(_a_micro(valor))
+            else:
+                self._valores[i].append(int(valor))
+        self.filas += 1
+
+    def extremos(self, nombre):
+        """(mínimo, máximo) de una columna entera"""
+        valores = self._valores[[c for c, _ in self.columnas].index(nombre)]
+        return (min(valores), max(valores)) if valores else (None, None)
+
+    def escribir(self, ruta, tabla, mes, llave):
+        """Escribe el archivo del mes (reemplaza el anterior solo cuando está completo)"""
+        meta = {'version': VERSION, 'tabla': tabla, 'mes': mes, 'filas': self.filas, 'columnas': []}
+        temporal = ruta + '.tmp'
+
+        with zipfile.ZipFile(temporal, 'w', zipfile.ZIP_DEFLATED, compresslevel=6) as z:
+            for i, (nombre, tipo) in enumerate(self.columnas):
+                valores = self._valores[i]
+                delta = nombre == llave or tipo == FECHA
+                if delta and valores:
+                    valores = array('q', [valores[0]]) + array('q', map(int.__sub__, valores[1:], valores))
+                nulos = any(self._nulos[i])
+
+                z.writestr(f'{nombre}.i64', _a_bytes(valores))
+                if tipo == TEXTO:
+                    z.writestr(f'{nombre}.txt', bytes(self._texto[i]))
+                if nulos:
+                    z.writestr(f'{nombre}.nul', bytes(self._nulos[i]))
+                meta['columnas'].append({'nombre': nombre, 'tipo': tipo, 'delta': delta, 'nulos': nulos})
+            z.writestr('meta.json', json.dumps(meta))
+
+        with open(temporal, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+
+
+class MesArchivado:
+    """Un mes archivado: las columnas se descomprimen solo cuando se piden"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._zip = zipfile.ZipFile(ruta)
+        self.meta = json.loads(self._zip.read('meta.json'))
+        self.filas = self.meta['filas']
+        self._columnas = {c['nombre']: c for c in self.meta['columnas']}
+        self._enteros = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    def cerrar(self):
+        self._zip.close()
+
+    def enteros(self, nombre):
+        """Columna como array('q') (fechas en microsegundos, texto: posiciones)"""
+        valores = self._enteros.get(nombre)
+        if valores is None:
+            valores = _de_bytes(self._zip.read(f'{nombre}.i64'))
+            if self._columnas[nombre]['delta']:
+                valores = array('q', accumulate(valores))
+            self._enteros[nombre] = valores
+        return valores
+
+    def nulos(self, nombre):
+        """Un byte por fila (1 = NULL), o None si la columna no tiene nulos"""
+        return self._zip.read(f'{nombre}.nul') if self._columnas[nombre]['nulos'] else None
+
+    def _lector(self, nombre):
+        """Función posición -> valor de Python de la columna"""
+        tipo = self._columnas[nombre]['tipo']
+        valores = self.enteros(nombre)
+
+        if tipo == TEXTO:
+            texto = self._zip.read(f'{nombre}.txt')
+
+            def valor(i):
+                return texto[valores[i]:valores[i + 1]].decode('utf-8')
+        elif tipo == FECHA:
+            def valor(i):
+                return _de_micro(valores[i])
+        else:
+            valor = valores.__getitem__
+
+        nulos = self.nulos(nombre)
+        if nulos is None:
+            return valor
+        return lambda i: None if nulos[i] else valor(i)
+
+    def seleccionar(self, columna_fecha, desde=None, hasta=None, **filtros):
+        """
+        Posiciones de las filas con fecha en [desde, hasta) que cumplen los
+        filtros (columna=valor o columna=conjunto de valores). Se evalúa sobre
+        las columnas enteras, sin armar filas.
+        """
+        posiciones = range(self.filas)
+        if desde is not None or hasta is not None:
+            fechas = self.enteros(columna_fecha)
+            minimo = _a_micro(desde) if desde is not None else -2 ** 63
+            maximo = _a_micro(hasta) if hasta is not None else 2 ** 63 - 1
+            posiciones = [i for i in posiciones if minimo <= fechas[i] < maximo]
+
+        for columna, valor in filtros.items():
+            if valor is None:
+                continue
+            valores = self.enteros(columna)
+            if isinstance(valor, (set, frozenset)):
+                posiciones = [i for i in posiciones if valores[i] in valor]
+            else:
+                posiciones = [i for i in posiciones if valores[i] == valor]
+        return list(posiciones)
+
+    def leer_filas(self, posiciones, columnas):
+        """Tuplas con los valores de 'columnas' en las posiciones dadas"""
+        lectores = [self._lector(nombre) for nombre in columnas]
+        for i in posiciones:
+            yield tuple(lector(i) for lector in lectores)
+
+
+# =============================================
+# CARPETA DEL ARCHIVO Y MANIFIESTO
+# =============================================
+
+class ArchivoHistorico:
+    """
+    Carpeta con los meses archivados y su manifiesto. El manifiesto se
+    vuelve a leer cuando otro proceso (el trabajo de archivado) lo cambia.
+    """
+
+    def __init__(self, carpeta):
+        self.carpeta = carpeta
+        self._lock = threading.Lock()
+        self._manifest = {'version': VERSION, 'tablas': {}}
+        self._mtime = None
+
+    @property
+    def ruta_manifest(self):
+        return os.path.join(self.carpeta, MANIFEST)
+
+    def ruta(self, tabla, mes):
+        return os.path.join(self.carpeta, tabla, f'{tabla}_{mes}.zip')
+
+    def _leer(self):
+        """Manifiesto actual (vacío si todavía no se ha archivado nada)"""
+        try:
+            mtime = os.stat(self.ruta_manifest).st_mtime_ns
+        except OSError:
+            return self._manifest
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.ruta_manifest, encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+                self._mtime = mtime
+            return self._manifest
+
+    def registrar(self, tabla, mes, datos):
+        """Actualiza la entrada de un mes y reescribe el manifiesto de forma atómica"""
+        manifest = self._leer()
+        with self._lock:
+            entrada = manifest['tablas'].setdefault(tabla, {}).setdefault(mes, {})
+            entrada.update(datos)
+
+            os.makedirs(self.carpeta, exist_ok=True)
+            temporal = self.ruta_manifest + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=1, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, self.ruta_manifest)
+            self._mtime = os.stat(self.ruta_manifest).st_mtime_ns
+            return dict(entrada)
+
+    def info(self, tabla, mes):
+        entrada = self._leer()['tablas'].get(tabla, {}).get(mes)
+        return dict(entrada) if entrada else None
+
+    def meses(self, tabla, desde=None, hasta=None):
+        """
+        Meses archivados de 'tabla' que se cruzan con [desde, hasta)
+
+        Returns:
+            list: Pares (AAAA-MM, entrada del manifiesto) en orden
+        """
+        meses = []
+        for mes, entrada in sorted(self._leer()['tablas'].get(tabla, {}).items()):
+            inicio = _inicio_mes(mes)
+            if desde is not None and _sumar_meses(inicio, 1) <= _fecha(desde):
+                continue
+            if hasta is not None and inicio >= _fecha(hasta, arriba=True):
+                continue
+            meses.append((mes, dict(entrada)))
+        return meses
+
+    def archivado_hasta(self, tabla):
+        """
+        Returns:
+            date: Primer día después del último mes archivado, o None
+        """
+        meses = self._leer()['tablas'].get(tabla)
+        return _sumar_meses(_inicio_mes(max(meses)), 1) if meses else None
+
+    def abrir(self, tabla, mes):
+        return MesArchivado(self.ruta(tabla, mes))
+
+    def leer(self, tabla, columnas, desde=None, hasta=None, descendente=False, **filtros):
+        """
+        Filas archivadas con fecha en [desde, hasta) que cumplen los filtros
+
+        Yields:
+            tuple: Valores de 'columnas', en orden de fecha y llave
+        """
+        llave, columna_fecha = TABLAS_ARCHIVO[tabla][:2]
+        for mes, _ in sorted(self.meses(tabla, desde, hasta), reverse=descendente):
+            with self.abrir(tabla, mes) as archivado:
+                posiciones = archivado.seleccionar(columna_fecha, desde, hasta, **filtros)
+                fechas, llaves = archivado.enteros(columna_fecha), archivado.enteros(llave)
+                posiciones.sort(key=lambda i: (fechas[i], llaves[i]), reverse=descendente)
+                yield from archivado.leer_filas(posiciones, columnas)
+
+    def verificar(self, tabla, mes):
+        """El archivo del mes existe, está íntegro y coincide con el manifiesto"""
+        entrada = self.info(tabla, mes)
+        ruta = self.ruta(tabla, mes)
+        if not entrada or not os.path.exists(ruta) or _sha256(ruta) != entrada['sha256']:
+            return False
+        with zipfile.ZipFile(ruta) as z:
+            if z.testzip() is not None:
+                return False
+            return json.loads(z.read('meta.json'))['filas'] == entrada['filas']
+
+
+def _fecha(valor, arriba=False):
+    """date de un date/datetime (con arriba=True, un datetime a media noche no sube de día)"""
+    if isinstance(valor, datetime):
+        if arriba and valor.time() != datetime.min.time():
+            return valor.date() + timedelta(days=1)
+        return valor.date()
+    return valor
+
+
+# =============================================
+# ARCHIVADO (LECTURA DE LA BD Y BORRADO POR LOTES)
+# =============================================
+
+class ArchivoOcupado(Exception):
+    """Ya hay otro proceso archivando en la misma carpeta"""
+
+
+@contextmanager
+def _bloqueo(carpeta, vencimiento=6 * 3600):
+    """Archivo de bloqueo: un solo archivado a la vez (trabajo programado o script)"""
+    os.makedirs(carpeta, exist_ok=True)
+    ruta = os.path.join(carpeta, '.archivando')
+    try:
+        fd = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if time.time() - os.path.getmtime(ruta) < vencimiento:
+            raise ArchivoOcupado('Ya hay un archivado en curso')
+        # Quedó de un proceso que terminó sin limpiar
+        os.remove(ruta)
+        fd = os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    os.write(fd, str(os.getpid()).encode())
+    os.close(fd)
+    try:
+        yield
+    finally:
+        os.remove(ruta)
+
+
+def meses_por_archivar(tabla, corte):
+    """
+    Returns:
+        list: Filas (anio, mes, filas) con fecha anterior a 'corte'
+    """
+    from app.database import execute_query
+
+    _, columna_fecha, condicion, _ = TABLAS_ARCHIVO[tabla]
+    extra = f" AND {condicion}" if condicion else ""
+    return execute_query(f"""
+        SELECT YEAR({columna_fecha}) AS anio, MONTH({columna_fecha}) AS mes, COUNT(*) AS filas
+        FROM {tabla}
+        WHERE {columna_fecha} < ?{extra}
+        GROUP BY YEAR({columna_fecha}), MONTH({columna_fecha})
+        ORDER BY anio, mes
+    """, (corte,))
+
+
+def _archivar_mes(archivo, tabla, desde, hasta):
+    """
+    Escribe el archivo del mes con sus filas de la BD
+
+    Si el mes ya estaba archivado (una ejecución anterior se interrumpió
+    antes de terminar de borrar) se conserva lo archivado y se agregan solo
+    las filas que no están en el archivo.
+
+    Returns:
+        dict: Entrada del manifiesto
+    """
+    from app.database import stream_query
+
+    llave, columna_fecha, condicion, columnas = TABLAS_ARCHIVO[tabla]
+    mes = _clave_mes(desde)
+    nombres = [nombre for nombre, _ in columnas]
+    posicion_llave = nombres.index(llave)
+    datos = ColumnasMes(columnas)
+
+    previo = archivo.info(tabla, mes)
+    archivadas = set()
+    if previo is not None:
+        # Parte del mes pudo borrarse ya de la BD: rehacerlo solo con la BD perdería esas filas
+        if not archivo.verificar(tabla, mes):
+            raise RuntimeError(f'El archivo de {tabla} {mes} está dañado o no coincide con el manifiesto')
+        with archivo.abrir(tabla, mes) as archivado:
+            archivadas = set(archivado.enteros(llave))
+            for fila in archivado.leer_filas(range(archivado.filas), nombres):
+                datos.agregar(fila)
+
+    extra = f" AND {condicion}" if condicion else ""
+    nuevas = 0
+    for fila in stream_query(f"""
+        SELECT {', '.join(nombres)}
+        FROM {tabla}
+        WHERE {columna_fecha} >= ? AND {columna_fecha} < ?{extra}
+        ORDER BY {llave}
+    """, (desde, hasta)):
+        if fila[posicion_llave] not in archivadas:
+            datos.agregar(fila)
+            nuevas += 1
+
+    if previo is not None and not nuevas:
+        return previo
+
+    ruta = archivo.ruta(tabla, mes)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    datos.escribir(ruta, tabla, mes, llave)
+    llave_minima, llave_maxima = datos.extremos(llave)
+    return archivo.registrar(tabla, mes, {
+        'archivo': os.path.relpath(ruta, archivo.carpeta).replace(os.sep, '/'),
+        'filas': datos.filas,
+        'llave_minima': llave_minima,
+        'llave_maxima': llave_maxima,
+        'bytes': os.path.getsize(ruta),
+        'sha256': _sha256(ruta),
+        'archivado': datetime.now().isoformat(timespec='seconds'),
+        'borradas': (previo or {}).get('borradas', 0),
+        'completo': False
+    })
+
+
+def _marcar_horizonte(tabla, hasta):
+    """
+    Guarda en la BD hasta dónde está archivada la tabla: los procedimientos
+    que recalculan MovimientosDiarios desde Movimientos no tocan esos meses
+    """
+    from app.database import execute_query
+
+    execute_query("""
+        MERGE HistoricoArchivado WITH (HOLDLOCK) AS h
+        USING (SELECT ? AS tabla, CAST(? AS DATE) AS archivado_hasta) AS n
+        ON h.tabla = n.tabla
+        WHEN MATCHED AND h.archivado_hasta < n.archivado_hasta THEN
+            UPDATE SET archivado_hasta = n.archivado_hasta, fecha_actualizacion = GETDATE()
+        WHEN NOT MATCHED THEN
+            INSERT (tabla, archivado_hasta) VALUES (n.tabla, n.archivado_hasta);
+    """, (tabla, hasta), fetch=False)
+
+
+def _borrar_mes(tabla, entrada, desde, hasta, lote, pausa, avance=None):
+    """
+    Borra de la tabla las filas archivadas del mes, 'lote' filas por
+    transacción: cada DELETE bloquea pocas filas (sin escalar a la tabla)
+    y los movimientos del día siguen registrándose entre lotes.
+
+    Returns:
+        int: Filas borradas
+    """
+    from app.database import execute_query, es_interbloqueo
+
+    llave, columna_fecha, condicion, _ = TABLAS_ARCHIVO[tabla]
+    extra = f" AND {condicion}" if condicion else ""
+    # Rango de llaves primero: búsqueda en el índice clustered, no recorrido
+    query = f"""
+        DELETE TOP (?) FROM {tabla} WITH (ROWLOCK)
+        WHERE {llave} >= ? AND {llave} <= ?
+            AND {columna_fecha} >= ? AND {columna_fecha} < ?{extra}
+    """
+    params = (lote, entrada['llave_minima'], entrada['llave_maxima'], desde, hasta)
+
+    total = 0
+    reintentos = 0
+    while True:
+        try:
+            borradas = execute_query(query, params, fetch=False)
+        except Exception as e:
+            if not es_interbloqueo(e) or reintentos >= 3:
+                raise
+            reintentos += 1
+            time.sleep(pausa * 10 * reintentos)
+            continue
+
+        total += borradas
+        if avance is not None:
+            avance(borradas)
+        if borradas < lote:
+            return total
+        if pausa:
+            time.sleep(pausa)
+
+
+def archivar_tabla(archivo, tabla, corte, lote=1000, pausa=0.05, avance=None):
+    """
+    Archiva y borra de la tabla las filas con fecha anterior a 'corte'
+    (primer día de un mes), un mes a la vez: escribir el archivo, verificarlo,
+    registrarlo en el manifiesto y recién entonces borrar.
+
+    Args:
+        avance (callable): Recibe (tabla, mes, filas borradas en el último lote)
+
+    Returns:
+        dict: {'meses': n, 'archivadas': filas en archivo, 'borradas': filas borradas}
+    """
+    resultado = {'meses': 0, 'archivadas': 0, 'borradas': 0}
+
+    for fila in meses_por_archivar(tabla, corte):
+        desde = date(fila.anio, fila.mes, 1)
+        hasta = _sumar_meses(desde, 1)
+        mes = _clave_mes(desde)
+
+        entrada = _archivar_mes(archivo, tabla, desde, hasta)
+        if not archivo.verificar(tabla, mes):
+            raise RuntimeError(f'El archivo de {tabla} {mes} no coincide con el manifiesto; no se borra nada')
+
+        _marcar_horizonte(tabla, hasta)
+        borradas = _borrar_mes(
+            tabla, entrada, desde, hasta, lote, pausa,
+            (lambda n, mes=mes: avance(tabla, mes, n)) if avance is not None else None
+        )
+        archivo.registrar(tabla, mes, {
+            'borradas': entrada.get('borradas', 0) + borradas,
+            'completo': True
+        })
+
+        resultado['meses'] += 1
+        resultado['archivadas'] += entrada['filas']
+        resultado['borradas'] += borradas
+
+    return resultado
+
+
+def corte_retencion(meses, hoy=None):
+    """
+    Returns:
+        date: Primer día del mes más antiguo que se conserva en la BD
+    """
+    hoy = hoy or date.today()
+    return _sumar_meses(date(hoy.year, hoy.month, 1), -meses)
+
+
+def archivar_historicos(archivo, retencion, lote=1000, pausa=0.05, avance=None, hoy=None):
+    """
+    Archiva todas las tablas según su retención
+
+    Args:
+        retencion (dict): tabla -> meses completos que se conservan en la BD
+                          además del mes en curso (0 o None = no se archiva)
+
+    Returns:
+        dict: tabla -> resultado de archivar_tabla
+    """
+    resultado = {}
+    with _bloqueo(archivo.carpeta):
+        for tabla, meses in retencion.items():
+            if tabla not in TABLAS_ARCHIVO or not meses:
+                continue
+            corte = corte_retencion(meses, hoy)
+            resultado[tabla] = archivar_tabla(archivo, tabla, corte, lote, pausa, avance)
+    return resultado
+
+
+@tarea('archivar_historicos')
+def tarea_archivar_historicos(trabajo):
+    """Archivado programado (JOBS_SCHEDULE) en un proceso de trabajo"""
+    config = current_app.config
+    if not config.get('ARCHIVE_ENABLED', False):
+        return {'tablas': {}}
+
+    borradas = 0
+
+    def avance(tabla, mes, n):
+        nonlocal borradas
+        borradas += n
+        trabajo.progreso(borradas, None, f'{tabla} {mes}: {borradas:,} filas archivadas')
+
+    resultado = archivar_historicos(
+        get_archivo_historico(),
+        config.get('ARCHIVE_RETENTION_MONTHS', {}),
+        lote=config.get('ARCHIVE_DELETE_BATCH', 1000),
+        pausa=config.get('ARCHIVE_DELETE_PAUSE', 0.05),
+        avance=avance
+    )
+    trabajo.progreso(borradas, borradas, f'{borradas:,} filas archivadas', forzar=True)
+    return {'tablas': resultado}
+
+
+_crear_lock = threading.Lock()
+
+
+def get_archivo_historico():
+    """
+    Obtiene el archivo histórico de la aplicación
+
+    Returns:
+        ArchivoHistorico: Meses archivados y su manifiesto
+    """
+    app = current_app._get_current_object()
+
+    archivo = app.extensions.get('archivo_historico')
+    if archivo is None:
+        with _crear_lock:
+            archivo = app.extensions.get('archivo_historico')
+            if archivo is None:
+                archivo = ArchivoHistorico(app.config.get('ARCHIVE_PATH', 'archivo'))
+                app.extensions['archivo_historico'] = archivo
+    return archivo
@@ -0,0 +1,288 @@
+# =============================================
+# REPORTES HISTÓRICOS SOBRE EL ALMACÉN ANALÍTICO
+# app/services/historical_analytics.py
+# =============================================
+
+from datetime import date, timedelta
+
+from app.services.analytics_store import a_segundos, de_segundos
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy se recorre fila por fila (mismo resultado)
+    np = None
+
+
+# Las consultas 6.4 a 6.7 de bd/ConsultasUtiles.sql, calculadas sobre las
+# particiones mensuales en lugar de Movimientos: un solo recorrido por
+# columnas da, por producto, los movimientos, entradas, salidas y el último
+# movimiento del rango; lo demás sale de la foto de Productos del almacén.
+REPORTES = {
+    'rotacion': ('Rotación de inventario', 90, [
+        ('sku', 'SKU'), ('nombre_producto', 'Producto'), ('stock_actual', 'Stock'),
+        ('total_movimientos', 'Movimientos'), ('total_entradas', 'Entradas'), ('total_salidas', 'Salidas')
+    ]),
+    'ventas_categoria': ('Ventas por categoría', 30, [
+        ('nombre_categoria', 'Categoría'), ('productos_vendidos', 'Productos vendidos'),
+        ('total_unidades', 'Unidades'), ('ingresos_estimados', 'Ingresos estimados')
+    ]),
+    'sin_movimiento': ('Productos sin movimiento', 60, [
+        ('sku', 'SKU'), ('nombre_producto', 'Producto'), ('stock_actual', 'Stock'),
+        ('valor_inmovilizado', 'Valor inmovilizado'), ('ultimo_movimiento', 'Último movimiento')
+    ]),
+    'rentabilidad': ('Rentabilidad por producto', 90, [
+        ('sku', 'SKU'), ('nombre_producto', 'Producto'), ('precio_compra', 'Precio compra'),
+        ('precio_venta', 'Precio venta'), ('margen_unitario', 'Margen unitario'),
+        ('porcentaje_margen', '% Margen'), ('stock_actual', 'Stock'),
+        ('utilidad_potencial', 'Utilidad potencial'), ('unidades_vendidas', 'Unidades vendidas'),
+        ('utilidad_estimada', 'Utilidad estimada')
+    ])
+}
+
+ENTRADA, SALIDA = 1, 2
+
+
+# =============================================
+# RECORRIDO POR PRODUCTO
+# =============================================
+
+def _clases_tipo(tipos):
+    """id_tipo_movimiento -> ENTRADA / SALIDA (AJUSTE y desconocidos: 0)"""
+    clases = {'SUMA': ENTRADA, 'RESTA': SALIDA}
+    return {
+        id_tipo: clases.get(afecta, 0)
+        for id_tipo, afecta in zip(tipos['id_tipo_movimiento'], tipos['afecta_stock'])
+    }
+
+
+def _recorrer_numpy(particiones, minimo, maximo, clases, n, completo):
+    movimientos = np.zeros(n, dtype=np.int64)
+    entradas = np.zeros(n, dtype=np.float64)
+    salidas = np.zeros(n, dtype=np.float64)
+    ultimo = np.full(n, -1, dtype=np.int64)
+
+    for particion in particiones:
+        if not particion.filas:
+            continue
+        ids = particion.columna('id_producto')
+        fecha = particion.columna('fecha')
+
+        # Solo los meses de los extremos se filtran fila por fila
+        if (minimo is not None and particion.desde < minimo) or (maximo is not None and particion.hasta > maximo):
+            filtro = np.ones(len(ids), dtype=bool)
+            if minimo is not None:
+                filtro &= fecha >= minimo
+            if maximo is not None:
+                filtro &= fecha < maximo
+            ids, fecha = ids[filtro], fecha[filtro]
+        else:
+            filtro = None
+
+        np.maximum.at(ultimo, ids, fecha)
+        if not completo:
+            continue
+
+        tipo = particion.columna('id_tipo_movimiento')
+        cantidad = particion.columna('cantidad')
+        if filtro is not None:
+            tipo, cantidad = tipo[filtro], cantidad[filtro]
+        tabla = np.zeros(max(int(tipo.max()) if len(tipo) else 0, max(clases, default=0)) + 1, dtype=np.int8)
+        for id_tipo, clase in clases.items():
+            tabla[id_tipo] = clase
+        clase = tabla[tipo]
+
+        movimientos += np.bincount(ids, minlength=n)
+        entradas += np.bincount(ids, weights=np.where(clase == ENTRADA, cantidad, 0), minlength=n)
+        salidas += np.bincount(ids, weights=np.where(clase == SALIDA, cantidad, 0), minlength=n)
+
+    # bincount devuelve float64: exacto hasta 2**53
+    return {
+        'movimientos': movimientos.tolist(),
+        'entradas': np.rint(entradas).astype(np.int64).tolist(),
+        'salidas': np.rint(salidas).astype(np.int64).tolist(),
+        'ultimo': ultimo.tolist()
+    }
+
+
+def _recorrer_python(particiones, minimo, maximo, clases, n, completo):
+    movimientos, entradas, salidas, ultimo = [0] * n, [0] * n, [0] * n, [-1] * n
+
+    for particion in particiones:
+        if not particion.filas:
+            continue
+        ids = particion.columna('id_producto')
+        fechas = particion.columna('fecha')
+        tipos = particion.columna('id_tipo_movimiento') if completo else ids
+        cantidades = particion.columna('cantidad') if completo else ids
+
+        for id_producto, fecha, tipo, cantidad in zip(ids, fechas, tipos, cantidades):
+            if (minimo is not None and fecha < minimo) or (maximo is not None and fecha >= maximo):
+                continue
+            if fecha > ultimo[id_producto]:
+                ultimo[id_producto] = fecha
+            if completo:
+                movimientos[id_producto] += 1
+                clase = clases.get(tipo, 0)
+                if clase == ENTRADA:
+                    entradas[id_producto] += cantidad
+                elif clase == SALIDA:
+                    salidas[id_producto] += cantidad
+
+    return {'movimientos': movimientos, 'entradas': entradas, 'salidas': salidas, 'ultimo': ultimo}
+
+
+def acumular_por_producto(almacen, desde=None, hasta=None, completo=True):
+    """
+    Totales de movimientos por producto en [desde, hasta)
+
+    Args:
+        almacen (AlmacenAnalitico): Almacén con particiones y dimensiones
+        desde, hasta (date): Rango (None = sin límite)
+        completo (bool): False calcula solo el último movimiento (lee dos columnas)
+
+    Returns:
+        dict: movimientos, entradas, salidas y ultimo (segundos, -1 = ninguno),
+              listas indexadas por id_producto
+    """
+    dimensiones = almacen.dimensiones()
+    particiones = almacen.particiones(desde, hasta)
+    minimo = a_segundos(desde) if desde is not None else None
+    maximo = a_segundos(hasta) if hasta is not None else None
+
+    # Un producto creado después de la foto de dimensiones puede aparecer en el mes en curso
+    n = max(dimensiones['productos']['id_producto'], default=0) + 1
+    for particion in particiones:
+        if particion.filas:
+            ids = particion.columna('id_producto')
+            n = max(n, int(ids.max() if np is not None else max(ids)) + 1)
+
+    recorrer = _recorrer_numpy if np is not None else _recorrer_python
+    return recorrer(particiones, minimo, maximo, _clases_tipo(dimensiones['tipos']), n, completo)
+
+
+# =============================================
+# REPORTES
+# =============================================
+
+def _productos(dimensiones, solo_activos=True):
+    productos = dimensiones['productos']
+    campos = list(productos)
+    for valores in zip(*(productos[c] for c in campos)):
+        producto = dict(zip(campos, valores))
+        if not solo_activos or producto['activo']:
+            yield producto
+
+
+def rotacion(almacen, desde, hasta):
+    """6.4: movimientos, entradas y salidas de cada producto activo, de más a menos movido"""
+    totales = acumular_por_producto(almacen, desde, hasta)
+    filas = [
+        {
+            'sku': p['sku'],
+            'nombre_producto': p['nombre_producto'],
+            'stock_actual': p['stock_actual'],
+            'total_movimientos': totales['movimientos'][p['id_producto']],
+            'total_entradas': totales['entradas'][p['id_producto']],
+            'total_salidas': totales['salidas'][p['id_producto']]
+        }
+        for p in _productos(almacen.dimensiones())
+    ]
+    return sorted(filas, key=lambda f: (-f['total_movimientos'], f['sku']))
+
+
+def ventas_por_categoria(almacen, desde, hasta):
+    """6.5: salidas por categoría valoradas al precio de venta actual"""
+    dimensiones = almacen.dimensiones()
+    totales = acumular_por_producto(almacen, desde, hasta)
+    categorias = dict(zip(dimensiones['categorias']['id_categoria'], dimensiones['categorias']['nombre_categoria']))
+
+    por_categoria = {}
+    for p in _productos(dimensiones, solo_activos=False):
+        unidades = totales['salidas'][p['id_producto']]
+        if not unidades or p['id_categoria'] not in categorias:
+            continue
+        fila = por_categoria.setdefault(p['id_categoria'], {
+            'nombre_categoria': categorias[p['id_categoria']],
+            'productos_vendidos': 0,
+            'total_unidades': 0,
+            'ingresos_estimados': 0.0
+        })
+        fila['productos_vendidos'] += 1
+        fila['total_unidades'] += unidades
+        fila['ingresos_estimados'] += unidades * p['precio_venta']
+
+    for fila in por_categoria.values():
+        fila['ingresos_estimados'] = round(fila['ingresos_estimados'], 2)
+    return sorted(por_categoria.values(), key=lambda f: -f['ingresos_estimados'])
+
+
+def sin_movimiento(almacen, desde, hasta):
+    """6.6: productos activos sin movimientos en [desde, hasta), con el último anterior a desde"""
+    ultimo = acumular_por_producto(almacen, hasta=hasta, completo=False)['ultimo']
+    limite = a_segundos(desde)
+
+    filas = []
+    for p in _productos(almacen.dimensiones()):
+        segundos = ultimo[p['id_producto']]
+        if segundos >= limite:
+            continue
+        filas.append({
+            'sku': p['sku'],
+            'nombre_producto': p['nombre_producto'],
+            'stock_actual': p['stock_actual'],
+            'valor_inmovilizado': round(p['stock_actual'] * p['precio_compra'], 2),
+            'ultimo_movimiento': de_segundos(segundos) if segundos >= 0 else None
+        })
+    return sorted(filas, key=lambda f: -f['valor_inmovilizado'])
+
+
+def rentabilidad(almacen, desde, hasta):
+    """6.7: margen de cada producto activo, con lo vendido en el rango y su utilidad"""
+    totales = acumular_por_producto(almacen, desde, hasta)
+
+    filas = []
+    for p in _productos(almacen.dimensiones()):
+        if p['precio_compra'] <= 0:
+            continue
+        margen = p['precio_venta'] - p['precio_compra']
+        vendidas = totales['salidas'][p['id_producto']]
+        filas.append({
+            'sku': p['sku'],
+            'nombre_producto': p['nombre_producto'],
+            'precio_compra': p['precio_compra'],
+            'precio_venta': p['precio_venta'],
+            'margen_unitario': round(margen, 2),
+            'porcentaje_margen': round(margen / p['precio_compra'] * 100, 2),
+            'stock_actual': p['stock_actual'],
+            'utilidad_potencial': round(p['stock_actual'] * margen, 2),
+            'unidades_vendidas': vendidas,
+            'utilidad_estimada': round(vendidas * margen, 2)
+        })
+    return sorted(filas, key=lambda f: (-f['porcentaje_margen'], f['sku']))
+
+
+def generar_reporte(almacen, reporte, desde=None, hasta=None):
+    """
+    Calcula un reporte de REPORTES
+
+    Args:
+        reporte (str): Llave de REPORTES
+        desde, hasta (date): Rango inclusivo (por defecto, los días de REPORTES hasta hoy)
+
+    Returns:
+        tuple: (desde, hasta, filas como dict)
+    """
+    dias = REPORTES[reporte][1]
+    hasta = hasta or date.today()
+    desde = desde or hasta - timedelta(days=dias)
+    fin = hasta + timedelta(days=1)
+
+    if reporte == 'rotacion':
+        filas = rotacion(almacen, desde, fin)
+    elif reporte == 'ventas_categoria':
+        filas = ventas_por_categoria(almacen, desde, fin)
+    elif reporte == 'sin_movimiento':
+        filas = sin_movimiento(almacen, desde, fin)
+    else:
+        filas = rentabilidad(almacen, desde, fin)
+    return desde, hasta, filas
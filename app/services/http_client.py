@@ -0,0 +1,107 @@
+# =============================================
+# CLIENTE HTTP COMPARTIDO - SGI-GuateMart
+# app/services/http_client.py
+# =============================================
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=10):
+    """
+    Obtiene la sesión HTTP compartida.
+    Reutiliza conexiones keep-alive en lugar de abrir una por consulta.
+
+    Args:
+        pool_size (int): Conexiones que se mantienen por host
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = 'SGI-GuateMart/1.0'
+                _session = session
+    return _session
+
+
+class RateLimiter:
+    """
+    Limitador de peticiones por segundo (token bucket).
+    Permite ráfagas de hasta 'burst' peticiones y luego espera lo necesario.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate (float): Peticiones por segundo permitidas
+            burst (int): Máximo de peticiones seguidas sin espera
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, int(rate)))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta que se permita una petición"""
+        self.try_acquire(None)
+
+    def try_acquire(self, timeout=0):
+        """
+        Toma un permiso si hay uno disponible dentro de 'timeout' segundos
+
+        Args:
+            timeout (float): Segundos máximos de espera (0 = no esperar,
+                             None = esperar lo necesario)
+
+        Returns:
+            bool: True si se tomó el permiso
+        """
+        if self.rate <= 0:
+            return True
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (ahora - self._updated) * self.rate)
+                self._updated = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                espera = (1 - self._tokens) / self.rate
+            if limite is not None and ahora + espera > limite:
+                return False
+            time.sleep(espera)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(url, rate, burst=None):
+    """
+    Obtiene el limitador del host de una URL (uno por host)
+
+    Args:
+        url (str): URL a consultar
+        rate (float): Peticiones por segundo para ese host
+        burst (int): Ráfaga máxima
+    """
+    host = urlsplit(url).netloc
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            limiter = _limiters[host] = RateLimiter(rate, burst)
+        return limiter
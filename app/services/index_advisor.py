@@ -0,0 +1,796 @@
+# =============================================
+# ASESOR DE ÍNDICES POR CARGA DE TRABAJO
+# app/services/index_advisor.py
+# =============================================
+
+import re
+import sqlite3
+import time
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.services.query_stats import parametros_de_json
+
+
+# Flujo (asesor_indices.py):
+#   1. Esquema.desde_sql lee bd/CreacionBD.sql (tablas, columnas calculadas,
+#      índices y vistas) y crea el equivalente en una BD SQLite local.
+#   2. copiar_muestra llena esa BD con las filas más recientes de cada tabla.
+#   3. AsesorIndices traduce las sentencias registradas (query_stats) a
+#      SQLite, las reproduce con sus parámetros de ejemplo, arma índices
+#      candidatos con las columnas de sus filtros, uniones y ORDER BY, y
+#      mide cada candidato: el ahorro es el tiempo total registrado en SQL
+#      Server por la fracción que baja la sentencia en SQLite cuando el plan
+#      usa el índice; las escrituras que lo tendrían que mantener (INSERT,
+#      DELETE y UPDATE de sus columnas) restan lo que empeoran. Se elige de
+#      a uno, volviendo a medir con los ya elegidos creados, y al final se verifica que el plan use cada uno.
+# El planificador de SQLite no es el de SQL Server: el resultado es una
+# lista priorizada para revisar, no un plan de ejecución.
+
+
+class NoReproducible(Exception):
+    """La sentencia usa algo de T-SQL que no tiene equivalente en SQLite"""
+
+
+# =============================================
+# ESQUEMA
+# =============================================
+
+_TIPOS = (
+    (re.compile(r'^(INT|INTEGER|BIGINT|SMALLINT|TINYINT|BIT)\b', re.I), 'INTEGER'),
+    (re.compile(r'^(DECIMAL|NUMERIC|MONEY|FLOAT|REAL)\b', re.I), 'REAL'),
+)
+
+_PALABRAS_RESERVADAS = {
+    'SELECT', 'FROM', 'WHERE', 'JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS', 'ON', 'AND', 'OR',
+    'NOT', 'IN', 'IS', 'NULL', 'LIKE', 'BETWEEN', 'ORDER', 'GROUP', 'BY', 'HAVING', 'AS', 'ASC', 'DESC',
+    'LIMIT', 'OFFSET', 'UNION', 'ALL', 'DISTINCT', 'CASE', 'WHEN', 'THEN', 'ELSE', 'END', 'SET', 'UPDATE',
+    'DELETE', 'INSERT', 'INTO', 'VALUES', 'EXISTS', 'WITH', 'OVER', 'PARTITION', 'TOP', 'ROWS', 'FETCH',
+    'NEXT', 'ONLY'
+}
+
+
+def _partir(texto, separador=','):
+    """Divide por el separador fuera de paréntesis y cadenas"""
+    partes, nivel, actual, en_cadena = [], 0, [], False
+    for caracter in texto:
+        if caracter == "'":
+            en_cadena = not en_cadena
+        elif not en_cadena:
+            if caracter == '(':
+                nivel += 1
+            elif caracter == ')':
+                nivel -= 1
+            elif caracter == separador and nivel == 0:
+                partes.append(''.join(actual).strip())
+                actual = []
+                continue
+        actual.append(caracter)
+    if ''.join(actual).strip():
+        partes.append(''.join(actual).strip())
+    return partes
+
+
+def _tipo_sqlite(tipo):
+    for patron, equivalente in _TIPOS:
+        if patron.match(tipo):
+            return equivalente
+    return 'TEXT'
+
+
+class Esquema:
+    """Tablas, índices y vistas de CreacionBD.sql, y su versión SQLite"""
+
+    def __init__(self):
+        self.tablas = {}        # tabla -> {'columnas': [(nombre, tipo)], 'llave': [..], 'calculadas': {col: expr}}
+        self.indices = {}       # nombre -> (tabla, [columnas clave], [columnas INCLUDE], único)
+        self.vistas = {}        # vista -> SELECT (T-SQL)
+
+    @classmethod
+    def desde_sql(cls, texto):
+        esquema = cls()
+
+        for tabla, cuerpo in re.findall(r'CREATE TABLE (\w+) \((.*?)\n\s*\);', texto, re.S):
+            columnas, llave = [], []
+            for definicion in _partir(re.sub(r'--[^\n]*', '', cuerpo)):
+                palabras = definicion.split()
+                primera = palabras[0].upper()
+                if primera == 'PRIMARY':
+                    llave = [c.strip() for c in re.search(r'\((.*)\)', definicion).group(1).split(',')]
+                elif primera not in ('FOREIGN', 'CONSTRAINT', 'UNIQUE', 'CHECK'):
+                    columnas.append((palabras[0], _tipo_sqlite(palabras[1])))
+                    if 'PRIMARY KEY' in definicion.upper():
+                        llave = [palabras[0]]
+                    elif 'UNIQUE' in definicion.upper():
+                        # SQL Server crea un índice único para la restricción
+                        esquema.indices[f'UQ_{tabla}_{palabras[0]}'] = (tabla, [palabras[0]], [], True)
+            esquema.tablas[tabla] = {'columnas': columnas, 'llave': llave, 'calculadas': {}}
+
+        for tabla, columna, expresion in re.findall(
+                r'ALTER TABLE (\w+) ADD (\w+) AS \((.*?)\)\s*PERSISTED', texto, re.S):
+            if tabla in esquema.tablas:
+                esquema.tablas[tabla]['columnas'].append((columna, 'INTEGER'))
+                esquema.tablas[tabla]['calculadas'][columna] = ' '.join(expresion.split())
+
+        for unico, nombre, tabla, clave, incluidas in re.findall(
+                r'CREATE (UNIQUE )?(?:NONCLUSTERED |CLUSTERED )?INDEX (\w+) ON (\w+)\s*\(([^)]*)\)'
+                r'(?:\s*INCLUDE\s*\(([^)]*)\))?', texto):
+            esquema.indices[nombre] = (
+                tabla,
+                [c.strip() for c in clave.split(',')],
+                [c.strip() for c in incluidas.split(',')] if incluidas else [],
+                bool(unico)
+            )
+
+        for vista, consulta in re.findall(r'CREATE VIEW (\w+) AS\s*(.*?);?\s*\nGO', texto, re.S):
+            esquema.vistas[vista] = consulta.strip()
+        return esquema
+
+    def columnas(self, tabla):
+        """Columnas de una tabla o vista"""
+        if tabla in self.tablas:
+            return [c for c, _ in self.tablas[tabla]['columnas']]
+        return list(self.columnas_vista(tabla))
+
+    def columnas_vista(self, vista):
+        """
+        Returns:
+            dict: columna de la vista -> (tabla, columna) de origen, si es directa
+        """
+        consulta = self.vistas[vista]
+        lista = re.search(r'SELECT\s+(.*?)\s+FROM\s', consulta, re.S | re.I).group(1)
+        alias = _alias(_tokens(consulta), self)
+        origen = {}
+        for expresion in _partir(lista):
+            directa = re.match(r'^(\w+)\.(\w+)(?:\s+AS\s+(\w+))?$', expresion, re.I)
+            if directa:
+                tabla = alias.get(directa.group(1).lower())
+                origen[directa.group(3) or directa.group(2)] = (tabla, directa.group(2)) if tabla else None
+            else:
+                nombre = re.search(r'\bAS\s+(\w+)$', expresion, re.I)
+                if nombre:
+                    origen[nombre.group(1)] = None
+        return origen
+
+    def cubierto(self, tabla, columnas):
+        """Indica si un índice existente (o la llave) empieza con esas columnas"""
+        existentes = [self.tablas[tabla]['llave']] + [
+            [c.split()[0] for c in clave] for t, clave, *_ in self.indices.values() if t == tabla
+        ]
+        return any(clave[:len(columnas)] == list(columnas) for clave in existentes)
+
+    def crear_sqlite(self, conn):
+        """Crea tablas, índices y vistas en una conexión SQLite vacía"""
+        for tabla, datos in self.tablas.items():
+            definiciones = []
+            for columna, tipo in datos['columnas']:
+                if columna in datos['calculadas']:
+                    definiciones.append(
+                        f"{columna} {tipo} GENERATED ALWAYS AS ({datos['calculadas'][columna]}) STORED"
+                    )
+                elif datos['llave'] == [columna] and tipo == 'INTEGER':
+                    definiciones.append(f"{columna} INTEGER PRIMARY KEY")
+                else:
+                    definiciones.append(f"{columna} {tipo}")
+            sin_rowid = ''
+            if len(datos['llave']) > 1:
+                # Llave compuesta: en SQL Server es el índice clustered
+                definiciones.append(f"PRIMARY KEY ({', '.join(datos['llave'])})")
+                sin_rowid = ' WITHOUT ROWID'
+            conn.execute(f"CREATE TABLE {tabla} ({', '.join(definiciones)}){sin_rowid}")
+
+        unicas = {}
+        for tabla, clave, _, unico in self.indices.values():
+            if unico:
+                unicas.setdefault(tabla, []).append(clave)
+
+        for nombre, (tabla, clave, incluidas, unico) in self.indices.items():
+            # INCLUDE no existe en SQLite: las columnas incluidas van al final de la clave.
+            # UNIQUE (también si empieza con una clave única, como IX_Productos_SKU) le
+            # dice al planificador que la búsqueda da una sola fila, como sabe SQL Server
+            if any(clave[:len(u)] == u for u in unicas.get(tabla, [])):
+                unico = True
+            tipo = 'UNIQUE INDEX' if unico else 'INDEX'
+            conn.execute(f"CREATE {tipo} {nombre} ON {tabla} ({', '.join(clave + incluidas)})")
+
+        for vista, consulta in self.vistas.items():
+            conn.execute(f"CREATE VIEW {vista} AS {traducir(consulta)[0]}")
+        conn.commit()
+
+
+def _valor_sqlite(valor):
+    """Fechas como texto ordenable (igual en los datos y en los parámetros)"""
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, bool):
+        return int(valor)
+    return valor
+
+
+def copiar_muestra(esquema, conn, leer, filas=200000):
+    """
+    Llena la BD SQLite con las filas más recientes de cada tabla
+
+    Args:
+        leer (callable): (tabla, columnas, llave, n) -> filas; en asesor_indices.py
+                         es un SELECT TOP (n) ... ORDER BY llave DESC en SQL Server
+        filas (int): Máximo de filas por tabla
+
+    Returns:
+        dict: tabla -> filas copiadas
+    """
+    copiadas = {}
+    for tabla, datos in esquema.tablas.items():
+        columnas = [c for c, _ in datos['columnas'] if c not in datos['calculadas']]
+        insertar = f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})"
+        lote, total = [], 0
+        for fila in leer(tabla, columnas, datos['llave'], filas):
+            lote.append([_valor_sqlite(v) for v in fila])
+            if len(lote) >= 5000:
+                conn.executemany(insertar, lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            conn.executemany(insertar, lote)
+            total += len(lote)
+        copiadas[tabla] = total
+    conn.commit()
+    conn.execute("ANALYZE")
+    return copiadas
+
+
+# =============================================
+# TRADUCCIÓN T-SQL -> SQLITE
+# =============================================
+
+_NO_SOPORTADO = re.compile(
+    r'STRING_SPLIT|OPENJSON|\bAPPLY\b|\bMERGE\b|\bOUTPUT\b|\bEXEC\b|#|@|\bFOR\s+(XML|JSON)\b|'
+    r'\bTRY_CAST\b|\bOBJECT_ID\b|\bINTO\s+\w+\s+FROM\b|;\s*\S',
+    re.I
+)
+_SUGERENCIAS = re.compile(r'\bWITH\s*\(\s*\w+(?:\s*,\s*\w+)*\s*\)', re.I)
+_TOP = re.compile(r'^\s*SELECT\s+(DISTINCT\s+)?TOP\s*(?:\(([^()]+)\)|(\d+))', re.I)
+_OFFSET = re.compile(r'\bOFFSET\s+(\S+)\s+ROWS?\s+FETCH\s+(?:NEXT|FIRST)\s+(\S+)\s+ROWS?\s+ONLY', re.I)
+_UNIDADES = {
+    'YEAR': 'years', 'YY': 'years', 'YYYY': 'years', 'MONTH': 'months', 'MM': 'months', 'M': 'months',
+    'DAY': 'days', 'DD': 'days', 'D': 'days', 'HOUR': 'hours', 'HH': 'hours',
+    'MINUTE': 'minutes', 'MI': 'minutes', 'N': 'minutes', 'SECOND': 'seconds', 'SS': 'seconds', 'S': 'seconds'
+}
+
+
+def _numerar(sql):
+    """? -> ?1, ?2...: la traducción puede cambiar el orden de los argumentos"""
+    partes = re.split(r"('(?:[^']|'')*')", sql)
+    n = 0
+    for i in range(0, len(partes), 2):
+        def siguiente(_):
+            nonlocal n
+            n += 1
+            return f'?{n}'
+        partes[i] = re.sub(r'\?', siguiente, partes[i])
+    return ''.join(partes), n
+
+
+def _funcion(sql, nombre, convertir):
+    """Reemplaza cada llamada nombre(...) por convertir(argumentos)"""
+    patron = re.compile(rf'\b{nombre}\s*\(', re.I)
+    inicio = 0
+    while True:
+        encontrado = patron.search(sql, inicio)
+        if not encontrado:
+            return sql
+        nivel, fin, en_cadena = 1, encontrado.end(), False
+        while nivel:
+            if fin >= len(sql):
+                raise NoReproducible(f'paréntesis sin cerrar en {nombre}')
+            if sql[fin] == "'":
+                en_cadena = not en_cadena
+            elif not en_cadena:
+                nivel += {'(': 1, ')': -1}.get(sql[fin], 0)
+            fin += 1
+        argumentos = [_funcion(a, nombre, convertir) for a in _partir(sql[encontrado.end():fin - 1])]
+        reemplazo = convertir(argumentos)
+        sql = sql[:encontrado.start()] + reemplazo + sql[fin:]
+        inicio = encontrado.start() + len(reemplazo)
+
+
+def _dateadd(args):
+    unidad = args[0].upper()
+    if unidad in ('WEEK', 'WK', 'WW'):
+        return f"datetime({args[2]}, (({args[1]}) * 7) || ' days')"
+    if unidad not in _UNIDADES:
+        raise NoReproducible(f'DATEADD({unidad})')
+    return f"datetime({args[2]}, ({args[1]}) || ' {_UNIDADES[unidad]}')"
+
+
+def _datediff(args):
+    unidad, desde, hasta = args[0].upper(), args[1], args[2]
+    if _UNIDADES.get(unidad) == 'days':
+        return f"CAST(julianday(date({hasta})) - julianday(date({desde})) AS INTEGER)"
+    if _UNIDADES.get(unidad) == 'seconds':
+        return f"CAST(round((julianday({hasta}) - julianday({desde})) * 86400) AS INTEGER)"
+    if _UNIDADES.get(unidad) == 'months':
+        return (f"((CAST(strftime('%Y', {hasta}) AS INTEGER) - CAST(strftime('%Y', {desde}) AS INTEGER)) * 12"
+                f" + CAST(strftime('%m', {hasta}) AS INTEGER) - CAST(strftime('%m', {desde}) AS INTEGER))")
+    raise NoReproducible(f'DATEDIFF({unidad})')
+
+
+def _cast(args):
+    valor, _, tipo = args[0].rpartition(' AS ')
+    if not valor:
+        valor, _, tipo = args[0].rpartition(' as ')
+    tipo = tipo.strip().upper()
+    if tipo == 'DATE':
+        return f"date({valor})"
+    if tipo.startswith(('DATETIME', 'SMALLDATETIME')):
+        return f"datetime({valor})"
+    return f"CAST({valor} AS {_tipo_sqlite(tipo)})"
+
+
+def _parte_fecha(formato):
+    return lambda args: f"CAST(strftime('{formato}', {args[0]}) AS INTEGER)"
+
+
+def traducir(sql):
+    """
+    Traduce una sentencia de la aplicación a SQLite
+
+    Returns:
+        tuple: (sql con parámetros ?1..?n, cantidad de parámetros)
+
+    Raises:
+        NoReproducible: Si usa algo sin equivalente (STRING_SPLIT, APPLY, EXEC...)
+    """
+    sql = re.sub(r'--[^\n]*', ' ', sql).strip().rstrip(';')
+    if _NO_SOPORTADO.search(sql):
+        raise NoReproducible(_NO_SOPORTADO.search(sql).group(0).strip())
+
+    sql, n = _numerar(sql)
+    sql = _SUGERENCIAS.sub('', sql)
+    sql = re.sub(r"\bN'", "'", sql)
+    sql = re.sub(r'\[(\w+)\]', r'"\1"', sql)
+    sql = re.sub(r'\b(GETDATE|SYSDATETIME|CURRENT_TIMESTAMP)\s*\(\s*\)', "datetime('now', 'localtime')", sql, flags=re.I)
+    sql = re.sub(r'\bISNULL\s*\(', 'IFNULL(', sql, flags=re.I)
+    sql = re.sub(r'\bLEN\s*\(', 'LENGTH(', sql, flags=re.I)
+
+    sql = _funcion(sql, 'DATEADD', _dateadd)
+    sql = _funcion(sql, 'DATEDIFF_BIG', _datediff)
+    sql = _funcion(sql, 'DATEDIFF', _datediff)
+    sql = _funcion(sql, 'CAST', _cast)
+    sql = _funcion(sql, 'YEAR', _parte_fecha('%Y'))
+    sql = _funcion(sql, 'MONTH', _parte_fecha('%m'))
+    sql = _funcion(sql, 'DAY', _parte_fecha('%d'))
+
+    limite = None
+    top = _TOP.match(sql)
+    if top:
+        limite = top.group(2) or top.group(3)
+        sql = f"SELECT {top.group(1) or ''}" + sql[top.end():]
+    if re.search(r'\bTOP\b', sql, re.I):
+        raise NoReproducible('TOP en una subconsulta')
+
+    offset = _OFFSET.search(sql)
+    if offset:
+        if limite is not None:
+            raise NoReproducible('TOP y OFFSET juntos')
+        sql = sql[:offset.start()] + f"LIMIT {offset.group(2)} OFFSET {offset.group(1)}" + sql[offset.end():]
+    elif limite is not None:
+        sql = f"{sql} LIMIT {limite}"
+
+    return ' '.join(sql.split()), n
+
+
+# =============================================
+# COLUMNAS USADAS POR UNA SENTENCIA
+# =============================================
+
+_TOKEN = re.compile(r"""
+    (?P<cadena>'(?:[^']|'')*')
+  | (?P<parametro>\?\d*)
+  | (?P<nombre>"[^"]+"|[A-Za-z_][\w$]*(?:\s*\.\s*(?:"[^"]+"|[A-Za-z_][\w$]*))?)
+  | (?P<numero>\d+(?:\.\d+)?)
+  | (?P<op><=|>=|<>|!=|[=<>(),;*+\-/%])
+""", re.X)
+
+_COMPARACIONES = {'=', '<', '>', '<=', '>=', 'IN', 'BETWEEN', 'LIKE'}
+
+
+def _tokens(sql):
+    tokens = []
+    for encontrado in _TOKEN.finditer(sql):
+        tipo = encontrado.lastgroup
+        valor = encontrado.group(0)
+        if tipo == 'nombre':
+            valor = re.sub(r'\s+', '', valor).replace('"', '')
+            if valor.upper() in _PALABRAS_RESERVADAS:
+                tipo, valor = 'palabra', valor.upper()
+        tokens.append((tipo, valor))
+    return tokens
+
+
+def _alias(tokens, esquema):
+    """alias (en minúsculas) -> tabla o vista, de FROM/JOIN/UPDATE/INTO"""
+    alias = {}
+    conocidas = {nombre.lower(): nombre for nombre in list(esquema.tablas) + list(esquema.vistas)}
+    for i, (tipo, valor) in enumerate(tokens[:-1]):
+        if tipo == 'palabra' and valor in ('FROM', 'JOIN', 'UPDATE', 'INTO'):
+            siguiente = tokens[i + 1][1]
+            tabla = conocidas.get(siguiente.lower())
+            if tabla is None:
+                continue
+            alias[tabla.lower()] = tabla
+            j = i + 2
+            if j < len(tokens) and tokens[j] == ('palabra', 'AS'):
+                j += 1
+            if j < len(tokens) and tokens[j][0] == 'nombre' and '.' not in tokens[j][1]:
+                alias[tokens[j][1].lower()] = tabla
+    return alias
+
+
+class _Uso:
+    """Columnas de cada tabla por cómo las usa la sentencia"""
+
+    def __init__(self):
+        self.igualdad = {}     # tabla -> [columnas] en orden de aparición
+        self.rango = {}
+        self.orden = {}
+
+    def agregar(self, clase, tabla, columna):
+        columnas = getattr(self, clase).setdefault(tabla, [])
+        if columna not in columnas:
+            columnas.append(columna)
+
+    def tablas(self):
+        return set(self.igualdad) | set(self.rango) | set(self.orden)
+
+
+def _resolver(referencia, alias, esquema):
+    """alias.columna o columna -> (tabla, columna) de una tabla base"""
+    if '.' in referencia:
+        prefijo, columna = referencia.split('.', 1)
+        origenes = [alias.get(prefijo.lower())]
+    else:
+        columna, origenes = referencia, list(dict.fromkeys(alias.values()))
+
+    for origen in origenes:
+        if origen is None:
+            continue
+        if origen in esquema.tablas:
+            if columna.lower() in (c.lower() for c in esquema.columnas(origen)):
+                return origen, next(c for c in esquema.columnas(origen) if c.lower() == columna.lower())
+        elif origen in esquema.vistas:
+            for nombre, base in esquema.columnas_vista(origen).items():
+                if nombre.lower() == columna.lower():
+                    return base
+    return None
+
+
+def usos(sql, esquema, uso=None):
+    """
+    Columnas de igualdad (filtros y uniones), de rango y de orden por tabla.
+    Si la sentencia lee una vista, se agregan las uniones de la vista.
+    """
+    uso = uso or _Uso()
+    tokens = _tokens(sql)
+    alias = _alias(tokens, esquema)
+
+    def columna(i):
+        if 0 <= i < len(tokens) and tokens[i][0] == 'nombre':
+            return _resolver(tokens[i][1], alias, esquema)
+        return None
+
+    en_set = False
+    for i, (tipo, valor) in enumerate(tokens):
+        if tipo == 'palabra' and valor in ('SET', 'WHERE', 'FROM'):
+            en_set = valor == 'SET'   # las asignaciones de un UPDATE no son filtros
+        if en_set or valor not in _COMPARACIONES or tipo not in ('op', 'palabra'):
+            continue
+        izquierda = columna(i - 1)
+        derecha = columna(i + 1) if valor in ('=', '<', '>', '<=', '>=') else None
+        clase = 'igualdad' if valor in ('=', 'IN') else 'rango'
+        if izquierda and derecha and valor == '=':
+            uso.agregar('igualdad', *izquierda)
+            uso.agregar('igualdad', *derecha)
+        elif izquierda:
+            uso.agregar(clase, *izquierda)
+        elif derecha and tokens[i - 1][0] in ('parametro', 'cadena', 'numero'):
+            uso.agregar(clase, *derecha)
+
+    # ORDER BY / GROUP BY hasta el final de la cláusula
+    for i, (tipo, valor) in enumerate(tokens[:-1]):
+        if tipo == 'palabra' and valor in ('ORDER', 'GROUP') and tokens[i + 1] == ('palabra', 'BY'):
+            nivel = 0
+            for tipo_siguiente, siguiente in tokens[i + 2:]:
+                if siguiente == '(':
+                    nivel += 1
+                elif siguiente == ')':
+                    if nivel == 0:
+                        break
+                    nivel -= 1
+                elif tipo_siguiente == 'palabra' and siguiente in ('LIMIT', 'OFFSET', 'HAVING', 'UNION', 'ORDER'):
+                    break
+                elif tipo_siguiente == 'nombre' and nivel == 0:
+                    resuelta = _resolver(siguiente, alias, esquema)
+                    if resuelta:
+                        uso.agregar('orden', *resuelta)
+
+    for nombre in set(alias.values()):
+        if nombre in esquema.vistas:
+            usos(traducir(esquema.vistas[nombre])[0], esquema, uso)
+    return uso
+
+
+_ESCRITURA = re.compile(r'^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM|DELETE)\s+(\w+)', re.I)
+_SET = re.compile(r'\bSET\b(.*?)(?:\bWHERE\b|\bFROM\b|$)', re.I | re.S)
+
+
+def escritura(sql, esquema):
+    """
+    Tabla que modifica una sentencia y columnas que cambia
+
+    Returns:
+        tuple: (tabla, set de columnas o None si cambia filas completas),
+               o None si no es INSERT, UPDATE ni DELETE sobre una tabla
+    """
+    encontrada = _ESCRITURA.match(sql)
+    if encontrada is None:
+        return None
+    nombres = {t.lower(): t for t in esquema.tablas}
+    objetivo = encontrada.group(2)
+    tabla = nombres.get(objetivo.lower())
+    if tabla is None:
+        # UPDATE p SET ... FROM Productos p
+        origen = re.search(rf'\bFROM\s+(\w+)\s+(?:AS\s+)?{objetivo}\b', sql, re.I)
+        tabla = nombres.get(origen.group(1).lower()) if origen else None
+    if tabla is None:
+        return None
+    if not encontrada.group(1).upper().startswith('UPDATE'):
+        return tabla, None
+    asignaciones = _SET.search(sql)
+    columnas = re.findall(r'(?:^|,)\s*(?:\w+\.)?(\w+)\s*=', asignaciones.group(1)) if asignaciones else []
+    return tabla, {c.lower() for c in columnas}
+
+
+def candidatos(uso, esquema, maximo_columnas=3):
+    """
+    Índices posibles por tabla: cada columna de igualdad sola y seguida de
+    una de rango u orden, todas las de igualdad juntas, y las de rango solas.
+    Se descartan los que ya cubre la llave o un índice existente.
+    """
+    resultado = []
+    for tabla in uso.tablas():
+        if tabla not in esquema.tablas:
+            continue
+        igualdad = uso.igualdad.get(tabla, [])
+        siguientes = [c for c in uso.rango.get(tabla, []) + uso.orden.get(tabla, []) if c not in igualdad]
+
+        opciones = [(c,) for c in igualdad] + [(c,) for c in siguientes]
+        opciones += [(c, s) for c in igualdad for s in siguientes]
+        if len(igualdad) > 1:
+            opciones.append(tuple(igualdad[:maximo_columnas]))
+            opciones += [tuple(igualdad[:maximo_columnas - 1]) + (s,) for s in siguientes[:1]]
+
+        for columnas in dict.fromkeys(opciones):
+            if not esquema.cubierto(tabla, columnas):
+                resultado.append((tabla, columnas))
+    return resultado
+
+
+# =============================================
+# REPRODUCCIÓN Y RECOMENDACIÓN
+# =============================================
+
+def nombre_indice(tabla, columnas, existentes=()):
+    """IX_Movimientos_Producto_Fecha para (id_producto, fecha_movimiento)"""
+    partes = []
+    for columna in columnas:
+        columna = columna[3:] if columna.startswith('id_') else columna.split('_')[0]
+        partes.append(columna.capitalize())
+    nombre = f"IX_{tabla}_{'_'.join(partes)}"
+    base, n = nombre, 2
+    while nombre in existentes:
+        nombre, n = f'{base}_{n}', n + 1
+    return nombre
+
+
+def ddl_sql_server(nombre, tabla, columnas):
+    """Sentencia con el mismo formato que los índices de CreacionBD.sql"""
+    return (f"IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = '{nombre}')\n"
+            f"    CREATE NONCLUSTERED INDEX {nombre} ON {tabla}({', '.join(columnas)});")
+
+
+class Sentencia:
+    """Una sentencia registrada, lista para reproducir en SQLite"""
+
+    def __init__(self, registro, esquema):
+        self.huella = registro['huella']
+        self.sql = registro['sql']
+        self.ejecuciones = registro['ejecuciones']
+        self.tiempo_total = registro['tiempo_total']
+        self.error = None
+        self.traducida = None
+        self.parametros = []
+        self.uso = None
+        self.escribe = None                     # resultado de escritura()
+        self.base = None                        # segundos en SQLite sin los índices propuestos
+        self.restante = self.tiempo_total       # tiempo registrado que todavía se puede ahorrar
+
+        if registro['procedimiento']:
+            self.error = 'procedimiento almacenado (revisar su plan en SQL Server)'
+            return
+        try:
+            self.traducida, n = traducir(registro['ejemplo'])
+            self.parametros = [_valor_sqlite(v) for v in parametros_de_json(registro['parametros'])]
+            if len(self.parametros) != n:
+                raise NoReproducible(f'{n} parámetros en el texto y {len(self.parametros)} registrados')
+            self.uso = usos(self.traducida, esquema)
+            self.escribe = escritura(self.traducida, esquema)
+        except NoReproducible as e:
+            self.error = f'no reproducible: {e}'
+
+    def afecta(self, tabla):
+        """La sentencia lee o modifica la tabla"""
+        return tabla in self.uso.tablas() or (self.escribe is not None and self.escribe[0] == tabla)
+
+    def mantiene(self, tabla, columnas):
+        """Con un índice en esas columnas, la sentencia también lo tendría que actualizar"""
+        if self.escribe is None or self.escribe[0] != tabla:
+            return False
+        cambiadas = self.escribe[1]
+        return cambiadas is None or any(c.lower() in cambiadas for c in columnas)
+
+
+class AsesorIndices:
+    """
+    Reproduce la carga registrada en la BD SQLite de muestra y mide índices
+    candidatos (ver el comentario al inicio del módulo)
+    """
+
+    def __init__(self, conn, esquema, repeticiones=3, mejora_minima=0.2):
+        """
+        Args:
+            conn (sqlite3.Connection): BD creada con Esquema.crear_sqlite y copiar_muestra
+            repeticiones (int): Ejecuciones por medición (se toma la más rápida)
+            mejora_minima (float): Fracción que debe bajar una sentencia para contar
+        """
+        self.conn = conn
+        self.esquema = esquema
+        self.repeticiones = repeticiones
+        self.mejora_minima = mejora_minima
+        conn.isolation_level = None   # las escrituras se reproducen en BEGIN ... ROLLBACK
+
+    def _medir(self, sentencia):
+        mejor = None
+        for _ in range(self.repeticiones):
+            self.conn.execute('BEGIN')
+            try:
+                inicio = time.perf_counter()
+                self.conn.execute(sentencia.traducida, sentencia.parametros).fetchall()
+                duracion = time.perf_counter() - inicio
+            finally:
+                self.conn.execute('ROLLBACK')
+            mejor = duracion if mejor is None else min(mejor, duracion)
+        return mejor
+
+    def _usa(self, sentencia, nombre):
+        plan = self.conn.execute(f"EXPLAIN QUERY PLAN {sentencia.traducida}", sentencia.parametros).fetchall()
+        return any(re.search(rf'\bINDEX {nombre}\b', fila[-1]) for fila in plan)
+
+    def preparar(self, registros):
+        """
+        Traduce y mide sin índices nuevos cada sentencia registrada
+
+        Returns:
+            list: Sentencia (las que fallan quedan con .error)
+        """
+        sentencias = []
+        for registro in registros:
+            sentencia = Sentencia(registro, self.esquema)
+            if sentencia.error is None:
+                try:
+                    sentencia.base = self._medir(sentencia)
+                except sqlite3.Error as e:
+                    sentencia.error = f'no reproducible: {e}'
+            sentencias.append(sentencia)
+        return sentencias
+
+    def _evaluar(self, tabla, columnas, sentencias, nombre='ix_asesor_candidato'):
+        """
+        Returns:
+            tuple: ahorro estimado (s) y [(Sentencia, tiempo con el índice)] de
+                   las que mejoran al menos mejora_minima
+
+        Se miden las sentencias cuyo plan usa el índice y las escrituras que
+        lo tendrían que mantener, aunque su plan no lo use.
+        """
+        self.conn.execute(f"CREATE INDEX {nombre} ON {tabla} ({', '.join(columnas)})")
+        self.conn.execute(f"ANALYZE {nombre}")
+        try:
+            ahorro, beneficiadas = 0.0, []
+            for sentencia in sentencias:
+                usa = self._usa(sentencia, nombre)
+                if not usa and not sentencia.mantiene(tabla, columnas):
+                    continue
+                nuevo = self._medir(sentencia)
+                fraccion = 1 - nuevo / sentencia.base if sentencia.base else 0
+                # Las que empeoran (escrituras que mantienen un índice más) restan
+                if fraccion >= self.mejora_minima or fraccion < 0:
+                    ahorro += sentencia.restante * fraccion
+                if usa and fraccion >= self.mejora_minima:
+                    beneficiadas.append((sentencia, nuevo))
+            return ahorro, beneficiadas
+        finally:
+            self.conn.execute(f"DROP INDEX {nombre}")
+
+    def recomendar(self, sentencias, maximo=10):
+        """
+        Elige índices de a uno: mide todos los candidatos, crea el de mayor
+        ahorro y vuelve a medir los demás con ese índice ya creado, para que
+        dos candidatos que resuelven la misma sentencia no sumen dos veces.
+        Al final verifica que el plan siga usando cada elegido con todos
+        creados. Deja las Sentencia con la base medida con los elegidos.
+
+        Returns:
+            list: dict tabla, columnas, nombre, ddl, ahorro (s en el periodo
+                  registrado), beneficiadas [(Sentencia, veces más rápida)] y
+                  usado (el plan lo sigue usando con todos los elegidos creados)
+        """
+        reproducibles = [s for s in sentencias if s.error is None]
+        pendientes = {}
+        for sentencia in reproducibles:
+            for candidato in candidatos(sentencia.uso, self.esquema):
+                pendientes.setdefault(candidato, None)
+
+        elegidos, nombres = [], set(self.esquema.indices)
+        try:
+            while pendientes and len(elegidos) < maximo:
+                mejor = None
+                for tabla, columnas in list(pendientes):
+                    afectadas = [s for s in reproducibles if s.afecta(tabla)]
+                    ahorro, beneficiadas = self._evaluar(tabla, columnas, afectadas)
+                    if ahorro <= 0 or not beneficiadas:
+                        # Con más índices creados no va a mejorar
+                        del pendientes[(tabla, columnas)]
+                    elif mejor is None or ahorro > mejor[0]:
+                        mejor = (ahorro, tabla, columnas, beneficiadas)
+                if mejor is None:
+                    break
+
+                ahorro, tabla, columnas, beneficiadas = mejor
+                del pendientes[(tabla, columnas)]
+                nombre = nombre_indice(tabla, columnas, nombres)
+                nombres.add(nombre)
+                self.conn.execute(f"CREATE INDEX {nombre} ON {tabla} ({', '.join(columnas)})")
+                self.conn.execute(f"ANALYZE {nombre}")
+                elegidos.append({
+                    'tabla': tabla, 'columnas': columnas, 'nombre': nombre,
+                    'ddl': ddl_sql_server(nombre, tabla, columnas), 'ahorro': ahorro,
+                    'beneficiadas': [(s, s.base / nuevo if nuevo else float('inf'))
+                                     for s, nuevo in sorted(beneficiadas, key=lambda b: -b[0].restante)]
+                })
+
+                # Lo que queda por ahorrar en cada sentencia, ya con este índice
+                for sentencia in reproducibles:
+                    if sentencia.afecta(tabla):
+                        nuevo = self._medir(sentencia)
+                        if sentencia.base:
+                            sentencia.restante *= nuevo / sentencia.base
+                        sentencia.base = nuevo
+
+            for elegido in elegidos:
+                elegido['usado'] = any(self._usa(s, elegido['nombre']) for s, _ in elegido['beneficiadas'])
+        finally:
+            for elegido in elegidos:
+                self.conn.execute(f"DROP INDEX {elegido['nombre']}")
+        return elegidos
+
+
+def base_muestra(esquema, ruta=':memory:'):
+    """Conexión SQLite con el esquema creado (vacía)"""
+    conn = sqlite3.connect(ruta)
+    esquema.crear_sqlite(conn)
+    return conn
@@ -0,0 +1,612 @@
+# =============================================
+# TRABAJOS EN SEGUNDO PLANO (REPORTES, IMPORTACIONES, EXPORTACIONES)
+# app/services/job_runner.py
+# =============================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from functools import partial
+from multiprocessing import get_context
+
+from flask import current_app
+
+
+PENDIENTE = 'PENDIENTE'
+EN_PROCESO = 'EN_PROCESO'
+COMPLETADO = 'COMPLETADO'
+ERROR = 'ERROR'
+CANCELADO = 'CANCELADO'
+TERMINADOS = (COMPLETADO, ERROR, CANCELADO)
+
+# nombre -> (función que corre en el proceso de trabajo, función al terminar en la web)
+_TAREAS = {}
+
+
+class TrabajoCancelado(Exception):
+    """Se lanza dentro de una tarea cuando el usuario pidió cancelarla"""
+
+
+def tarea(nombre, al_terminar=None):
+    """
+    Registra una función como tarea en segundo plano
+
+    La función recibe el Trabajo y los parámetros con que se encoló, corre en
+    un proceso aparte (con su propio contexto de aplicación y pool de BD) y
+    retorna un dict con el resultado. 'al_terminar' recibe ese dict en el
+    proceso web que encoló el trabajo, para actualizar cachés en memoria.
+
+    Debe definirse a nivel de módulo en un módulo que create_app importe,
+    para que el proceso de trabajo la encuentre por nombre.
+    """
+    def decorador(funcion):
+        _TAREAS[nombre] = (funcion, al_terminar)
+        return funcion
+    return decorador
+
+
+# =============================================
+# TABLA DE TRABAJOS (SQLite)
+# =============================================
+
+class JobStore:
+    """
+    Tabla persistente de trabajos en SQLite, compartida por el proceso web
+    y los procesos de trabajo (modo WAL: lecturas sin bloquear escrituras).
+    """
+
+    _CAMPOS = ('id', 'tipo', 'id_usuario', 'descripcion', 'parametros', 'estado', 'hechos',
+               'total', 'mensaje', 'resultado', 'archivo', 'nombre_archivo', 'cancelar',
+               'creado', 'iniciado', 'actualizado', 'terminado')
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        directorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directorio, exist_ok=True)
+
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS trabajos (
+                id TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                id_usuario INTEGER,
+                descripcion TEXT,
+                parametros TEXT NOT NULL,
+                estado TEXT NOT NULL,
+                hechos INTEGER NOT NULL DEFAULT 0,
+                total INTEGER,
+                mensaje TEXT,
+                resultado TEXT,
+                archivo TEXT,
+                nombre_archivo TEXT,
+                cancelar INTEGER NOT NULL DEFAULT 0,
+                creado REAL NOT NULL,
+                iniciado REAL,
+                actualizado REAL,
+                terminado REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_trabajos_usuario ON trabajos(id_usuario, creado)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_trabajos_estado ON trabajos(estado)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS programados (
+                tipo TEXT PRIMARY KEY,
+                ultima REAL NOT NULL DEFAULT 0
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        """Conexión SQLite del hilo actual"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _dict(self, fila):
+        trabajo = dict(zip(self._CAMPOS, fila))
+        trabajo['parametros'] = json.loads(trabajo['parametros'])
+        trabajo['resultado'] = json.loads(trabajo['resultado']) if trabajo['resultado'] else None
+        trabajo['cancelar'] = bool(trabajo['cancelar'])
+        if trabajo['total']:
+            trabajo['porcentaje'] = min(100, round(trabajo['hechos'] * 100 / trabajo['total'], 1))
+        else:
+            trabajo['porcentaje'] = 100 if trabajo['estado'] == COMPLETADO else None
+        return trabajo
+
+    def crear(self, tipo, parametros, id_usuario=None, descripcion=None):
+        """
+        Returns:
+            str: Id del trabajo (PENDIENTE)
+        """
+        id_trabajo = uuid.uuid4().hex
+        conn = self._conn()
+        conn.execute(
+            """
+            INSERT INTO trabajos (id, tipo, id_usuario, descripcion, parametros, estado, creado)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (id_trabajo, tipo, id_usuario, descripcion, json.dumps(parametros), PENDIENTE, time.time())
+        )
+        conn.commit()
+        return id_trabajo
+
+    def obtener(self, id_trabajo):
+        fila = self._conn().execute(
+            f"SELECT {', '.join(self._CAMPOS)} FROM trabajos WHERE id = ?", (id_trabajo,)
+        ).fetchone()
+        return self._dict(fila) if fila else None
+
+    def listar(self, id_usuario=None, limite=50):
+        """Trabajos más recientes (de un usuario o de todos)"""
+        query = f"SELECT {', '.join(self._CAMPOS)} FROM trabajos"
+        params = []
+        if id_usuario is not None:
+            query += " WHERE id_usuario = ?"
+            params.append(id_usuario)
+        query += " ORDER BY creado DESC LIMIT ?"
+        params.append(limite)
+        return [self._dict(fila) for fila in self._conn().execute(query, params)]
+
+    def pendientes(self):
+        return self._conn().execute(
+            "SELECT id, tipo, parametros FROM trabajos WHERE estado = ? ORDER BY creado", (PENDIENTE,)
+        ).fetchall()
+
+    def tomar(self, id_trabajo):
+        """
+        Pasa el trabajo a EN_PROCESO si sigue PENDIENTE
+
+        Returns:
+            bool: False si ya lo tomó otro proceso o se canceló antes de empezar
+        """
+        ahora = time.time()
+        conn = self._conn()
+        tomado = conn.execute(
+            """
+            UPDATE trabajos SET estado = ?, iniciado = ?, actualizado = ?
+            WHERE id = ? AND estado = ? AND cancelar = 0
+            """,
+            (EN_PROCESO, ahora, ahora, id_trabajo, PENDIENTE)
+        ).rowcount
+        conn.commit()
+        return tomado == 1
+
+    def progreso(self, id_trabajo, hechos, total=None, mensaje=None):
+        """
+        Guarda el avance del trabajo
+
+        Returns:
+            bool: True si el usuario pidió cancelarlo
+        """
+        conn = self._conn()
+        conn.execute(
+            """
+            UPDATE trabajos SET hechos = ?, total = COALESCE(?, total),
+                mensaje = COALESCE(?, mensaje), actualizado = ?
+            WHERE id = ?
+            """,
+            (hechos, total, mensaje, time.time(), id_trabajo)
+        )
+        cancelar = conn.execute("SELECT cancelar FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+        conn.commit()
+        return bool(cancelar and cancelar[0])
+
+    def terminar(self, id_trabajo, estado, mensaje=None, resultado=None, archivo=None, nombre_archivo=None):
+        """Marca el trabajo como terminado (si no lo estaba ya)"""
+        ahora = time.time()
+        conn = self._conn()
+        conn.execute(
+            f"""
+            UPDATE trabajos SET estado = ?, mensaje = COALESCE(?, mensaje), resultado = ?,
+                archivo = ?, nombre_archivo = ?, actualizado = ?, terminado = ?
+            WHERE id = ? AND estado NOT IN ({', '.join('?' * len(TERMINADOS))})
+            """,
+            (estado, mensaje, json.dumps(resultado, default=str) if resultado is not None else None,
+             archivo, nombre_archivo, ahora, ahora, id_trabajo, *TERMINADOS)
+        )
+        conn.commit()
+
+    def cancelar(self, id_trabajo):
+        """
+        Un trabajo PENDIENTE se cancela de inmediato; uno EN_PROCESO recibe la
+        marca y se detiene en su siguiente reporte de avance.
+
+        Returns:
+            str: Estado resultante, o None si el trabajo no existe
+        """
+        ahora = time.time()
+        conn = self._conn()
+        conn.execute(
+            """
+            UPDATE trabajos SET
+                cancelar = 1,
+                estado = CASE WHEN estado = ? THEN ? ELSE estado END,
+                mensaje = CASE WHEN estado = ? THEN 'Cancelado antes de iniciar' ELSE mensaje END,
+                terminado = CASE WHEN estado = ? THEN ? ELSE terminado END
+            WHERE id = ? AND estado IN (?, ?)
+            """,
+            (PENDIENTE, CANCELADO, PENDIENTE, PENDIENTE, ahora, id_trabajo, PENDIENTE, EN_PROCESO)
+        )
+        fila = conn.execute("SELECT estado FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+        conn.commit()
+        return fila[0] if fila else None
+
+    def interrumpidos(self, antiguedad):
+        """
+        Marca como ERROR los trabajos EN_PROCESO sin avance en 'antiguedad'
+        segundos (el proceso que los corría terminó con la aplicación)
+        """
+        ahora = time.time()
+        conn = self._conn()
+        marcados = conn.execute(
+            """
+            UPDATE trabajos SET estado = ?, mensaje = 'Interrumpido: la aplicación se reinició', terminado = ?
+            WHERE estado = ? AND COALESCE(actualizado, creado) < ?
+            """,
+            (ERROR, ahora, EN_PROCESO, ahora - antiguedad)
+        ).rowcount
+        conn.commit()
+        return marcados
+
+    def reclamar_programado(self, tipo, intervalo):
+        """
+        Marca como ejecutada ahora una tarea periódica si le toca
+
+        Varios procesos web comparten la tabla: solo el que logra actualizar
+        la fila encola el trabajo.
+
+        Returns:
+            bool: True si este proceso debe encolarla
+        """
+        ahora = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR IGNORE INTO programados (tipo, ultima) VALUES (?, 0)", (tipo,))
+        reclamado = conn.execute(
+            "UPDATE programados SET ultima = ? WHERE tipo = ? AND ultima <= ?",
+            (ahora, tipo, ahora - intervalo)
+        ).rowcount
+        conn.commit()
+        return reclamado == 1
+
+    def purgar(self, antiguedad):
+        """
+        Elimina los trabajos terminados hace más de 'antiguedad' segundos
+
+        Returns:
+            list: Archivos de resultado que quedaron sin trabajo
+        """
+        limite = time.time() - antiguedad
+        conn = self._conn()
+        archivos = [fila[0] for fila in conn.execute(
+            "SELECT archivo FROM trabajos WHERE terminado < ? AND archivo IS NOT NULL", (limite,)
+        )]
+        conn.execute("DELETE FROM trabajos WHERE terminado < ?", (limite,))
+        conn.commit()
+        return archivos
+
+
+# =============================================
+# PROCESO DE TRABAJO
+# =============================================
+
+class Trabajo:
+    """Lo que una tarea ve de su trabajo: avance, cancelación y archivo de resultado"""
+
+    def __init__(self, store, id_trabajo, carpeta, intervalo=0.5):
+        self.store = store
+        self.id = id_trabajo
+        self.carpeta = carpeta
+        self.intervalo = intervalo
+        self.archivo = None
+        self.nombre_archivo = None
+        self._ultimo = 0.0
+
+    def progreso(self, hechos, total=None, mensaje=None, forzar=False):
+        """
+        Reporta el avance (se escribe como máximo cada 'intervalo' segundos)
+
+        Raises:
+            TrabajoCancelado: si el usuario canceló el trabajo
+        """
+        ahora = time.monotonic()
+        if not forzar and ahora - self._ultimo < self.intervalo:
+            return
+        self._ultimo = ahora
+        if self.store.progreso(self.id, hechos, total, mensaje):
+            raise TrabajoCancelado()
+
+    def archivo_resultado(self, nombre_descarga):
+        """
+        Ruta donde la tarea escribe el archivo que el usuario descargará
+
+        Args:
+            nombre_descarga (str): Nombre con que se descarga (define la extensión)
+        """
+        os.makedirs(self.carpeta, exist_ok=True)
+        extension = os.path.splitext(nombre_descarga)[1]
+        self.archivo = os.path.join(self.carpeta, f'{self.id}{extension}')
+        self.nombre_archivo = nombre_descarga
+        return self.archivo
+
+    def _borrar_archivo(self):
+        if self.archivo:
+            try:
+                os.remove(self.archivo)
+            except OSError:
+                pass
+            self.archivo = self.nombre_archivo = None
+
+
+_worker = {}
+
+
+def _iniciar_worker(ruta_db, carpeta, config_name):
+    """Inicializador de cada proceso: tabla de trabajos y aplicación propias"""
+    _worker['store'] = JobStore(ruta_db)
+    _worker['carpeta'] = carpeta
+    _worker['app'] = None
+    if config_name is not None:
+        from app import create_app
+        _worker['app'] = create_app(config_name)
+
+
+def _ejecutar(id_trabajo, tipo, parametros):
+    """Corre una tarea en el proceso de trabajo y deja el estado final en la tabla"""
+    store = _worker['store']
+    if not store.tomar(id_trabajo):
+        return None
+
+    trabajo = Trabajo(store, id_trabajo, _worker['carpeta'])
+    app = _worker['app']
+    try:
+        funcion = _TAREAS[tipo][0]
+        with app.app_context() if app is not None else nullcontext():
+            resultado = funcion(trabajo, **parametros)
+    except TrabajoCancelado:
+        trabajo._borrar_archivo()
+        store.terminar(id_trabajo, CANCELADO, 'Cancelado por el usuario')
+        return None
+    except Exception as e:
+        print(f"Error en trabajo {tipo} {id_trabajo}: {e}")
+        trabajo._borrar_archivo()
+        store.terminar(id_trabajo, ERROR, str(e) or e.__class__.__name__)
+        return None
+
+    store.terminar(id_trabajo, COMPLETADO, 'Completado', resultado,
+                   trabajo.archivo, trabajo.nombre_archivo)
+    return resultado
+
+
+# =============================================
+# PROCESO WEB
+# =============================================
+
+class JobRunner:
+    """
+    Encola trabajos en un pool de procesos para que los hilos web queden
+    libres. El estado vive en JobStore, así que el avance, la cancelación y
+    la descarga funcionan desde cualquier petición (y tras un reinicio los
+    trabajos pendientes se vuelven a encolar).
+    """
+
+    def __init__(self, store, carpeta, max_workers=2, config_name=None, app=None,
+                 antiguedad_interrumpidos=600, ttl_resultados=86400):
+        """
+        Args:
+            store (JobStore): Tabla de trabajos
+            carpeta (str): Carpeta de archivos de resultado
+            max_workers (int): Procesos de trabajo
+            config_name (str): Configuración con que cada proceso crea su aplicación
+                               (None = sin aplicación, para tareas que no usan la BD)
+            app (Flask): Aplicación donde corren las funciones 'al_terminar'
+            antiguedad_interrumpidos (int): Segundos sin avance para dar por perdido un trabajo
+            ttl_resultados (int): Segundos que se conservan los trabajos terminados
+        """
+        self.store = store
+        self.carpeta = carpeta
+        self.max_workers = max_workers
+        self.config_name = config_name
+        self.app = app
+        self.ttl_resultados = ttl_resultados
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._futuros = {}
+        self._programados = {}
+        self._hilo_programados = None
+        self._cerrado = threading.Event()
+
+        store.interrumpidos(antiguedad_interrumpidos)
+        self.purgar()
+        for id_trabajo, tipo, parametros in store.pendientes():
+            self._enviar(id_trabajo, tipo, json.loads(parametros))
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: los procesos no heredan conexiones ni hilos del proceso web
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=get_context('spawn'),
+                    initializer=_iniciar_worker,
+                    initargs=(self.store.path, self.carpeta, self.config_name)
+                )
+            return self._executor
+
+    def _enviar(self, id_trabajo, tipo, parametros):
+        futuro = self._pool().submit(_ejecutar, id_trabajo, tipo, parametros)
+        with self._lock:
+            self._futuros[id_trabajo] = futuro
+        futuro.add_done_callback(partial(self._terminado, id_trabajo, tipo))
+
+    def _terminado(self, id_trabajo, tipo, futuro):
+        """Callback en el proceso web cuando el proceso de trabajo responde"""
+        with self._lock:
+            self._futuros.pop(id_trabajo, None)
+        if futuro.cancelled():
+            return
+
+        error = futuro.exception()
+        if error is not None:
+            # El proceso murió (memoria, kill): la tarea no pudo dejar su estado
+            print(f"Error en trabajo {tipo} {id_trabajo}: {error!r}")
+            self.store.terminar(id_trabajo, ERROR, 'El proceso de trabajo terminó inesperadamente')
+            if isinstance(error, BrokenProcessPool):
+                with self._lock:
+                    self._executor = None
+            return
+
+        resultado = futuro.result()
+        al_terminar = _TAREAS.get(tipo, (None, None))[1]
+        if resultado is not None and al_terminar is not None:
+            try:
+                with self.app.app_context() if self.app is not None else nullcontext():
+                    al_terminar(resultado)
+            except Exception as e:
+                print(f"Error al finalizar trabajo {tipo} {id_trabajo}: {e}")
+
+    def encolar(self, tipo, parametros, id_usuario=None, descripcion=None):
+        """
+        Args:
+            tipo (str): Nombre registrado con @tarea
+            parametros (dict): Argumentos de la tarea (serializables a JSON)
+
+        Returns:
+            str: Id del trabajo
+        """
+        if tipo not in _TAREAS:
+            raise ValueError(f'Tarea desconocida: {tipo}')
+        id_trabajo = self.store.crear(tipo, parametros, id_usuario, descripcion)
+        self._enviar(id_trabajo, tipo, parametros)
+        return id_trabajo
+
+    def cancelar(self, id_trabajo):
+        """
+        Returns:
+            str: Estado resultante, o None si el trabajo no existe
+        """
+        estado = self.store.cancelar(id_trabajo)
+        with self._lock:
+            futuro = self._futuros.get(id_trabajo)
+        if futuro is not None and estado == CANCELADO:
+            futuro.cancel()
+        return estado
+
+    def purgar(self):
+        """Borra los trabajos terminados que vencieron y sus archivos"""
+        for archivo in self.store.purgar(self.ttl_resultados):
+            try:
+                os.remove(archivo)
+            except OSError:
+                pass
+
+    def programar(self, tipo, intervalo, parametros=None, descripcion=None):
+        """
+        Encola una tarea cada 'intervalo' segundos (la primera vez de inmediato
+        si nunca se ha ejecutado). La última ejecución se guarda en JobStore,
+        así un reinicio no la repite antes de tiempo.
+        """
+        if tipo not in _TAREAS:
+            raise ValueError(f'Tarea desconocida: {tipo}')
+        with self._lock:
+            self._programados[tipo] = (intervalo, parametros or {}, descripcion)
+            if self._hilo_programados is None:
+                self._hilo_programados = threading.Thread(
+                    target=self._ciclo_programados, name='trabajos-programados', daemon=True
+                )
+                self._hilo_programados.start()
+
+    def _ciclo_programados(self):
+        while not self._cerrado.is_set():
+            with self._lock:
+                programados = list(self._programados.items())
+            for tipo, (intervalo, parametros, descripcion) in programados:
+                try:
+                    if self.store.reclamar_programado(tipo, intervalo):
+                        self.encolar(tipo, parametros, descripcion=descripcion)
+                except Exception as e:
+                    print(f"Error al encolar tarea programada {tipo}: {e}")
+            self._cerrado.wait(min([60] + [p[0] for _, p in programados]))
+
+    def activos(self):
+        with self._lock:
+            return len(self._futuros)
+
+    def cerrar(self, esperar=True):
+        self._cerrado.set()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=esperar, cancel_futures=True)
+
+
+_crear_lock = threading.Lock()
+
+
+def get_job_runner():
+    """
+    Obtiene el ejecutor de trabajos de la aplicación
+
+    Returns:
+        JobRunner: o None si los trabajos en segundo plano están desactivados
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('JOBS_ENABLED', True):
+        return None
+
+    runner = app.extensions.get('job_runner')
+    if runner is None:
+        with _crear_lock:
+            runner = app.extensions.get('job_runner')
+            if runner is None:
+                runner = JobRunner(
+                    JobStore(app.config.get('JOBS_DB_PATH', 'cache/trabajos.sqlite3')),
+                    app.config.get('JOBS_FOLDER', 'cache/trabajos'),
+                    max_workers=app.config.get('JOBS_MAX_WORKERS', 2),
+                    config_name=app.config.get('CONFIG_NAME', 'default'),
+                    app=app,
+                    antiguedad_interrumpidos=app.config.get('JOBS_STALE_AFTER', 600),
+                    ttl_resultados=app.config.get('JOBS_RESULT_TTL', 86400)
+                )
+                app.extensions['job_runner'] = runner
+    return runner
+
+
+def iniciar_programados():
+    """
+    Programa las tareas periódicas de JOBS_SCHEDULE (una vez por aplicación)
+
+    Se llama antes de cada petición: los procesos de trabajo también crean
+    la aplicación, pero no atienden peticiones y no programan nada.
+    """
+    app = current_app._get_current_object()
+    if app.extensions.get('trabajos_programados'):
+        return
+
+    with _crear_lock:
+        if app.extensions.get('trabajos_programados'):
+            return
+        app.extensions['trabajos_programados'] = True
+
+    programacion = {tipo: intervalo for tipo, intervalo in app.config.get('JOBS_SCHEDULE', {}).items()
+                    if intervalo}
+    runner = get_job_runner() if programacion else None
+    if runner is None:
+        return
+    for tipo, intervalo in programacion.items():
+        try:
+            runner.programar(tipo, intervalo, descripcion='Tarea programada')
+        except ValueError as e:
+            print(f"Error en JOBS_SCHEDULE: {e}")
@@ -0,0 +1,517 @@
+# =============================================
+# IMPORTACIÓN MASIVA DE PRODUCTOS (CSV / XLSX)
+# app/services/product_import.py
+# =============================================
+
+import codecs
+import csv
+import io
+import os
+import re
+import time
+import unicodedata
+import zipfile
+from decimal import Decimal, InvalidOperation
+from xml.etree.ElementTree import iterparse
+
+import pyodbc
+
+from app.database import execute_query, execute_batch
+from app.services.audit_writer import evento, registrar_auditoria
+
+
+FORMATOS_IMPORTACION = {'csv', 'xlsx'}
+LOTE = 1000
+MAX_ERRORES = 1000   # errores que se detallan (el total se cuenta siempre)
+
+# Encabezados aceptados (normalizados) -> campo
+COLUMNAS = {
+    'sku': 'sku',
+    'codigo': 'sku',
+    'codigo_barras': 'codigo_barras',
+    'barcode': 'codigo_barras',
+    'ean': 'codigo_barras',
+    'nombre_producto': 'nombre_producto',
+    'nombre': 'nombre_producto',
+    'producto': 'nombre_producto',
+    'descripcion': 'descripcion',
+    'categoria': 'categoria',
+    'id_categoria': 'categoria',
+    'proveedor': 'proveedor',
+    'id_proveedor': 'proveedor',
+    'nit_proveedor': 'proveedor',
+    'precio_compra': 'precio_compra',
+    'costo': 'precio_compra',
+    'precio_venta': 'precio_venta',
+    'precio': 'precio_venta',
+    'stock_actual': 'stock_actual',
+    'stock': 'stock_actual',
+    'existencia': 'stock_actual',
+    'stock_minimo': 'stock_minimo',
+    'minimo': 'stock_minimo',
+    'stock_maximo': 'stock_maximo',
+    'maximo': 'stock_maximo',
+    'ubicacion': 'ubicacion'
+}
+
+LONGITUDES = {'sku': 50, 'codigo_barras': 50, 'nombre_producto': 150, 'ubicacion': 50}
+
+
+def normalizar_encabezado(texto):
+    """'Código de Barras' -> 'codigo_de_barras'"""
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_')
+
+
+def clave_sku(sku):
+    """SKU como lo compara la collation CI de Productos: 'abc-1' y 'ABC-1' son el mismo"""
+    return sku.casefold()
+
+
+def _campo(encabezado):
+    """Campo de un encabezado; 'codigo_de_barras' se prueba también como 'codigo_barras'"""
+    clave = normalizar_encabezado(encabezado)
+    return COLUMNAS.get(clave) or COLUMNAS.get(clave.replace('_de_', '_'))
+
+
+# =============================================
+# LECTURA EN STREAMING
+# =============================================
+
+def _codificacion(ruta):
+    """UTF-8 (con o sin BOM) si el inicio del archivo lo es; si no, Windows-1252 (Excel en español)"""
+    with open(ruta, 'rb') as f:
+        muestra = f.read(65536)
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(muestra, final=False)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+
+def _filas_csv(ruta):
+    with open(ruta, 'r', encoding=_codificacion(ruta), newline='') as archivo:
+        muestra = archivo.readline()
+        delimitador = max((';', ',', '\t'), key=muestra.count)
+        yield from csv.reader(io.StringIO(muestra), delimiter=delimitador)
+        yield from csv.reader(archivo, delimiter=delimitador)
+
+
+_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_INDICES = {}
+
+
+def _indice_columna(ref):
+    """'C12' -> 2"""
+    letras = ref.rstrip('0123456789')
+    indice = _INDICES.get(letras)
+    if indice is None:
+        indice = 0
+        for letra in letras:
+            indice = indice * 26 + ord(letra) - 64
+        indice = _INDICES[letras] = indice - 1
+    return indice
+
+
+def _primera_hoja(libro):
+    """Ruta dentro del ZIP de la primera hoja del libro"""
+    try:
+        with libro.open('xl/workbook.xml') as f:
+            for _, elem in iterparse(f):
+                if elem.tag == _NS + 'sheet':
+                    rid = elem.get(_NS_REL + 'id')
+                    break
+            else:
+                rid = None
+        with libro.open('xl/_rels/workbook.xml.rels') as f:
+            for _, elem in iterparse(f):
+                if elem.get('Id') == rid:
+                    destino = elem.get('Target').lstrip('/')
+                    return destino if destino.startswith('xl/') else 'xl/' + destino
+    except KeyError:
+        pass
+    return 'xl/worksheets/sheet1.xml'
+
+
+def _textos_compartidos(libro):
+    if 'xl/sharedStrings.xml' not in libro.namelist():
+        return []
+    textos = []
+    with libro.open('xl/sharedStrings.xml') as f:
+        for _, elem in iterparse(f):
+            if elem.tag == _NS + 'si':
+                textos.append(''.join(t.text or '' for t in elem.iter(_NS + 't')))
+                elem.clear()
+    return textos
+
+
+def _numero_texto(valor):
+    """Números de Excel como texto: '7.50123456789E+12' -> '7501234567890', '10.0' -> '10'"""
+    if valor and ('E' in valor or valor.endswith('.0')):
+        try:
+            numero = float(valor)
+            if numero.is_integer():
+                return str(int(numero))
+        except ValueError:
+            pass
+    return valor
+
+
+def _filas_xlsx(ruta):
+    """
+    Lee la primera hoja fila por fila con iterparse, sin cargar el libro:
+    cada fila se libera después de producirla
+    """
+    with zipfile.ZipFile(ruta) as libro:
+        compartidos = _textos_compartidos(libro)
+        with libro.open(_primera_hoja(libro)) as hoja:
+            for _, elem in iterparse(hoja):
+                if elem.tag != _NS + 'row':
+                    continue
+                fila = []
+                for celda in elem.iter(_NS + 'c'):
+                    ref = celda.get('r')
+                    if ref:
+                        indice = _indice_columna(ref)
+                        fila.extend([''] * (indice - len(fila)))
+                    tipo = celda.get('t')
+                    if tipo == 'inlineStr':
+                        valor = ''.join(t.text or '' for t in celda.iter(_NS + 't'))
+                    else:
+                        v = celda.find(_NS + 'v')
+                        valor = v.text if v is not None and v.text is not None else ''
+                        if tipo == 's' and valor:
+                            valor = compartidos[int(valor)]
+                        elif tipo in (None, 'n'):
+                            valor = _numero_texto(valor)
+                    fila.append(valor)
+                elem.clear()
+                yield fila
+
+
+def leer_archivo(ruta):
+    """
+    Filas del archivo (la primera es el encabezado) como listas de texto
+
+    Raises:
+        ValueError: Si el formato no se puede importar
+    """
+    extension = ruta.rsplit('.', 1)[-1].lower()
+    if extension == 'csv':
+        return _filas_csv(ruta)
+    if extension == 'xlsx':
+        return _filas_xlsx(ruta)
+    raise ValueError('Formato no soportado: guarde el archivo como .xlsx o .csv')
+
+
+# =============================================
+# VALIDACIÓN Y ESCRITURA POR LOTES
+# =============================================
+
+def _decimal(texto):
+    """'1,234.50', '1.234,50' y '12,5' -> Decimal"""
+    texto = texto.replace(' ', '').replace('Q', '')
+    if ',' in texto and '.' in texto:
+        if texto.rfind(',') > texto.rfind('.'):
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    elif ',' in texto:
+        texto = texto.replace(',', '.')
+    return Decimal(texto)
+
+
+_SQL_INSERTAR = """
+    INSERT INTO Productos (
+        sku, codigo_barras, nombre_producto, descripcion,
+        id_categoria, id_proveedor, precio_compra, precio_venta,
+        stock_actual, stock_minimo, stock_maximo, ubicacion, activo
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+"""
+
+# Celdas vacías conservan el valor actual. El stock de un producto existente
+# no se toca: solo cambia con movimientos
+_SQL_ACTUALIZAR = """
+    UPDATE Productos SET
+        codigo_barras = COALESCE(?, codigo_barras),
+        nombre_producto = COALESCE(?, nombre_producto),
+        descripcion = COALESCE(?, descripcion),
+        id_categoria = COALESCE(?, id_categoria),
+        id_proveedor = COALESCE(?, id_proveedor),
+        precio_compra = COALESCE(?, precio_compra),
+        precio_venta = COALESCE(?, precio_venta),
+        stock_minimo = COALESCE(?, stock_minimo),
+        stock_maximo = COALESCE(?, stock_maximo),
+        ubicacion = COALESCE(?, ubicacion),
+        fecha_modificacion = GETDATE()
+    WHERE sku = ?
+"""
+
+
+class ImportacionProductos:
+    """
+    Valida las filas contra los SKU, categorías y proveedores cargados una
+    sola vez y escribe los productos por lotes: los SKU nuevos se insertan y
+    los existentes se actualizan. Si un lote falla en la BD se reintenta fila
+    por fila para saber cuál tiene el problema.
+    """
+
+    def __init__(self, skus, categorias, proveedores, lote=LOTE, max_errores=MAX_ERRORES, escribir=None,
+                 progreso=None):
+        """
+        Args:
+            skus (iterable): SKU existentes en Productos
+            categorias (dict): id o nombre normalizado -> id_categoria
+            proveedores (dict): id, NIT o nombre normalizado -> id_proveedor
+            lote (int): Filas por escritura
+            max_errores (int): Errores que se detallan en el resultado
+            escribir (callable): Recibe la lista de sentencias de execute_batch
+            progreso (callable): Recibe las filas leídas después de cada lote
+        """
+        self.skus = {clave_sku(sku) for sku in skus}   # comparados con clave_sku
+        self.categorias = categorias
+        self.proveedores = proveedores
+        self.lote = lote
+        self.max_errores = max_errores
+        self.escribir = escribir or execute_batch
+        self.progreso = progreso
+
+        self.filas = 0
+        self.insertados = 0
+        self.actualizados = 0
+        self.total_errores = 0
+        self.errores = []
+        self._vistos = {}          # clave_sku -> fila donde apareció primero
+        self._nuevos = []          # (fila, parámetros)
+        self._existentes = []
+
+    def error(self, fila, sku, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < self.max_errores:
+            self.errores.append({'fila': fila, 'sku': sku, 'mensaje': mensaje})
+
+    def _buscar(self, tabla, texto):
+        return tabla.get(texto) or tabla.get(normalizar_encabezado(texto))
+
+    def validar(self, numero, valores):
+        """
+        Valida una fila ya mapeada a campos
+
+        Returns:
+            tuple: (sku, es_nuevo, parámetros) o None si la fila tiene errores
+        """
+        sku = valores.get('sku', '')
+        if not sku:
+            self.error(numero, '', 'La fila no tiene SKU')
+            return None
+        clave = clave_sku(sku)
+        if clave in self._vistos:
+            self.error(numero, sku, f'SKU repetido en el archivo (fila {self._vistos[clave]})')
+            return None
+        self._vistos[clave] = numero
+
+        for campo, maximo in LONGITUDES.items():
+            if len(valores.get(campo) or '') > maximo:
+                self.error(numero, sku, f'{campo} admite {maximo} caracteres')
+                return None
+
+        es_nuevo = clave not in self.skus
+        if es_nuevo and not valores.get('nombre_producto'):
+            self.error(numero, sku, 'Producto nuevo sin nombre')
+            return None
+
+        datos = {}
+        try:
+            for campo in ('precio_compra', 'precio_venta'):
+                texto = valores.get(campo)
+                if texto:
+                    precio = _decimal(texto).quantize(Decimal('0.01'))
+                    if precio < 0 or precio >= Decimal('100000000'):
+                        raise ValueError(f'{campo} fuera de rango')
+                    datos[campo] = precio
+            for campo in ('stock_actual', 'stock_minimo', 'stock_maximo'):
+                texto = valores.get(campo)
+                if texto:
+                    numero_stock = _decimal(texto)
+                    if numero_stock != numero_stock.to_integral_value() or not 0 <= numero_stock < 2**31:
+                        raise ValueError(f'{campo} debe ser un entero mayor o igual a 0')
+                    datos[campo] = int(numero_stock)
+        except (InvalidOperation, ValueError) as e:
+            mensaje = str(e) if isinstance(e, ValueError) and str(e) else 'Número no válido'
+            self.error(numero, sku, mensaje)
+            return None
+
+        for campo, tabla, nombre in (
+            ('categoria', self.categorias, 'Categoría'),
+            ('proveedor', self.proveedores, 'Proveedor')
+        ):
+            texto = valores.get(campo)
+            if texto:
+                encontrado = self._buscar(tabla, texto)
+                if encontrado is None:
+                    self.error(numero, sku, f'{nombre} "{texto}" no existe')
+                    return None
+                datos[campo] = encontrado
+
+        def texto(campo):
+            return valores.get(campo) or None
+
+        if es_nuevo:
+            parametros = (
+                sku, texto('codigo_barras'), valores['nombre_producto'], texto('descripcion'),
+                datos.get('categoria'), datos.get('proveedor'),
+                datos.get('precio_compra', 0), datos.get('precio_venta', 0),
+                datos.get('stock_actual', 0), datos.get('stock_minimo', 0),
+                datos.get('stock_maximo', 0), texto('ubicacion')
+            )
+        else:
+            parametros = (
+                texto('codigo_barras'), texto('nombre_producto'), texto('descripcion'),
+                datos.get('categoria'), datos.get('proveedor'),
+                datos.get('precio_compra'), datos.get('precio_venta'),
+                datos.get('stock_minimo'), datos.get('stock_maximo'), texto('ubicacion'),
+                sku
+            )
+        return sku, es_nuevo, parametros
+
+    def _escribir_lote(self):
+        nuevos, existentes = self._nuevos, self._existentes
+        self._nuevos, self._existentes = [], []
+        if not nuevos and not existentes:
+            return
+
+        try:
+            self.escribir([
+                (_SQL_INSERTAR, [p for _, p in nuevos]),
+                (_SQL_ACTUALIZAR, [p for _, p in existentes])
+            ])
+            self.insertados += len(nuevos)
+            self.actualizados += len(existentes)
+        except pyodbc.Error:
+            # El lote se revirtió completo: se reintenta fila por fila
+            for query, filas in ((_SQL_INSERTAR, nuevos), (_SQL_ACTUALIZAR, existentes)):
+                for numero, parametros in filas:
+                    try:
+                        self.escribir([(query, [parametros])])
+                    except pyodbc.Error as e:
+                        sku = parametros[0] if query is _SQL_INSERTAR else parametros[-1]
+                        self.error(numero, sku, f'Error de base de datos: {e.args[-1] if e.args else e}')
+                        if query is _SQL_INSERTAR:
+                            self.skus.discard(clave_sku(sku))
+                        continue
+                    if query is _SQL_INSERTAR:
+                        self.insertados += 1
+                    else:
+                        self.actualizados += 1
+
+    def procesar(self, filas):
+        """
+        Valida y escribe todas las filas
+
+        Args:
+            filas (iterable): Listas de texto; la primera es el encabezado
+
+        Returns:
+            dict: filas, insertados, actualizados, total_errores, errores, segundos
+        """
+        inicio = time.perf_counter()
+        filas = iter(filas)
+        encabezado = next(filas, None)
+        if not encabezado:
+            raise ValueError('El archivo está vacío')
+
+        campos = [_campo(titulo) for titulo in encabezado]
+        if 'sku' not in campos:
+            raise ValueError('El archivo debe tener una columna SKU')
+        columnas = [(i, campo) for i, campo in enumerate(campos) if campo]
+
+        for numero, fila in enumerate(filas, 2):
+            if not any(fila):
+                continue
+            self.filas += 1
+            valores = {
+                campo: (fila[i].strip() if i < len(fila) and fila[i] else '')
+                for i, campo in columnas
+            }
+
+            validada = self.validar(numero, valores)
+            if validada is None:
+                continue
+            sku, es_nuevo, parametros = validada
+            if es_nuevo:
+                self.skus.add(clave_sku(sku))
+                self._nuevos.append((numero, parametros))
+            else:
+                self._existentes.append((numero, parametros))
+
+            if len(self._nuevos) + len(self._existentes) >= self.lote:
+                self._escribir_lote()
+                if self.progreso is not None:
+                    self.progreso(self.filas)
+
+        self._escribir_lote()
+        return self.resultado(time.perf_counter() - inicio)
+
+    def resultado(self, segundos=0.0):
+        return {
+            'filas': self.filas,
+            'insertados': self.insertados,
+            'actualizados': self.actualizados,
+            'total_errores': self.total_errores,
+            'errores': sorted(self.errores, key=lambda e: e['fila']),
+            'segundos': round(segundos, 2)
+        }
+
+
+# =============================================
+# IMPORTACIÓN DESDE LA APLICACIÓN
+# =============================================
+
+def _catalogos():
+    """SKU existentes, categorías y proveedores (una consulta cada uno)"""
+    skus = {fila[0] for fila in execute_query("SELECT sku FROM Productos")}
+
+    categorias = {}
+    for fila in execute_query("SELECT id_categoria, nombre_categoria FROM Categorias"):
+        categorias[str(fila['id_categoria'])] = fila['id_categoria']
+        categorias[normalizar_encabezado(fila['nombre_categoria'])] = fila['id_categoria']
+
+    proveedores = {}
+    for fila in execute_query("SELECT id_proveedor, nit, nombre_proveedor FROM Proveedores"):
+        proveedores[str(fila['id_proveedor'])] = fila['id_proveedor']
+        proveedores[fila['nit']] = fila['id_proveedor']
+        proveedores[normalizar_encabezado(fila['nombre_proveedor'])] = fila['id_proveedor']
+
+    return skus, categorias, proveedores
+
+
+def importar_productos(ruta, lote=LOTE, max_errores=MAX_ERRORES, progreso=None, id_usuario=None, ip_address=None):
+    """
+    Importa un archivo CSV o XLSX de productos
+
+    Args:
+        ruta (str): Archivo subido (en UPLOAD_FOLDER)
+        lote (int): Filas por escritura con fast_executemany
+        progreso (callable): Recibe las filas leídas después de cada lote
+        id_usuario, ip_address: Para la auditoría (por defecto, los de la petición)
+
+    Returns:
+        dict: Resultado de ImportacionProductos.procesar y 'desde' (hora de la BD
+              al iniciar, para sincronizar índices con lo modificado)
+    """
+    filas = leer_archivo(ruta)
+    desde = execute_query("SELECT GETDATE() AS ahora")[0]['ahora']
+    importacion = ImportacionProductos(*_catalogos(), lote=lote, max_errores=max_errores, progreso=progreso)
+    resultado = importacion.procesar(filas)
+    resultado['desde'] = desde
+
+    # Un evento por importación: auditar fila por fila duplicaría la escritura
+    registrar_auditoria([evento(
+        'Productos', 'IMPORTACION',
+        detalles=(f"{os.path.basename(ruta)}: {resultado['insertados']} creados, "
+                  f"{resultado['actualizados']} actualizados, {resultado['total_errores']} filas con errores"),
+        id_usuario=id_usuario, ip_address=ip_address
+    )])
+    return resultado
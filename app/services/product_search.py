@@ -0,0 +1,348 @@
+# =============================================
+# SERVICIO DE BÚSQUEDA DE PRODUCTOS (TRIGRAMAS)
+# app/services/product_search.py
+# =============================================
+
+import json
+import threading
+import time
+import unicodedata
+from array import array
+
+from flask import current_app
+
+from app.database import execute_query
+
+
+# Sin distinguir mayúsculas ni tildes, como normalizar()
+COLLATION_LIKE = 'Latin1_General_CI_AI'
+
+
+def normalizar(texto):
+    """Minúsculas y sin tildes, para comparar igual que la collation CI de SQL Server"""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto))
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def trigramas(texto):
+    """Conjunto de trigramas de un texto ya normalizado"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class TrigramIndex:
+    """
+    Índice en memoria de trigramas sobre SKU y nombre de producto.
+
+    Cada trigrama guarda una lista compacta (array de enteros) de ids. Para
+    buscar se toma la lista del trigrama menos frecuente del término y se
+    verifica la subcadena contra el texto guardado, así que el costo depende
+    de cuántos productos comparten ese trigrama y no del tamaño del catálogo.
+    Al editar un producto se quita su id de los trigramas que ya no tiene.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}    # trigrama -> array('i') de ids
+        self._docs = {}        # id -> (sku, nombre, activo) normalizados
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, id_producto, sku, nombre, activo=True):
+        """Agrega o actualiza un producto en el índice"""
+        sku_n, nombre_n = normalizar(sku), normalizar(nombre)
+
+        nuevos = trigramas(sku_n) | trigramas(nombre_n)
+
+        with self._lock:
+            anterior = self._docs.get(id_producto)
+            ya_indexados = set()
+            if anterior:
+                ya_indexados = trigramas(anterior[0]) | trigramas(anterior[1])
+                self._quitar(id_producto, ya_indexados - nuevos)
+
+            for tri in nuevos - ya_indexados:
+                lista = self._postings.get(tri)
+                if lista is None:
+                    lista = self._postings[tri] = array('i')
+                lista.append(id_producto)
+
+            self._docs[id_producto] = (sku_n, nombre_n, bool(activo))
+
+    def remove(self, id_producto):
+        """Quita un producto del índice"""
+        with self._lock:
+            anterior = self._docs.pop(id_producto, None)
+            if anterior:
+                self._quitar(id_producto, trigramas(anterior[0]) | trigramas(anterior[1]))
+
+    def _quitar(self, id_producto, trigramas_producto):
+        """Quita un id de las listas de esos trigramas (con el lock tomado)"""
+        for tri in trigramas_producto:
+            lista = self._postings.get(tri)
+            if lista is None:
+                continue
+            try:
+                lista.remove(id_producto)
+            except ValueError:
+                continue
+            if not lista:
+                del self._postings[tri]
+
+    def clear(self):
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+
+    def search(self, termino, solo_activos=True, limite=None):
+        """
+        Busca productos cuyo SKU o nombre contiene el término
+
+        Args:
+            termino (str): Texto a buscar (mínimo 3 caracteres)
+            solo_activos (bool): Excluir productos desactivados
+            limite (int): Máximo de resultados; si se excede retorna None
+
+        Returns:
+            list: ids ordenados por relevancia, o None si el término es muy
+                  corto o hay más coincidencias que el límite
+        """
+        term = normalizar(termino).strip()
+        if len(term) < 3:
+            return None
+
+        with self._lock:
+            listas = [self._postings.get(tri) for tri in trigramas(term)]
+            if any(lista is None for lista in listas):
+                return []
+            candidatos = min(listas, key=len)
+
+            encontrados = []
+            vistos = set()
+            for id_producto in candidatos:
+                if id_producto in vistos:
+                    continue
+                vistos.add(id_producto)
+
+                doc = self._docs.get(id_producto)
+                if doc is None or (solo_activos and not doc[2]):
+                    continue
+
+                sku, nombre = doc[0], doc[1]
+                if term in sku or term in nombre:
+                    encontrados.append((self._puntaje(term, sku, nombre), id_producto))
+                    if limite and len(encontrados) > limite:
+                        return None
+
+        encontrados.sort()
+        return [id_producto for _, id_producto in encontrados]
+
+    @staticmethod
+    def _puntaje(term, sku, nombre):
+        """Menor es mejor: SKU exacto, prefijo de SKU, prefijo de nombre, palabra, subcadena"""
+        if sku == term:
+            nivel = 0
+        elif sku.startswith(term):
+            nivel = 1
+        elif nombre.startswith(term):
+            nivel = 2
+        elif (' ' + term) in nombre:
+            nivel = 3
+        else:
+            nivel = 4
+        posicion = nombre.find(term)
+        return (nivel, posicion if posicion >= 0 else len(nombre), len(nombre), nombre)
+
+
+# =============================================
+# ÍNDICE DE LA APLICACIÓN
+# =============================================
+
+_carga_lock = threading.Lock()
+
+
+def _cargar(index, desde=None):
+    """Carga (o sincroniza desde una fecha) los productos en el índice"""
+    query = "SELECT GETDATE() AS ahora"
+    ahora = execute_query(query)[0]['ahora']
+
+    query = "SELECT id_producto, sku, nombre_producto, activo FROM Productos"
+    params = None
+    if desde is not None:
+        query += " WHERE fecha_modificacion >= ?"
+        params = (desde,)
+
+    for fila in execute_query(query, params):
+        index.add(fila['id_producto'], fila['sku'], fila['nombre_producto'], fila['activo'])
+
+    return ahora
+
+
+def _construir(app):
+    """Construye el índice en un hilo; mientras tanto las búsquedas usan LIKE"""
+    intervalo = app.config.get('SEARCH_INDEX_SYNC_INTERVAL', 60)
+    with app.app_context():
+        try:
+            index = TrigramIndex()
+            sincronizado = _cargar(index)
+        except Exception as e:
+            print(f"Error al construir índice de búsqueda: {e}")
+            app.extensions['product_search_carga'] = time.monotonic() + intervalo  # se reintenta
+            return
+
+    app.extensions['product_search'] = {
+        'index': index,
+        'sincronizado': sincronizado,
+        'proxima_sync': time.monotonic() + intervalo
+    }
+
+
+def precargar_indice():
+    """
+    Empieza a construir el índice en segundo plano (una vez por aplicación)
+
+    Se llama antes de cada petición, como iniciar_programados: los procesos
+    de trabajo también crean la aplicación pero no buscan productos.
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('SEARCH_INDEX_ENABLED', True):
+        return
+    if time.monotonic() < app.extensions.get('product_search_carga', 0):
+        return
+
+    with _carga_lock:
+        if time.monotonic() < app.extensions.get('product_search_carga', 0):
+            return
+        app.extensions['product_search_carga'] = float('inf')
+
+    threading.Thread(target=_construir, args=(app,), name='indice-busqueda', daemon=True).start()
+
+
+def get_search_index():
+    """
+    Obtiene el índice de búsqueda de la aplicación, o None si aún se está
+    construyendo (precargar_indice). Luego se sincroniza cada
+    SEARCH_INDEX_SYNC_INTERVAL segundos con los cambios de otros procesos.
+    """
+    app = current_app._get_current_object()
+    estado = app.extensions.get('product_search')
+    if estado is None:
+        return None
+
+    if time.monotonic() >= estado['proxima_sync'] and _carga_lock.acquire(blocking=False):
+        try:
+            estado['proxima_sync'] = time.monotonic() + app.config.get('SEARCH_INDEX_SYNC_INTERVAL', 60)
+            estado['sincronizado'] = _cargar(estado['index'], desde=estado['sincronizado'])
+        except Exception as e:
+            print(f"Error al sincronizar índice de búsqueda: {e}")
+        finally:
+            _carga_lock.release()
+
+    return estado['index']
+
+
+def buscar_productos(termino, solo_activos=True):
+    """
+    Busca ids de productos por SKU o nombre usando el índice
+
+    Returns:
+        list: ids ordenados por relevancia, o None si se debe usar LIKE
+    """
+    if not current_app.config.get('SEARCH_INDEX_ENABLED', True):
+        return None
+    try:
+        index = get_search_index()
+        if index is None:
+            return None
+        return index.search(
+            termino,
+            solo_activos=solo_activos,
+            limite=current_app.config.get('SEARCH_INDEX_MAX_RESULTS', 2000)
+        )
+    except Exception as e:
+        print(f"Error en índice de búsqueda, se usa LIKE: {e}")
+        return None
+
+
+def condicion_producto(filtro, alias='p', solo_activos=True):
+    """
+    Construye la condición SQL para filtrar productos por SKU o nombre
+
+    Con el índice la condición es por llave primaria; si el término es muy
+    corto o el índice no está disponible se usa LIKE, con una collation que
+    ignora tildes para encontrar lo mismo que el índice (normalizar).
+
+    Args:
+        filtro (str): Texto de búsqueda
+        alias (str): Alias de la tabla Productos en la consulta
+        solo_activos (bool): Buscar solo productos activos
+
+    Returns:
+        tuple: (condición SQL que inicia con AND, lista de parámetros, ids o None)
+    """
+    ids = buscar_productos(filtro, solo_activos)
+
+    if ids is None:
+        return (
+            f" AND ({alias}.sku COLLATE {COLLATION_LIKE} LIKE ?"
+            f" OR {alias}.nombre_producto COLLATE {COLLATION_LIKE} LIKE ?)",
+            [f'%{filtro}%', f'%{filtro}%'],
+            None
+        )
+    if not ids:
+        return " AND 1 = 0", [], ids
+
+    return (
+        f" AND {alias}.id_producto IN (SELECT CAST(value AS INT) FROM STRING_SPLIT(?, ','))",
+        [','.join(str(i) for i in ids)],
+        ids
+    )
+
+
+def relevancia_producto(ids, alias='p'):
+    """
+    JOIN que numera los ids en el orden de relevancia del índice, para
+    ordenar la consulta por esa posición en lugar de por nombre
+
+    Args:
+        ids (list): ids retornados por condicion_producto
+        alias (str): Alias de la tabla Productos en la consulta
+
+    Returns:
+        tuple: (JOIN SQL, lista de parámetros, expresión con la posición 0..n-1)
+    """
+    return (
+        f" INNER JOIN OPENJSON(?) rel ON CAST(rel.value AS INT) = {alias}.id_producto",
+        [json.dumps(ids)],
+        "CAST(rel.[key] AS INT)"
+    )
+
+
+def refrescar_producto(id_producto=None, sku=None, desde=None):
+    """
+    Actualiza en el índice un producto recién creado, editado o desactivado,
+    o con desde= todos los modificados a partir de esa fecha (importaciones)
+    """
+    app = current_app._get_current_object()
+    estado = app.extensions.get('product_search')
+    if estado is None:
+        return  # El índice aún no se ha construido; se cargará completo
+
+    try:
+        if desde is not None:
+            _cargar(estado['index'], desde=desde)
+            return
+
+        if id_producto is not None:
+            query = "SELECT id_producto, sku, nombre_producto, activo FROM Productos WHERE id_producto = ?"
+            params = (id_producto,)
+        else:
+            query = "SELECT id_producto, sku, nombre_producto, activo FROM Productos WHERE sku = ?"
+            params = (sku,)
+
+        for fila in execute_query(query, params):
+            estado['index'].add(fila['id_producto'], fila['sku'], fila['nombre_producto'], fila['activo'])
+    except Exception as e:
+        print(f"Error al actualizar índice de búsqueda: {e}")
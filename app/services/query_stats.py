@@ -0,0 +1,284 @@
+# =============================================
+# ESTADÍSTICAS DE CONSULTAS (CARGA DE TRABAJO)
+# app/services/query_stats.py
+# =============================================
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from hashlib import sha1
+from multiprocessing.util import Finalize
+
+from flask import current_app
+
+
+_COMENTARIOS = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_CADENAS = re.compile(r"N?'(?:[^']|'')*'")
+_NUMEROS = re.compile(r'(?<![\w.@#?])-?\d+(?:\.\d+)?\b')
+_LISTAS_IN = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_ESPACIOS = re.compile(r'\s+')
+
+# Sentencias cuyos parámetros no se guardan: solo su tipo (ver parametros_a_json)
+_SENSIBLES = re.compile(r'\b(?:Usuarios|\w*password\w*|\w*contrase\w*|\w*token\w*|\w*secret\w*)\b', re.I)
+
+
+@lru_cache(maxsize=2048)
+def normalizar(sql):
+    """
+    Texto de la consulta sin valores: literales -> ?, listas IN -> IN (?),
+    sin comentarios ni espacios repetidos. Las consultas que solo cambian en
+    los valores (f-strings con TOP, OFFSET, etc.) quedan juntas.
+    """
+    sql = _COMENTARIOS.sub(' ', sql)
+    sql = _CADENAS.sub('?', sql)
+    sql = _NUMEROS.sub('?', sql)
+    sql = _LISTAS_IN.sub('IN (?)', sql)
+    return _ESPACIOS.sub(' ', sql).strip().rstrip(';').strip()
+
+
+def huella(sql_normalizado):
+    return sha1(sql_normalizado.encode('utf-8')).hexdigest()[:16]
+
+
+def _valor_json(valor):
+    if isinstance(valor, datetime):
+        return {'$fecha_hora': valor.isoformat()}
+    if isinstance(valor, date):
+        return {'$fecha': valor.isoformat()}
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, (bytes, bytearray)):
+        return None
+    return valor
+
+
+def _tipo_json(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, bool):
+        return {'$tipo': 'int'}
+    if isinstance(valor, datetime):
+        return {'$tipo': 'fecha_hora'}
+    if isinstance(valor, date):
+        return {'$tipo': 'fecha'}
+    if isinstance(valor, (int, float, Decimal)):
+        return {'$tipo': type(valor).__name__.lower()}
+    return {'$tipo': 'str'}
+
+
+# Valor con que se reproduce un parámetro del que solo se guardó el tipo
+_VALORES_TIPO = {
+    'int': 0,
+    'float': 0.0,
+    'decimal': 0.0,
+    'str': '',
+    'fecha': date(2000, 1, 1),
+    'fecha_hora': datetime(2000, 1, 1)
+}
+
+
+def es_sensible(sql):
+    """Sentencias sobre usuarios, contraseñas o tokens"""
+    return _SENSIBLES.search(sql) is not None
+
+
+def parametros_a_json(params, solo_tipos=False):
+    """
+    Args:
+        solo_tipos (bool): Guardar el tipo de cada parámetro y no su valor
+    """
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        params = list(params.values())
+    convertir = _tipo_json if solo_tipos else _valor_json
+    return json.dumps([convertir(v) for v in params], default=str, ensure_ascii=False)
+
+
+def parametros_de_json(texto):
+    """
+    Parámetros guardados, con las fechas como date/datetime. Los que se
+    guardaron solo con su tipo vuelven como un valor fijo de ese tipo.
+    """
+    if not texto:
+        return []
+
+    def valor(v):
+        if isinstance(v, dict) and '$fecha_hora' in v:
+            return datetime.fromisoformat(v['$fecha_hora'])
+        if isinstance(v, dict) and '$fecha' in v:
+            return date.fromisoformat(v['$fecha'])
+        if isinstance(v, dict) and '$tipo' in v:
+            return _VALORES_TIPO.get(v['$tipo'])
+        return v
+
+    return [valor(v) for v in json.loads(texto)]
+
+
+class RegistroConsultas:
+    """
+    Frecuencia y latencia de cada sentencia que pasa por app.database,
+    agrupadas por su texto normalizado.
+
+    Cada proceso acumula en memoria (un dict bajo un lock) y suma sus
+    deltas a una tabla SQLite compartida cada 'intervalo' segundos y al
+    terminar. De cada sentencia se guarda un ejemplo con sus parámetros
+    para poder reproducirla (asesor_indices.py). De las sentencias sobre
+    usuarios o contraseñas solo se guarda el tipo de cada parámetro, y de
+    los procedimientos (que el asesor no reproduce) ningún parámetro.
+    """
+
+    def __init__(self, path, intervalo=60):
+        """
+        Args:
+            path (str): Archivo SQLite
+            intervalo (int): Segundos entre escrituras de lo acumulado
+        """
+        self.path = path
+        self.intervalo = intervalo
+        self._lock = threading.Lock()
+        self._pendientes = {}
+        self._ultima_escritura = time.monotonic()
+
+        directorio = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directorio, exist_ok=True)
+
+        with self._conectar() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS consultas (
+                    huella TEXT PRIMARY KEY,
+                    sql TEXT NOT NULL,
+                    procedimiento INTEGER NOT NULL,
+                    ejecuciones INTEGER NOT NULL,
+                    tiempo_total REAL NOT NULL,
+                    tiempo_maximo REAL NOT NULL,
+                    ejemplo TEXT NOT NULL,
+                    parametros TEXT,
+                    primera REAL NOT NULL,
+                    ultima REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _conectar(self):
+        """Conexión corta (commit al salir): se escribe pocas veces por minuto"""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def registrar(self, sql, params, segundos, procedimiento=False):
+        """
+        Suma una ejecución
+
+        Args:
+            sql (str): Texto enviado (para procedimientos, 'EXEC nombre ?, ?')
+            params (tuple|dict): Parámetros de la ejecución
+            segundos (float): Duración medida por quien ejecutó
+        """
+        texto = normalizar(sql)
+        ahora = time.time()
+
+        with self._lock:
+            acumulado = self._pendientes.get(texto)
+            if acumulado is None:
+                # El ejemplo es el de la primera ejecución del intervalo
+                self._pendientes[texto] = [1, segundos, segundos, sql, params, procedimiento, ahora, ahora]
+            else:
+                acumulado[0] += 1
+                acumulado[1] += segundos
+                if segundos > acumulado[2]:
+                    acumulado[2] = segundos
+                acumulado[7] = ahora
+            escribir = time.monotonic() - self._ultima_escritura >= self.intervalo
+
+        if escribir:
+            self.vaciar()
+
+    def vaciar(self):
+        """Suma lo acumulado a la tabla compartida"""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+            self._ultima_escritura = time.monotonic()
+        if not pendientes:
+            return
+
+        filas = [
+            (huella(texto), texto, int(procedimiento), n, total, maximo, ejemplo,
+             None if procedimiento else parametros_a_json(params, solo_tipos=es_sensible(texto)),
+             primera, ultima)
+            for texto, (n, total, maximo, ejemplo, params, procedimiento, primera, ultima) in pendientes.items()
+        ]
+        try:
+            with self._conectar() as conn:
+                conn.executemany("""
+                    INSERT INTO consultas (huella, sql, procedimiento, ejecuciones, tiempo_total, tiempo_maximo,
+                                           ejemplo, parametros, primera, ultima)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (huella) DO UPDATE SET
+                        ejecuciones = ejecuciones + excluded.ejecuciones,
+                        tiempo_total = tiempo_total + excluded.tiempo_total,
+                        tiempo_maximo = MAX(tiempo_maximo, excluded.tiempo_maximo),
+                        ultima = MAX(ultima, excluded.ultima)
+                """, filas)
+        except sqlite3.Error as e:
+            print(f"Error al guardar estadísticas de consultas: {e}")
+
+    def leer(self, minimo_ejecuciones=1):
+        """
+        Returns:
+            list: dict por sentencia, de mayor a menor tiempo total
+        """
+        self.vaciar()
+        with self._conectar() as conn:
+            conn.row_factory = sqlite3.Row
+            return [dict(fila) for fila in conn.execute(
+                "SELECT * FROM consultas WHERE ejecuciones >= ? ORDER BY tiempo_total DESC",
+                (minimo_ejecuciones,)
+            )]
+
+    def reiniciar(self):
+        """Borra lo registrado (por ejemplo después de crear índices)"""
+        with self._lock:
+            self._pendientes = {}
+        with self._conectar() as conn:
+            conn.execute("DELETE FROM consultas")
+
+
+_crear_lock = threading.Lock()
+
+
+def get_registro_consultas():
+    """
+    Obtiene el registro de consultas de la aplicación
+
+    Returns:
+        RegistroConsultas: o None si está desactivado
+    """
+    app = current_app._get_current_object()
+    if not app.config.get('QUERY_STATS_ENABLED', True):
+        return None
+
+    registro = app.extensions.get('registro_consultas')
+    if registro is None:
+        with _crear_lock:
+            registro = app.extensions.get('registro_consultas')
+            if registro is None:
+                registro = RegistroConsultas(
+                    app.config.get('QUERY_STATS_PATH', os.path.join('cache', 'consultas.sqlite3')),
+                    intervalo=app.config.get('QUERY_STATS_FLUSH_INTERVAL', 60)
+                )
+                # Finalize (y no atexit) para que también corra en los procesos de trabajo
+                Finalize(registro, registro.vaciar, exitpriority=5)
+                app.extensions['registro_consultas'] = registro
+    return registro
@@ -0,0 +1,310 @@
+# =============================================
+# AGREGADOS DEL REPORTE DE MOVIMIENTOS (COLUMNAR)
+# app/services/report_analytics.py
+# =============================================
+
+from datetime import date, timedelta
+from itertools import chain
+
+from app.database import execute_query, stream_query
+
+try:
+    import numpy as np
+except ImportError:  # Sin NumPy se usa el cálculo fila por fila (mismo resultado)
+    np = None
+
+
+_EPOCA = date(1970, 1, 1)
+
+# Columnas que se leen de MovimientosDiarios, en este orden. La fecha viaja
+# como número de día desde 1970 para que todo el lote sea numérico
+COLUMNAS = ('dia', 'id_producto', 'id_tipo_movimiento', 'registros', 'cantidad', 'minima', 'maxima')
+
+
+def _fecha(dia):
+    return _EPOCA + timedelta(days=int(dia))
+
+
+# =============================================
+# LECTURA EN COLUMNAS
+# =============================================
+
+class ColumnasReporte:
+    """
+    Filas del resumen diario guardadas por columnas (un arreglo por campo).
+
+    Con NumPy cada lote del cursor se convierte a un arreglo int64 en una
+    sola pasada y los totales se calculan con operaciones vectorizadas; sin
+    NumPy se guardan las tuplas tal cual y se agregan con un ciclo.
+    """
+
+    def __init__(self, filas=None):
+        self.filas = 0
+        self._lotes = []
+        self._columnas = None
+        if filas is not None:
+            self.agregar_lote(filas)
+
+    def __len__(self):
+        return self.filas
+
+    def agregar_lote(self, lote):
+        """
+        Args:
+            lote (list): Tuplas en el orden de COLUMNAS
+        """
+        if not lote:
+            return
+        if np is not None:
+            # fromiter sobre el lote aplanado evita que NumPy inspeccione cada tupla
+            datos = np.fromiter(chain.from_iterable(lote), dtype=np.int64, count=len(lote) * len(COLUMNAS))
+            self._lotes.append(datos.reshape(-1, len(COLUMNAS)))
+        else:
+            self._lotes.append(list(lote))
+        self.filas += len(lote)
+        self._columnas = None
+
+    def columnas(self):
+        """
+        Returns:
+            dict: nombre de columna -> arreglo (NumPy) o lista de tuplas (sin NumPy)
+        """
+        if self._columnas is None:
+            if np is None:
+                self._columnas = [fila for lote in self._lotes for fila in lote]
+            elif self._lotes:
+                datos = np.concatenate(self._lotes) if len(self._lotes) > 1 else self._lotes[0]
+                self._lotes = [datos]
+                self._columnas = {nombre: datos[:, i] for i, nombre in enumerate(COLUMNAS)}
+            else:
+                vacio = np.zeros(0, dtype=np.int64)
+                self._columnas = {nombre: vacio for nombre in COLUMNAS}
+        return self._columnas
+
+
+def leer_columnas(condiciones='', params=None, lote=5000):
+    """
+    Lee del resumen diario las columnas del reporte con los filtros dados
+
+    Args:
+        condiciones (str): Condiciones de _filtros_reporte (alias r, columna fecha)
+        params (tuple): Parámetros de las condiciones
+        lote (int): Filas por cada lectura del cursor
+
+    Returns:
+        ColumnasReporte
+    """
+    query = f"""
+        SELECT
+            DATEDIFF(DAY, '19700101', r.fecha) AS dia,
+            r.id_producto,
+            r.id_tipo_movimiento,
+            r.total_movimientos AS registros,
+            r.total_cantidad AS cantidad,
+            -- Grupos anteriores a estas columnas: se usa el promedio del grupo
+            ISNULL(r.cantidad_minima, r.total_cantidad / r.total_movimientos) AS minima,
+            ISNULL(r.cantidad_maxima, r.total_cantidad / r.total_movimientos) AS maxima
+        FROM MovimientosDiarios r
+        INNER JOIN Productos p ON r.id_producto = p.id_producto
+        WHERE 1=1 {condiciones}
+    """
+    columnas = ColumnasReporte()
+    pendientes = []
+    for fila in stream_query(query, params, batch_size=lote):
+        pendientes.append(tuple(fila))
+        if len(pendientes) >= lote:
+            columnas.agregar_lote(pendientes)
+            pendientes = []
+    columnas.agregar_lote(pendientes)
+    return columnas
+
+
+# =============================================
+# AGREGACIÓN
+# =============================================
+
+def _sumas_por_clave(claves, *pesos):
+    """
+    Group-by vectorizado: suma cada arreglo de pesos por valor de clave
+
+    Returns:
+        tuple: (claves únicas ordenadas, sumas de cada peso en el mismo orden)
+    """
+    if not len(claves):
+        return claves, [np.zeros(0, dtype=np.int64) for _ in pesos]
+
+    minimo = int(claves.min())
+    rango = int(claves.max()) - minimo + 1
+    if rango <= max(len(claves) * 4, 1 << 16):
+        # Claves compactas (días, tipos, ids): conteo directo sin ordenar
+        indices = claves - minimo
+        presentes = np.bincount(indices, minlength=rango) > 0
+        unicas = np.flatnonzero(presentes) + minimo
+        sumas = [np.bincount(indices, weights=p, minlength=rango)[presentes] for p in pesos]
+    else:
+        unicas, indices = np.unique(claves, return_inverse=True)
+        sumas = [np.bincount(indices, weights=p) for p in pesos]
+
+    # bincount devuelve float64: exacto hasta 2**53
+    return unicas, [np.rint(s).astype(np.int64) for s in sumas]
+
+
+def _agregar_numpy(columnas):
+    c = columnas.columnas()
+    registros, cantidad = c['registros'], c['cantidad']
+
+    tipos, (reg_tipo, cant_tipo) = _sumas_por_clave(c['id_tipo_movimiento'], registros, cantidad)
+    productos, (reg_prod, cant_prod) = _sumas_por_clave(c['id_producto'], registros, cantidad)
+    dias, (reg_dia, cant_dia) = _sumas_por_clave(c['dia'], registros, cantidad)
+
+    # Productos de mayor a menor cantidad (empate: menor id primero)
+    orden = np.lexsort((productos, -cant_prod))
+
+    total_registros = int(registros.sum())
+    total_cantidad = int(cantidad.sum())
+    return {
+        'por_tipo': list(zip(tipos.tolist(), reg_tipo.tolist(), cant_tipo.tolist())),
+        'por_producto': list(zip(productos[orden].tolist(), reg_prod[orden].tolist(), cant_prod[orden].tolist())),
+        'por_dia': list(zip(dias.tolist(), reg_dia.tolist(), cant_dia.tolist())),
+        'registros': total_registros,
+        'cantidad': total_cantidad,
+        'minima': int(c['minima'].min()) if len(columnas) else None,
+        'maxima': int(c['maxima'].max()) if len(columnas) else None
+    }
+
+
+def _agregar_python(filas):
+    tipos, productos, dias = {}, {}, {}
+    minima = maxima = None
+    total_registros = total_cantidad = 0
+
+    for dia, id_producto, id_tipo, registros, cantidad, minimo, maximo in filas:
+        for grupos, clave in ((tipos, id_tipo), (productos, id_producto), (dias, dia)):
+            suma = grupos.get(clave)
+            if suma is None:
+                grupos[clave] = [registros, cantidad]
+            else:
+                suma[0] += registros
+                suma[1] += cantidad
+        total_registros += registros
+        total_cantidad += cantidad
+        if minimo is not None and (minima is None or minimo < minima):
+            minima = minimo
+        if maximo is not None and (maxima is None or maximo > maxima):
+            maxima = maximo
+
+    orden_productos = sorted(productos.items(), key=lambda p: (-p[1][1], p[0]))
+    return {
+        'por_tipo': [(k, r, c) for k, (r, c) in sorted(tipos.items())],
+        'por_producto': [(k, r, c) for k, (r, c) in orden_productos],
+        'por_dia': [(k, r, c) for k, (r, c) in sorted(dias.items())],
+        'registros': total_registros,
+        'cantidad': total_cantidad,
+        'minima': minima,
+        'maxima': maxima
+    }
+
+
+def agregar(columnas):
+    """
+    Calcula los agregados del reporte sobre las columnas leídas
+
+    Args:
+        columnas (ColumnasReporte): Filas del resumen diario
+
+    Returns:
+        dict: por_tipo [(id_tipo, registros, cantidad)], por_producto
+              [(id_producto, registros, cantidad)] de mayor a menor cantidad,
+              por_dia [(dia, registros, cantidad)], y los totales registros,
+              cantidad, minima y maxima
+    """
+    if np is not None:
+        return _agregar_numpy(columnas)
+    return _agregar_python(columnas.columnas())
+
+
+# =============================================
+# AGREGADOS PARA PLANTILLA Y EXPORTACIÓN
+# =============================================
+
+def _nombres_productos(ids):
+    if not ids:
+        return {}
+    filas = execute_query(
+        """
+        SELECT id_producto, sku, nombre_producto FROM Productos
+        WHERE id_producto IN (SELECT CAST(value AS INT) FROM STRING_SPLIT(?, ','))
+        """,
+        (','.join(str(i) for i in ids),)
+    )
+    return {f['id_producto']: (f['sku'], f['nombre_producto']) for f in filas}
+
+
+def agregados_reporte(condiciones='', params=None, top_productos=10):
+    """
+    Agregados del reporte de movimientos listos para mostrar o exportar
+
+    Args:
+        condiciones (str): Condiciones sobre MovimientosDiarios (alias r, columna fecha)
+        params (tuple): Parámetros de las condiciones
+        top_productos (int): Productos a incluir (None = todos)
+
+    Returns:
+        dict: totales (nombre de tipo -> cantidad), por_tipo, por_producto,
+              por_dia (fecha, registros, cantidad) y estadisticas
+    """
+    resultado = agregar(leer_columnas(condiciones, params))
+
+    nombres_tipo = {
+        f['id_tipo_movimiento']: f['nombre_tipo']
+        for f in execute_query("SELECT id_tipo_movimiento, nombre_tipo FROM TiposMovimiento")
+    }
+    por_tipo = sorted(
+        (
+            {'nombre_tipo': nombres_tipo.get(id_tipo, str(id_tipo)), 'registros': registros, 'cantidad': cantidad}
+            for id_tipo, registros, cantidad in resultado['por_tipo']
+        ),
+        key=lambda t: t['nombre_tipo']
+    )
+
+    productos = resultado['por_producto']
+    if top_productos is not None:
+        productos = productos[:top_productos]
+    nombres = _nombres_productos([p[0] for p in productos])
+    por_producto = [
+        {
+            'id_producto': id_producto,
+            'sku': nombres.get(id_producto, ('', ''))[0],
+            'nombre_producto': nombres.get(id_producto, ('', ''))[1],
+            'registros': registros,
+            'cantidad': cantidad
+        }
+        for id_producto, registros, cantidad in productos
+    ]
+
+    por_dia = [
+        {'fecha': _fecha(dia), 'registros': registros, 'cantidad': cantidad}
+        for dia, registros, cantidad in resultado['por_dia']
+    ]
+
+    registros = resultado['registros']
+    dia_maximo = max(por_dia, key=lambda d: d['cantidad']) if por_dia else None
+    estadisticas = {
+        'registros': registros,
+        'cantidad': resultado['cantidad'],
+        'cantidad_minima': resultado['minima'],
+        'cantidad_maxima': resultado['maxima'],
+        'cantidad_promedio': round(resultado['cantidad'] / registros, 2) if registros else None,
+        'dias': len(por_dia),
+        'promedio_diario': round(resultado['cantidad'] / len(por_dia), 2) if por_dia else None,
+        'dia_maximo': dia_maximo,
+        'productos': len(resultado['por_producto'])
+    }
+
+    return {
+        'totales': {t['nombre_tipo']: t['cantidad'] for t in por_tipo},
+        'por_tipo': por_tipo,
+        'por_producto': por_producto,
+        'por_dia': por_dia,
+        'estadisticas': estadisticas
+    }
@@ -0,0 +1,259 @@
+# =============================================
+# EXPORTACIÓN DE REPORTES (CSV / XLSX EN STREAMING)
+# app/services/report_export.py
+# =============================================
+
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+
+LOTE = 1000                      # filas entre cada envío al cliente
+MAX_FILAS_HOJA = 1048576 - 1     # límite de Excel por hoja (sin el encabezado)
+
+
+# Excel interpreta como fórmula una celda que empieza con estos caracteres
+_INICIO_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(valor, str) and valor.startswith(_INICIO_FORMULA):
+        return "'" + valor      # se muestra como texto (nombres y notas los escribe el usuario)
+    return valor
+
+
+# =============================================
+# CSV
+# =============================================
+
+def exportar_csv(columnas, filas, lote=LOTE):
+    """
+    Genera un CSV por partes a partir de un iterador de filas
+
+    Args:
+        columnas (list): Títulos de las columnas
+        filas (iterable): Tuplas de valores (por ejemplo stream_query)
+        lote (int): Filas por cada parte enviada
+
+    Yields:
+        str: Partes del archivo (la primera lleva BOM para que Excel lea UTF-8)
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write('\ufeff')
+    writer.writerow(columnas)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    for i, fila in enumerate(filas, 1):
+        writer.writerow([_texto(v) for v in fila])
+        if i % lote == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# =============================================
+# XLSX (solo escritura)
+# =============================================
+
+class _Salida:
+    """Archivo de solo escritura que acumula lo que zipfile escribe hasta que se envía"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+_CONTROL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+
+
+def _columna(n):
+    """0 -> A, 25 -> Z, 26 -> AA"""
+    letras = ''
+    n += 1
+    while n:
+        n, resto = divmod(n - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _celda(ref, valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, bool):
+        return f'<c r="{ref}" t="b"><v>{int(valor)}</v></c>'
+    if isinstance(valor, (int, float, Decimal)):
+        return f'<c r="{ref}"><v>{valor}</v></c>'
+    if isinstance(valor, datetime):
+        serial = (valor - _EPOCA_EXCEL).total_seconds() / 86400
+        return f'<c r="{ref}" s="1"><v>{serial:.8f}</v></c>'
+    if isinstance(valor, date):
+        serial = (valor - _EPOCA_EXCEL.date()).days
+        return f'<c r="{ref}" s="3"><v>{serial}</v></c>'
+    texto = escape(_CONTROL.sub('', str(valor)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+_HOJA_INICIO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+    'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews>'
+    '<sheetData>'
+)
+_HOJA_FIN = '</sheetData></worksheet>'
+
+_ESTILOS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<numFmts count="2"><numFmt numFmtId="164" formatCode="dd/mm/yyyy hh:mm"/>'
+    '<numFmt numFmtId="165" formatCode="dd/mm/yyyy"/></numFmts>'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '</cellXfs></styleSheet>'
+)
+
+
+def _archivos_libro(nombre_hoja, hojas):
+    """Partes fijas del paquete; se escriben al final, cuando se sabe cuántas hojas hubo"""
+    nombres = [nombre_hoja if hojas == 1 else f'{nombre_hoja} {i}' for i in range(1, hojas + 1)]
+
+    tipos = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, hojas + 1)
+    )
+    hojas_xml = ''.join(
+        f'<sheet name="{escape(nombre[:31])}" sheetId="{i}" r:id="rId{i}"/>'
+        for i, nombre in enumerate(nombres, 1)
+    )
+    relaciones = ''.join(
+        f'<Relationship Id="rId{i}" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{i}.xml"/>'
+        for i in range(1, hojas + 1)
+    )
+
+    return {
+        '[Content_Types].xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{tipos}</Types>'
+        ),
+        '_rels/.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        'xl/workbook.xml': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{hojas_xml}</sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{relaciones}'
+            f'<Relationship Id="rId{hojas + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/></Relationships>'
+        ),
+        'xl/styles.xml': _ESTILOS
+    }
+
+
+def exportar_xlsx(columnas, filas, nombre_hoja='Reporte', lote=LOTE, max_filas_hoja=MAX_FILAS_HOJA):
+    """
+    Genera un libro XLSX por partes, sin armarlo en memoria.
+
+    Las celdas se escriben directo al ZIP (texto en línea, sin tabla de
+    cadenas compartidas), así que la memoria no crece con la cantidad de
+    filas. Si se supera el límite de filas de Excel se continúa en otra hoja.
+
+    Args:
+        columnas (list): Títulos de las columnas
+        filas (iterable): Tuplas de valores (por ejemplo stream_query)
+        nombre_hoja (str): Nombre de la hoja
+        lote (int): Filas por cada parte enviada
+        max_filas_hoja (int): Filas de datos por hoja
+
+    Yields:
+        bytes: Partes del archivo .xlsx
+    """
+    salida = _Salida()
+    refs = [_columna(i) for i in range(len(columnas))]
+    encabezado = '<row r="1">' + ''.join(
+        f'<c r="{ref}1" t="inlineStr" s="2"><is><t>{escape(str(titulo))}</t></is></c>'
+        for ref, titulo in zip(refs, columnas)
+    ) + '</row>'
+
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+        hojas = 0
+        filas = iter(filas)
+        fila = next(filas, None)
+
+        while hojas == 0 or fila is not None:
+            hojas += 1
+            with libro.open(f'xl/worksheets/sheet{hojas}.xml', 'w', force_zip64=True) as hoja:
+                hoja.write((_HOJA_INICIO + encabezado).encode('utf-8'))
+                yield salida.vaciar()
+
+                numero = 1
+                while fila is not None and numero <= max_filas_hoja:
+                    numero += 1
+                    celdas = ''.join(_celda(f'{ref}{numero}', v) for ref, v in zip(refs, fila))
+                    hoja.write(f'<row r="{numero}">{celdas}</row>'.encode('utf-8'))
+                    if numero % lote == 0:
+                        yield salida.vaciar()
+                    fila = next(filas, None)
+
+                hoja.write(_HOJA_FIN.encode('utf-8'))
+
+        for nombre, contenido in _archivos_libro(nombre_hoja, hojas).items():
+            libro.writestr(nombre, contenido)
+
+    yield salida.vaciar()
@@ -0,0 +1,67 @@
+# =============================================
+# ARCHIVAR HISTÓRICOS - SGI-GuateMart
+# archivar_historicos.py
+# Uso: python archivar_historicos.py [--simular]
+#
+# Lo mismo que la tarea programada 'archivar_historicos' (JOBS_SCHEDULE),
+# para correrlo a mano o desde el Programador de tareas de Windows.
+# Con --simular solo muestra lo que se archivaría.
+# =============================================
+
+import os
+import sys
+import time
+
+from app import create_app
+from app.services.data_archive import (
+    archivar_historicos, corte_retencion, get_archivo_historico, meses_por_archivar, TABLAS_ARCHIVO
+)
+
+if __name__ == '__main__':
+    simular = '--simular' in sys.argv[1:]
+
+    app = create_app(os.environ.get('FLASK_CONFIG', 'development'))
+    with app.app_context():
+        archivo = get_archivo_historico()
+        retencion = app.config['ARCHIVE_RETENTION_MONTHS']
+
+        print("=" * 60)
+        print("ARCHIVO HISTÓRICO" + (" (SIMULACIÓN)" if simular else ""))
+        print("=" * 60)
+        print(f"Carpeta: {os.path.abspath(archivo.carpeta)}")
+        for tabla, meses in retencion.items():
+            if tabla in TABLAS_ARCHIVO and meses:
+                print(f"   {tabla}: se conservan {meses} meses (desde {corte_retencion(meses)})")
+        print()
+
+        if simular:
+            for tabla, meses in retencion.items():
+                if tabla not in TABLAS_ARCHIVO or not meses:
+                    continue
+                for fila in meses_por_archivar(tabla, corte_retencion(meses)):
+                    print(f"   {tabla} {fila.anio:04d}-{fila.mes:02d}: {fila.filas:,} filas")
+            print("=" * 60)
+            sys.exit(0)
+
+        borradas = {}
+
+        def avance(tabla, mes, n):
+            antes = borradas.get((tabla, mes), 0)
+            borradas[(tabla, mes)] = antes + n
+            if n < app.config['ARCHIVE_DELETE_BATCH'] or (antes + n) // 50000 > antes // 50000:
+                print(f"   {tabla} {mes}: {antes + n:,} filas borradas")
+
+        inicio = time.time()
+        resultado = archivar_historicos(
+            archivo, retencion,
+            lote=app.config['ARCHIVE_DELETE_BATCH'],
+            pausa=app.config['ARCHIVE_DELETE_PAUSE'],
+            avance=avance
+        )
+
+        print()
+        for tabla, datos in resultado.items():
+            print(f"✓ {tabla}: {datos['meses']} meses, {datos['archivadas']:,} filas archivadas, "
+                  f"{datos['borradas']:,} borradas de la BD")
+        print(f"   ({time.time() - inicio:.1f} s)")
+        print("=" * 60)
@@ -0,0 +1,105 @@
+# =============================================
+# ASESOR DE ÍNDICES - SGI-GuateMart
+# asesor_indices.py
+# Uso: python asesor_indices.py [--muestra N] [--top N] [--minimo N] [--reiniciar]
+#
+# Lee las estadísticas de consultas que registra la aplicación
+# (QUERY_STATS_PATH), copia las filas más recientes de cada tabla a una BD
+# SQLite con el esquema de bd/CreacionBD.sql, reproduce ahí las sentencias
+# y propone índices ordenados por el tiempo que ahorrarían, con su DDL.
+# El resultado es una lista para revisar en SQL Server, no se aplica nada.
+# Con --reiniciar borra las estadísticas (después de crear los índices).
+# =============================================
+
+import os
+import sys
+import time
+
+from app import create_app
+from app.database import stream_query
+from app.services.index_advisor import AsesorIndices, Esquema, base_muestra, copiar_muestra
+from app.services.query_stats import get_registro_consultas
+
+
+def _opcion(nombre, defecto):
+    if nombre in sys.argv[1:]:
+        return int(sys.argv[sys.argv.index(nombre) + 1])
+    return defecto
+
+
+if __name__ == '__main__':
+    muestra = _opcion('--muestra', 200000)
+    top = _opcion('--top', 10)
+    minimo = _opcion('--minimo', 5)
+
+    app = create_app(os.environ.get('FLASK_CONFIG', 'development'))
+    with app.app_context():
+        registro = get_registro_consultas()
+        if registro is None:
+            print("Las estadísticas de consultas están desactivadas (QUERY_STATS_ENABLED)")
+            sys.exit(1)
+
+        if '--reiniciar' in sys.argv[1:]:
+            registro.reiniciar()
+            print("✓ Estadísticas de consultas borradas")
+            sys.exit(0)
+
+        registros = registro.leer(minimo_ejecuciones=minimo)
+        # Las lecturas de la muestra no son parte de la carga
+        app.config['QUERY_STATS_ENABLED'] = False
+
+        print("=" * 60)
+        print("ASESOR DE ÍNDICES")
+        print("=" * 60)
+        if not registros:
+            print(f"No hay sentencias con al menos {minimo} ejecuciones en {registro.path}")
+            sys.exit(0)
+
+        desde = min(r['primera'] for r in registros)
+        horas = max((max(r['ultima'] for r in registros) - desde) / 3600, 1)
+        print(f"Carga: {len(registros)} sentencias, {sum(r['ejecuciones'] for r in registros):,} ejecuciones, "
+              f"{sum(r['tiempo_total'] for r in registros):,.1f} s desde "
+              f"{time.strftime('%d/%m/%Y %H:%M', time.localtime(desde))}")
+
+        ruta = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bd', 'CreacionBD.sql')
+        with open(ruta, encoding='latin-1') as archivo:
+            esquema = Esquema.desde_sql(archivo.read())
+        conn = base_muestra(esquema)
+
+        def leer(tabla, columnas, llave, n):
+            orden = ', '.join(f"{c} DESC" for c in llave) if llave else '1'
+            return stream_query(f"SELECT TOP (?) {', '.join(columnas)} FROM {tabla} ORDER BY {orden}", (n,))
+
+        inicio = time.time()
+        copiadas = copiar_muestra(esquema, conn, leer, filas=muestra)
+        print(f"Muestra: {sum(copiadas.values()):,} filas ({time.time() - inicio:.1f} s)")
+
+        inicio = time.time()
+        asesor = AsesorIndices(conn, esquema)
+        sentencias = asesor.preparar(registros)
+        elegidos = asesor.recomendar(sentencias, maximo=top)
+        print(f"Análisis: {sum(1 for s in sentencias if s.error is None)} sentencias reproducidas "
+              f"({time.time() - inicio:.1f} s)")
+        print()
+
+        if not elegidos:
+            print("Sin recomendaciones: ningún índice candidato mejora la carga registrada")
+        for i, elegido in enumerate(elegidos, 1):
+            print(f"{i}. {elegido['tabla']}({', '.join(elegido['columnas'])}): "
+                  f"~{elegido['ahorro']:,.1f} s ahorrados ({elegido['ahorro'] / horas * 24:,.1f} s por día)")
+            if not elegido['usado']:
+                print("   ⚠ con los demás índices creados, SQLite ya no lo usa")
+            for sentencia, veces in elegido['beneficiadas'][:3]:
+                print(f"   {veces:,.1f}x más rápida ({sentencia.ejecuciones:,} ejecuciones): {sentencia.sql[:80]}")
+            print()
+            print(elegido['ddl'])
+            print()
+
+        no_reproducibles = [s for s in sentencias if s.error]
+        if no_reproducibles:
+            print("-" * 60)
+            print("Sin analizar:")
+            for sentencia in no_reproducibles:
+                print(f"   {sentencia.tiempo_total:,.1f} s  {sentencia.sql[:60]}")
+                print(f"      {sentencia.error}")
+        print("=" * 60)
@@ -296,6 +296,10 @@ SELECT
 FROM Productos
 WHERE activo = 1;
 
+-- Las consultas 6.4 a 6.7 tambin se calculan en la aplicacin (Anlisis,
+-- /analitica) sobre el almacn analtico: toda la historia, incluidos los
+-- meses archivados, sin leer Movimientos.
+
 -- 6.4 Rotacin de inventario (productos ms/menos movidos)
 SELECT 
     p.sku,
@@ -434,6 +438,11 @@ ORDER BY total_operaciones DESC;
 -- SECCIN 9: MANTENIMIENTO
 -- =============================================
 
+-- La aplicacin archiva Movimientos, Auditoria y las alertas resueltas
+-- ms antiguas que ARCHIVE_RETENTION_MONTHS (config.py) una vez al da, en
+-- archivos por mes y borrando por lotes (archivar_historicos.py). Las
+-- consultas 9.1 y 9.2 borran sin conservar copia ni tocar el manifiesto.
+
 -- 9.1 Limpiar alertas resueltas antiguas (ms de 90 das)
 DELETE FROM AlertasStock
 WHERE estado = 'RESUELTA'
@@ -464,6 +473,11 @@ WHERE p.index_id IN (0, 1)
 GROUP BY t.name
 ORDER BY total_registros DESC;
 
+-- 9.5 Hasta dnde est archivada cada tabla (lo anterior est en los archivos por mes)
+SELECT tabla, archivado_hasta, fecha_actualizacion
+FROM HistoricoArchivado
+ORDER BY tabla;
+
 -- =============================================
 -- SECCIN 10: EJEMPLOS DE USO DEL SP
 -- =============================================
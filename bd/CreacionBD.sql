@@ -212,6 +212,100 @@ BEGIN
 END
 GO
 
+-- =============================================
+-- COLUMNA CALCULADA: Productos.nivel_stock
+-- 0 = normal, 1 = agotado, 2 = crtico, 3 = bajo (mismo criterio que
+-- vw_ProductosStockBajo). Persistida para poder indexarla: las alertas se
+-- leen en orden de gravedad sin recorrer todos los productos bajo el mnimo
+-- =============================================
+IF COL_LENGTH('Productos', 'nivel_stock') IS NULL
+BEGIN
+    ALTER TABLE Productos ADD nivel_stock AS (
+        CASE 
+            WHEN stock_actual <= 0 THEN 1
+            WHEN stock_actual <= (stock_minimo * 0.5) THEN 2
+            WHEN stock_actual <= stock_minimo THEN 3
+            ELSE 0
+        END
+    ) PERSISTED;
+END
+GO
+
+-- =============================================
+-- TABLA: DashboardResumen
+-- Snapshot de los contadores del dashboard, repartido en 32 fragmentos
+-- (id_producto % 32) que se suman al leer. Cada movimiento actualiza solo
+-- el fragmento de su producto: dos movimientos de productos distintos casi
+-- nunca esperan uno al otro por el contador.
+-- Se mantiene con triggers y se reconcilia con sp_ReconciliarDashboard
+-- =============================================
+IF EXISTS (SELECT * FROM sys.tables WHERE name = 'DashboardResumen')
+    AND COL_LENGTH('DashboardResumen', 'fragmento') IS NULL
+    DROP TABLE DashboardResumen;  -- Versin de una sola fila; la reconciliacin final la vuelve a llenar
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'DashboardResumen')
+BEGIN
+    CREATE TABLE DashboardResumen (
+        fragmento TINYINT PRIMARY KEY,
+        total_productos INT NOT NULL DEFAULT 0,
+        total_items_inventario BIGINT NOT NULL DEFAULT 0,
+        valor_total_inventario DECIMAL(18,2) NOT NULL DEFAULT 0,
+        productos_stock_bajo INT NOT NULL DEFAULT 0,
+        alertas_pendientes INT NOT NULL DEFAULT 0,
+        fecha_reconciliacion DATETIME,
+        CONSTRAINT CK_DashboardResumen_Fragmento CHECK (fragmento < 32)
+    );
+END
+GO
+
+-- =============================================
+-- TABLA: MovimientosDiarios
+-- Resumen de Movimientos por da, producto y tipo. Se mantiene con
+-- trg_Movimientos_Resumen al registrar y se llena para el historial con
+-- sp_ReconstruirMovimientosDiarios. Reportes y dashboard leen de aqu:
+-- un rango de un ao cuesta filas de resumen, no movimientos
+-- =============================================
+IF EXISTS (SELECT * FROM sys.tables WHERE name = 'DashboardDiario')
+    DROP TABLE DashboardDiario;  -- Reemplazada por MovimientosDiarios
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'MovimientosDiarios')
+BEGIN
+    CREATE TABLE MovimientosDiarios (
+        fecha DATE NOT NULL,
+        id_producto INT NOT NULL,
+        id_tipo_movimiento INT NOT NULL,
+        total_movimientos INT NOT NULL DEFAULT 0,
+        total_cantidad BIGINT NOT NULL DEFAULT 0,
+        cantidad_minima INT NULL,
+        cantidad_maxima INT NULL,
+        PRIMARY KEY (fecha, id_producto, id_tipo_movimiento)
+    );
+END
+GO
+
+-- Cantidad mnima y mxima de un movimiento del grupo (para las estadsticas del reporte)
+IF COL_LENGTH('MovimientosDiarios', 'cantidad_minima') IS NULL
+    ALTER TABLE MovimientosDiarios ADD cantidad_minima INT NULL, cantidad_maxima INT NULL;
+GO
+
+-- =============================================
+-- TABLA: HistoricoArchivado
+-- Hasta qu fecha (exclusiva) cada tabla est archivada en archivos por mes
+-- (app/services/data_archive.py). Esas filas ya no estn en la BD: los
+-- procedimientos que recalculan MovimientosDiarios no tocan esos meses
+-- =============================================
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'HistoricoArchivado')
+BEGIN
+    CREATE TABLE HistoricoArchivado (
+        tabla VARCHAR(50) PRIMARY KEY,
+        archivado_hasta DATE NOT NULL,
+        fecha_actualizacion DATETIME DEFAULT GETDATE()
+    );
+END
+GO
+
 -- =============================================
 -- NDICES para optimizacin
 -- =============================================
@@ -246,6 +340,31 @@ IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Movimientos_Fecha')
 IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Movimientos_Usuario')
     CREATE NONCLUSTERED INDEX IX_Movimientos_Usuario ON Movimientos(id_usuario);
 
+-- ndices para paginacin por cursor (keyset)
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Movimientos_Fecha_Id')
+    CREATE NONCLUSTERED INDEX IX_Movimientos_Fecha_Id ON Movimientos(fecha_movimiento DESC, id_movimiento DESC);
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Productos_Activo_Nombre')
+    CREATE NONCLUSTERED INDEX IX_Productos_Activo_Nombre ON Productos(activo, nombre_producto, id_producto);
+
+-- ndices en el resumen diario (reportes filtrados por producto)
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_MovimientosDiarios_Producto')
+    CREATE INDEX IX_MovimientosDiarios_Producto ON MovimientosDiarios(id_producto, fecha)
+        INCLUDE (id_tipo_movimiento, total_movimientos, total_cantidad, cantidad_minima, cantidad_maxima);
+
+-- ndices para alertas (en orden de gravedad, sin ordenar en memoria)
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Productos_NivelStock')
+    CREATE INDEX IX_Productos_NivelStock ON Productos(activo, nivel_stock, stock_actual)
+        INCLUDE (sku, nombre_producto, stock_minimo, stock_maximo, id_categoria, id_proveedor);
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_AlertasStock_Estado')
+    CREATE INDEX IX_AlertasStock_Estado ON AlertasStock(estado, tipo_alerta, fecha_generacion DESC, id_alerta DESC)
+        INCLUDE (id_producto);
+
+-- Alerta pendiente de un producto (la revisa cada movimiento que deja el stock en el mnimo)
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_AlertasStock_Producto')
+    CREATE INDEX IX_AlertasStock_Producto ON AlertasStock(id_producto, estado);
+
 -- ndices en Auditora
 IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_Auditoria_Tabla')
     CREATE NONCLUSTERED INDEX IX_Auditoria_Tabla ON Auditoria(tabla_afectada);
@@ -327,15 +446,16 @@ SELECT
     p.stock_maximo,
     c.nombre_categoria,
     pr.nombre_proveedor,
-    CASE 
-        WHEN p.stock_actual <= 0 THEN 'AGOTADO'
-        WHEN p.stock_actual <= (p.stock_minimo * 0.5) THEN 'CRTICO'
-        WHEN p.stock_actual <= p.stock_minimo THEN 'BAJO'
-    END AS nivel_alerta
+    CASE p.nivel_stock
+        WHEN 1 THEN 'AGOTADO'
+        WHEN 2 THEN 'CRTICO'
+        WHEN 3 THEN 'BAJO'
+    END AS nivel_alerta,
+    p.nivel_stock
 FROM Productos p
 LEFT JOIN Categorias c ON p.id_categoria = c.id_categoria
 LEFT JOIN Proveedores pr ON p.id_proveedor = pr.id_proveedor
-WHERE p.stock_actual <= p.stock_minimo AND p.activo = 1;
+WHERE p.nivel_stock > 0 AND p.activo = 1;
 GO
 
 -- Vista: Resumen de inventario
@@ -398,6 +518,11 @@ GO
 -- =============================================
 
 -- Procedimiento: Registrar movimiento de inventario
+-- El stock se lee, calcula y escribe en un solo UPDATE ... OUTPUT con bloqueo
+-- de fila: dos movimientos simultneos del mismo producto se encadenan en
+-- lugar de leer el mismo stock y perder una de las cantidades. El mismo UPDATE
+-- devuelve el mnimo y decide la alerta, as AlertasStock solo se consulta
+-- cuando el stock queda en o bajo el mnimo.
 IF EXISTS (SELECT * FROM sys.procedures WHERE name = 'sp_RegistrarMovimiento')
     DROP PROCEDURE sp_RegistrarMovimiento;
 GO
@@ -413,33 +538,69 @@ CREATE PROCEDURE sp_RegistrarMovimiento
 AS
 BEGIN
     SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    
+    DECLARE @afecta_stock VARCHAR(10);
+    DECLARE @id_movimiento INT;
+    DECLARE @cambio TABLE (
+        stock_anterior INT,
+        stock_nuevo INT,
+        stock_minimo INT,
+        tipo_alerta VARCHAR(50),
+        mensaje VARCHAR(200)
+    );
+    
     BEGIN TRY
-        BEGIN TRANSACTION;
-        
-        DECLARE @stock_anterior INT;
-        DECLARE @stock_nuevo INT;
-        DECLARE @afecta_stock VARCHAR(10);
+        -- Catlogo pequeo: se lee antes de abrir la transaccin
+        SELECT @afecta_stock = afecta_stock FROM TiposMovimiento WHERE id_tipo_movimiento = @id_tipo_movimiento;
         
-        -- Obtener stock actual
-        SELECT @stock_anterior = stock_actual FROM Productos WHERE id_producto = @id_producto;
+        IF @afecta_stock IS NULL
+            RAISERROR('Tipo de movimiento no vlido', 16, 1);
         
-        -- Obtener cmo afecta el movimiento
-        SELECT @afecta_stock = afecta_stock FROM TiposMovimiento WHERE id_tipo_movimiento = @id_tipo_movimiento;
+        BEGIN TRANSACTION;
         
-        -- Calcular nuevo stock
-        IF @afecta_stock = 'SUMA'
-            SET @stock_nuevo = @stock_anterior + @cantidad;
-        ELSE IF @afecta_stock = 'RESTA'
-            SET @stock_nuevo = @stock_anterior - @cantidad;
-        ELSE
-            SET @stock_nuevo = @cantidad; -- AJUSTE directo
+        -- Compatible con otros movimientos; solo espera a una reconciliacin del dashboard
+        EXEC sp_getapplock @Resource = 'DashboardSnapshot', @LockMode = 'Shared', @LockOwner = 'Transaction';
         
+        -- Stock, mnimo y decisin de alerta en una sola sentencia. ROWLOCK: el
+        -- bloqueo queda en la fila del producto y no frena a los dems productos
+        UPDATE Productos WITH (ROWLOCK)
+        SET stock_actual = CASE @afecta_stock
+                WHEN 'SUMA' THEN stock_actual + @cantidad
+                WHEN 'RESTA' THEN stock_actual - @cantidad
+                ELSE @cantidad  -- AJUSTE directo
+            END,
+            fecha_modificacion = GETDATE()
+        OUTPUT
+            deleted.stock_actual,
+            inserted.stock_actual,
+            inserted.stock_minimo,
+            CASE 
+                WHEN inserted.stock_actual > inserted.stock_minimo THEN NULL
+                WHEN inserted.stock_actual = 0 OR inserted.stock_actual <= inserted.stock_minimo * 0.5 THEN 'STOCK_CRITICO'
+                ELSE 'STOCK_MINIMO'
+            END,
+            CASE 
+                WHEN inserted.stock_actual > inserted.stock_minimo THEN NULL
+                WHEN inserted.stock_actual = 0 THEN 'Producto agotado'
+                WHEN inserted.stock_actual <= inserted.stock_minimo * 0.5 THEN 'Stock crtico, por debajo del 50% del mnimo'
+                ELSE 'Stock alcanz el nivel mnimo'
+            END
+        INTO @cambio (stock_anterior, stock_nuevo, stock_minimo, tipo_alerta, mensaje)
+        WHERE id_producto = @id_producto
         -- Validar que no quede negativo
-        IF @stock_nuevo < 0
+        AND CASE @afecta_stock
+                WHEN 'SUMA' THEN stock_actual + @cantidad
+                WHEN 'RESTA' THEN stock_actual - @cantidad
+                ELSE @cantidad
+            END >= 0;
+        
+        IF NOT EXISTS (SELECT 1 FROM @cambio)
         BEGIN
-            RAISERROR('No hay suficiente stock para realizar esta operacin', 16, 1);
-            ROLLBACK TRANSACTION;
-            RETURN;
+            IF EXISTS (SELECT 1 FROM Productos WHERE id_producto = @id_producto)
+                RAISERROR('No hay suficiente stock para realizar esta operacin', 16, 1);
+            ELSE
+                RAISERROR('El producto no existe', 16, 1);
         END
         
         -- Registrar movimiento
@@ -447,62 +608,335 @@ BEGIN
             id_producto, id_tipo_movimiento, cantidad, stock_anterior, 
             stock_nuevo, id_usuario, id_proveedor, numero_documento, observaciones
         )
-        VALUES (
-            @id_producto, @id_tipo_movimiento, @cantidad, @stock_anterior,
-            @stock_nuevo, @id_usuario, @id_proveedor, @numero_documento, @observaciones
+        SELECT 
+            @id_producto, @id_tipo_movimiento, @cantidad, stock_anterior,
+            stock_nuevo, @id_usuario, @id_proveedor, @numero_documento, @observaciones
+        FROM @cambio;
+        
+        SET @id_movimiento = SCOPE_IDENTITY();
+        
+        -- Alerta si el UPDATE la decidi y no hay una pendiente. La fila del
+        -- producto sigue bloqueada: otro movimiento no puede crearla en medio.
+        -- UPDLOCK, HOLDLOCK: el motor de alertas de la aplicacin no bloquea el
+        -- producto, as que la comprobacin bloquea el rango hasta el COMMIT
+        INSERT INTO AlertasStock (
+            id_producto, tipo_alerta, stock_actual, 
+            stock_minimo, mensaje, estado
+        )
+        SELECT 
+            @id_producto, c.tipo_alerta, c.stock_nuevo,
+            c.stock_minimo, c.mensaje, 'PENDIENTE'
+        FROM @cambio c
+        WHERE c.tipo_alerta IS NOT NULL
+        AND NOT EXISTS (
+            SELECT 1 FROM AlertasStock a WITH (UPDLOCK, HOLDLOCK)
+            WHERE a.id_producto = @id_producto
+            AND a.estado = 'PENDIENTE'
         );
         
-        -- Actualizar stock del producto
-        UPDATE Productos 
-        SET stock_actual = @stock_nuevo,
-            fecha_modificacion = GETDATE()
-        WHERE id_producto = @id_producto;
+        COMMIT TRANSACTION;
         
-        -- Verificar si se debe generar alerta de stock
-        DECLARE @stock_minimo INT;
-        SELECT @stock_minimo = stock_minimo FROM Productos WHERE id_producto = @id_producto;
+        SELECT 
+            'Movimiento registrado exitosamente' AS Resultado,
+            @id_movimiento AS id_movimiento,
+            stock_anterior,
+            stock_nuevo
+        FROM @cambio;
         
-        IF @stock_nuevo <= @stock_minimo
-        BEGIN
-            DECLARE @tipo_alerta VARCHAR(50);
-            DECLARE @mensaje VARCHAR(MAX);  -- Cambiado de TEXT a VARCHAR(MAX)
-            
-            IF @stock_nuevo = 0
-            BEGIN
-                SET @tipo_alerta = 'STOCK_CRITICO';
-                SET @mensaje = 'Producto agotado';
-            END
-            ELSE IF @stock_nuevo <= (@stock_minimo * 0.5)
-            BEGIN
-                SET @tipo_alerta = 'STOCK_CRITICO';
-                SET @mensaje = 'Stock crtico, por debajo del 50% del mnimo';
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
+        
+        -- THROW conserva el nmero de error: un interbloqueo llega a la
+        -- aplicacin como 1205 y execute_procedure lo reintenta
+        THROW;
+    END CATCH
+END
+GO
+
+-- Procedimiento: Registrar varios movimientos en una sola transaccin
+-- Las lneas llegan en #LineasMovimiento, creada y llenada por la aplicacin
+-- en la misma conexin (fast_executemany). Se validan, calculan e insertan
+-- por conjuntos: un INSERT en Movimientos, un UPDATE en Productos y una
+-- revisin de alertas para todo el lote, as los triggers se disparan una vez.
+-- Si una lnea deja el stock negativo se rechaza junto con las siguientes
+-- del mismo producto, para respetar el orden del lote.
+-- Retorna el resultado de cada lnea
+IF EXISTS (SELECT * FROM sys.procedures WHERE name = 'sp_RegistrarMovimientosLote')
+    DROP PROCEDURE sp_RegistrarMovimientosLote;
+GO
+
+CREATE PROCEDURE sp_RegistrarMovimientosLote
+    @id_usuario INT,
+    @todo_o_nada BIT = 0  -- 1 = si alguna lnea se rechaza no se registra ninguna
+AS
+BEGIN
+    SET NOCOUNT ON;
+    
+    CREATE TABLE #Lote (
+        linea INT PRIMARY KEY,
+        id_producto INT,
+        id_tipo_movimiento INT,
+        cantidad INT,
+        id_proveedor INT,
+        numero_documento VARCHAR(50),
+        observaciones VARCHAR(MAX),
+        afecta_stock VARCHAR(10),
+        stock_inicial INT,
+        stock_anterior INT,
+        stock_nuevo INT,
+        error VARCHAR(200)
+    );
+    
+    DECLARE @insertados TABLE (linea INT PRIMARY KEY, id_movimiento INT);
+    
+    BEGIN TRY
+        BEGIN TRANSACTION;
+        
+        EXEC sp_getapplock @Resource = 'DashboardSnapshot', @LockMode = 'Shared', @LockOwner = 'Transaction';
+        
+        -- Validacin de cada lnea; el stock de los productos queda bloqueado hasta el final
+        INSERT INTO #Lote (
+            linea, id_producto, id_tipo_movimiento, cantidad, id_proveedor,
+            numero_documento, observaciones, afecta_stock, stock_inicial, error
+        )
+        SELECT 
+            l.linea, l.id_producto, l.id_tipo_movimiento, l.cantidad, l.id_proveedor,
+            l.numero_documento, l.observaciones, t.afecta_stock, p.stock_actual,
+            CASE 
+                WHEN l.cantidad IS NULL OR l.cantidad <= 0 THEN 'La cantidad debe ser mayor a 0'
+                WHEN p.id_producto IS NULL THEN 'El producto no existe'
+                WHEN t.id_tipo_movimiento IS NULL THEN 'Tipo de movimiento no vlido'
+                WHEN l.id_proveedor IS NOT NULL AND pr.id_proveedor IS NULL THEN 'El proveedor no existe'
             END
-            ELSE
-            BEGIN
-                SET @tipo_alerta = 'STOCK_MINIMO';
-                SET @mensaje = 'Stock alcanz el nivel mnimo';
+        FROM #LineasMovimiento l
+        LEFT JOIN Productos p WITH (UPDLOCK, HOLDLOCK) ON p.id_producto = l.id_producto
+        LEFT JOIN TiposMovimiento t ON t.id_tipo_movimiento = l.id_tipo_movimiento
+        LEFT JOIN Proveedores pr ON pr.id_proveedor = l.id_proveedor;
+        
+        -- Stock despus de cada lnea, en orden. Un AJUSTE fija el stock y abre
+        -- un tramo nuevo; dentro del tramo se acumulan las SUMA y RESTA
+        WITH tramos AS (
+            SELECT 
+                linea, id_producto, afecta_stock, cantidad, stock_inicial,
+                SUM(CASE WHEN afecta_stock IN ('SUMA', 'RESTA') THEN 0 ELSE 1 END)
+                    OVER (PARTITION BY id_producto ORDER BY linea ROWS UNBOUNDED PRECEDING) AS tramo
+            FROM #Lote
+            WHERE error IS NULL
+        ),
+        calculo AS (
+            SELECT 
+                linea,
+                ISNULL(MAX(CASE WHEN afecta_stock NOT IN ('SUMA', 'RESTA') THEN cantidad END)
+                           OVER (PARTITION BY id_producto, tramo), stock_inicial)
+                + SUM(CASE afecta_stock WHEN 'SUMA' THEN cantidad WHEN 'RESTA' THEN -cantidad ELSE 0 END)
+                    OVER (PARTITION BY id_producto, tramo ORDER BY linea ROWS UNBOUNDED PRECEDING) AS stock_nuevo
+            FROM tramos
+        )
+        UPDATE l
+        SET stock_nuevo = c.stock_nuevo
+        FROM #Lote l
+        INNER JOIN calculo c ON c.linea = l.linea;
+        
+        WITH anterior AS (
+            SELECT 
+                linea,
+                LAG(stock_nuevo, 1, stock_inicial) OVER (PARTITION BY id_producto ORDER BY linea) AS stock_anterior
+            FROM #Lote
+            WHERE error IS NULL
+        )
+        UPDATE l
+        SET stock_anterior = a.stock_anterior
+        FROM #Lote l
+        INNER JOIN anterior a ON a.linea = l.linea;
+        
+        -- Stock insuficiente: se rechaza la lnea y las siguientes del mismo producto
+        UPDATE l
+        SET error = CASE 
+                WHEN l.stock_nuevo < 0 THEN 'No hay suficiente stock para realizar esta operacin'
+                ELSE 'No se aplic: una lnea anterior del mismo producto fue rechazada'
             END
-            
-            -- Insertar alerta si no existe una pendiente
-            IF NOT EXISTS (
-                SELECT 1 FROM AlertasStock 
-                WHERE id_producto = @id_producto 
-                AND estado = 'PENDIENTE'
+        FROM #Lote l
+        WHERE l.error IS NULL
+        AND EXISTS (
+            SELECT 1 FROM #Lote f
+            WHERE f.id_producto = l.id_producto
+            AND f.error IS NULL
+            AND f.stock_nuevo < 0
+            AND f.linea <= l.linea
+        );
+        
+        IF @todo_o_nada = 1 AND EXISTS (SELECT 1 FROM #Lote WHERE error IS NOT NULL)
+            UPDATE #Lote
+            SET error = 'No se aplic: el lote tiene lneas rechazadas'
+            WHERE error IS NULL;
+        
+        -- Movimientos del lote en una sola insercin
+        MERGE Movimientos AS m
+        USING (SELECT * FROM #Lote WHERE error IS NULL) AS l
+        ON 1 = 0
+        WHEN NOT MATCHED THEN
+            INSERT (
+                id_producto, id_tipo_movimiento, cantidad, stock_anterior,
+                stock_nuevo, id_usuario, id_proveedor, numero_documento, observaciones
             )
-            BEGIN
-                INSERT INTO AlertasStock (
-                    id_producto, tipo_alerta, stock_actual, 
-                    stock_minimo, mensaje, estado
-                )
-                VALUES (
-                    @id_producto, @tipo_alerta, @stock_nuevo,
-                    @stock_minimo, @mensaje, 'PENDIENTE'
-                );
-            END
+            VALUES (
+                l.id_producto, l.id_tipo_movimiento, l.cantidad, l.stock_anterior,
+                l.stock_nuevo, @id_usuario, l.id_proveedor, l.numero_documento, l.observaciones
+            )
+        OUTPUT l.linea, inserted.id_movimiento INTO @insertados (linea, id_movimiento);
+        
+        -- Stock final de cada producto: el de su ltima lnea aplicada
+        UPDATE p
+        SET stock_actual = u.stock_nuevo,
+            fecha_modificacion = GETDATE()
+        FROM Productos p
+        INNER JOIN (
+            SELECT 
+                id_producto, stock_nuevo,
+                ROW_NUMBER() OVER (PARTITION BY id_producto ORDER BY linea DESC) AS n
+            FROM #Lote
+            WHERE error IS NULL
+        ) u ON u.id_producto = p.id_producto AND u.n = 1;
+        
+        -- Alertas con el mismo criterio que sp_RegistrarMovimiento, sobre el stock final
+        INSERT INTO AlertasStock (id_producto, tipo_alerta, stock_actual, stock_minimo, mensaje, estado)
+        SELECT 
+            p.id_producto,
+            CASE WHEN p.stock_actual = 0 OR p.stock_actual <= p.stock_minimo * 0.5
+                 THEN 'STOCK_CRITICO' ELSE 'STOCK_MINIMO' END,
+            p.stock_actual,
+            p.stock_minimo,
+            CASE 
+                WHEN p.stock_actual = 0 THEN 'Producto agotado'
+                WHEN p.stock_actual <= p.stock_minimo * 0.5 THEN 'Stock crtico, por debajo del 50% del mnimo'
+                ELSE 'Stock alcanz el nivel mnimo'
+            END,
+            'PENDIENTE'
+        FROM Productos p
+        WHERE p.id_producto IN (SELECT id_producto FROM #Lote WHERE error IS NULL)
+        AND p.stock_actual <= p.stock_minimo
+        AND NOT EXISTS (
+            SELECT 1 FROM AlertasStock a WITH (UPDLOCK, HOLDLOCK)
+            WHERE a.id_producto = p.id_producto
+            AND a.estado = 'PENDIENTE'
+        );
+        
+        COMMIT TRANSACTION;
+        
+        SELECT 
+            l.linea,
+            CASE WHEN l.error IS NULL THEN 'REGISTRADO' ELSE 'RECHAZADO' END AS estado,
+            ISNULL(l.error, 'Movimiento registrado exitosamente') AS mensaje,
+            l.id_producto,
+            i.id_movimiento,
+            CASE WHEN l.error IS NULL THEN l.stock_anterior END AS stock_anterior,
+            CASE WHEN l.error IS NULL THEN l.stock_nuevo END AS stock_nuevo
+        FROM #Lote l
+        LEFT JOIN @insertados i ON i.linea = l.linea
+        ORDER BY l.linea;
+        
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
+        
+        -- Como en sp_RegistrarMovimiento: un interbloqueo llega como 1205
+        -- y registrar_movimientos_lote reintenta el lote completo
+        THROW;
+    END CATCH
+END
+GO
+
+-- Procedimiento: Reconciliar snapshot del dashboard
+-- Recalcula desde las tablas base lo que los triggers mantienen incrementalmente
+IF EXISTS (SELECT * FROM sys.procedures WHERE name = 'sp_ReconciliarDashboard')
+    DROP PROCEDURE sp_ReconciliarDashboard;
+GO
+
+CREATE PROCEDURE sp_ReconciliarDashboard
+    @segundos_minimos INT = 0  -- No reconciliar si se hizo hace menos de estos segundos
+AS
+BEGIN
+    SET NOCOUNT ON;
+    -- Ante un deadlock con un movimiento en curso, cede la reconciliacin
+    SET DEADLOCK_PRIORITY LOW;
+    BEGIN TRY
+        BEGIN TRANSACTION;
+        
+        -- Exclusivo: espera a que terminen los movimientos en curso y detiene
+        -- los nuevos hasta terminar, para que ningn delta se pierda ni se duplique
+        EXEC sp_getapplock @Resource = 'DashboardSnapshot', @LockMode = 'Exclusive', @LockOwner = 'Transaction';
+        
+        -- Otro proceso pudo reconciliar mientras se esperaba el bloqueo
+        IF @segundos_minimos > 0 AND (
+            SELECT MIN(fecha_reconciliacion) FROM DashboardResumen
+        ) >= DATEADD(SECOND, -@segundos_minimos, GETDATE())
+        BEGIN
+            COMMIT TRANSACTION;
+            RETURN;
         END
         
+        -- Los 32 fragmentos existen siempre: los triggers solo los actualizan
+        INSERT INTO DashboardResumen (fragmento)
+        SELECT f.fragmento
+        FROM (SELECT TOP 32 CAST(ROW_NUMBER() OVER (ORDER BY object_id) - 1 AS TINYINT) AS fragmento
+              FROM sys.all_objects) f
+        WHERE NOT EXISTS (SELECT 1 FROM DashboardResumen r WHERE r.fragmento = f.fragmento);
+        
+        UPDATE r
+        SET total_productos = ISNULL(t.total_productos, 0),
+            total_items_inventario = ISNULL(t.total_items_inventario, 0),
+            valor_total_inventario = ISNULL(t.valor_total_inventario, 0),
+            productos_stock_bajo = ISNULL(t.productos_stock_bajo, 0),
+            alertas_pendientes = ISNULL(a.alertas_pendientes, 0),
+            fecha_reconciliacion = GETDATE()
+        FROM DashboardResumen r
+        LEFT JOIN (
+            SELECT 
+                id_producto % 32 AS fragmento,
+                COUNT(*) AS total_productos,
+                SUM(CAST(stock_actual AS BIGINT)) AS total_items_inventario,
+                SUM(stock_actual * precio_compra) AS valor_total_inventario,
+                COUNT(CASE WHEN stock_actual <= stock_minimo THEN 1 END) AS productos_stock_bajo
+            FROM Productos
+            WHERE activo = 1
+            GROUP BY id_producto % 32
+        ) t ON t.fragmento = r.fragmento
+        LEFT JOIN (
+            SELECT id_producto % 32 AS fragmento, COUNT(*) AS alertas_pendientes
+            FROM AlertasStock
+            WHERE estado = 'PENDIENTE'
+            GROUP BY id_producto % 32
+        ) a ON a.fragmento = r.fragmento;
+        
+        -- Resumen diario de la ventana que usa el dashboard (31 das)
+        DECLARE @desde DATE = DATEADD(DAY, -31, CAST(GETDATE() AS DATE));
+        
+        -- Los das archivados ya no estn en Movimientos: su resumen se conserva
+        SELECT @desde = archivado_hasta FROM HistoricoArchivado
+        WHERE tabla = 'Movimientos' AND archivado_hasta > @desde;
+        
+        DELETE FROM MovimientosDiarios WHERE fecha >= @desde;
+        
+        INSERT INTO MovimientosDiarios (
+            fecha, id_producto, id_tipo_movimiento, total_movimientos, total_cantidad,
+            cantidad_minima, cantidad_maxima
+        )
+        SELECT 
+            CAST(fecha_movimiento AS DATE),
+            id_producto,
+            id_tipo_movimiento,
+            COUNT(*),
+            SUM(CAST(cantidad AS BIGINT)),
+            MIN(cantidad),
+            MAX(cantidad)
+        FROM Movimientos
+        WHERE fecha_movimiento >= @desde
+        GROUP BY CAST(fecha_movimiento AS DATE), id_producto, id_tipo_movimiento;
+        
         COMMIT TRANSACTION;
-        SELECT 'Movimiento registrado exitosamente' AS Resultado;
         
     END TRY
     BEGIN CATCH
@@ -515,7 +949,85 @@ BEGIN
 END
 GO
 
+-- Procedimiento: Reconstruir el resumen diario de movimientos
+-- Backfill del historial (sin fechas = todo) o correccin de un rango.
+-- Trabaja por meses, cada uno en su propia transaccin, para no bloquear
+-- el registro de movimientos durante todo el proceso
+IF EXISTS (SELECT * FROM sys.procedures WHERE name = 'sp_ReconstruirMovimientosDiarios')
+    DROP PROCEDURE sp_ReconstruirMovimientosDiarios;
+GO
+
+CREATE PROCEDURE sp_ReconstruirMovimientosDiarios
+    @fecha_desde DATE = NULL,
+    @fecha_hasta DATE = NULL
+AS
+BEGIN
+    SET NOCOUNT ON;
+    SET DEADLOCK_PRIORITY LOW;
+    
+    IF @fecha_desde IS NULL
+        SELECT @fecha_desde = CAST(MIN(fecha_movimiento) AS DATE) FROM Movimientos;
+    IF @fecha_hasta IS NULL
+        SET @fecha_hasta = CAST(GETDATE() AS DATE);
+    IF @fecha_desde IS NULL
+        RETURN;  -- No hay movimientos
+    
+    -- Los meses archivados ya no estn en Movimientos: su resumen se conserva
+    SELECT @fecha_desde = archivado_hasta FROM HistoricoArchivado
+    WHERE tabla = 'Movimientos' AND archivado_hasta > @fecha_desde;
+    
+    DECLARE @inicio DATE = @fecha_desde;
+    DECLARE @fin DATE;
+    
+    WHILE @inicio <= @fecha_hasta
+    BEGIN
+        -- Hasta el primer da del mes siguiente (o el final del rango)
+        SET @fin = DATEADD(MONTH, 1, DATEFROMPARTS(YEAR(@inicio), MONTH(@inicio), 1));
+        IF @fin > DATEADD(DAY, 1, @fecha_hasta)
+            SET @fin = DATEADD(DAY, 1, @fecha_hasta);
+        
+        BEGIN TRY
+            BEGIN TRANSACTION;
+            
+            -- Mismo bloqueo que la reconciliacin: ningn movimiento del rango queda a medias
+            EXEC sp_getapplock @Resource = 'DashboardSnapshot', @LockMode = 'Exclusive', @LockOwner = 'Transaction';
+            
+            DELETE FROM MovimientosDiarios WHERE fecha >= @inicio AND fecha < @fin;
+            
+            INSERT INTO MovimientosDiarios (
+                fecha, id_producto, id_tipo_movimiento, total_movimientos, total_cantidad,
+                cantidad_minima, cantidad_maxima
+            )
+            SELECT 
+                CAST(fecha_movimiento AS DATE),
+                id_producto,
+                id_tipo_movimiento,
+                COUNT(*),
+                SUM(CAST(cantidad AS BIGINT)),
+                MIN(cantidad),
+                MAX(cantidad)
+            FROM Movimientos
+            WHERE fecha_movimiento >= @inicio AND fecha_movimiento < @fin
+            GROUP BY CAST(fecha_movimiento AS DATE), id_producto, id_tipo_movimiento;
+            
+            COMMIT TRANSACTION;
+        END TRY
+        BEGIN CATCH
+            IF @@TRANCOUNT > 0
+                ROLLBACK TRANSACTION;
+            
+            DECLARE @ErrorMessage NVARCHAR(4000) = ERROR_MESSAGE();
+            RAISERROR(@ErrorMessage, 16, 1);
+            RETURN;
+        END CATCH
+        
+        SET @inicio = @fin;
+    END
+END
+GO
+
 -- Procedimiento: Obtener dashboard estadstico
+-- Lee el snapshot mantenido por los triggers: el costo no depende del historial
 IF EXISTS (SELECT * FROM sys.procedures WHERE name = 'sp_ObtenerDashboard')
     DROP PROCEDURE sp_ObtenerDashboard;
 GO
@@ -525,40 +1037,68 @@ AS
 BEGIN
     SET NOCOUNT ON;
     
-    -- Resumen general
+    -- Resumen general (suma de los fragmentos)
     SELECT 
-        COUNT(*) AS total_productos,
-        SUM(stock_actual) AS total_items_inventario,
-        SUM(stock_actual * precio_compra) AS valor_total_inventario,
-        COUNT(CASE WHEN stock_actual <= stock_minimo THEN 1 END) AS productos_stock_bajo
-    FROM Productos
-    WHERE activo = 1;
+        SUM(total_productos) AS total_productos,
+        SUM(total_items_inventario) AS total_items_inventario,
+        SUM(valor_total_inventario) AS valor_total_inventario,
+        SUM(productos_stock_bajo) AS productos_stock_bajo,
+        DATEDIFF(SECOND, MIN(fecha_reconciliacion), GETDATE()) AS segundos_desde_reconciliacion
+    FROM DashboardResumen
+    HAVING COUNT(*) > 0;
     
     -- Productos ms vendidos (ltimos 30 das)
     SELECT TOP 10
         p.nombre_producto,
-        SUM(m.cantidad) AS total_salidas
-    FROM Movimientos m
-    INNER JOIN Productos p ON m.id_producto = p.id_producto
-    INNER JOIN TiposMovimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
+        SUM(d.total_cantidad) AS total_salidas
+    FROM MovimientosDiarios d
+    INNER JOIN Productos p ON d.id_producto = p.id_producto
+    INNER JOIN TiposMovimiento tm ON d.id_tipo_movimiento = tm.id_tipo_movimiento
     WHERE tm.afecta_stock = 'RESTA'
-        AND m.fecha_movimiento >= DATEADD(DAY, -30, GETDATE())
+        AND d.fecha >= CAST(DATEADD(DAY, -30, GETDATE()) AS DATE)
     GROUP BY p.nombre_producto
     ORDER BY total_salidas DESC;
     
     -- Alertas pendientes
-    SELECT COUNT(*) AS alertas_pendientes
-    FROM AlertasStock
-    WHERE estado = 'PENDIENTE';
+    SELECT SUM(alertas_pendientes) AS alertas_pendientes
+    FROM DashboardResumen
+    HAVING COUNT(*) > 0;
     
     -- Movimientos por da (ltimos 7 das)
     SELECT 
-        CAST(fecha_movimiento AS DATE) AS fecha,
-        COUNT(*) AS total_movimientos
-    FROM Movimientos
-    WHERE fecha_movimiento >= DATEADD(DAY, -7, GETDATE())
-    GROUP BY CAST(fecha_movimiento AS DATE)
+        fecha,
+        SUM(total_movimientos) AS total_movimientos
+    FROM MovimientosDiarios
+    WHERE fecha >= CAST(DATEADD(DAY, -7, GETDATE()) AS DATE)
+    GROUP BY fecha
     ORDER BY fecha DESC;
+    
+    -- Alertas de stock bajo (primeras 5, de la ms grave a la menos grave)
+    SELECT TOP 5 *
+    FROM vw_ProductosStockBajo
+    ORDER BY nivel_stock, stock_actual;
+    
+    -- Movimientos recientes (ltimos 10)
+    SELECT TOP 10
+        m.fecha_movimiento,
+        p.nombre_producto,
+        tm.nombre_tipo,
+        m.cantidad,
+        u.nombre_completo
+    FROM Movimientos m
+    INNER JOIN Productos p ON m.id_producto = p.id_producto
+    INNER JOIN TiposMovimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
+    INNER JOIN Usuarios u ON m.id_usuario = u.id_usuario
+    ORDER BY m.fecha_movimiento DESC, m.id_movimiento DESC;
+    
+    -- Productos bajo el mnimo por nivel
+    SELECT 
+        nivel_stock,
+        COUNT(*) AS total
+    FROM Productos
+    WHERE activo = 1 AND nivel_stock > 0
+    GROUP BY nivel_stock
+    ORDER BY nivel_stock;
 END
 GO
 
@@ -566,33 +1106,156 @@ GO
 -- TRIGGERS PARA AUDITORA AUTOMTICA
 -- =============================================
 
--- Trigger: Auditora de Productos
+-- Trigger: Auditora de Productos (retirado)
+-- Escriba una fila de Auditoria por cada UPDATE de Productos, incluidos los
+-- cambios de stock de cada movimiento, que ya quedan en Movimientos con el
+-- stock anterior, el nuevo y el usuario. La aplicacin audita ahora las
+-- altas, ediciones y bajas de productos (valores antes y despus, usuario e
+-- IP) y las escribe por lotes: app/services/audit_writer.py
 IF EXISTS (SELECT * FROM sys.triggers WHERE name = 'trg_Auditoria_Productos_Update')
     DROP TRIGGER trg_Auditoria_Productos_Update;
 GO
 
-CREATE TRIGGER trg_Auditoria_Productos_Update
+-- =============================================
+-- TRIGGERS DEL SNAPSHOT DEL DASHBOARD
+-- Aplican a DashboardResumen/MovimientosDiarios la diferencia de cada
+-- escritura, dentro de la misma transaccin. En DashboardResumen solo se
+-- tocan los fragmentos de los productos escritos (id_producto % 32)
+-- =============================================
+
+-- Trigger: Contadores de productos (altas, ediciones, stock y desactivacin)
+IF EXISTS (SELECT * FROM sys.triggers WHERE name = 'trg_Dashboard_Productos')
+    DROP TRIGGER trg_Dashboard_Productos;
+GO
+
+CREATE TRIGGER trg_Dashboard_Productos
 ON Productos
-AFTER UPDATE
+AFTER INSERT, UPDATE, DELETE
 AS
 BEGIN
     SET NOCOUNT ON;
     
-    INSERT INTO Auditoria (
-        tabla_afectada, operacion, id_registro, 
-        datos_anteriores, datos_nuevos
-    )
-    SELECT 
-        'Productos',
-        'UPDATE',
-        d.id_producto,
-        CONCAT('SKU:', d.sku, ' Stock:', d.stock_actual, ' Precio:', d.precio_venta),
-        CONCAT('SKU:', i.sku, ' Stock:', i.stock_actual, ' Precio:', i.precio_venta)
-    FROM deleted d
-    INNER JOIN inserted i ON d.id_producto = i.id_producto;
+    IF NOT EXISTS (SELECT 1 FROM inserted) AND NOT EXISTS (SELECT 1 FROM deleted)
+        RETURN;
+    
+    EXEC sp_getapplock @Resource = 'DashboardSnapshot', @LockMode = 'Shared', @LockOwner = 'Transaction';
+    
+    -- Lo nuevo suma y lo anterior resta; solo cuentan los productos activos
+    UPDATE r WITH (ROWLOCK)
+    SET total_productos = r.total_productos + d.productos,
+        total_items_inventario = r.total_items_inventario + d.items,
+        valor_total_inventario = r.valor_total_inventario + d.valor,
+        productos_stock_bajo = r.productos_stock_bajo + d.stock_bajo
+    FROM DashboardResumen r
+    INNER JOIN (
+        SELECT 
+            x.id_producto % 32 AS fragmento,
+            SUM(x.signo) AS productos,
+            SUM(x.signo * CAST(ISNULL(x.stock_actual, 0) AS BIGINT)) AS items,
+            SUM(x.signo * ISNULL(x.stock_actual, 0) * ISNULL(x.precio_compra, 0)) AS valor,
+            SUM(CASE WHEN x.stock_actual <= x.stock_minimo THEN x.signo ELSE 0 END) AS stock_bajo
+        FROM (
+            SELECT 1 AS signo, id_producto, stock_actual, stock_minimo, precio_compra FROM inserted WHERE activo = 1
+            UNION ALL
+            SELECT -1, id_producto, stock_actual, stock_minimo, precio_compra FROM deleted WHERE activo = 1
+        ) x
+        GROUP BY x.id_producto % 32
+    ) d ON d.fragmento = r.fragmento
+    WHERE d.productos <> 0 OR d.items <> 0 OR d.valor <> 0 OR d.stock_bajo <> 0;
 END
 GO
 
+-- Trigger: Resumen diario de movimientos (por da, producto y tipo)
+-- Solo inserciones: archivar o depurar movimientos viejos no cambia el resumen
+IF EXISTS (SELECT * FROM sys.triggers WHERE name = 'trg_Dashboard_Movimientos')
+    DROP TRIGGER trg_Dashboard_Movimientos;
+GO
+
+IF EXISTS (SELECT * FROM sys.triggers WHERE name = 'trg_Movimientos_Resumen')
+    DROP TRIGGER trg_Movimientos_Resumen;
+GO
+
+CREATE TRIGGER trg_Movimientos_Resumen
+ON Movimientos
+AFTER INSERT
+AS
+BEGIN
+    SET NOCOUNT ON;
+    
+    IF NOT EXISTS (SELECT 1 FROM inserted)
+        RETURN;
+    
+    EXEC sp_getapplock @Resource = 'DashboardSnapshot', @LockMode = 'Shared', @LockOwner = 'Transaction';
+    
+    MERGE MovimientosDiarios WITH (HOLDLOCK) AS d
+    USING (
+        SELECT 
+            CAST(fecha_movimiento AS DATE) AS fecha,
+            id_producto,
+            id_tipo_movimiento,
+            COUNT(*) AS total_movimientos,
+            SUM(CAST(cantidad AS BIGINT)) AS total_cantidad,
+            MIN(cantidad) AS cantidad_minima,
+            MAX(cantidad) AS cantidad_maxima
+        FROM inserted
+        WHERE fecha_movimiento IS NOT NULL
+        GROUP BY CAST(fecha_movimiento AS DATE), id_producto, id_tipo_movimiento
+    ) AS n
+    ON d.fecha = n.fecha AND d.id_producto = n.id_producto AND d.id_tipo_movimiento = n.id_tipo_movimiento
+    WHEN MATCHED THEN
+        UPDATE SET total_movimientos = d.total_movimientos + n.total_movimientos,
+                   total_cantidad = d.total_cantidad + n.total_cantidad,
+                   cantidad_minima = CASE WHEN d.cantidad_minima <= n.cantidad_minima
+                                          THEN d.cantidad_minima ELSE n.cantidad_minima END,
+                   cantidad_maxima = CASE WHEN d.cantidad_maxima >= n.cantidad_maxima
+                                          THEN d.cantidad_maxima ELSE n.cantidad_maxima END
+    WHEN NOT MATCHED THEN
+        INSERT (fecha, id_producto, id_tipo_movimiento, total_movimientos, total_cantidad,
+                cantidad_minima, cantidad_maxima)
+        VALUES (n.fecha, n.id_producto, n.id_tipo_movimiento, n.total_movimientos, n.total_cantidad,
+                n.cantidad_minima, n.cantidad_maxima);
+END
+GO
+
+-- Trigger: Alertas pendientes
+IF EXISTS (SELECT * FROM sys.triggers WHERE name = 'trg_Dashboard_AlertasStock')
+    DROP TRIGGER trg_Dashboard_AlertasStock;
+GO
+
+CREATE TRIGGER trg_Dashboard_AlertasStock
+ON AlertasStock
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+    
+    IF NOT EXISTS (SELECT 1 FROM inserted WHERE estado = 'PENDIENTE')
+        AND NOT EXISTS (SELECT 1 FROM deleted WHERE estado = 'PENDIENTE')
+        RETURN;
+    
+    EXEC sp_getapplock @Resource = 'DashboardSnapshot', @LockMode = 'Shared', @LockOwner = 'Transaction';
+    
+    UPDATE r WITH (ROWLOCK)
+    SET alertas_pendientes = r.alertas_pendientes + d.delta
+    FROM DashboardResumen r
+    INNER JOIN (
+        SELECT x.id_producto % 32 AS fragmento, SUM(x.signo) AS delta
+        FROM (
+            SELECT 1 AS signo, id_producto FROM inserted WHERE estado = 'PENDIENTE'
+            UNION ALL
+            SELECT -1, id_producto FROM deleted WHERE estado = 'PENDIENTE'
+        ) x
+        GROUP BY x.id_producto % 32
+    ) d ON d.fragmento = r.fragmento
+    WHERE d.delta <> 0;
+END
+GO
+
+-- Carga inicial del resumen diario con todo el historial y del snapshot
+EXEC sp_ReconstruirMovimientosDiarios;
+EXEC sp_ReconciliarDashboard;
+GO
+
 PRINT 'Base de datos SGI-GuateMart creada exitosamente';
 PRINT 'Usuario por defecto: admin / Password: admin123';
 PRINT 'IMPORTANTE: Cambiar la contrasea del administrador en produccin';
@@ -0,0 +1,111 @@
+# =============================================
+# BENCHMARK - AGREGADOS DEL REPORTE DE MOVIMIENTOS
+# benchmarks/bench_agregados.py
+# Uso: python benchmarks/bench_agregados.py [filas]
+# =============================================
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import report_analytics
+from app.services.report_analytics import ColumnasReporte, agregar, _agregar_python, _fecha
+
+LOTE = 5000        # filas por fetchmany, igual que leer_columnas
+TIPOS = ['Entrada por Compra', 'Salida por Venta', 'Ajuste Positivo',
+         'Ajuste Negativo', 'Devolución', 'Merma']
+
+
+def generar_filas(n, productos=20_000, dias=365, semilla=1):
+    """Tuplas del cursor en el orden de COLUMNAS (dia, producto, tipo, registros, cantidad, min, max)"""
+    rnd = random.Random(semilla)
+    inicio = 19_000
+    filas = []
+    for _ in range(n):
+        registros = rnd.randint(1, 20)
+        minima = rnd.randint(1, 10)
+        maxima = minima + rnd.randint(0, 40)
+        cantidad = minima * registros + rnd.randint(0, (maxima - minima) * registros)
+        filas.append((inicio + rnd.randrange(dias), rnd.randint(1, productos),
+                      rnd.randint(1, len(TIPOS)), registros, cantidad, minima, maxima))
+    return filas
+
+
+def ciclo_por_fila(filas):
+    """
+    Como lo hacía reporte(): un diccionario por fila (lo que entrega
+    execute_query) y un ciclo que acumula en diccionarios
+    """
+    columnas = report_analytics.COLUMNAS
+    registros_dict = [dict(zip(columnas, f)) for f in filas]
+
+    totales, por_producto, por_dia = {}, {}, {}
+    minima = maxima = None
+    total_movimientos = 0
+    for m in registros_dict:
+        tipo = TIPOS[m['id_tipo_movimiento'] - 1]
+        totales[tipo] = totales.get(tipo, 0) + m['cantidad']
+        por_producto[m['id_producto']] = por_producto.get(m['id_producto'], 0) + m['cantidad']
+        fecha = _fecha(m['dia'])
+        por_dia[fecha] = por_dia.get(fecha, 0) + m['cantidad']
+        total_movimientos += m['registros']
+        if minima is None or m['minima'] < minima:
+            minima = m['minima']
+        if maxima is None or m['maxima'] > maxima:
+            maxima = m['maxima']
+    return totales, por_producto, por_dia, total_movimientos, minima, maxima
+
+
+def columnar(filas):
+    """Conversión por lotes (como llegan de fetchmany) + agregación vectorizada"""
+    columnas = ColumnasReporte()
+    t0 = time.perf_counter()
+    for i in range(0, len(filas), LOTE):
+        columnas.agregar_lote(filas[i:i + LOTE])
+    columnas.columnas()
+    t1 = time.perf_counter()
+    resultado = agregar(columnas)
+    return t1 - t0, time.perf_counter() - t1, resultado
+
+
+def medir(funcion, *args):
+    t0 = time.perf_counter()
+    resultado = funcion(*args)
+    return time.perf_counter() - t0, resultado
+
+
+if __name__ == '__main__':
+    n_filas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    filas = generar_filas(n_filas)
+
+    print("=" * 64)
+    print(f"AGREGADOS DEL REPORTE ({n_filas:,} filas del resumen diario)")
+    print("=" * 64)
+
+    t_ciclo, (totales, _, _, registros, _, _) = medir(ciclo_por_fila, filas)
+    print(f"Ciclo por fila (dicts):     {t_ciclo:8.3f} s")
+
+    t_python, esperado = medir(_agregar_python, filas)
+    print(f"Ciclo sobre tuplas:         {t_python:8.3f} s   (respaldo sin NumPy)")
+
+    if report_analytics.np is None:
+        print("-" * 64)
+        print("NumPy no está instalado: solo se midió el ciclo")
+        sys.exit(0)
+
+    t_conversion, t_agregacion, resultado = columnar(filas)
+    t_numpy = t_conversion + t_agregacion
+    print(f"NumPy (columnas):           {t_numpy:8.3f} s   "
+          f"(conversión {t_conversion:.3f} s + agregación {t_agregacion:.3f} s)")
+
+    assert resultado == esperado, "NumPy y el ciclo no coinciden"
+    assert resultado['registros'] == registros
+    assert sum(c for _, _, c in resultado['por_tipo']) == sum(totales.values())
+
+    print("-" * 64)
+    print(f"Tipos: {len(resultado['por_tipo'])} | productos: {len(resultado['por_producto']):,} | "
+          f"días: {len(resultado['por_dia'])} | resultados idénticos")
+    print(f"Vs. ciclo por fila: {t_ciclo / t_numpy:,.1f}x total, {t_ciclo / t_agregacion:,.0f}x solo agregación")
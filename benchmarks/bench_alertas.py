@@ -0,0 +1,112 @@
+# =============================================
+# BENCHMARK - MOTOR INCREMENTAL DE ALERTAS
+# benchmarks/bench_alertas.py
+# Uso: python benchmarks/bench_alertas.py [productos] [movimientos]
+# =============================================
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.alert_engine import AlertEngine, clasificar
+
+LOTE = 100  # movimientos por escritura (un registro masivo o varias peticiones)
+
+
+def generar_productos(n, semilla=1):
+    """(id, stock, minimo, activo) con ~5% de productos bajo el mínimo"""
+    rnd = random.Random(semilla)
+    productos = []
+    for i in range(1, n + 1):
+        minimo = rnd.randint(5, 50)
+        stock = rnd.randint(0, minimo) if rnd.random() < 0.05 else rnd.randint(minimo + 1, minimo * 10)
+        productos.append((i, stock, minimo, True))
+    return productos
+
+
+def generar_movimientos(productos, n, semilla=2):
+    """Movimientos con sesgo: el 20% de los productos recibe el 80% de los movimientos"""
+    rnd = random.Random(semilla)
+    calientes = [p[0] for p in productos[:max(1, len(productos) // 5)]]
+    todos = [p[0] for p in productos]
+    movimientos = []
+    for _ in range(n):
+        id_producto = rnd.choice(calientes) if rnd.random() < 0.8 else rnd.choice(todos)
+        movimientos.append((id_producto, rnd.choice((-1, -1, -1, 1)) * rnd.randint(1, 10)))
+    return movimientos
+
+
+def incremental(productos, movimientos):
+    """Motor: solo se evalúan los productos tocados por cada lote"""
+    engine = AlertEngine()
+    engine.cargar(productos, {})
+    engine.tomar_cambios()
+    stock = {p[0]: [p[1], p[2]] for p in productos}
+
+    escrituras = 0
+    t0 = time.perf_counter()
+    for inicio in range(0, len(movimientos), LOTE):
+        tocados = set()
+        for id_producto, delta in movimientos[inicio:inicio + LOTE]:
+            estado = stock[id_producto]
+            estado[0] = max(0, estado[0] + delta)
+            tocados.add(id_producto)
+        for id_producto in tocados:
+            estado = stock[id_producto]
+            engine.actualizar(id_producto, estado[0], estado[1])
+        escrituras += len(engine.tomar_cambios())
+    return time.perf_counter() - t0, escrituras, engine
+
+
+def recalculo_completo(productos, movimientos, lotes):
+    """Como vw_ProductosStockBajo: se re-clasifican todos los productos en cada lectura"""
+    stock = {p[0]: [p[1], p[2]] for p in productos}
+    t0 = time.perf_counter()
+    for n in range(lotes):
+        for id_producto, delta in movimientos[n * LOTE:(n + 1) * LOTE]:
+            estado = stock[id_producto]
+            estado[0] = max(0, estado[0] + delta)
+        bajo_minimo = [i for i, (s, m) in stock.items() if clasificar(s, m)]
+    return (time.perf_counter() - t0) / lotes, len(bajo_minimo)
+
+
+if __name__ == '__main__':
+    n_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    n_movimientos = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    productos = generar_productos(n_productos)
+    movimientos = generar_movimientos(productos, n_movimientos)
+    lotes = (n_movimientos + LOTE - 1) // LOTE
+
+    print("=" * 64)
+    print(f"MOTOR DE ALERTAS ({n_productos:,} productos, {n_movimientos:,} movimientos)")
+    print("=" * 64)
+
+    tiempo, escrituras, engine = incremental(productos, movimientos)
+
+    tracemalloc.start()
+    estado = AlertEngine()
+    estado.cargar(productos, {})
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = engine.stats()
+    print(f"Incremental:  {tiempo:8.2f} s | {n_movimientos / tiempo:12,.0f} mov/s | "
+          f"{tiempo / lotes * 1000:7.3f} ms por lote de {LOTE}")
+    print(f"              cambios escritos: {escrituras:,} "
+          f"(emitidas {stats['emitidas']:,}, escaladas {stats['escaladas']:,}, "
+          f"resueltas {stats['resueltas']:,})")
+    print(f"              memoria del estado: {memoria / 1024 / 1024:.1f} MB")
+
+    muestra = min(lotes, 50)
+    por_lote, bajo_minimo = recalculo_completo(productos, movimientos, muestra)
+    print(f"Recálculo:    {por_lote * 1000:8.1f} ms por lote (muestra de {muestra} lotes, "
+          f"{bajo_minimo:,} productos bajo el mínimo)")
+
+    print("-" * 64)
+    print(f"Por lote: {por_lote / (tiempo / lotes):,.0f}x más rápido | "
+          f"filas de AlertasStock escritas por movimiento: {escrituras / n_movimientos:.4f}")
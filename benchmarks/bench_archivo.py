@@ -0,0 +1,91 @@
+# =============================================
+# BENCHMARK - ARCHIVO HISTÓRICO COLUMNAR POR MES
+# benchmarks/bench_archivo.py
+# Uso: python benchmarks/bench_archivo.py [filas]
+#
+# Un mes de Movimientos simulado: tamaño del archivo columnar comprimido
+# frente al mismo mes en CSV (y CSV comprimido), tiempo de escritura y
+# lectura del reporte de un producto en el mes. No necesita la base de datos.
+# =============================================
+
+import csv
+import gzip
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.data_archive import ArchivoHistorico, ColumnasMes, TABLAS_ARCHIVO
+
+COLUMNAS = TABLAS_ARCHIVO['Movimientos'][3]
+REPORTE = ('fecha_movimiento', 'id_producto', 'id_tipo_movimiento', 'cantidad', 'numero_documento')
+
+
+def movimientos(n, productos=5000):
+    rnd = random.Random(1)
+    inicio = datetime(2024, 1, 1)
+    paso = timedelta(days=31) / n
+    for i in range(n):
+        tipo = rnd.choice((1, 2, 2, 2, 3, 4))
+        stock = rnd.randint(0, 500)
+        yield (i + 1, rnd.randint(1, productos), tipo, rnd.randint(1, 20), stock, stock + 5,
+               rnd.randint(1, 8), rnd.randint(1, 30) if tipo == 1 else None,
+               f'FAC-{rnd.randint(1, 99999):05d}' if tipo in (1, 2) else None,
+               'Conteo físico' if tipo in (3, 4) else None,
+               inicio + paso * i)
+
+
+if __name__ == '__main__':
+    n_filas = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+    filas = list(movimientos(n_filas))
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        print("=" * 64)
+        print(f"UN MES DE MOVIMIENTOS: {n_filas:,} FILAS")
+        print("=" * 64)
+
+        texto = io.StringIO()
+        csv.writer(texto).writerows(filas)
+        crudo = texto.getvalue().encode('utf-8')
+        comprimido = gzip.compress(crudo, 6)
+        print(f"CSV:               {len(crudo) / 1024 / 1024:7.2f} MB")
+        print(f"CSV gzip:          {len(comprimido) / 1024 / 1024:7.2f} MB")
+
+        archivo = ArchivoHistorico(carpeta)
+        ruta = archivo.ruta('Movimientos', '2024-01')
+        os.makedirs(os.path.dirname(ruta))
+
+        t0 = time.perf_counter()
+        datos = ColumnasMes(COLUMNAS)
+        for fila in filas:
+            datos.agregar(fila)
+        datos.escribir(ruta, 'Movimientos', '2024-01', 'id_movimiento')
+        t_escribir = time.perf_counter() - t0
+        tamano = os.path.getsize(ruta)
+        print(f"Columnar (zip):    {tamano / 1024 / 1024:7.2f} MB | {len(crudo) / tamano:4.1f}x menos que CSV | "
+              f"escrito en {t_escribir:.2f} s")
+        archivo.registrar('Movimientos', '2024-01', {'filas': n_filas})
+        print("-" * 64)
+
+        # Reporte de un producto en el mes: solo se descomprimen las columnas que se usan
+        t0 = time.perf_counter()
+        resultado = list(archivo.leer('Movimientos', REPORTE, descendente=True, id_producto=42))
+        t_producto = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        en_csv = [fila for fila in csv.reader(io.StringIO(gzip.decompress(comprimido).decode('utf-8')))
+                  if fila[1] == '42']
+        t_csv = time.perf_counter() - t0
+
+        print(f"Un producto (columnar): {t_producto * 1000:8.1f} ms | {len(resultado):,} movimientos")
+        print(f"Un producto (CSV gzip): {t_csv * 1000:8.1f} ms | {len(en_csv):,} movimientos")
+
+        t0 = time.perf_counter()
+        todo = list(archivo.leer('Movimientos', [nombre for nombre, _ in COLUMNAS]))
+        t_todo = time.perf_counter() - t0
+        print(f"Mes completo:           {t_todo * 1000:8.1f} ms | idéntico al original: {todo == filas}")
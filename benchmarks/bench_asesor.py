@@ -0,0 +1,179 @@
+# =============================================
+# BENCHMARK - ASESOR DE ÍNDICES SOBRE UNA CARGA SIMULADA
+# benchmarks/bench_asesor.py
+# Uso: python benchmarks/bench_asesor.py [movimientos]
+#
+# Crea el esquema de bd/CreacionBD.sql en SQLite con datos simulados,
+# registra una carga parecida a la de la aplicación (historial de
+# productos.ver, listado de movimientos por tipo, usuarios.ver, alertas)
+# y muestra el ranking de índices que propone el asesor. También mide
+# cuánto agrega el registro de estadísticas a cada ejecución. No necesita
+# la base de datos.
+# =============================================
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.index_advisor import AsesorIndices, Esquema, base_muestra, copiar_muestra
+from app.services.query_stats import RegistroConsultas, huella, normalizar
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PRODUCTOS = 5000
+USUARIOS = 8
+TIPOS = 6
+
+HISTORIAL = """
+        SELECT TOP 20 * FROM vw_HistorialMovimientos
+        WHERE sku = (SELECT sku FROM Productos WHERE id_producto = ?)
+        ORDER BY fecha_movimiento DESC
+"""
+MOVIMIENTOS_TIPO = """
+            SELECT m.id_movimiento, m.fecha_movimiento, p.sku, p.nombre_producto, tm.nombre_tipo,
+                   m.cantidad, m.stock_anterior, m.stock_nuevo, u.nombre_completo AS usuario, m.numero_documento
+            FROM Movimientos m
+            INNER JOIN Productos p ON m.id_producto = p.id_producto
+            INNER JOIN TiposMovimiento tm ON m.id_tipo_movimiento = tm.id_tipo_movimiento
+            INNER JOIN Usuarios u ON m.id_usuario = u.id_usuario
+            WHERE 1=1 AND m.id_tipo_movimiento = ?
+            ORDER BY m.fecha_movimiento DESC, m.id_movimiento DESC OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+"""
+ESTADISTICAS_USUARIO = """
+        SELECT
+            (SELECT COUNT(*) FROM Movimientos WHERE id_usuario = ?) as total_movimientos,
+            (SELECT MAX(fecha_movimiento) FROM Movimientos WHERE id_usuario = ?) as ultimo_movimiento
+"""
+ALERTA_PENDIENTE = "SELECT 1 FROM AlertasStock WHERE id_producto = ? AND estado = 'PENDIENTE'"
+POR_IDS = "SELECT * FROM Productos WHERE id_producto IN (SELECT CAST(value AS INT) FROM STRING_SPLIT(?, ','))"
+
+# (sql, parámetros de ejemplo, ejecuciones, ms por ejecución en SQL Server)
+CARGA = [
+    (HISTORIAL, (42,), 1800, 35.0),
+    (MOVIMIENTOS_TIPO, (3, 51), 900, 48.0),
+    (ESTADISTICAS_USUARIO, (2, 2), 150, 20.0),
+    (ALERTA_PENDIENTE, (42,), 6000, 0.4),
+    (POR_IDS, ('1,2,3',), 300, 2.0),
+    ("EXEC sp_RegistrarMovimiento ?, ?, ?, ?, ?, ?, ?", (1, 1, 5, 1, None, None, None), 2500, 6.0),
+]
+
+
+def filas_simuladas(movimientos, rnd):
+    """tabla -> (función número -> dict con la fila, filas)"""
+    inicio = datetime(2024, 1, 1)
+    paso = 730 * 86400 / movimientos
+
+    def productos(i):
+        return {
+            'id_producto': i, 'sku': f'SKU-{i:05d}', 'codigo_barras': f'750{i:010d}',
+            'nombre_producto': f'Producto {i}', 'id_categoria': i % 12 + 1, 'id_proveedor': i % 40 + 1,
+            'precio_compra': 10.0 + i % 90, 'precio_venta': 14.0 + i % 120, 'stock_actual': i % 400,
+            'stock_minimo': 10, 'stock_maximo': 500, 'activo': 1, 'fecha_creacion': inicio
+        }
+
+    def movimiento(i):
+        # El producto 42 (el del historial) concentra el 10% de los movimientos
+        return {
+            'id_movimiento': i, 'id_producto': 42 if rnd.random() < 0.1 else rnd.randint(1, PRODUCTOS),
+            'id_tipo_movimiento': rnd.randint(1, TIPOS), 'cantidad': rnd.randint(1, 20),
+            'stock_anterior': 100, 'stock_nuevo': 90, 'id_usuario': rnd.randint(1, USUARIOS),
+            'id_proveedor': None, 'numero_documento': f'DOC-{i}',
+            'fecha_movimiento': inicio + timedelta(seconds=paso * i)
+        }
+
+    def alerta(i):
+        return {
+            'id_alerta': i, 'id_producto': rnd.randint(1, PRODUCTOS), 'tipo_alerta': 'STOCK_BAJO',
+            'stock_actual': 3, 'stock_minimo': 10, 'mensaje': 'Stock bajo',
+            'estado': 'PENDIENTE' if rnd.random() < 0.05 else 'RESUELTA',
+            'fecha_generacion': inicio + timedelta(hours=i)
+        }
+
+    return {
+        'Roles': (lambda i: {'id_rol': i, 'nombre_rol': f'Rol {i}', 'activo': 1}, 3),
+        'Usuarios': (lambda i: {'id_usuario': i, 'username': f'usuario{i}', 'password_hash': 'x',
+                                'nombre_completo': f'Usuario {i}', 'id_rol': 1, 'activo': 1}, USUARIOS),
+        'Categorias': (lambda i: {'id_categoria': i, 'nombre_categoria': f'Categoría {i}', 'activo': 1}, 12),
+        'Proveedores': (lambda i: {'id_proveedor': i, 'nit': f'{i}-K', 'nombre_proveedor': f'Proveedor {i}',
+                                   'activo': 1}, 40),
+        'TiposMovimiento': (lambda i: {'id_tipo_movimiento': i, 'nombre_tipo': f'Tipo {i}',
+                                       'afecta_stock': 'SUMA' if i % 2 else 'RESTA', 'activo': 1}, TIPOS),
+        'Productos': (productos, PRODUCTOS),
+        'Movimientos': (movimiento, movimientos),
+        'AlertasStock': (alerta, movimientos // 20),
+    }
+
+
+def registrar_carga(registro):
+    for sql, params, ejecuciones, ms in CARGA:
+        procedimiento = sql.startswith('EXEC')
+        for _ in range(ejecuciones):
+            registro.registrar(sql, params, ms / 1000, procedimiento=procedimiento)
+    registro.vaciar()
+
+
+if __name__ == '__main__':
+    movimientos = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rnd = random.Random(7)
+
+    with open(os.path.join(RAIZ, 'bd', 'CreacionBD.sql'), encoding='latin-1') as archivo:
+        esquema = Esquema.desde_sql(archivo.read())
+    conn = base_muestra(esquema)
+    generadores = filas_simuladas(movimientos, rnd)
+
+    def leer(tabla, columnas, llave, n):
+        generar, total = generadores.get(tabla, (None, 0))
+        for i in range(1, min(n, total) + 1):
+            fila = generar(i)
+            yield [fila.get(c) for c in columnas]
+
+    print("=" * 60)
+    print(f"ASESOR DE ÍNDICES ({movimientos:,} movimientos simulados)")
+    print("=" * 60)
+
+    inicio = time.perf_counter()
+    copiadas = copiar_muestra(esquema, conn, leer, filas=movimientos)
+    print(f"Muestra: {sum(copiadas.values()):,} filas en {time.perf_counter() - inicio:.1f} s")
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        registro = RegistroConsultas(os.path.join(carpeta, 'consultas.sqlite3'), intervalo=3600)
+
+        # Costo de registrar: normalizar (cacheado) + acumular bajo el lock
+        n = sum(e for _, _, e, _ in CARGA)
+        inicio = time.perf_counter()
+        registrar_carga(registro)
+        print(f"Registro: {(time.perf_counter() - inicio) / n * 1e6:.1f} µs por ejecución ({n:,} ejecuciones)")
+
+        normalizar.cache_clear()
+        inicio = time.perf_counter()
+        for sql, _, _, _ in CARGA:
+            huella(normalizar(sql))
+        print(f"Normalizar sin caché: {(time.perf_counter() - inicio) / len(CARGA) * 1e6:.1f} µs por sentencia")
+
+        registros = registro.leer()
+
+    asesor = AsesorIndices(conn, esquema)
+    inicio = time.perf_counter()
+    sentencias = asesor.preparar(registros)
+    elegidos = asesor.recomendar(sentencias)
+    print(f"Análisis: {time.perf_counter() - inicio:.1f} s")
+    print()
+
+    for i, elegido in enumerate(elegidos, 1):
+        print(f"{i}. {elegido['tabla']}({', '.join(elegido['columnas'])}) "
+              f"ahorro estimado {elegido['ahorro']:.1f} s"
+              + ("" if elegido['usado'] else "  [no se usa junto con los demás]"))
+        for sentencia, veces in elegido['beneficiadas']:
+            print(f"      {veces:6.1f}x  {sentencia.sql[:70]}")
+    if not elegidos:
+        print("Sin recomendaciones")
+
+    print()
+    for sentencia in sentencias:
+        if sentencia.error:
+            print(f"   - {sentencia.sql[:50]}: {sentencia.error}")
+    print("=" * 60)
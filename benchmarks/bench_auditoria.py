@@ -0,0 +1,72 @@
+# =============================================
+# BENCHMARK - AUDITORÍA SÍNCRONA vs COLA CON ESCRITURA POR LOTES
+# benchmarks/bench_auditoria.py
+# Uso: python benchmarks/bench_auditoria.py [eventos] [latencia_ms]
+#
+# Simula la BD con un costo fijo por viaje (latencia) y uno pequeño por fila
+# (fast_executemany). Mide cuánto espera quien escribe y cuántos viajes se
+# hacen. No necesita la base de datos.
+# =============================================
+
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.audit_writer import AuditWriter, evento
+
+COSTO_FILA = 0.00002   # segundos por fila dentro de un executemany
+
+
+class BDSimulada:
+    def __init__(self, latencia):
+        self.latencia = latencia
+        self.viajes = 0
+        self.filas = 0
+        self._lock = threading.Lock()
+
+    def escribir(self, eventos):
+        time.sleep(self.latencia + COSTO_FILA * len(eventos))
+        with self._lock:
+            self.viajes += 1
+            self.filas += len(eventos)
+
+
+def eventos_prueba(n):
+    return [evento('Productos', 'UPDATE', i, anteriores={'precio_venta': 10}, nuevos={'precio_venta': 11},
+                   id_usuario=1, ip_address='127.0.0.1') for i in range(n)]
+
+
+if __name__ == '__main__':
+    n_eventos = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latencia = (float(sys.argv[2]) if len(sys.argv) > 2 else 1.0) / 1000
+    eventos = eventos_prueba(n_eventos)
+
+    print("=" * 64)
+    print(f"AUDITORÍA DE {n_eventos:,} CAMBIOS (latencia simulada {latencia * 1000:.1f} ms)")
+    print("=" * 64)
+
+    # Un INSERT por cambio dentro de la escritura (como el trigger)
+    bd = BDSimulada(latencia)
+    t0 = time.perf_counter()
+    for e in eventos:
+        bd.escribir([e])
+    t_sync = time.perf_counter() - t0
+    print(f"Síncrona:  {t_sync:7.3f} s esperando | {bd.viajes:6,} viajes | "
+          f"{t_sync / n_eventos * 1e6:8.1f} µs por cambio")
+
+    # Cola + hilo que escribe por lotes
+    bd = BDSimulada(latencia)
+    writer = AuditWriter(bd.escribir, max_cola=10000, lote=500, intervalo=0.2)
+    t0 = time.perf_counter()
+    for e in eventos:
+        writer.registrar([e])
+    t_cola = time.perf_counter() - t0
+    writer.cerrar()
+    t_total = time.perf_counter() - t0
+    print(f"En cola:   {t_cola:7.3f} s esperando | {bd.viajes:6,} viajes | "
+          f"{t_cola / n_eventos * 1e6:8.1f} µs por cambio | escritos {bd.filas:,} en {t_total:.3f} s")
+    print("-" * 64)
+    print(f"Espera de quien escribe: {t_sync / t_cola:,.0f}x menor; viajes: {n_eventos / max(bd.viajes, 1):,.0f}x menos")
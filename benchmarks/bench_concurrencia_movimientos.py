@@ -0,0 +1,172 @@
+# =============================================
+# BENCHMARK - MOVIMIENTOS CONCURRENTES SOBRE LOS MISMOS PRODUCTOS
+# benchmarks/bench_concurrencia_movimientos.py
+# Uso: python benchmarks/bench_concurrencia_movimientos.py [hilos] [movimientos_por_hilo] [productos]
+#
+# Varios hilos registran entradas y salidas sobre pocos productos "calientes"
+# (como varias cajas escaneando el mismo SKU) y al final se compara el stock
+# de cada producto con el esperado según los movimientos que sí se registraron.
+#   - legado: lectura con SELECT, cálculo y UPDATE por separado (el
+#     procedimiento anterior, ejecutado como lote de T-SQL)
+#   - actual: sp_RegistrarMovimiento (UPDATE ... OUTPUT) con reintento de
+#     interbloqueos en execute_procedure
+#
+# Necesita la base de datos configurada en config.py y ESCRIBE movimientos
+# (entradas y salidas de la misma cantidad). Usar una base de datos de pruebas.
+# =============================================
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+N_HILOS = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+os.environ.setdefault('DB_POOL_MAX_SIZE', str(N_HILOS + 2))  # una conexión por hilo
+
+from app import create_app
+from app.database import execute_query, execute_procedure, es_interbloqueo
+
+# El procedimiento anterior, tal cual, para comparar en la misma base de datos
+LEGADO = """
+    SET NOCOUNT ON;
+    DECLARE @id_producto INT = ?, @id_tipo_movimiento INT = ?, @cantidad INT = ?, @id_usuario INT = ?;
+    DECLARE @stock_anterior INT, @stock_nuevo INT, @afecta_stock VARCHAR(10), @stock_minimo INT;
+
+    BEGIN TRANSACTION;
+    EXEC sp_getapplock @Resource = 'DashboardSnapshot', @LockMode = 'Shared', @LockOwner = 'Transaction';
+
+    SELECT @stock_anterior = stock_actual FROM Productos WHERE id_producto = @id_producto;
+    SELECT @afecta_stock = afecta_stock FROM TiposMovimiento WHERE id_tipo_movimiento = @id_tipo_movimiento;
+    SET @stock_nuevo = CASE @afecta_stock
+        WHEN 'SUMA' THEN @stock_anterior + @cantidad
+        WHEN 'RESTA' THEN @stock_anterior - @cantidad
+        ELSE @cantidad END;
+
+    IF @stock_nuevo < 0
+    BEGIN
+        ROLLBACK TRANSACTION;
+        RAISERROR('No hay suficiente stock para realizar esta operación', 16, 1);
+        RETURN;
+    END
+
+    INSERT INTO Movimientos (id_producto, id_tipo_movimiento, cantidad, stock_anterior, stock_nuevo, id_usuario, numero_documento)
+    VALUES (@id_producto, @id_tipo_movimiento, @cantidad, @stock_anterior, @stock_nuevo, @id_usuario, 'BENCH');
+
+    UPDATE Productos SET stock_actual = @stock_nuevo, fecha_modificacion = GETDATE()
+    WHERE id_producto = @id_producto;
+
+    SELECT @stock_minimo = stock_minimo FROM Productos WHERE id_producto = @id_producto;
+    IF @stock_nuevo <= @stock_minimo AND NOT EXISTS (
+        SELECT 1 FROM AlertasStock WHERE id_producto = @id_producto AND estado = 'PENDIENTE'
+    )
+        INSERT INTO AlertasStock (id_producto, tipo_alerta, stock_actual, stock_minimo, mensaje, estado)
+        VALUES (@id_producto, 'STOCK_MINIMO', @stock_nuevo, @stock_minimo, 'Stock alcanzó el nivel mínimo', 'PENDIENTE');
+
+    COMMIT TRANSACTION;
+"""
+
+
+def preparar(n_productos):
+    """Productos calientes (los de más stock), tipos SUMA/RESTA y usuario"""
+    productos = [fila[0] for fila in execute_query(
+        f"SELECT TOP {int(n_productos)} id_producto FROM Productos WHERE activo = 1 ORDER BY stock_actual DESC"
+    )]
+    suma = execute_query("SELECT TOP 1 id_tipo_movimiento FROM TiposMovimiento WHERE afecta_stock = 'SUMA'")[0][0]
+    resta = execute_query("SELECT TOP 1 id_tipo_movimiento FROM TiposMovimiento WHERE afecta_stock = 'RESTA'")[0][0]
+    usuario = execute_query("SELECT TOP 1 id_usuario FROM Usuarios ORDER BY id_usuario")[0][0]
+    return productos, suma, resta, usuario
+
+
+def stocks(productos):
+    marcadores = ', '.join('?' * len(productos))
+    return {fila[0]: fila[1] for fila in execute_query(
+        f"SELECT id_producto, stock_actual FROM Productos WHERE id_producto IN ({marcadores})", tuple(productos)
+    )}
+
+
+def registrar_legado(id_producto, id_tipo, cantidad, id_usuario):
+    execute_query(LEGADO, (id_producto, id_tipo, cantidad, id_usuario), fetch=False)
+
+
+def registrar_actual(id_producto, id_tipo, cantidad, id_usuario):
+    execute_procedure('sp_RegistrarMovimiento', {
+        'id_producto': id_producto,
+        'id_tipo_movimiento': id_tipo,
+        'cantidad': cantidad,
+        'id_usuario': id_usuario,
+        'id_proveedor': None,
+        'numero_documento': 'BENCH',
+        'observaciones': None
+    })
+
+
+def escritor(app, registrar, productos, suma, resta, id_usuario, n, semilla, neto, errores, lock):
+    """Entradas y salidas alternadas; 'neto' acumula lo que sí se registró"""
+    rnd = random.Random(semilla)
+    propio = Counter()
+    fallas = Counter()
+    with app.app_context():
+        for i in range(n):
+            id_producto = rnd.choice(productos)
+            cantidad = rnd.randint(1, 5)
+            entrada = i % 2 == 0
+            try:
+                registrar(id_producto, suma if entrada else resta, cantidad, id_usuario)
+                propio[id_producto] += cantidad if entrada else -cantidad
+            except Exception as e:
+                fallas['interbloqueo' if es_interbloqueo(e) else 'otro'] += 1
+    with lock:
+        neto.update(propio)
+        errores.update(fallas)
+
+
+def medir(app, nombre, registrar, productos, suma, resta, id_usuario, n):
+    inicial = stocks(productos)
+    neto, errores, lock = Counter(), Counter(), threading.Lock()
+    hilos = [
+        threading.Thread(target=escritor, args=(app, registrar, productos, suma, resta, id_usuario,
+                                                n, semilla, neto, errores, lock))
+        for semilla in range(N_HILOS)
+    ]
+
+    t0 = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    tiempo = time.perf_counter() - t0
+
+    final = stocks(productos)
+    descuadre = sum(abs(final[p] - (inicial[p] + neto[p])) for p in productos)
+    registrados = N_HILOS * n - sum(errores.values())
+    print(f"{nombre:7} {tiempo:7.2f} s | {registrados / tiempo:8,.0f} mov/s | "
+          f"interbloqueos {errores['interbloqueo']:4} | otros errores {errores['otro']:4} | "
+          f"descuadre de stock {descuadre:,} unidades")
+
+
+if __name__ == '__main__':
+    n_movimientos = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    n_productos = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    app = create_app(os.environ.get('FLASK_CONFIG', 'development'))
+    with app.app_context():
+        productos, suma, resta, id_usuario = preparar(n_productos)
+
+        print("=" * 88)
+        print(f"MOVIMIENTOS CONCURRENTES: {N_HILOS} hilos x {n_movimientos} movimientos "
+              f"sobre {len(productos)} productos")
+        print("=" * 88)
+
+        # Calentamiento: planes de ejecución y conexiones
+        registrar_actual(productos[0], suma, 1, id_usuario)
+        registrar_actual(productos[0], resta, 1, id_usuario)
+
+        medir(app, 'legado', registrar_legado, productos, suma, resta, id_usuario, n_movimientos)
+        medir(app, 'actual', registrar_actual, productos, suma, resta, id_usuario, n_movimientos)
+
+        print("-" * 88)
+        print("Descuadre = diferencia entre el stock final y el inicial más los movimientos registrados")
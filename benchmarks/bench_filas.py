@@ -0,0 +1,75 @@
+# =============================================
+# BENCHMARK - FILAS COMPACTAS vs DICCIONARIOS
+# benchmarks/bench_filas.py
+# Uso: python benchmarks/bench_filas.py [filas]
+# =============================================
+
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rows import make_rows
+
+COLUMNAS = [
+    'id_movimiento', 'fecha_movimiento', 'sku', 'nombre_producto', 'nombre_tipo',
+    'cantidad', 'stock_anterior', 'stock_nuevo', 'usuario', 'numero_documento'
+]
+
+
+def generar_filas(n):
+    """Simula las filas que retorna el cursor para movimientos.listar"""
+    inicio = datetime(2025, 1, 1)
+    tipos = ['Entrada', 'Salida', 'Ajuste Positivo', 'Ajuste Negativo']
+    return [
+        (i, inicio + timedelta(minutes=i), f'SKU-{i % 5000:05d}', f'Producto {i % 5000}',
+         tipos[i % 4], i % 50 + 1, i % 300, i % 300 + 1, 'Operador Bodega', f'DOC-{i}')
+        for i in range(n)
+    ]
+
+
+def con_diccionarios(columns, rows):
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def con_filas(columns, rows):
+    return list(make_rows(columns, rows))
+
+
+def medir(nombre, funcion, columns, rows):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resultado = funcion(columns, rows)
+    construir = time.perf_counter() - t0
+    memoria, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    total = 0
+    for fila in resultado:
+        total += fila['cantidad']
+    acceso = time.perf_counter() - t0
+
+    print(f"{nombre:<14} construir: {construir * 1000:8.1f} ms | "
+          f"acceso: {acceso * 1000:7.1f} ms | memoria: {memoria / 1024 / 1024:7.1f} MB")
+    return construir, memoria
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    filas = generar_filas(n)
+
+    print("=" * 60)
+    print(f"FILAS COMPACTAS vs DICCIONARIOS ({n:,} filas)")
+    print("=" * 60)
+
+    t_dict, m_dict = medir('dict(zip())', con_diccionarios, COLUMNAS, filas)
+    t_row, m_row = medir('Row', con_filas, COLUMNAS, filas)
+
+    print("-" * 60)
+    print(f"Tiempo de construcción: {t_dict / t_row:.1f}x más rápido")
+    print(f"Memoria adicional:      {m_dict / m_row:.1f}x menor "
+          f"({(m_dict - m_row) / 1024 / 1024:.1f} MB ahorrados)")
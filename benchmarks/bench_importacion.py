@@ -0,0 +1,100 @@
+# =============================================
+# BENCHMARK - IMPORTACIÓN MASIVA DE PRODUCTOS
+# benchmarks/bench_importacion.py
+# Uso: python benchmarks/bench_importacion.py [productos]
+#
+# Mide lectura en streaming + validación + armado de lotes. La escritura
+# se reemplaza por un contador: con la BD cada lote es un executemany con
+# fast_executemany en lugar de dos viajes (COUNT + INSERT) por producto.
+# =============================================
+
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.product_import import ImportacionProductos, leer_archivo
+from app.services.report_export import exportar_xlsx
+
+ENCABEZADO = ['SKU', 'Código de Barras', 'Nombre', 'Categoría', 'Proveedor',
+              'Precio Compra', 'Precio Venta', 'Stock', 'Stock Mínimo', 'Stock Máximo']
+CATEGORIAS = {'1': 1, '2': 2, 'alimentos': 1, 'bebidas': 2}
+PROVEEDORES = {'1': 1, '12345-6': 1}
+
+
+def generar_filas(n, semilla=1):
+    """Catálogo de proveedor con ~1% de filas inválidas y 10% de SKU ya existentes"""
+    rnd = random.Random(semilla)
+    for i in range(n):
+        precio = rnd.randint(100, 50000) / 100
+        fila = [f'PROV-{i:06d}', str(7400000000000 + i), f'Producto importado {i}',
+                rnd.choice(['Alimentos', 'Bebidas', '2']), '12345-6',
+                f'{precio:.2f}', f'{precio * 1.3:.2f}', str(rnd.randint(0, 500)),
+                str(rnd.randint(5, 20)), str(rnd.randint(100, 900))]
+        if i % 100 == 99:
+            fila[rnd.choice((5, 7, 3))] = 'xx'
+        yield fila
+
+
+class Contador:
+    """Reemplaza execute_batch: solo cuenta lotes y filas"""
+
+    def __init__(self):
+        self.lotes = 0
+        self.filas = 0
+
+    def __call__(self, sentencias):
+        self.lotes += 1
+        self.filas += sum(len(filas) for _, filas in sentencias)
+
+
+def medir(ruta, n):
+    existentes = {f'PROV-{i:06d}' for i in range(0, n, 10)}
+    contador = Contador()
+    importacion = ImportacionProductos(existentes, CATEGORIAS, PROVEEDORES, escribir=contador)
+
+    t0 = time.perf_counter()
+    resultado = importacion.procesar(leer_archivo(ruta))
+    tiempo = time.perf_counter() - t0
+
+    tracemalloc.start()
+    ImportacionProductos(set(existentes), CATEGORIAS, PROVEEDORES, escribir=Contador()).procesar(leer_archivo(ruta))
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return tiempo, pico, resultado, contador
+
+
+if __name__ == '__main__':
+    n_productos = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_csv = os.path.join(carpeta, 'catalogo.csv')
+        with open(ruta_csv, 'w', encoding='utf-8', newline='') as f:
+            escritor = csv.writer(f)
+            escritor.writerow(ENCABEZADO)
+            escritor.writerows(generar_filas(n_productos))
+
+        ruta_xlsx = os.path.join(carpeta, 'catalogo.xlsx')
+        with open(ruta_xlsx, 'wb') as f:
+            for parte in exportar_xlsx(ENCABEZADO, generar_filas(n_productos)):
+                f.write(parte)
+
+        print("=" * 64)
+        print(f"IMPORTACIÓN DE PRODUCTOS ({n_productos:,} filas)")
+        print("=" * 64)
+
+        for nombre, ruta in (('CSV', ruta_csv), ('XLSX', ruta_xlsx)):
+            tiempo, pico, resultado, contador = medir(ruta, n_productos)
+            print(f"{nombre:5} {tiempo:7.2f} s | {n_productos / tiempo:9,.0f} filas/s | "
+                  f"memoria pico {pico / 1024 / 1024:5.1f} MB | archivo {os.path.getsize(ruta) / 1024 / 1024:.1f} MB")
+            print(f"      nuevos {resultado['insertados']:,} | existentes {resultado['actualizados']:,} | "
+                  f"errores {resultado['total_errores']:,} | {contador.lotes} lotes")
+
+        ejemplo = resultado['errores'][0]
+        print("-" * 64)
+        print(f"Ejemplo de error: fila {ejemplo['fila']}, {ejemplo['sku']}: {ejemplo['mensaje']}")
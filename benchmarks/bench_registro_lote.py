@@ -0,0 +1,88 @@
+# =============================================
+# BENCHMARK - REGISTRO DE MOVIMIENTOS LÍNEA POR LÍNEA vs EN LOTE
+# benchmarks/bench_registro_lote.py
+# Uso: python benchmarks/bench_registro_lote.py [lineas] [id_producto]
+#
+# Necesita la base de datos configurada en config.py y ESCRIBE movimientos:
+# entradas y salidas de la misma cantidad que dejan el stock igual.
+# Usar una base de datos de pruebas.
+# =============================================
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.database import execute_query, execute_procedure, registrar_movimientos_lote
+
+
+def preparar(id_producto=None):
+    """Producto, tipos SUMA/RESTA y usuario para las pruebas"""
+    suma = execute_query("SELECT TOP 1 id_tipo_movimiento FROM TiposMovimiento WHERE afecta_stock = 'SUMA'")
+    resta = execute_query("SELECT TOP 1 id_tipo_movimiento FROM TiposMovimiento WHERE afecta_stock = 'RESTA'")
+    usuario = execute_query("SELECT TOP 1 id_usuario FROM Usuarios ORDER BY id_usuario")
+    if id_producto is None:
+        id_producto = execute_query("SELECT TOP 1 id_producto FROM Productos WHERE activo = 1 ORDER BY id_producto")[0][0]
+    return id_producto, suma[0][0], resta[0][0], usuario[0][0]
+
+
+def lineas_compensadas(n, id_producto, tipo_suma, tipo_resta):
+    """Entrada y salida alternadas: el stock termina como empezó"""
+    return [
+        (i, id_producto, tipo_suma if i % 2 else tipo_resta, 1, None, 'BENCH', None)
+        for i in range(1, n + 1)
+    ]
+
+
+def por_linea(lineas, id_usuario):
+    """Como hoy: una llamada a sp_RegistrarMovimiento (y una transacción) por línea"""
+    t0 = time.perf_counter()
+    for _, id_producto, id_tipo, cantidad, id_proveedor, documento, observaciones in lineas:
+        execute_procedure('sp_RegistrarMovimiento', {
+            'id_producto': id_producto,
+            'id_tipo_movimiento': id_tipo,
+            'cantidad': cantidad,
+            'id_usuario': id_usuario,
+            'id_proveedor': id_proveedor,
+            'numero_documento': documento,
+            'observaciones': observaciones
+        })
+    return time.perf_counter() - t0
+
+
+def en_lote(lineas, id_usuario):
+    t0 = time.perf_counter()
+    resultados = registrar_movimientos_lote(lineas, id_usuario)
+    tiempo = time.perf_counter() - t0
+    rechazadas = sum(1 for r in resultados if r['estado'] != 'REGISTRADO')
+    return tiempo, rechazadas
+
+
+if __name__ == '__main__':
+    n_lineas = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    id_producto = int(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    app = create_app(os.environ.get('FLASK_CONFIG', 'development'))
+    with app.test_request_context():
+        id_producto, tipo_suma, tipo_resta, id_usuario = preparar(id_producto)
+        lineas = lineas_compensadas(n_lineas, id_producto, tipo_suma, tipo_resta)
+
+        print("=" * 64)
+        print(f"REGISTRO DE MOVIMIENTOS ({n_lineas:,} líneas, producto {id_producto})")
+        print("=" * 64)
+
+        # Calentamiento: planes de ejecución y conexión
+        en_lote(lineas[:2], id_usuario)
+        por_linea(lineas[:2], id_usuario)
+
+        t_linea = por_linea(lineas, id_usuario)
+        print(f"Línea por línea: {t_linea:8.3f} s | {n_lineas / t_linea:10,.0f} líneas/s")
+
+        t_lote, rechazadas = en_lote(lineas, id_usuario)
+        print(f"En lote:         {t_lote:8.3f} s | {n_lineas / t_lote:10,.0f} líneas/s"
+              f" | rechazadas: {rechazadas}")
+
+        print("-" * 64)
+        print(f"Lote: {t_linea / t_lote:,.1f}x más rápido")
@@ -0,0 +1,120 @@
+# =============================================
+# BENCHMARK - EXPORTACIÓN EN LA PETICIÓN vs TRABAJO EN SEGUNDO PLANO
+# benchmarks/bench_trabajos.py
+# Uso: python benchmarks/bench_trabajos.py [filas]
+#
+# Genera un XLSX grande (la parte de CPU de exportar el reporte) mientras
+# el proceso web atiende peticiones cortas, y mide su latencia:
+#   - en la petición: la exportación compite por el GIL con las demás
+#   - en segundo plano: corre en un proceso de JobRunner
+# No necesita la base de datos.
+# =============================================
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.job_runner import JobRunner, JobStore, tarea, TERMINADOS
+from app.services.report_export import exportar_xlsx
+
+COLUMNAS = ['Fecha', 'SKU', 'Producto', 'Tipo', 'Cantidad', 'Stock Anterior', 'Stock Nuevo', 'Usuario', 'Documento']
+
+
+def filas_reporte(n):
+    inicio = datetime(2025, 1, 1)
+    for i in range(n):
+        yield (inicio + timedelta(minutes=i), f'SKU-{i % 5000:05d}', f'Producto {i % 5000}', 'Entrada',
+               i % 50 + 1, i % 300, i % 300 + 5, 'Operador Bodega', f'FAC-{i}')
+
+
+def exportar(ruta, n, avance=None):
+    with open(ruta, 'wb') as f:
+        for i, parte in enumerate(exportar_xlsx(COLUMNAS, filas_reporte(n))):
+            f.write(parte)
+            if avance is not None:
+                avance(i)
+
+
+@tarea('bench_exportar')
+def tarea_exportar(trabajo, filas):
+    exportar(trabajo.archivo_resultado('reporte.xlsx'), filas,
+             lambda i: trabajo.progreso(i * 1000, filas, f'{i * 1000:,} filas'))
+    return {'filas': filas}
+
+
+def peticion_corta():
+    """Lo que cuesta una página interactiva pequeña (armar y serializar unas filas)"""
+    t0 = time.perf_counter()
+    sum(len(str(fila)) for fila in filas_reporte(200))
+    return time.perf_counter() - t0
+
+
+def latencias(mientras):
+    """Latencias de peticiones cortas hasta que 'mientras()' sea falso"""
+    medidas = []
+    while mientras():
+        medidas.append(peticion_corta())
+        time.sleep(0.005)
+    medidas.sort()
+    return medidas
+
+
+def percentil(medidas, p):
+    return medidas[min(len(medidas) - 1, int(len(medidas) * p))] * 1000 if medidas else 0.0
+
+
+if __name__ == '__main__':
+    n_filas = int(sys.argv[1]) if len(sys.argv) > 1 else 300_000
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        print("=" * 64)
+        print(f"EXPORTACIÓN XLSX DE {n_filas:,} FILAS")
+        print("=" * 64)
+
+        base = latencias(lambda fin=time.perf_counter() + 1: time.perf_counter() < fin)
+        print(f"Sin exportación:    petición corta p50 {percentil(base, .5):6.2f} ms | p99 {percentil(base, .99):6.2f} ms")
+
+        # 1) En la petición (otro hilo del mismo proceso web)
+        hilo = threading.Thread(target=exportar, args=(os.path.join(carpeta, 'inline.xlsx'), n_filas))
+        t0 = time.perf_counter()
+        hilo.start()
+        medidas = latencias(hilo.is_alive)
+        t_inline = time.perf_counter() - t0
+        print(f"En la petición:     {t_inline:6.2f} s ocupando el hilo web | "
+              f"p50 {percentil(medidas, .5):6.2f} ms | p99 {percentil(medidas, .99):6.2f} ms")
+
+        # 2) En segundo plano
+        store = JobStore(os.path.join(carpeta, 'trabajos.sqlite3'))
+        runner = JobRunner(store, os.path.join(carpeta, 'resultados'), max_workers=1)
+        runner.encolar('bench_exportar', {'filas': 1000})          # calentamiento: arranque del proceso
+        while store.listar(limite=1)[0]['estado'] not in TERMINADOS:
+            time.sleep(0.05)
+
+        t0 = time.perf_counter()
+        id_trabajo = runner.encolar('bench_exportar', {'filas': n_filas})
+        t_encolar = time.perf_counter() - t0
+        medidas = latencias(lambda: store.obtener(id_trabajo)['estado'] not in TERMINADOS)
+        t_fondo = time.perf_counter() - t0
+        trabajo = store.obtener(id_trabajo)
+        print(f"Segundo plano:      {t_encolar * 1000:6.2f} ms para encolar, {t_fondo:.2f} s hasta {trabajo['estado']} | "
+              f"p50 {percentil(medidas, .5):6.2f} ms | p99 {percentil(medidas, .99):6.2f} ms")
+        print(f"                    archivo {os.path.getsize(trabajo['archivo']) / 1024 / 1024:.1f} MB")
+
+        # 3) Cancelación a mitad del trabajo
+        id_trabajo = runner.encolar('bench_exportar', {'filas': n_filas})
+        while store.obtener(id_trabajo)['hechos'] == 0:
+            time.sleep(0.02)
+        t0 = time.perf_counter()
+        runner.cancelar(id_trabajo)
+        while store.obtener(id_trabajo)['estado'] not in TERMINADOS:
+            time.sleep(0.01)
+        trabajo = store.obtener(id_trabajo)
+        print(f"Cancelación:        {trabajo['estado']} en {(time.perf_counter() - t0) * 1000:.0f} ms "
+              f"(iba en {trabajo['hechos']:,} filas)")
+
+        runner.cerrar()
@@ -26,6 +26,16 @@ class Config:
         f'Trusted_Connection=yes;'
     )
     
+    # Pool de conexiones
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', 2))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 10))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))     # segundos de espera
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))     # edad máxima en segundos
+    DB_POOL_VALIDATE = True                                             # SELECT 1 al prestar
+    DB_STREAM_BATCH_SIZE = 1000                                         # filas por fetchmany
+    DB_DEADLOCK_RETRIES = 3                                             # reintentos si un procedimiento es víctima de un interbloqueo
+    DB_DEADLOCK_BACKOFF = 0.05                                          # segundos de la primera espera (se duplica en cada reintento)
+    
     # =============================================
     # CONFIGURACIÓN DE SESIONES
     # =============================================
@@ -41,11 +51,101 @@ class Config:
     APP_NAME = 'SGI-GuateMart'
     APP_VERSION = '1.0.0'
     ITEMS_PER_PAGE = 20
+    PAGINATION_COUNT_TTL = 60  # segundos que se cachea el total de registros (0 = no contar)
+    
+    # Índice de búsqueda de productos (trigramas en memoria)
+    SEARCH_INDEX_ENABLED = True
+    SEARCH_INDEX_MAX_RESULTS = 2000    # con más coincidencias se usa LIKE
+    SEARCH_INDEX_SYNC_INTERVAL = 60    # segundos entre sincronizaciones con la BD
+    
+    # Snapshot del dashboard: se recalcula desde las tablas base con la
+    # tarea programada 'reconciliar_dashboard' (JOBS_SCHEDULE)
+    DASHBOARD_CACHE_TTL = 30             # segundos que se comparten los datos por rol (0 = sin caché)
+    
+    # Motor de alertas de stock (estado por producto en memoria)
+    ALERT_ENGINE_ENABLED = True
+    ALERT_ENGINE_SYNC_INTERVAL = 300     # segundos entre sincronizaciones con cambios de otros procesos
+    
+    # Auditoría de cambios en productos (cola en memoria, escritura por lotes)
+    AUDIT_ENABLED = True
+    AUDIT_QUEUE_MAX = 10000              # eventos en cola antes de escribir en la petición
+    AUDIT_BATCH_SIZE = 500               # eventos por escritura (fast_executemany)
+    AUDIT_FLUSH_INTERVAL = 1.0           # segundos máximos que un evento espera en la cola
+    AUDIT_PENDING_PATH = os.path.join('cache', 'auditoria_pendiente.jsonl')  # si la BD no responde al cerrar
+    
+    # Registro de movimientos en lote (recepción de un camión, conteos)
+    MOVIMIENTOS_LOTE_MAX = 1000          # líneas por petición
     
     # Uploads
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv', 'pdf'}
+    PRODUCT_IMPORT_BATCH_SIZE = 1000    # productos por escritura en la importación masiva
+    PRODUCT_IMPORT_MAX_ERRORS = 1000    # errores por fila que se muestran
+    
+    # Trabajos en segundo plano (exportaciones e importaciones grandes)
+    JOBS_ENABLED = True
+    JOBS_MAX_WORKERS = int(os.environ.get('JOBS_MAX_WORKERS', 2))   # procesos de trabajo
+    JOBS_DB_PATH = os.environ.get('JOBS_DB_PATH') or os.path.join('cache', 'trabajos.sqlite3')
+    JOBS_FOLDER = os.environ.get('JOBS_FOLDER') or os.path.join('cache', 'trabajos')  # archivos de resultado
+    JOBS_RESULT_TTL = 24 * 3600         # segundos que se conservan los trabajos terminados y sus archivos
+    JOBS_STALE_AFTER = 600              # segundos sin avance para dar por interrumpido un trabajo
+    JOBS_SCHEDULE = {                   # tarea -> segundos entre ejecuciones (0 = no se programa)
+        'archivar_historicos': 0,       # 24 * 3600 con ARCHIVE_ENABLED (ver GUIA_INSTALACION.txt)
+        'exportar_analitica': 3600,
+        'reconciliar_dashboard': 3600
+    }
+    
+    # Archivo histórico: lo anterior a la retención se guarda por mes en
+    # archivos columnares comprimidos y se borra de la BD por lotes.
+    # Apagado por defecto: borra filas de la BD (ver GUIA_INSTALACION.txt)
+    ARCHIVE_ENABLED = False
+    ARCHIVE_PATH = os.environ.get('ARCHIVE_PATH') or 'archivo'
+    ARCHIVE_RETENTION_MONTHS = {         # meses completos que se conservan en la BD (0 = no se archiva)
+        'Movimientos': 24,
+        'Auditoria': 6,
+        'AlertasStock': 3                # solo las resueltas
+    }
+    ARCHIVE_DELETE_BATCH = 1000         # filas por DELETE: cada fila bloquea también sus llaves en cada
+                                        # índice, y con 5000 bloqueos SQL Server escala a toda la tabla
+    ARCHIVE_DELETE_PAUSE = 0.05         # segundos entre lotes para no acaparar el registro de movimientos
+    
+    # Almacén analítico: Movimientos por mes en columnas sin comprimir (mmap)
+    # para los reportes históricos de /analitica; se actualiza con la tarea
+    # programada 'exportar_analitica'
+    ANALYTICS_ENABLED = True
+    ANALYTICS_PATH = os.environ.get('ANALYTICS_PATH') or os.path.join('cache', 'analitica')
+
+    # Estadísticas de consultas: frecuencia y latencia por sentencia normalizada,
+    # para sugerir índices con asesor_indices.py
+    QUERY_STATS_ENABLED = True
+    QUERY_STATS_PATH = os.environ.get('QUERY_STATS_PATH') or os.path.join('cache', 'consultas.sqlite3')
+    QUERY_STATS_FLUSH_INTERVAL = 60     # segundos entre escrituras de lo acumulado por cada proceso
+
+    # Caché local de códigos de barras (SQLite)
+    BARCODE_CACHE_ENABLED = True
+    BARCODE_CACHE_PATH = os.environ.get('BARCODE_CACHE_PATH') or os.path.join('cache', 'barcodes.sqlite3')
+    BARCODE_CACHE_TTL = 7 * 24 * 3600          # productos encontrados: 7 días
+    BARCODE_CACHE_NEGATIVE_TTL = 24 * 3600     # "no encontrado": 1 día
+    BARCODE_CACHE_MAX_ENTRIES = 50000
+    
+    # Catálogo offline (se genera con importar_catalogo.py)
+    BARCODE_CATALOG_PATH = os.environ.get('BARCODE_CATALOG_PATH') or 'catalogo'
+    
+    # Consultas a APIs de códigos de barras
+    BARCODE_OPENFOODFACTS_URL = os.environ.get('BARCODE_OPENFOODFACTS_URL')  # None = URL pública
+    BARCODE_UPCITEMDB_URL = os.environ.get('BARCODE_UPCITEMDB_URL')          # None = URL pública
+    BARCODE_UPCITEMDB_ENABLED = True
+    BARCODE_UPCITEMDB_RATE_LIMIT = 1    # el plan gratuito es muy limitado
+    BARCODE_TIMEOUT = 5             # segundos máximos por búsqueda (todas las fuentes)
+    BARCODE_HEDGE_DELAY = 0.8       # segundos antes de consultar también la fuente de respaldo
+    BARCODE_BREAKER_FAILURES = 5    # errores seguidos que abren el circuito
+    BARCODE_BREAKER_ERROR_RATE = 0.5
+    BARCODE_BREAKER_COOLDOWN = 30   # segundos con el circuito abierto
+    BARCODE_BREAKER_SLOW_CALL = 3   # respuestas más lentas cuentan como degradación
+    BARCODE_MAX_WORKERS = 8         # consultas simultáneas en lote
+    BARCODE_RATE_LIMIT = 10         # peticiones por segundo por host
+    BARCODE_BATCH_MAX = 500         # códigos por petición de lote
 
 
 class DevelopmentConfig(Config):
@@ -0,0 +1,36 @@
+# =============================================
+# IMPORTAR CATÁLOGO OFFLINE - SGI-GuateMart
+# importar_catalogo.py
+# Uso: python importar_catalogo.py <export.csv|.jsonl[.gz]> [directorio]
+# =============================================
+
+import sys
+import time
+
+from app.services.barcode_catalog import construir_catalogo
+from config import Config
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Uso: python importar_catalogo.py <export.csv|.jsonl[.gz]> [directorio]")
+        sys.exit(1)
+
+    origen = sys.argv[1]
+    destino = sys.argv[2] if len(sys.argv) > 2 else Config.BARCODE_CATALOG_PATH
+
+    print("=" * 60)
+    print("IMPORTANDO CATÁLOGO OFFLINE DE CÓDIGOS DE BARRAS")
+    print("=" * 60)
+    print(f"Origen:  {origen}")
+    print(f"Destino: {destino}")
+    print()
+
+    inicio = time.time()
+    cantidad = construir_catalogo(
+        origen, destino,
+        progreso=lambda n: print(f"   {n:,} productos leídos...")
+    )
+
+    print()
+    print(f"✓ {cantidad:,} productos en el catálogo ({time.time() - inicio:.1f} s)")
+    print("=" * 60)